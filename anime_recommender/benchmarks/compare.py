@@ -0,0 +1,93 @@
+import numpy as np
+
+# Metric -> direction: 1 when lower is better, -1 when higher is better
+METRIC_DIRECTIONS = {
+    'seconds': 1,
+    'cpu_seconds': 1,
+    'mean_ms': 1,
+    'p50_ms': 1,
+    'p90_ms': 1,
+    'p99_ms': 1,
+    'per_query_ms': 1,
+    'peak_memory_bytes': 1,
+    'qps': -1,
+    'overhead_fraction': 1,
+}
+# Changes smaller than these are treated as noise whatever their relative size
+MIN_ABSOLUTE_CHANGE = {
+    'seconds': 0.01,
+    'cpu_seconds': 0.01,
+    'peak_memory_bytes': 1024 * 1024,
+    'overhead_fraction': 0.001,
+}
+MIN_ABSOLUTE_CHANGE_MS = 0.05
+# Settings that must match for two reports to be comparable
+COMPARABLE_META = ('scale', 'seed', 'n_users', 'n_anime', 'n_ratings', 'latency_queries', 'batch_size', 'n_recommendations')
+
+
+def _min_change(metric: str) -> float:
+    return MIN_ABSOLUTE_CHANGE_MS if metric.endswith('_ms') else MIN_ABSOLUTE_CHANGE.get(metric, 0.0)
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float = 0.10) -> dict:
+    """
+    Compares two benchmark reports metric by metric.
+
+    A metric regresses when it is worse than the baseline by more than `threshold` (relative)
+    and by more than a small absolute floor, so sub-millisecond jitter is not flagged.
+
+    Args:
+        baseline (dict): Report of the reference run.
+        current (dict): Report of the run under test.
+        threshold (float): Relative change tolerated before flagging. Defaults to 0.10.
+
+    Returns:
+        dict: Per-benchmark changes, the regressions and improvements found, benchmarks missing
+        from either report and any settings that differ between the two runs.
+    """
+    baseline_results, current_results = baseline.get('results', {}), current.get('results', {})
+    comparisons, regressions, improvements = {}, [], []
+    for name in sorted(set(baseline_results) & set(current_results)):
+        comparisons[name] = {}
+        for metric, direction in METRIC_DIRECTIONS.items():
+            before, after = baseline_results[name].get(metric), current_results[name].get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else (np.inf if after else 0.0)
+            entry = {'baseline': before, 'current': after, 'change': change}
+            comparisons[name][metric] = entry
+            if abs(after - before) <= _min_change(metric):
+                continue
+            if direction * change > threshold:
+                regressions.append({'benchmark': name, 'metric': metric, **entry})
+            elif direction * change < -threshold:
+                improvements.append({'benchmark': name, 'metric': metric, **entry})
+    baseline_meta, current_meta = baseline.get('meta', {}), current.get('meta', {})
+    return {
+        'threshold': threshold,
+        'baseline_commit': baseline_meta.get('git_commit'),
+        'current_commit': current_meta.get('git_commit'),
+        'settings_differ': {
+            key: {'baseline': baseline_meta.get(key), 'current': current_meta.get(key)}
+            for key in COMPARABLE_META if baseline_meta.get(key) != current_meta.get(key)
+        },
+        'missing_in_current': sorted(set(baseline_results) - set(current_results)),
+        'missing_in_baseline': sorted(set(current_results) - set(baseline_results)),
+        'regressions': regressions,
+        'improvements': improvements,
+        'comparisons': comparisons,
+    }
+
+
+def format_comparison(comparison: dict) -> str:
+    """Renders the regressions and improvements of a comparison as a short text summary."""
+    lines = []
+    if comparison['settings_differ']:
+        lines.append(f"WARNING: runs are not comparable, settings differ: {comparison['settings_differ']}")
+    for title, entries in (('Regressions', comparison['regressions']), ('Improvements', comparison['improvements'])):
+        lines.append(f"{title} (beyond {comparison['threshold']:.0%}): {len(entries)}")
+        for entry in entries:
+            lines.append(f"  {entry['benchmark']} {entry['metric']}: {entry['baseline']:.4g} -> {entry['current']:.4g} ({entry['change']:+.1%})")
+    if comparison['missing_in_current']:
+        lines.append(f"Missing in current run: {', '.join(comparison['missing_in_current'])}")
+    return "\n".join(lines)
@@ -0,0 +1,503 @@
+import os
+import sys
+import time
+import logging as std_logging
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from anime_recommender.loggers.logging import logging, SAMPLED, SamplingFilter, create_file_handler, create_queue_handler
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.entity.config_entity import BenchmarkConfig, TrainingPipelineConfig, DataTransformationConfig
+from anime_recommender.components.data_transformation import DataTransformation
+from anime_recommender.source.collaborative_modelling import CollaborativeAnimeRecommender
+from anime_recommender.source.content_based_modelling import ContentBasedRecommender
+from anime_recommender.source.top_anime_filtering import PopularityBasedFiltering
+from anime_recommender.source.sharded_knn import ShardedUserKNN, usable_cores
+from anime_recommender.source.embeddings import EmbeddingKNN
+from anime_recommender.source.recommendations import AnimeMetadata, Recommendations
+from sklearn.neighbors import NearestNeighbors
+from anime_recommender.benchmarks.synthetic_data import SyntheticAnimeData
+from anime_recommender.utils.serving_metrics import serving_metrics
+from anime_recommender.constant import DATA_INGESTION_DIR_NAME, DATA_INGESTION_FEATURE_STORE_DIR, SERVING_METRICS_OVERHEAD_BUDGET, MODEL_TRAINER_KNN_EMBEDDING_MIN_OVERLAP
+
+COLLABORATIVE_BENCHMARKS = (
+    'train.prepare_collaborative', 'train.svd', 'train.item_knn', 'train.item_neighbor_table', 'train.user_knn',
+    'latency.svd', 'latency.item_knn', 'latency.because_you_watched', 'latency.user_knn', 'scaling.user_knn_shards',
+    'knn_embedding',
+)
+POPULARITY_METHODS = (
+    'popular_animes', 'top_ranked_animes', 'overall_top_rated_animes', 'favorite_animes',
+    'top_animes_members', 'popular_anime_among_members', 'top_avg_rated',
+)
+
+
+def measure(fn, repeats: int = 1, track_memory: bool = True) -> dict:
+    """
+    Times fn over a number of runs and, optionally, measures its peak memory.
+
+    Peak memory is the tracemalloc high-water mark (Python and NumPy allocations) of one extra
+    run, so tracing does not slow down the timed runs.
+
+    Args:
+        fn (callable): Zero-argument function to benchmark.
+        repeats (int): Number of timed runs. Defaults to 1.
+        track_memory (bool): Whether to add the traced run. Defaults to True.
+
+    Returns:
+        dict: Median, min and max wall seconds, median CPU seconds and peak memory bytes.
+    """
+    wall, cpu = [], []
+    for _ in range(repeats):
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        fn()
+        wall.append(time.perf_counter() - start_wall)
+        cpu.append(time.process_time() - start_cpu)
+    result = {
+        'repeats': repeats,
+        'seconds': float(np.median(wall)),
+        'min_seconds': float(np.min(wall)),
+        'max_seconds': float(np.max(wall)),
+        'cpu_seconds': float(np.median(cpu)),
+    }
+    if track_memory:
+        result['peak_memory_bytes'] = peak_memory(fn)
+    return result
+
+
+def peak_memory(fn) -> int:
+    """Peak bytes allocated while running fn, as seen by tracemalloc."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def latency_stats(seconds: list, n_queries: int = None) -> dict:
+    """
+    Summarizes per-call latencies.
+
+    Args:
+        seconds (list): Duration of each call in seconds.
+        n_queries (int, optional): Queries answered by all calls together, when a call answers a batch. Defaults to one per call.
+
+    Returns:
+        dict: Call count, mean and percentile latencies in milliseconds, per-query latency and throughput.
+    """
+    ms = np.asarray(seconds) * 1000.0
+    total_queries = n_queries or len(ms)
+    return {
+        'calls': len(ms),
+        'queries': total_queries,
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p90_ms': float(np.percentile(ms, 90)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'per_query_ms': float(ms.sum() / total_queries),
+        'qps': float(total_queries / (ms.sum() / 1000.0)) if ms.sum() > 0 else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+class BenchmarkSuite:
+    """
+    Benchmarks the data transformation, every training method and the per-query and batch
+    latency of every recommender on one synthetic dataset.
+
+    Benchmarks run in dependency order (transformation, then training, then latency) and are
+    named '<group>.<name>', e.g. 'train.svd' or 'latency.user_knn.batch'; `only` selects them by
+    name prefix. Models needed by a selected latency benchmark are trained even when their
+    training benchmark is not selected.
+    """
+    def __init__(self, benchmark_config: BenchmarkConfig, only: tuple = None):
+        """
+        Args:
+            benchmark_config (BenchmarkConfig): Scale, repeats, query counts and output paths.
+            only (tuple, optional): Benchmark name prefixes to run. Defaults to all benchmarks.
+        """
+        self.benchmark_config = benchmark_config
+        self.only = tuple(only) if only else None
+        self.results = {}
+        self.data = SyntheticAnimeData.from_scale(benchmark_config.scale, seed=benchmark_config.seed)
+        self._rng = np.random.default_rng(benchmark_config.seed)
+
+    def _selected(self, name: str) -> bool:
+        return self.only is None or name.startswith(self.only)
+
+    def _needs(self, *names) -> bool:
+        """Whether any selected benchmark falls under, or contains, one of the given names."""
+        return self.only is None or any(name.startswith(prefix) or prefix.startswith(name) for name in names for prefix in self.only)
+
+    def _record(self, name: str, result: dict) -> None:
+        self.results[name] = result
+        logging.info(f"Benchmark {name}: {result}")
+
+    def _time(self, name: str, fn, repeats: int = None):
+        """Runs a throughput benchmark when selected; returns fn's result either way."""
+        if not self._selected(name):
+            return fn()
+        value = {}
+        def run():
+            value['result'] = fn()
+        self._record(name, measure(run, repeats or self.benchmark_config.repeats, self.benchmark_config.track_memory))
+        return value['result']
+
+    def _latency(self, name: str, fn, queries: list, batch_size: int = 1) -> None:
+        """Times fn on each query (or each batch of queries) and records the latency distribution."""
+        if not self._selected(name):
+            return
+        calls = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)] if batch_size > 1 else queries
+        fn(calls[0])
+        seconds = []
+        for call in calls:
+            start = time.perf_counter()
+            fn(call)
+            seconds.append(time.perf_counter() - start)
+        result = latency_stats(seconds, len(queries))
+        if batch_size > 1:
+            result['batch_size'] = batch_size
+        if self.benchmark_config.track_memory:
+            result['peak_memory_bytes'] = peak_memory(lambda: [fn(call) for call in calls[:10]])
+        self._record(name, result)
+
+    def _sample(self, population, size: int) -> list:
+        return list(self._rng.choice(population, size=min(size, len(population)), replace=False))
+
+    def run(self) -> dict:
+        """
+        Generates the dataset and runs the selected benchmarks.
+
+        Returns:
+            dict: The report, with run metadata and one entry per benchmark.
+        """
+        try:
+            config = self.benchmark_config
+            n = config.n_recommendations
+            started = time.perf_counter()
+            data_ingestion_artifact = self.data.write(os.path.join(config.benchmark_dir, DATA_INGESTION_DIR_NAME, DATA_INGESTION_FEATURE_STORE_DIR))
+            generate_seconds = time.perf_counter() - started
+
+            # Data transformation, reading and writing CSVs exactly as the pipeline does
+            training_pipeline_config = TrainingPipelineConfig()
+            training_pipeline_config.artifact_dir = config.benchmark_dir
+            data_transformation = DataTransformation(data_ingestion_artifact, DataTransformationConfig(training_pipeline_config))
+            self._time('transform.data_transformation', data_transformation.initiate_data_transformation, repeats=1)
+            merged_df = pd.read_csv(data_transformation.data_transformation_config.merged_file_path)
+            anime_df = pd.read_csv(data_ingestion_artifact.feature_store_anime_file_path)
+
+            vocabulary = None
+            if self._needs(*COLLABORATIVE_BENCHMARKS):
+                recommender = self._time('train.prepare_collaborative', lambda: CollaborativeAnimeRecommender(merged_df), repeats=1)
+                vocabulary = recommender.vocabulary
+                active_users = vocabulary.user_ids[np.diff(recommender.user_item_matrix.indptr) > 0]
+                user_ids = [int(user_id) for user_id in self._sample(active_users, config.latency_queries)]
+                titles = [title for title in self._sample(vocabulary.anime_titles[:vocabulary.n_rated_anime], config.latency_queries) if isinstance(title, str)]
+
+            if self._needs('train.svd', 'latency.svd'):
+                self._time('train.svd', recommender.train_svd, repeats=1)
+                svd = recommender.svd
+                self._latency('latency.svd.single', lambda user_id: recommender.get_svd_recommendations(user_id, n=n, svd_model=svd), user_ids)
+                self._latency('latency.svd.batch', lambda batch: self._svd_batch(recommender, svd, batch, n), user_ids, config.batch_size)
+
+            if self._needs('train.item_knn', 'train.item_neighbor_table', 'latency.item_knn', 'latency.because_you_watched'):
+                self._time('train.item_knn', recommender.train_knn_item_based)
+                knn_item = recommender.knn_item_based
+                self._latency('latency.item_knn.single', lambda title: recommender.get_item_based_recommendations(title, n_recommendations=n, knn_item_model=knn_item), titles)
+                self._latency('latency.item_knn.batch', lambda batch: self._item_knn_batch(recommender, knn_item, batch, n), titles, config.batch_size)
+                if self._needs('train.item_neighbor_table', 'latency.because_you_watched'):
+                    table = self._time('train.item_neighbor_table', lambda: recommender.build_item_neighbor_table(k=config.item_neighbor_table_k, knn_item_model=knn_item), repeats=1)
+                    self._latency('latency.because_you_watched.single', lambda user_id: recommender.get_because_you_watched_recommendations(user_id=user_id, n_recommendations=n, item_neighbor_table=table), user_ids)
+                    self._latency('latency.because_you_watched.batch', lambda batch: recommender.get_batch_because_you_watched_recommendations(batch, n_recommendations=n, item_neighbor_table=table), user_ids, config.batch_size)
+
+            if self._needs('train.user_knn', 'latency.user_knn', 'scaling.user_knn_shards'):
+                self._time('train.user_knn', recommender.train_knn_user_based)
+                knn_user = recommender.knn_user_based
+                self._latency('latency.user_knn.single', lambda user_id: recommender.get_user_based_recommendations(user_id, n_recommendations=n, knn_user_model=knn_user), user_ids)
+                self._latency('latency.user_knn.batch', lambda batch: self._user_knn_batch(recommender, knn_user, batch, n), user_ids, config.batch_size)
+                if self._selected('scaling.user_knn_shards'):
+                    self._record('scaling.user_knn_shards', self._user_knn_shard_scaling(recommender, knn_user, user_ids))
+
+            if self._selected('knn_embedding'):
+                self._record('knn_embedding.item_knn', self._knn_embedding_comparison(recommender.item_user_matrix))
+                self._record('knn_embedding.user_knn', self._knn_embedding_comparison(recommender.user_item_matrix))
+
+            if self._needs('train.content', 'latency.content'):
+                content = self._time('train.content', lambda: ContentBasedRecommender(anime_df, vocabulary=vocabulary), repeats=1)
+                self._latency('latency.content.single', lambda title: content.get_rec_cosine(title, n_recommendations=n), self._sample(content.df['name'].to_numpy(), config.latency_queries))
+
+            if self._needs('latency.popularity'):
+                popularity = PopularityBasedFiltering(anime_df.copy())
+                for method in POPULARITY_METHODS:
+                    self._latency(f'latency.popularity.{method}', lambda _, method=method: getattr(popularity, method)(n=n), list(range(min(50, config.latency_queries))))
+
+            if self._selected('serving.metrics_overhead'):
+                self._record('serving.metrics_overhead', self._metrics_overhead())
+            if self._selected('serving.logging_overhead'):
+                self._record('serving.logging_overhead', self._logging_overhead())
+            if self._selected('serving.result_overhead'):
+                self._record('serving.result_overhead', self._result_overhead(anime_df, n))
+            return self.report(generate_seconds)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def _user_knn_shard_scaling(self, recommender: CollaborativeAnimeRecommender, knn_user_model, user_ids: list) -> dict:
+        """
+        Batched neighbor-query throughput of the sharded user-KNN index at every configured shard
+        count, one worker process per shard, against one shard. Also reports the share of the
+        unsharded model's neighbors the sharded index returns, which is 1 up to exactly tied
+        neighbors. Scaling flattens once the shard count exceeds the usable cores, so shard counts
+        above them are flagged as not parallel and `scaling_measured` is False on a single core.
+        """
+        config = self.benchmark_config
+        # As many neighbors as the batched user-KNN recommendations query
+        n_neighbors = min(config.n_recommendations + 1, recommender.user_item_matrix.shape[0])
+        queries = recommender.user_item_matrix[recommender.vocabulary.user_index(np.asarray(user_ids))]
+        batches = [queries[i:i + config.batch_size] for i in range(0, queries.shape[0], config.batch_size)]
+        expected = knn_user_model.kneighbors(queries, n_neighbors=n_neighbors, return_distance=False)
+        cores = usable_cores()
+        result = {
+            'cpu_count': os.cpu_count(), 'usable_cores': cores, 'scaling_measured': cores > 1,
+            'queries': queries.shape[0], 'batch_size': config.batch_size, 'n_neighbors': n_neighbors, 'shards': {},
+        }
+        for n_shards in config.user_knn_shard_counts:
+            with ShardedUserKNN(n_shards=n_shards).fit(recommender.user_item_matrix) as index:
+                found = index.kneighbors(queries, n_neighbors=n_neighbors, return_distance=False)
+                timings = []
+                for _ in range(config.repeats):
+                    start = time.perf_counter()
+                    for batch in batches:
+                        index.kneighbors(batch, n_neighbors=n_neighbors, return_distance=False)
+                    timings.append(time.perf_counter() - start)
+            seconds = float(np.median(timings))
+            result['shards'][n_shards] = {
+                'seconds': seconds,
+                'qps': queries.shape[0] / seconds if seconds > 0 else None,
+                'neighbor_overlap': float(np.mean([len(np.intersect1d(a, b)) / n_neighbors for a, b in zip(expected, found)])),
+                'parallel': n_shards <= cores,
+            }
+        baseline = result['shards'].get(1, {}).get('qps')
+        for n_shards, shard_result in result['shards'].items():
+            if baseline and shard_result['qps']:
+                shard_result['speedup'] = shard_result['qps'] / baseline
+                shard_result['scaling_efficiency'] = shard_result['speedup'] / n_shards
+        return result
+
+    def _knn_embedding_comparison(self, matrix) -> dict:
+        """
+        Brute-force cosine KNN over the rows of a rating matrix against EmbeddingKNN at every
+        configured dimension: build seconds, batched query latency, and the share of the brute
+        force neighbors (the query itself excluded) each embedding finds, and whether that passes
+        the overlap training requires before it uses an embedding (MODEL_TRAINER_KNN_EMBEDDING_MIN_OVERLAP).
+        """
+        config = self.benchmark_config
+        n_neighbors = min(config.n_recommendations + 1, matrix.shape[0])
+        queries = np.sort(self._rng.choice(matrix.shape[0], size=min(config.latency_queries, matrix.shape[0]), replace=False))
+        batches = [matrix[queries[i:i + config.batch_size]] for i in range(0, len(queries), config.batch_size)]
+
+        def evaluate(model) -> tuple:
+            start = time.perf_counter()
+            model.fit(matrix)
+            build_seconds = time.perf_counter() - start
+            model.kneighbors(batches[0], n_neighbors=n_neighbors)
+            seconds = []
+            for batch in batches:
+                start = time.perf_counter()
+                model.kneighbors(batch, n_neighbors=n_neighbors)
+                seconds.append(time.perf_counter() - start)
+            result = {'build_seconds': build_seconds, **latency_stats(seconds, len(queries))}
+            indices = model.kneighbors(matrix[queries], n_neighbors=n_neighbors, return_distance=False)
+            return result, [set(row) - {query} for query, row in zip(queries, indices)]
+
+        brute, expected = evaluate(NearestNeighbors(metric='cosine', algorithm='brute'))
+        result = {'rows': matrix.shape[0], 'columns': matrix.shape[1], 'n_neighbors': n_neighbors - 1, 'min_overlap': MODEL_TRAINER_KNN_EMBEDDING_MIN_OVERLAP, 'brute': brute, 'dims': {}}
+        for dim in config.knn_embedding_dims:
+            embedded, found = evaluate(EmbeddingKNN(n_components=dim))
+            embedded['neighbor_overlap'] = float(np.mean([len(a & b) / len(a) for a, b in zip(expected, found) if a]))
+            embedded['passes_gate'] = embedded['neighbor_overlap'] >= MODEL_TRAINER_KNN_EMBEDDING_MIN_OVERLAP
+            embedded['query_speedup'] = brute['per_query_ms'] / embedded['per_query_ms'] if embedded['per_query_ms'] > 0 else None
+            result['dims'][dim] = embedded
+        return result
+
+    def _metrics_overhead(self) -> dict:
+        """
+        Serving instrumentation cost per request against the single-query latencies measured above:
+        the mean over the benchmarked methods, checked against the budget, and the fastest method
+        as the worst case.
+        """
+        per_request = serving_metrics.measure_overhead()
+        single_ms = {name: result['mean_ms'] for name, result in self.results.items() if name.startswith('latency.') and 'batch_size' not in result}
+        result = {'per_request_us': 1e6 * per_request, 'budget': SERVING_METRICS_OVERHEAD_BUDGET}
+        if single_ms:
+            fastest = min(single_ms, key=single_ms.get)
+            mean_ms = float(np.mean(list(single_ms.values())))
+            result.update({
+                'mean_request_ms': mean_ms,
+                'overhead_fraction': 1000 * per_request / mean_ms,
+                'within_budget': 1000 * per_request / mean_ms <= SERVING_METRICS_OVERHEAD_BUDGET,
+                'fastest_benchmark': fastest,
+                'fastest_overhead_fraction': 1000 * per_request / single_ms[fastest],
+            })
+        return result
+
+    def _logging_overhead(self, n_requests: int = 2000, repeats: int = 5) -> dict:
+        """
+        Request-thread cost of the same INFO log call written synchronously to a file and through
+        the asynchronous queue handler, in both log formats. The two are timed in alternating runs
+        and the best of `repeats` is kept, in microseconds per call; `async_cheaper` tells whether
+        the asynchronous logger is worth keeping. Also times the asynchronous calls including the
+        listener writing them out, sampled records over their rate limit, and the sampled DEBUG
+        records of the popularity methods, which the default INFO level rejects.
+        """
+        def timed(log_call) -> float:
+            start = time.perf_counter()
+            for n in range(n_requests):
+                log_call(n)
+            return 1e6 * (time.perf_counter() - start) / n_requests
+
+        def info(logger):
+            return lambda n: logger.info("Fetching top %d most popular animes", n)
+
+        result = {'formats': {}}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for log_format in ('json', 'text'):
+                sync_logger = std_logging.getLogger(f'anime_recommender.benchmarks.logging_sync_{log_format}')
+                async_logger = std_logging.getLogger(f'anime_recommender.benchmarks.logging_async_{log_format}')
+                file_handler = create_file_handler(os.path.join(tmp_dir, f'sync.{log_format}.log'), log_format)
+                queue_handler, listener = create_queue_handler(os.path.join(tmp_dir, f'async.{log_format}.log'), log_format)
+                for logger, handler in ((sync_logger, file_handler), (async_logger, queue_handler)):
+                    handler.addFilter(SamplingFilter())
+                    logger.handlers, logger.propagate = [handler], False
+                    logger.setLevel(std_logging.INFO)
+                listener.start()
+                try:
+                    sync_us, async_us = [], []
+                    for _ in range(repeats):
+                        sync_us.append(timed(info(sync_logger)))
+                        async_us.append(timed(info(async_logger)))
+                    sampled_out = min(timed(lambda n: async_logger.info("Fetching top %d most popular animes", n, extra=SAMPLED)) for _ in range(repeats))
+                    rejected = min(timed(lambda n: async_logger.debug("Fetching top %d most popular animes", n, extra=SAMPLED)) for _ in range(repeats))
+                    start = time.perf_counter()
+                    timed(info(async_logger))
+                    listener.stop()
+                    written = 1e6 * (time.perf_counter() - start) / n_requests
+                finally:
+                    for handler in (file_handler, *listener.handlers):
+                        handler.close()
+                    sync_logger.handlers = async_logger.handlers = []
+                result['formats'][log_format] = {
+                    'info_sync_us': min(sync_us), 'info_async_us': min(async_us), 'info_async_written_us': written,
+                    'async_speedup': min(sync_us) / min(async_us), 'async_cheaper': min(async_us) < min(sync_us),
+                    'sampled_out_us': sampled_out, 'debug_rejected_us': rejected,
+                }
+        result['async_cheaper'] = all(format_result['async_cheaper'] for format_result in result['formats'].values())
+        popularity_ms = [latency['mean_ms'] for name, latency in self.results.items() if name.startswith('latency.popularity.')]
+        if popularity_ms:
+            mean_ms = float(np.mean(popularity_ms))
+            result['mean_request_ms'] = mean_ms
+            for format_result in result['formats'].values():
+                format_result['info_sync_fraction'] = format_result['info_sync_us'] / (1000 * mean_ms)
+                format_result['info_async_fraction'] = format_result['info_async_us'] / (1000 * mean_ms)
+        return result
+
+    def _result_overhead(self, anime_df: pd.DataFrame, n: int, n_requests: int = 2000, repeats: int = 5) -> dict:
+        """
+        Per-request cost of the result type, before and after Recommendations: a DataFrame built
+        from the four gathered detail columns and read back with iterrows, as the app rendered it,
+        against wrapping the ranked positions and iterating over the records. Also times converting
+        a result into JSON-ready records for the serving API, both ways. Best of `repeats` runs over
+        random top-n catalog rows, in microseconds per request.
+        """
+        catalog = anime_df.dropna(subset=['name']).reset_index(drop=True)
+        metadata = AnimeMetadata.from_frame(catalog)
+        rows = [self._rng.choice(len(catalog), size=min(n, len(catalog)), replace=False) for _ in range(n_requests)]
+
+        def best_of(request) -> float:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                for request_rows in rows:
+                    request(request_rows)
+                timings.append(time.perf_counter() - start)
+            return 1e6 * min(timings) / n_requests
+
+        def dataframe(request_rows) -> pd.DataFrame:
+            return pd.DataFrame({
+                'Anime name': metadata.names[request_rows],
+                'Image URL': metadata.image_urls[request_rows],
+                'Genres': metadata.genres[request_rows],
+                'Rating': metadata.ratings[request_rows],
+            })
+
+        def dataframe_records(request_rows) -> list:
+            recommendations = dataframe(request_rows)
+            columns = list(recommendations.columns)
+            values = zip(*(recommendations[column].tolist() for column in columns))
+            return [{column: (None if value != value else value) for column, value in zip(columns, row)} for row in values]
+
+        before = best_of(lambda request_rows: [(row['Image URL'], row['Anime name'], row['Genres'], row['Rating']) for _, row in dataframe(request_rows).iterrows()])
+        after = best_of(lambda request_rows: [(anime.image_url, anime.name, anime.genres, anime.rating) for anime in Recommendations(metadata, request_rows)])
+        records_before = best_of(dataframe_records)
+        records_after = best_of(lambda request_rows: Recommendations(metadata, request_rows).to_records())
+        return {
+            'n_recommendations': n, 'before_us': before, 'after_us': after, 'speedup': before / after,
+            'records_before_us': records_before, 'records_after_us': records_after, 'records_speedup': records_before / records_after,
+        }
+
+    @staticmethod
+    def _svd_batch(recommender: CollaborativeAnimeRecommender, svd_model, user_ids: list, n: int) -> list:
+        """Scores a batch of users with one SVD prediction, as the serving micro-batcher does."""
+        scores = recommender._svd_scores(svd_model, recommender.vocabulary.user_index(np.asarray(user_ids)))
+        return [recommender._format_recommendations(recommender._top_n(row, n)) for row in scores]
+
+    @staticmethod
+    def _user_knn_batch(recommender: CollaborativeAnimeRecommender, knn_user_model, user_ids: list, n: int) -> list:
+        """Scores a batch of users with one neighbor query and one sparse product."""
+        counts = recommender._user_based_scores(knn_user_model, recommender.vocabulary.user_index(np.asarray(user_ids)), n + 1)
+        return [recommender._format_recommendations(recommender._top_n(row, n)) for row in counts]
+
+    @staticmethod
+    def _item_knn_batch(recommender: CollaborativeAnimeRecommender, knn_item_model, titles: list, n: int) -> list:
+        """Scores a batch of titles with one neighbor query."""
+        anime_idx = np.array([recommender.vocabulary.anime_index_for_title(title) for title in titles])
+        _, indices = knn_item_model.kneighbors(recommender.item_user_matrix[anime_idx], n_neighbors=min(n + 1, recommender.item_user_matrix.shape[0]))
+        return [recommender._format_recommendations(row[row != query][:n]) for query, row in zip(anime_idx, indices)]
+
+    def report(self, generate_seconds: float = None) -> dict:
+        """
+        Returns:
+            dict: Run metadata (dataset size, seed, environment) and the benchmark results.
+        """
+        config = self.benchmark_config
+        return {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'scale': config.scale,
+                'seed': config.seed,
+                'n_users': self.data.n_users,
+                'n_anime': self.data.n_anime,
+                'n_ratings': self.data.n_ratings,
+                'generate_seconds': generate_seconds,
+                'repeats': config.repeats,
+                'latency_queries': config.latency_queries,
+                'batch_size': config.batch_size,
+                'n_recommendations': config.n_recommendations,
+                'git_commit': _git_commit(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            'results': self.results,
+        }
@@ -0,0 +1,225 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.components.data_transformation import DataTransformation
+from anime_recommender.entity.artifact_entity import DataIngestionArtifact
+from anime_recommender.constant import (
+    ANIME_FILE_NAME, RATING_FILE_NAME, DATA_TRANSFORMATION_K_CORE_MIN_USER_RATINGS,
+    DATA_TRANSFORMATION_K_CORE_MIN_ANIME_RATINGS, DATA_TRANSFORMATION_K_CORE_MAX_ITERATIONS,
+)
+
+# Scale name -> (n_users, n_anime, n_ratings). The published UserRatings dataset is close to '1m'.
+SYNTHETIC_SCALES = {
+    '10k': (1_000, 1_000, 10_000),
+    '100k': (5_000, 4_000, 100_000),
+    '1m': (40_000, 12_000, 1_000_000),
+    '10m': (200_000, 20_000, 10_000_000),
+    '50m': (800_000, 25_000, 50_000_000),
+}
+
+GENRES = (
+    'Action', 'Adventure', 'Avant Garde', 'Award Winning', 'Boys Love', 'Comedy', 'Drama', 'Ecchi',
+    'Fantasy', 'Girls Love', 'Gourmet', 'Horror', 'Mystery', 'Romance', 'School', 'Sci-Fi',
+    'Slice of Life', 'Sports', 'Supernatural', 'Suspense',
+)
+TYPES = ('TV', 'Movie', 'OVA', 'ONA', 'Special', 'Music')
+SOURCES = ('Original', 'Manga', 'Light novel', 'Visual novel', 'Game', 'Web manga', 'Novel')
+ANIME_RATINGS = (
+    'G - All Ages', 'PG - Children', 'PG-13 - Teens 13 or older',
+    'R - 17+ (violence & profanity)', 'R+ - Mild Nudity',
+)
+
+# Ratings are drawn and de-duplicated in chunks of this many (user, anime) pairs
+_CHUNK_SIZE = 5_000_000
+
+
+class SyntheticAnimeData:
+    """
+    Generates Animes, UserRatings and merged (Anime_UserRatings) datasets with the columns and
+    dtypes of the Hugging Face datasets, at any scale.
+
+    Anime popularity follows a Zipf-like power law and user activity a Pareto distribution, so
+    a few titles and heavy users account for most ratings while most anime and users sit in a
+    long tail. Ratings combine a per-anime quality with a per-user bias and noise, and the
+    average_rating, rank, popularity, members and favorites columns are consistent with them.
+    Generation is deterministic for a given seed.
+    """
+    def __init__(self, n_users: int, n_anime: int, n_ratings: int, seed: int = 42,
+                 popularity_exponent: float = 0.8, activity_shape: float = 1.5):
+        """
+        Args:
+            n_users (int): Number of users.
+            n_anime (int): Number of anime in the catalog.
+            n_ratings (int): Number of distinct (user, anime) ratings.
+            seed (int): Random seed. Defaults to 42.
+            popularity_exponent (float): Exponent of the anime popularity power law; higher means a shorter head. Defaults to 0.8.
+            activity_shape (float): Pareto shape of user activity; lower means heavier users. Defaults to 1.5.
+        """
+        try:
+            if n_ratings > n_users * n_anime:
+                raise ValueError(f"Cannot draw {n_ratings} distinct ratings from {n_users} users and {n_anime} anime.")
+            self.n_users = n_users
+            self.n_anime = n_anime
+            self.n_ratings = n_ratings
+            self.seed = seed
+            rng = np.random.default_rng([seed, 0])
+            self.user_ids = np.sort(rng.choice(2 * n_users, size=n_users, replace=False)).astype(np.int64)
+            self.anime_ids = np.sort(rng.choice(np.arange(1, 3 * n_anime + 1), size=n_anime, replace=False)).astype(np.int64)
+            # Popularity rank 1 is the most rated anime
+            self.popularity_rank = rng.permutation(n_anime) + 1
+            self.anime_weights = 1.0 / self.popularity_rank ** popularity_exponent
+            self.anime_weights /= self.anime_weights.sum()
+            self.user_weights = rng.pareto(activity_shape, n_users) + 1.0
+            self.user_weights /= self.user_weights.sum()
+            # Popular anime tend to be rated higher, as on the real site
+            self.anime_quality = np.clip(rng.normal(7.0, 0.9, n_anime) + 0.6 * (self.anime_weights > np.median(self.anime_weights)), 2.0, 9.6)
+            self.user_bias = rng.normal(0.0, 1.0, n_users)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @classmethod
+    def from_scale(cls, scale: str, seed: int = 42) -> "SyntheticAnimeData":
+        """
+        Args:
+            scale (str): One of SYNTHETIC_SCALES, e.g. '10k' or '50m'.
+            seed (int): Random seed. Defaults to 42.
+        """
+        if scale not in SYNTHETIC_SCALES:
+            raise ValueError(f"Unknown scale '{scale}', expected one of {list(SYNTHETIC_SCALES)}.")
+        n_users, n_anime, n_ratings = SYNTHETIC_SCALES[scale]
+        return cls(n_users, n_anime, n_ratings, seed=seed)
+
+    @staticmethod
+    def _with_unknown(values, rng, fraction: float) -> np.ndarray:
+        """Formats values as strings and replaces a random fraction with 'UNKNOWN', like the source data."""
+        values = np.asarray(values).astype(str).astype(object)
+        values[rng.random(len(values)) < fraction] = 'UNKNOWN'
+        return values
+
+    def anime(self) -> pd.DataFrame:
+        """
+        Generates the anime catalog with the columns of the Animes dataset.
+
+        Returns:
+            pd.DataFrame: One row per anime.
+        """
+        try:
+            rng = np.random.default_rng([self.seed, 1])
+            n = self.n_anime
+            n_genres = rng.integers(1, 6, n)
+            genre_choices = [rng.choice(len(GENRES), size=k, replace=False) for k in n_genres]
+            genres = np.array([', '.join(GENRES[g] for g in sorted(choice)) for choice in genre_choices], dtype=object)
+            genres[rng.random(n) < 0.005] = np.nan
+            members = np.round(self.anime_weights * 400 * self.n_users * rng.uniform(0.5, 1.5, n)).astype(np.int64)
+            quality_rank = np.empty(n, dtype=np.int64)
+            quality_rank[np.argsort(-self.anime_quality, kind='stable')] = np.arange(1, n + 1)
+            names = np.array([f"Synthetic Anime {i}" for i in range(n)], dtype=object)
+            return pd.DataFrame({
+                'anime_id': self.anime_ids,
+                'genres': genres,
+                'name': names,
+                'average_rating': self._with_unknown(np.round(self.anime_quality + rng.normal(0, 0.1, n), 2), rng, 0.03),
+                'overview': np.array([f"{name} follows its cast through {genre}." for name, genre in zip(names, genres)], dtype=object),
+                'type': rng.choice(TYPES, n, p=(0.45, 0.15, 0.15, 0.12, 0.1, 0.03)),
+                'episodes': self._with_unknown(rng.choice((1, 12, 13, 24, 25, 26, 50), n), rng, 0.02),
+                'producers': np.array([f"Producer {i}" for i in rng.integers(0, 500, n)], dtype=object),
+                'licensors': self._with_unknown(np.array([f"Licensor {i}" for i in rng.integers(0, 60, n)]), rng, 0.5),
+                'studios': np.array([f"Studio {i}" for i in rng.integers(0, 300, n)], dtype=object),
+                'source': rng.choice(SOURCES, n),
+                'anime_rating': rng.choice(ANIME_RATINGS, n, p=(0.15, 0.1, 0.55, 0.15, 0.05)),
+                'rank': self._with_unknown(quality_rank, rng, 0.13),
+                'popularity': self.popularity_rank,
+                'favorites': np.round(members * rng.beta(1, 60, n)).astype(np.int64),
+                'scored by': self._with_unknown(np.round(members * rng.uniform(0.3, 0.7, n)).astype(np.int64), rng, 0.02),
+                'members': members,
+                'image url': np.array([f"https://cdn.myanimelist.net/images/anime/{i % 13}/{i}.jpg" for i in self.anime_ids], dtype=object),
+            })
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def _draw_pairs(self, rng, size: int) -> np.ndarray:
+        """Draws size (user, anime) pairs from the activity and popularity distributions as user * n_anime + anime keys."""
+        keys = []
+        for start in range(0, size, _CHUNK_SIZE):
+            chunk = min(_CHUNK_SIZE, size - start)
+            users = rng.choice(self.n_users, size=chunk, p=self.user_weights).astype(np.int64)
+            anime = rng.choice(self.n_anime, size=chunk, p=self.anime_weights)
+            keys.append(np.unique(users * self.n_anime + anime))
+        return np.unique(np.concatenate(keys)) if len(keys) > 1 else keys[0]
+
+    def ratings(self) -> pd.DataFrame:
+        """
+        Generates the user ratings with the columns of the UserRatings dataset, sorted by user.
+
+        Returns:
+            pd.DataFrame: n_ratings rows of distinct (user, anime) ratings on a 1-10 scale.
+        """
+        try:
+            rng = np.random.default_rng([self.seed, 2])
+            keys = self._draw_pairs(rng, self.n_ratings)
+            # Heavy users and head anime collide; top up from the same distributions until the target is reached
+            for _ in range(20):
+                missing = self.n_ratings - len(keys)
+                if missing <= 0:
+                    break
+                keys = np.union1d(keys, self._draw_pairs(rng, int(missing * 1.5) + 1000))
+            if len(keys) > self.n_ratings:
+                keys = np.sort(rng.choice(keys, size=self.n_ratings, replace=False))
+            elif len(keys) < self.n_ratings:
+                logging.warning(f"Synthetic ratings saturated at {len(keys)} of {self.n_ratings} requested")
+
+            user_idx = (keys // self.n_anime).astype(np.int32)
+            anime_idx = (keys % self.n_anime).astype(np.int32)
+            del keys
+            ratings = self.anime_quality[anime_idx] + self.user_bias[user_idx] + rng.normal(0.0, 1.2, len(user_idx))
+            ratings = np.clip(np.rint(ratings), 1, 10).astype(np.int64)
+            usernames = pd.Categorical.from_codes(
+                user_idx, categories=pd.Index([f"user{user_id}" for user_id in self.user_ids])
+            )
+            logging.info(f"Generated {len(ratings)} synthetic ratings for {self.n_users} users and {self.n_anime} anime")
+            return pd.DataFrame({
+                'user_id': self.user_ids[user_idx],
+                'username': usernames,
+                'anime_id': self.anime_ids[anime_idx],
+                'rating': ratings,
+            })
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @staticmethod
+    def merged(anime_df: pd.DataFrame, rating_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Builds the merged Anime_UserRatings dataset exactly as DataTransformation does.
+        """
+        merged_df = DataTransformation.clean_filter_data(DataTransformation.merge_data(anime_df, rating_df))
+        merged_df, _, _ = DataTransformation.k_core_filter(
+            merged_df, DATA_TRANSFORMATION_K_CORE_MIN_USER_RATINGS, DATA_TRANSFORMATION_K_CORE_MIN_ANIME_RATINGS, DATA_TRANSFORMATION_K_CORE_MAX_ITERATIONS
+        )
+        return merged_df
+
+    def write(self, output_dir: str) -> DataIngestionArtifact:
+        """
+        Writes the Animes and UserRatings CSV files in the feature store layout DataTransformation reads.
+
+        Args:
+            output_dir (str): Directory to write Animes.csv and UserRatings.csv to.
+
+        Returns:
+            DataIngestionArtifact: Paths of the written files.
+        """
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            anime_file_path = os.path.join(output_dir, ANIME_FILE_NAME)
+            rating_file_path = os.path.join(output_dir, RATING_FILE_NAME)
+            self.anime().to_csv(anime_file_path, index=False)
+            self.ratings().to_csv(rating_file_path, index=False, chunksize=1_000_000)
+            logging.info(f"Synthetic datasets written to {output_dir}")
+            return DataIngestionArtifact(
+                feature_store_anime_file_path=anime_file_path,
+                feature_store_userrating_file_path=rating_file_path
+            )
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
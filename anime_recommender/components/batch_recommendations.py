@@ -0,0 +1,132 @@
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.entity.config_entity import BatchRecommendationConfig
+from anime_recommender.entity.artifact_entity import DataTransformationArtifact, CollaborativeModelArtifact, RecommendationStoreArtifact
+from anime_recommender.utils.main_utils.utils import load_csv_data, load_object
+from anime_recommender.utils.instrumentation import instrument
+from anime_recommender.source.collaborative_modelling import CollaborativeAnimeRecommender
+from anime_recommender.source.recommendation_store import RecommendationStore
+from anime_recommender.source.model_layout import check_model_layout
+
+# Per-worker state, loaded once by the pool initializer
+_worker_recommender = None
+_worker_models = {}
+
+
+def _init_worker(merged_file_path: str, vocabulary_file_path: str, model_file_paths: dict) -> None:
+    """
+    Loads the transformed ratings, vocabulary and models once in each worker process.
+    """
+    global _worker_recommender, _worker_models
+    vocabulary = load_object(vocabulary_file_path) if vocabulary_file_path else None
+    _worker_recommender = CollaborativeAnimeRecommender(load_csv_data(merged_file_path), vocabulary=vocabulary)
+    _worker_models = {method: load_object(path) for method, path in model_file_paths.items()}
+    # Stored lists are raw IDs read through the vocabulary, so models in another row layout are refused
+    for method, layout_method in (('user_knn', 'user_knn'), ('because_you_watched', 'item_neighbor_table')):
+        if method in _worker_models:
+            check_model_layout(_worker_models[method], _worker_recommender.vocabulary, layout_method, name=model_file_paths[method])
+
+
+def _score_chunk(method: str, user_idx: np.ndarray, top_n: int, user_knn_neighbors: int):
+    """
+    Computes the ranked top-N raw anime IDs and scores of a chunk of users for one method.
+
+    Returns:
+        tuple: (method, raw user IDs, (n x top_n) raw anime IDs padded with -1, (n x top_n) scores).
+    """
+    recommender, model = _worker_recommender, _worker_models[method]
+    if method == 'svd':
+        scores = recommender._svd_scores(model, user_idx)
+        # Matches the live path, which does not exclude anime the user already rated
+    elif method == 'user_knn':
+        scores = recommender._user_based_scores(model, user_idx, user_knn_neighbors)
+    elif method == 'because_you_watched':
+        scores = recommender._because_you_watched_scores(recommender._seed_matrix(user_idx=user_idx), model)
+    else:
+        raise ValueError(f"Unsupported materialization method '{method}'.")
+
+    # Ranked as the live path ranks, ties by lower index, so a stored list cut to n equals the live top n
+    anime_ids = np.full((len(user_idx), top_n), -1, dtype=np.int32)
+    top_scores = np.zeros((len(user_idx), top_n), dtype=np.float32)
+    for row, row_scores in enumerate(scores):
+        ranked = recommender._top_n(row_scores, top_n)
+        anime_ids[row, :len(ranked)] = recommender.vocabulary.anime_ids[ranked]
+        top_scores[row, :len(ranked)] = row_scores[ranked]
+    return method, recommender.vocabulary.user_ids[user_idx], anime_ids, top_scores
+
+
+class BatchRecommendationMaterializer:
+    """
+    Offline job that computes top-N collaborative recommendations for every user and writes them
+    to an embedded recommendation store, so serving can answer with a single key lookup.
+    """
+    def __init__(self, batch_recommendation_config: BatchRecommendationConfig, data_transformation_artifact: DataTransformationArtifact, collaborative_model_artifact: CollaborativeModelArtifact):
+        """
+        Initializes the BatchRecommendationMaterializer with configuration and trained model artifacts.
+
+        Args:
+            batch_recommendation_config (BatchRecommendationConfig): Configuration settings for the batch job.
+            data_transformation_artifact (DataTransformationArtifact): Artifact containing the transformed data and vocabulary paths.
+            collaborative_model_artifact (CollaborativeModelArtifact): Artifact containing the trained collaborative model paths.
+        """
+        try:
+            self.batch_recommendation_config = batch_recommendation_config
+            self.data_transformation_artifact = data_transformation_artifact
+            self.collaborative_model_artifact = collaborative_model_artifact
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def _model_file_paths(self) -> dict:
+        """
+        Maps each materializable method to the saved model it needs, skipping models that were not trained.
+        """
+        paths = {
+            'svd': self.collaborative_model_artifact.svd_file_path,
+            'user_knn': self.collaborative_model_artifact.user_based_knn_file_path,
+            'because_you_watched': self.collaborative_model_artifact.item_neighbor_table_file_path,
+        }
+        return {method: path for method, path in paths.items() if path}
+
+    def initiate_materialization(self) -> RecommendationStoreArtifact:
+        """
+        Scores every user for every available collaborative method across a process pool and writes the store.
+
+        Returns:
+            RecommendationStoreArtifact: Object containing the path of the recommendation store.
+        """
+        try:
+            config = self.batch_recommendation_config
+            model_file_paths = self._model_file_paths()
+            if not model_file_paths:
+                raise ValueError("No collaborative model artifacts available to materialize.")
+
+            vocabulary = load_object(self.data_transformation_artifact.vocabulary_file_path)
+            chunks = np.array_split(np.arange(vocabulary.n_users), max(1, -(-vocabulary.n_users // config.chunk_size)))
+            logging.info(f"Materializing {list(model_file_paths)} for {vocabulary.n_users} users in {len(chunks)} chunks")
+
+            store = RecommendationStore.create(config.store_file_path, top_n=config.top_n)
+            # Scoring runs in worker processes; their CPU time is reported as children_cpu_seconds
+            with instrument("score_and_store") as step, ProcessPoolExecutor(
+                max_workers=config.n_workers,
+                initializer=_init_worker,
+                initargs=(self.data_transformation_artifact.merged_file_path, self.data_transformation_artifact.vocabulary_file_path, model_file_paths)
+            ) as executor:
+                futures = [
+                    executor.submit(_score_chunk, method, chunk, config.top_n, config.user_knn_neighbors)
+                    for method in model_file_paths for chunk in chunks if len(chunk)
+                ]
+                for future in futures:
+                    store.put_many(*future.result())
+                step.set(users=vocabulary.n_users, methods=len(model_file_paths), chunks=len(futures))
+
+            store.set_metadata('methods', ','.join(model_file_paths))
+            store.set_metadata('user_knn_neighbors', config.user_knn_neighbors)
+            for method in model_file_paths:
+                logging.info(f"Materialized {store.count(method)} '{method}' lists")
+            store.close()
+            return RecommendationStoreArtifact(store_file_path=config.store_file_path)
+        except Exception as e:
+            raise AnimeRecommendorException(f"Error in BatchRecommendationMaterializer: {str(e)}", sys)
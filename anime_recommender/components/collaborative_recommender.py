@@ -1,10 +1,29 @@
+import os
 import sys
+import numpy as np
 from anime_recommender.loggers.logging import logging
 from anime_recommender.exception.exception import AnimeRecommendorException
 from anime_recommender.entity.config_entity import CollaborativeModelConfig
 from anime_recommender.entity.artifact_entity import DataTransformationArtifact, CollaborativeModelArtifact
-from anime_recommender.utils.main_utils.utils import load_csv_data, save_model, load_object
+from anime_recommender.utils.main_utils.utils import load_csv_data, save_model, load_object, save_json
+from anime_recommender.utils.instrumentation import instrument
 from anime_recommender.source.collaborative_modelling import CollaborativeAnimeRecommender
+from anime_recommender.source.quantization import quantize_model, quantization_report
+from anime_recommender.source.svd_tuning import SVDHyperparameterSearch
+from anime_recommender.source.sampling import RatingSampler
+from anime_recommender.source.neighbor_graph import UserNeighborGraph
+from anime_recommender.source.model_layout import LAYOUT_MODELS, tag_model
+from anime_recommender.serving.model_versions import list_completed_runs
+from anime_recommender.constant import (
+    MODEL_TRAINER_QUANTIZATION_REPORT_SUFFIX, MODEL_TRAINER_DIR_NAME, MODEL_TRAINER_COL_TRAINED_MODEL_DIR, MODEL_TRAINER_USER_NEIGHBOR_GRAPH_NAME
+)
+
+def _ranked_neighbors(item_neighbor_table, anime_idx):
+    """
+    Returns the neighbors of one anime in an item neighbor table, most similar first.
+    """
+    row = (item_neighbor_table.to_csr() if hasattr(item_neighbor_table, 'to_csr') else item_neighbor_table)[anime_idx]
+    return row.indices[np.argsort(-row.data, kind='stable')]
 
 class CollaborativeModelTrainer:
     """
@@ -29,6 +48,107 @@ class CollaborativeModelTrainer:
         except Exception as e:
             raise AnimeRecommendorException(e, sys)
 
+    def _save_model(self, model, file_path: str, rank_fn, n_queries: int) -> None:
+        """
+        Saves a trained model, quantized when the configuration asks for it.
+
+        When quantizing, a report comparing artifact size, load time, scoring throughput and
+        top-N overlap against the full-precision model is written next to the saved model.
+
+        Args:
+            model (object): The full-precision model.
+            file_path (str): The file path where the model should be stored.
+            rank_fn (callable): rank_fn(model, query_index) returning ranked item indices.
+            n_queries (int): Number of user or item indices available as report queries.
+        """
+        dtype = self.collaborative_model_trainer_config.quantization_dtype
+        with instrument(f"save_{os.path.splitext(os.path.basename(file_path))[0]}") as step:
+            saved_model = model
+            if dtype:
+                logging.info(f"Quantizing model to {dtype} before saving...")
+                saved_model = quantized_model = quantize_model(model, dtype)
+            if os.path.basename(file_path) in LAYOUT_MODELS:
+                tag_model(saved_model)
+            save_model(saved_model, file_path)
+            step.set(bytes=os.path.getsize(file_path))
+        if not dtype:
+            return
+        rng = np.random.default_rng(42)
+        queries = rng.choice(n_queries, size=min(n_queries, self.collaborative_model_trainer_config.quantization_report_queries), replace=False)
+        report = quantization_report(model, quantized_model, rank_fn, queries)
+        report['dtype'] = dtype
+        save_json(report, os.path.splitext(file_path)[0] + MODEL_TRAINER_QUANTIZATION_REPORT_SUFFIX)
+
+    def _tune_svd(self, recommender: CollaborativeAnimeRecommender) -> dict:
+        """
+        Searches the SVD hyperparameters on the recommender's rating matrix and saves the search report.
+
+        Returns:
+            dict: The search report, with 'best_params' and 'best_cv_metrics'.
+        """
+        config = self.collaborative_model_trainer_config
+        with instrument("tune_svd") as step:
+            ratings = recommender.user_item_matrix.tocoo()
+            search = SVDHyperparameterSearch(
+                config.svd_tuning_search_space, n_configs=config.svd_tuning_n_configs, n_folds=config.svd_tuning_n_folds,
+                eta=config.svd_tuning_eta, n_workers=config.svd_tuning_n_workers, seed=config.svd_tuning_seed
+            )
+            report = search.run(ratings.row, ratings.col, ratings.data)
+            save_json(report, config.svd_tuning_report_file_path)
+            step.set(ratings=report['n_ratings'], configs=len(report['configs']), fits=report['n_fits'])
+            return report
+
+    def _sample(self, df, vocabulary) -> tuple:
+        """
+        Samples the training ratings as configured and saves the sampling report, which records
+        the effective sample size whether or not sampling is enabled.
+
+        Returns:
+            tuple: (training ratings DataFrame, sampling report).
+        """
+        config = self.collaborative_model_trainer_config
+        with instrument("sample_ratings") as step:
+            user_codes = vocabulary.user_index(df['user_id'].to_numpy()) if vocabulary is not None else None
+            df, report = RatingSampler.from_config(config).sample(df, user_codes)
+            save_json(report, config.sampling_report_file_path)
+            step.set(ratings=report['input_ratings'], sampled=report['sampled_ratings'])
+        return df, report
+
+    def _previous_user_neighbor_graph(self) -> str:
+        """Path of the user neighbor graph of the latest completed training run, or None."""
+        for run_dir in reversed(list_completed_runs(self.collaborative_model_trainer_config.artifact_root)):
+            file_path = os.path.join(run_dir, MODEL_TRAINER_DIR_NAME, MODEL_TRAINER_COL_TRAINED_MODEL_DIR, MODEL_TRAINER_USER_NEIGHBOR_GRAPH_NAME)
+            if os.path.exists(file_path):
+                return file_path
+        return None
+
+    def _build_user_neighbor_graph(self, recommender: CollaborativeAnimeRecommender) -> dict:
+        """
+        Builds the user neighbor graph, or refreshes the previous run's graph incrementally when
+        enabled and built with the same k, then saves it with its build report.
+
+        Returns:
+            dict: The build or refresh report, with the rows recomputed against a full rebuild.
+        """
+        config = self.collaborative_model_trainer_config
+        with instrument("user_neighbor_graph") as step:
+            previous_file_path = self._previous_user_neighbor_graph() if config.user_neighbor_graph_incremental else None
+            graph = load_object(previous_file_path) if previous_file_path else None
+            if graph is not None and graph.k == config.user_neighbor_graph_k:
+                graph.block_size, graph.n_workers = config.user_neighbor_graph_block_size, config.user_neighbor_graph_n_workers
+                report = graph.refresh(recommender.user_item_matrix, recommender.vocabulary)
+                report['previous_graph_file_path'] = previous_file_path
+            else:
+                graph = UserNeighborGraph(
+                    k=config.user_neighbor_graph_k, block_size=config.user_neighbor_graph_block_size, n_workers=config.user_neighbor_graph_n_workers
+                )
+                report = graph.build(recommender.user_item_matrix, recommender.vocabulary)
+            save_model(graph, config.user_neighbor_graph_file_path)
+            save_json(report, config.user_neighbor_graph_report_file_path)
+            step.set(rows=report['users'], recomputed=report['rows_recomputed'], merged=report['rows_merged'])
+        recommender.user_neighbor_graph = graph
+        return report
+
     def initiate_model_trainer(self, model_type: str) -> CollaborativeModelArtifact:
         """
         Trains and saves the specified collaborative filtering model. 
@@ -41,25 +161,48 @@ class CollaborativeModelTrainer:
         """
         try:
             logging.info("Loading transformed data...")
-            df = load_csv_data(self.data_transformation_artifact.merged_file_path)
-            recommender = CollaborativeAnimeRecommender(df) 
+            with instrument("load_data") as step:
+                df = load_csv_data(self.data_transformation_artifact.merged_file_path)
+                vocabulary = None
+                if self.data_transformation_artifact.vocabulary_file_path:
+                    vocabulary = load_object(self.data_transformation_artifact.vocabulary_file_path)
+                step.set(rows=len(df))
+            df, sampling_report = self._sample(df, vocabulary)
+            sample = dict(training_ratings=sampling_report['sampled_ratings'], sampling_report_file_path=self.collaborative_model_trainer_config.sampling_report_file_path)
+            recommender = CollaborativeAnimeRecommender(df, vocabulary=vocabulary) 
             if model_type == 'svd':
+                tuning_report = None
+                if self.collaborative_model_trainer_config.svd_tuning_enabled:
+                    logging.info("Tuning SVD hyperparameters...")
+                    tuning_report = self._tune_svd(recommender)
                 logging.info("Training and saving SVD model...")
-                recommender.train_svd()
-                save_model(recommender.svd, self.collaborative_model_trainer_config.svd_trained_model_file_path)
+                recommender.train_svd(params=tuning_report['best_params'] if tuning_report else None)
+                self._save_model(
+                    recommender.svd, self.collaborative_model_trainer_config.svd_trained_model_file_path,
+                    rank_fn=lambda model, user_idx: recommender._top_n(recommender._svd_scores(model, user_idx), 10),
+                    n_queries=recommender.vocabulary.n_users
+                )
 
                 logging.info("Loading pre-trained SVD model...")
                 svd_model = load_object(self.collaborative_model_trainer_config.svd_trained_model_file_path)
                 svd_recommendations = recommender.get_svd_recommendations(user_id=436, n=10, svd_model=svd_model)
                 logging.info(f"SVD recommendations: {svd_recommendations}")
                 return CollaborativeModelArtifact(
-                    svd_file_path=self.collaborative_model_trainer_config.svd_trained_model_file_path
+                    svd_file_path=self.collaborative_model_trainer_config.svd_trained_model_file_path,
+                    svd_params=tuning_report['best_params'] if tuning_report else None,
+                    svd_cv_metrics=tuning_report['best_cv_metrics'] if tuning_report else None,
+                    svd_tuning_report_file_path=self.collaborative_model_trainer_config.svd_tuning_report_file_path if tuning_report else None,
+                    **sample
                 )
 
             elif model_type == 'item_knn':
                 logging.info("Training and saving KNN item-based model...")
-                recommender.train_knn_item_based()
-                save_model(recommender.knn_item_based, self.collaborative_model_trainer_config.item_knn_trained_model_file_path)
+                recommender.train_knn_item_based(embedding_dim=self.collaborative_model_trainer_config.knn_embedding_dim)
+                self._save_model(
+                    recommender.knn_item_based, self.collaborative_model_trainer_config.item_knn_trained_model_file_path,
+                    rank_fn=lambda model, anime_idx: model.kneighbors(recommender.item_user_matrix[anime_idx], n_neighbors=11)[1].ravel(),
+                    n_queries=recommender.item_user_matrix.shape[0]
+                )
 
                 logging.info("Loading pre-trained item-based KNN model...")
                 item_knn_model = load_object(self.collaborative_model_trainer_config.item_knn_trained_model_file_path)
@@ -67,14 +210,35 @@ class CollaborativeModelTrainer:
                     anime_name='One Piece', n_recommendations=10, knn_item_model=item_knn_model
                 )
                 logging.info(f"Item Based recommendations: {item_based_recommendations}")
+
+                logging.info("Building and saving item neighbor table...")
+                item_neighbor_table = recommender.build_item_neighbor_table(
+                    k=self.collaborative_model_trainer_config.item_neighbor_table_k, knn_item_model=item_knn_model
+                )
+                self._save_model(
+                    item_neighbor_table, self.collaborative_model_trainer_config.item_neighbor_table_file_path,
+                    rank_fn=_ranked_neighbors,
+                    n_queries=item_neighbor_table.shape[0]
+                )
+                item_neighbor_table = load_object(self.collaborative_model_trainer_config.item_neighbor_table_file_path)
+                because_you_watched_recommendations = recommender.get_because_you_watched_recommendations(
+                    seeds=['One Piece'], n_recommendations=10, item_neighbor_table=item_neighbor_table
+                )
+                logging.info(f"Because you watched recommendations: {because_you_watched_recommendations}")
                 return CollaborativeModelArtifact(
-                    item_based_knn_file_path=self.collaborative_model_trainer_config.item_knn_trained_model_file_path
+                    item_based_knn_file_path=self.collaborative_model_trainer_config.item_knn_trained_model_file_path,
+                    item_neighbor_table_file_path=self.collaborative_model_trainer_config.item_neighbor_table_file_path,
+                    **sample
                 )
 
             elif model_type == 'user_knn':
                 logging.info("Training and saving KNN user-based model...")
-                recommender.train_knn_user_based()
-                save_model(recommender.knn_user_based, self.collaborative_model_trainer_config.user_knn_trained_model_file_path)
+                recommender.train_knn_user_based(embedding_dim=self.collaborative_model_trainer_config.knn_embedding_dim)
+                self._save_model(
+                    recommender.knn_user_based, self.collaborative_model_trainer_config.user_knn_trained_model_file_path,
+                    rank_fn=lambda model, user_idx: model.kneighbors(recommender.user_item_matrix[user_idx], n_neighbors=11)[1].ravel(),
+                    n_queries=recommender.user_item_matrix.shape[0]
+                )
 
                 logging.info("Loading pre-trained user-based KNN model...")
                 user_knn_model = load_object(self.collaborative_model_trainer_config.user_knn_trained_model_file_path)
@@ -82,8 +246,14 @@ class CollaborativeModelTrainer:
                     user_id=817, n_recommendations=10, knn_user_model=user_knn_model
                 )
                 logging.info(f"User Based recommendations: {user_based_recommendations}")
+
+                logging.info("Building and saving user neighbor graph...")
+                graph_report = self._build_user_neighbor_graph(recommender)
                 return CollaborativeModelArtifact(
-                    user_based_knn_file_path=self.collaborative_model_trainer_config.user_knn_trained_model_file_path
+                    user_based_knn_file_path=self.collaborative_model_trainer_config.user_knn_trained_model_file_path,
+                    user_neighbor_graph_file_path=self.collaborative_model_trainer_config.user_neighbor_graph_file_path,
+                    user_neighbor_graph_report=graph_report,
+                    **sample
                 )
 
             else:
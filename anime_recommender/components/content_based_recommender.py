@@ -1,9 +1,13 @@
+import os
 import sys
+import numpy as np
 from anime_recommender.loggers.logging import logging
 from anime_recommender.exception.exception import AnimeRecommendorException
 from anime_recommender.entity.config_entity import ContentBasedModelConfig
-from anime_recommender.entity.artifact_entity import ContentBasedModelArtifact, DataIngestionArtifact
-from anime_recommender.utils.main_utils.utils import load_csv_data
+from anime_recommender.entity.artifact_entity import ContentBasedModelArtifact, DataIngestionArtifact, DataTransformationArtifact
+from anime_recommender.utils.main_utils.utils import load_csv_data, load_object, save_json
+from anime_recommender.utils.instrumentation import instrument
+from anime_recommender.source.quantization import quantization_report
 from anime_recommender.source.content_based_modelling import ContentBasedRecommender
 from anime_recommender.constant import *
  
@@ -11,20 +15,39 @@ class ContentBasedModelTrainer:
     """
     A class responsible for training and saving the content-based recommender model. 
     """
-    def __init__(self, content_based_model_trainer_config: ContentBasedModelConfig, data_ingestion_artifact: DataIngestionArtifact):
+    def __init__(self, content_based_model_trainer_config: ContentBasedModelConfig, data_ingestion_artifact: DataIngestionArtifact, data_transformation_artifact: DataTransformationArtifact = None):
         """
         Initializes the ContentBasedModelTrainer with configuration and data ingestion artifacts.
 
         Args:
             content_based_model_trainer_config (ContentBasedModelConfig): Configuration settings for model training.
             data_ingestion_artifact (DataIngestionArtifact): Data ingestion artifact containing the dataset path.
+            data_transformation_artifact (DataTransformationArtifact, optional): Data transformation artifact containing the shared vocabulary path.
         """
         try:
             self.content_based_model_trainer_config = content_based_model_trainer_config
             self.data_ingestion_artifact = data_ingestion_artifact
+            self.data_transformation_artifact = data_transformation_artifact
         except Exception as e:
             raise AnimeRecommendorException(e, sys)
 
+    def _write_quantization_report(self, recommender: ContentBasedRecommender, quantization: str) -> None:
+        """
+        Compares the saved quantized similarity matrix against the full-precision one and writes the report next to the model.
+        """
+        model_path = self.content_based_model_trainer_config.cosine_similarity_model_file_path
+        quantized_model = load_object(model_path)
+        rng = np.random.default_rng(42)
+        n_rows = recommender.cosine_sim.shape[0]
+        queries = rng.choice(n_rows, size=min(n_rows, self.content_based_model_trainer_config.quantization_report_queries), replace=False)
+        report = quantization_report(
+            (recommender.tfv, recommender.cosine_sim), quantized_model,
+            rank_fn=lambda model, row: np.argsort(-np.asarray(model[1][row], dtype=np.float64), kind='stable')[1:11],
+            queries=queries
+        )
+        report['dtype'] = quantization
+        save_json(report, os.path.splitext(model_path)[0] + MODEL_TRAINER_QUANTIZATION_REPORT_SUFFIX)
+
     def initiate_model_trainer(self) -> ContentBasedModelArtifact:
         """
         Trains the content-based recommender model using TF-IDF and cosine similarity,
@@ -35,15 +58,26 @@ class ContentBasedModelTrainer:
         """
         try:
             logging.info("Loading ingested data...")
-            df = load_csv_data(self.data_ingestion_artifact.feature_store_anime_file_path)
+            with instrument("load_data") as step:
+                df = load_csv_data(self.data_ingestion_artifact.feature_store_anime_file_path)
+                step.set(rows=len(df))
             logging.info("Training ContentBasedRecommender model...")
             
+            vocabulary = None
+            if self.data_transformation_artifact and self.data_transformation_artifact.vocabulary_file_path:
+                vocabulary = load_object(self.data_transformation_artifact.vocabulary_file_path)
+
             # Initialize and train the model
-            recommender = ContentBasedRecommender(df=df )
+            recommender = ContentBasedRecommender(df=df, vocabulary=vocabulary)
             
             # Save the model (TF-IDF and cosine similarity matrix)
-            recommender.save_model(self.content_based_model_trainer_config.cosine_similarity_model_file_path)
+            quantization = self.content_based_model_trainer_config.quantization_dtype
+            with instrument("save_model") as step:
+                recommender.save_model(self.content_based_model_trainer_config.cosine_similarity_model_file_path, quantization=quantization)
+                step.set(bytes=os.path.getsize(self.content_based_model_trainer_config.cosine_similarity_model_file_path))
             logging.info("Model saved successfully.")
+            if quantization:
+                self._write_quantization_report(recommender, quantization)
             
             logging.info("Loading saved model to get recommendations...")
             cosine_recommendations = recommender.get_rec_cosine(title="One Piece", model_path=self.content_based_model_trainer_config.cosine_similarity_model_file_path, n_recommendations=10)
@@ -6,6 +6,7 @@ from anime_recommender.exception.exception import AnimeRecommendorException
 from anime_recommender.entity.config_entity import DataIngestionConfig
 from anime_recommender.entity.artifact_entity import DataIngestionArtifact
 from anime_recommender.utils.main_utils.utils import export_data_to_dataframe
+from anime_recommender.utils.instrumentation import instrument
 
 class DataIngestion:
     """
@@ -45,9 +46,9 @@ class DataIngestion:
             df = pd.DataFrame(dataset['train'])
 
             # Log some information about the data
-            logging.info(f"Shape of the dataframe: {df.shape}")
-            logging.info(f"Column names: {df.columns}")
-            logging.info(f"Preview of the DataFrame:\n{df.head()}")
+            logging.info("Shape of the dataframe: %s", df.shape, extra={'columns': list(df.columns)})
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug("Preview of the DataFrame:\n%s", df.head().to_string())
             logging.info("Data fetched successfully from Hugging Face.")
             
             return df
@@ -64,12 +65,18 @@ class DataIngestion:
         """
         try:
             # Load anime and rating data from Hugging Face datasets
-            anime_df = self.fetch_data_from_huggingface(self.data_ingestion_config.anime_filepath)
-            rating_df = self.fetch_data_from_huggingface(self.data_ingestion_config.rating_filepath)
+            with instrument("fetch_anime") as step:
+                anime_df = self.fetch_data_from_huggingface(self.data_ingestion_config.anime_filepath)
+                step.set(rows=len(anime_df))
+            with instrument("fetch_ratings") as step:
+                rating_df = self.fetch_data_from_huggingface(self.data_ingestion_config.rating_filepath)
+                step.set(rows=len(rating_df))
 
             # Export data to DataFrame
-            export_data_to_dataframe(anime_df, file_path=self.data_ingestion_config.feature_store_anime_file_path)
-            export_data_to_dataframe(rating_df, file_path=self.data_ingestion_config.feature_store_userrating_file_path)
+            with instrument("export_feature_store") as step:
+                export_data_to_dataframe(anime_df, file_path=self.data_ingestion_config.feature_store_anime_file_path)
+                export_data_to_dataframe(rating_df, file_path=self.data_ingestion_config.feature_store_userrating_file_path)
+                step.set(rows=len(anime_df) + len(rating_df))
 
             # Create artifact to store data ingestion info
             dataingestionartifact = DataIngestionArtifact(
@@ -3,7 +3,11 @@ import numpy as np
 import pandas as pd 
 from anime_recommender.loggers.logging import logging
 from anime_recommender.exception.exception import AnimeRecommendorException
-from anime_recommender.utils.main_utils.utils import export_data_to_dataframe
+from anime_recommender.utils.main_utils.utils import export_data_to_dataframe, save_model, save_json
+from anime_recommender.source.vocabulary import IdVocabulary
+from anime_recommender.source.search_index import SearchIndex
+from anime_recommender.source.content_based_modelling import content_catalog
+from anime_recommender.utils.instrumentation import instrument
 from anime_recommender.constant import *
 from anime_recommender.entity.config_entity import DataTransformationConfig
 from anime_recommender.entity.artifact_entity import DataIngestionArtifact,DataTransformationArtifact
@@ -51,8 +55,7 @@ class DataTransformation:
         """
         try:
             merged_df = pd.merge(rating_df, anime_df, on="anime_id", how="inner")
-            logging.info(f"Shape of the Merged dataframe:{merged_df.shape}")
-            logging.info(f"Column names: {merged_df.columns}") 
+            logging.info("Shape of the Merged dataframe: %s", merged_df.shape, extra={'columns': list(merged_df.columns)})
             return merged_df
         except Exception as e:
             raise AnimeRecommendorException(e, sys)
@@ -78,13 +81,84 @@ class DataTransformation:
                 'favorites', 'scored by', 'members' ]
             cleaned_df = merged_df.copy()
             cleaned_df.drop(columns=cols_to_drop, inplace=True)
-            logging.info(f"Shape of the Merged dataframe:{cleaned_df.shape}")
-            logging.info(f"Column names: {cleaned_df.columns}")
-            logging.info(f"Preview of the merged DataFrame:\n{cleaned_df.head()}")
+            logging.info("Shape of the cleaned dataframe: %s", cleaned_df.shape, extra={'columns': list(cleaned_df.columns)})
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug("Preview of the cleaned DataFrame:\n%s", cleaned_df.head().to_string())
             return cleaned_df
         except Exception as e:
             raise AnimeRecommendorException(e, sys)
         
+    @staticmethod
+    def k_core_filter(df: pd.DataFrame, min_user_ratings: int = 5, min_anime_ratings: int = 5, max_iterations: int = 50) -> tuple:
+        """
+        Iteratively drops users with fewer than min_user_ratings ratings and anime with fewer than
+        min_anime_ratings, until every remaining user and anime meets its threshold (the k-core) or
+        max_iterations is reached. Dropping anime can push users below their threshold and vice versa,
+        hence the iteration. Counts are bincounts over integer codes of the user and anime IDs.
+
+        Args:
+            df (pd.DataFrame): Ratings with 'user_id' and 'anime_id' columns.
+            min_user_ratings (int): Minimum number of distinct anime a user must have rated. Defaults to 5.
+            min_anime_ratings (int): Minimum number of distinct users an anime must have been rated by. Defaults to 5.
+            max_iterations (int): Upper bound on the pruning passes. Defaults to 50.
+
+        Returns:
+            tuple: (pruned DataFrame, report with the matrix dimensions and nnz before and after, and the pruned user IDs).
+        """
+        try:
+            user_codes, user_ids = pd.factorize(df['user_id'])
+            anime_codes, _ = pd.factorize(df['anime_id'])
+            n_users, n_anime = len(user_ids), int(anime_codes.max()) + 1 if len(anime_codes) else 0
+            # One entry per distinct (user, anime) pair, so duplicate rows do not count twice
+            valid = (user_codes >= 0) & (anime_codes >= 0)
+            pair_keys = np.unique(user_codes[valid].astype(np.int64) * max(n_anime, 1) + anime_codes[valid])
+            pair_users, pair_anime = pair_keys // max(n_anime, 1), pair_keys % max(n_anime, 1)
+
+            def dimensions(keep) -> dict:
+                return {
+                    'users': int(np.count_nonzero(np.bincount(pair_users[keep], minlength=n_users))),
+                    'anime': int(np.count_nonzero(np.bincount(pair_anime[keep], minlength=n_anime))),
+                    'nnz': int(np.count_nonzero(keep)),
+                }
+
+            keep = np.ones(len(pair_keys), dtype=bool)
+            before = dimensions(keep)
+            iterations, converged = 0, False
+            while iterations < max_iterations:
+                user_counts = np.bincount(pair_users[keep], minlength=n_users)
+                anime_counts = np.bincount(pair_anime[keep], minlength=n_anime)
+                next_keep = keep & (user_counts[pair_users] >= min_user_ratings) & (anime_counts[pair_anime] >= min_anime_ratings)
+                iterations += 1
+                if np.array_equal(next_keep, keep):
+                    converged = True
+                    break
+                keep = next_keep
+            after = dimensions(keep)
+
+            kept_users = np.zeros(n_users, dtype=bool)
+            kept_users[pair_users[keep]] = True
+            kept_anime = np.zeros(n_anime, dtype=bool)
+            kept_anime[pair_anime[keep]] = True
+            pruned_df = df[valid & kept_users[user_codes] & kept_anime[anime_codes]]
+
+            report = {
+                'min_user_ratings': min_user_ratings,
+                'min_anime_ratings': min_anime_ratings,
+                'iterations': iterations,
+                'converged': converged,
+                'before': {**before, 'rows': int(len(df)), 'density': before['nnz'] / max(1, before['users'] * before['anime'])},
+                'after': {**after, 'rows': int(len(pruned_df)), 'density': after['nnz'] / max(1, after['users'] * after['anime'])},
+            }
+            pruned_user_ids = pd.to_numeric(pd.Series(np.asarray(user_ids)[~kept_users]), errors='coerce').dropna().astype(np.int64).to_numpy()
+            logging.info(
+                "k-core (%d, %d) after %d iterations: %dx%d with %d ratings -> %dx%d with %d ratings",
+                min_user_ratings, min_anime_ratings, iterations, before['users'], before['anime'], before['nnz'],
+                after['users'], after['anime'], after['nnz']
+            )
+            return pruned_df, report, pruned_user_ids
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
     def initiate_data_transformation(self)->DataTransformationArtifact:
         """
         Initiates the data transformation process by reading, transforming, and saving the data.
@@ -94,14 +168,47 @@ class DataTransformation:
         """
         logging.info("Entering initiate_data_transformation method of DataTransformation class.")
         try:  
-            anime_df = DataTransformation.read_data(self.data_ingestion_artifact.feature_store_anime_file_path)
-            rating_df = DataTransformation.read_data(self.data_ingestion_artifact.feature_store_userrating_file_path) 
-            merged_df = DataTransformation.merge_data(anime_df, rating_df)
-            transformed_df = DataTransformation.clean_filter_data(merged_df)
+            with instrument("read_data") as step:
+                anime_df = DataTransformation.read_data(self.data_ingestion_artifact.feature_store_anime_file_path)
+                rating_df = DataTransformation.read_data(self.data_ingestion_artifact.feature_store_userrating_file_path) 
+                step.set(anime_rows=len(anime_df), rating_rows=len(rating_df))
+            with instrument("merge_data") as step:
+                merged_df = DataTransformation.merge_data(anime_df, rating_df)
+                step.set(rows=len(merged_df))
+            with instrument("clean_filter_data") as step:
+                transformed_df = DataTransformation.clean_filter_data(merged_df)
+                step.set(rows=len(transformed_df))
+            with instrument("k_core_filter") as step:
+                config = self.data_transformation_config
+                transformed_df, k_core_report, pruned_user_ids = DataTransformation.k_core_filter(
+                    transformed_df, config.k_core_min_user_ratings, config.k_core_min_anime_ratings, config.k_core_max_iterations
+                )
+                save_json(k_core_report, config.k_core_report_file_path)
+                step.set(users=k_core_report['after']['users'], anime=k_core_report['after']['anime'], nnz=k_core_report['after']['nnz'],
+                         pruned_users=len(pruned_user_ids), iterations=k_core_report['iterations'])
+
+            with instrument("export_merged") as step:
+                export_data_to_dataframe(transformed_df, self.data_transformation_config.merged_file_path)
+                step.set(rows=len(transformed_df))
 
-            export_data_to_dataframe(transformed_df, self.data_transformation_config.merged_file_path)
+            # Build the shared user/anime ID vocabulary once for every model and serving path
+            with instrument("build_vocabulary") as step:
+                vocabulary = IdVocabulary.from_frames(anime_df, transformed_df, pruned_user_ids=pruned_user_ids)
+                save_model(vocabulary, self.data_transformation_config.vocabulary_file_path)
+                step.set(users=vocabulary.n_users, anime=vocabulary.n_anime, rated_anime=vocabulary.n_rated_anime)
+            # Searched by the app and the service instead of shipping every title and user ID to the UI
+            with instrument("build_search_index") as step:
+                # Titles are flagged by the content catalog's own rows, which drop anime with missing details
+                search_index = SearchIndex.from_vocabulary(
+                    vocabulary, min_similarity=self.data_transformation_config.search_min_similarity,
+                    content_anime_ids=content_catalog(anime_df)['anime_id'].to_numpy()
+                )
+                save_model(search_index, self.data_transformation_config.search_index_file_path)
+                step.set(titles=len(search_index.keys), users=len(search_index.user_ids))
             data_transformation_artifact = DataTransformationArtifact( 
-                merged_file_path=self.data_transformation_config.merged_file_path
+                merged_file_path=self.data_transformation_config.merged_file_path,
+                vocabulary_file_path=self.data_transformation_config.vocabulary_file_path,
+                search_index_file_path=self.data_transformation_config.search_index_file_path
                             )
             
             return data_transformation_artifact
@@ -0,0 +1,184 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.entity.config_entity import ModelEvaluationConfig
+from anime_recommender.entity.artifact_entity import (
+    DataIngestionArtifact, DataTransformationArtifact, CollaborativeModelArtifact, ContentBasedModelArtifact, ModelEvaluationArtifact
+)
+from anime_recommender.utils.main_utils.utils import load_csv_data, load_object, save_json
+from anime_recommender.utils.instrumentation import instrument
+from anime_recommender.source.collaborative_modelling import CollaborativeAnimeRecommender
+from anime_recommender.source.content_based_modelling import ContentBasedRecommender
+from anime_recommender.source.evaluation import OfflineEvaluator, holdout_split
+from anime_recommender.source.sampling import RatingSampler
+
+class ModelEvaluator:
+    """
+    Offline evaluation stage: splits the transformed ratings per user into training and held-out
+    ratings, trains every recommender on the training split only and reports their ranking quality
+    on the held-out ratings.
+    """
+    def __init__(self, model_evaluation_config: ModelEvaluationConfig, data_ingestion_artifact: DataIngestionArtifact,
+                 data_transformation_artifact: DataTransformationArtifact, collaborative_model_artifact: CollaborativeModelArtifact = None,
+                 content_based_model_artifact: ContentBasedModelArtifact = None):
+        """
+        Initializes the ModelEvaluator with configuration and the artifacts of the earlier stages.
+
+        Args:
+            model_evaluation_config (ModelEvaluationConfig): Configuration settings for the evaluation.
+            data_ingestion_artifact (DataIngestionArtifact): Artifact containing the anime catalog path.
+            data_transformation_artifact (DataTransformationArtifact): Artifact containing the transformed data and vocabulary paths.
+            collaborative_model_artifact (CollaborativeModelArtifact, optional): Tuned SVD parameters, when available, are re-used.
+            content_based_model_artifact (ContentBasedModelArtifact, optional): Saved content model, fitted from the catalog when not given.
+        """
+        try:
+            self.model_evaluation_config = model_evaluation_config
+            self.data_ingestion_artifact = data_ingestion_artifact
+            self.data_transformation_artifact = data_transformation_artifact
+            self.collaborative_model_artifact = collaborative_model_artifact
+            self.content_based_model_artifact = content_based_model_artifact
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def split(self, df: pd.DataFrame, vocabulary) -> tuple:
+        """
+        Splits the ratings with the configured per-user holdout.
+
+        Returns:
+            tuple: (training ratings, held-out ratings) DataFrames.
+        """
+        config = self.model_evaluation_config
+        df = df.drop_duplicates(subset=['user_id', 'anime_id'])
+        df = df[vocabulary.user_index(df['user_id'].to_numpy()) >= 0]
+        order = None
+        if config.holdout == 'temporal':
+            if config.timestamp_column in df.columns:
+                order = pd.to_numeric(df[config.timestamp_column], errors='coerce').to_numpy()
+            else:
+                logging.warning(f"No '{config.timestamp_column}' column; the temporal holdout falls back to the file order")
+        test = holdout_split(
+            vocabulary.user_index(df['user_id'].to_numpy()), test_fraction=config.test_fraction, min_ratings=config.min_user_ratings,
+            strategy=config.holdout, order=order, seed=config.seed
+        )
+        return df[~test], df[test]
+
+    def train_models(self, train_df: pd.DataFrame, vocabulary) -> tuple:
+        """
+        Trains the configured methods on the training ratings.
+
+        Returns:
+            tuple: (CollaborativeAnimeRecommender over the training ratings, models by method for OfflineEvaluator.evaluate).
+        """
+        config = self.model_evaluation_config
+        recommender = CollaborativeAnimeRecommender(train_df, vocabulary=vocabulary)
+        models = {}
+        if 'svd' in config.methods:
+            svd_params = self.collaborative_model_artifact.svd_params if self.collaborative_model_artifact else None
+            recommender.train_svd(params=svd_params)
+            models['svd'] = recommender.svd
+        if 'item_knn' in config.methods:
+            recommender.train_knn_item_based(embedding_dim=config.knn_embedding_dim)
+            models['item_knn'] = recommender.build_item_neighbor_table(k=config.item_neighbor_table_k)
+        if 'user_knn' in config.methods:
+            recommender.train_knn_user_based(embedding_dim=config.knn_embedding_dim)
+            models['user_knn'] = (recommender.knn_user_based, config.user_knn_neighbors)
+        if 'content' in config.methods:
+            anime_df = load_csv_data(self.data_ingestion_artifact.feature_store_anime_file_path)
+            model_path = self.content_based_model_artifact.cosine_similarity_model_file_path if self.content_based_model_artifact else None
+            models['content'] = ContentBasedRecommender(anime_df, vocabulary=vocabulary, model_path=model_path)
+        if 'popularity' in config.methods:
+            models['popularity'] = None
+        return recommender, models
+
+    def evaluate(self, train_df: pd.DataFrame, test_df: pd.DataFrame, vocabulary) -> dict:
+        """
+        Trains the configured methods on train_df and evaluates them against test_df.
+
+        Returns:
+            dict: The evaluation report of OfflineEvaluator.evaluate.
+        """
+        config = self.model_evaluation_config
+        with instrument("train_on_split") as step:
+            start = time.perf_counter()
+            recommender, models = self.train_models(train_df, vocabulary)
+            train_seconds = time.perf_counter() - start
+            step.set(ratings=recommender.user_item_matrix.nnz)
+        with instrument("rank_and_score") as step:
+            user_idx = vocabulary.user_index(test_df['user_id'].to_numpy())
+            anime_idx = vocabulary.anime_index(test_df['anime_id'].to_numpy())
+            ratings = pd.to_numeric(test_df['rating'], errors='coerce').to_numpy(dtype=np.float64)
+            keep = (user_idx >= 0) & (anime_idx >= 0) & (anime_idx < vocabulary.n_rated_anime) & np.isfinite(ratings)
+            test_matrix = recommender._ratings_matrix(user_idx[keep], anime_idx[keep], ratings[keep])
+            evaluator = OfflineEvaluator(
+                vocabulary, recommender.user_item_matrix, test_matrix, k_values=config.k_values,
+                relevance_threshold=config.relevance_threshold, batch_size=config.batch_size,
+                n_workers=config.n_workers, max_users=config.max_users, seed=config.seed
+            )
+            report = evaluator.evaluate(models)
+            step.set(users=report['users'], test_ratings=report['test_ratings'])
+        report['train_seconds'] = train_seconds
+        return report
+
+    def evaluate_sampling(self, train_df: pd.DataFrame, test_df: pd.DataFrame, vocabulary, full_report: dict) -> dict:
+        """
+        Trains the configured methods on the configured sample of train_df, as the collaborative
+        trainer does, and compares them with the models trained on all of train_df.
+
+        Args:
+            full_report (dict): Report of evaluate on the full train_df.
+
+        Returns:
+            dict: The sampling report with the measured training speedup, the sampled models'
+                  metrics and their difference from the full models' metrics (sampled - full).
+        """
+        sampler = RatingSampler.from_config(self.model_evaluation_config)
+        with instrument("sample_ratings") as step:
+            sampled_df, sampling = sampler.sample(train_df, vocabulary.user_index(train_df['user_id'].to_numpy()))
+            step.set(ratings=sampling['input_ratings'], sampled=sampling['sampled_ratings'])
+        sampled_report = self.evaluate(sampled_df, test_df, vocabulary)
+        sampling.update({
+            'train_seconds': full_report['train_seconds'],
+            'sampled_train_seconds': sampled_report['train_seconds'],
+            'training_speedup': full_report['train_seconds'] / sampled_report['train_seconds'] if sampled_report['train_seconds'] else None,
+            'methods': sampled_report['methods'],
+            'quality_delta': {
+                method: {
+                    metric: value - full_report['methods'][method][metric]
+                    for metric, value in metrics.items() if metric != 'users' and isinstance(value, (int, float))
+                }
+                for method, metrics in sampled_report['methods'].items() if method in full_report['methods']
+            },
+        })
+        logging.info(f"Training on {sampling['effective_fraction']:.1%} of the ratings took {sampling['sampled_train_seconds']:.2f}s "
+                     f"instead of {sampling['train_seconds']:.2f}s")
+        return sampling
+
+    def initiate_model_evaluation(self) -> ModelEvaluationArtifact:
+        """
+        Splits the transformed ratings, evaluates every configured method and saves the report.
+
+        Returns:
+            ModelEvaluationArtifact: Object containing the report path and the per-method metrics.
+        """
+        try:
+            config = self.model_evaluation_config
+            with instrument("load_data") as step:
+                df = load_csv_data(self.data_transformation_artifact.merged_file_path)
+                vocabulary = load_object(self.data_transformation_artifact.vocabulary_file_path)
+                step.set(rows=len(df))
+            with instrument("holdout_split") as step:
+                train_df, test_df = self.split(df, vocabulary)
+                step.set(train=len(train_df), test=len(test_df))
+            logging.info(f"{config.holdout.capitalize()} holdout: {len(train_df)} training and {len(test_df)} held-out ratings")
+
+            report = self.evaluate(train_df, test_df, vocabulary)
+            if RatingSampler.from_config(config).enabled:
+                report['sampling'] = self.evaluate_sampling(train_df, test_df, vocabulary, report)
+            report.update({'holdout': config.holdout, 'test_fraction': config.test_fraction, 'min_user_ratings': config.min_user_ratings})
+            save_json(report, config.report_file_path)
+            return ModelEvaluationArtifact(report_file_path=config.report_file_path, metrics=report['methods'])
+        except Exception as e:
+            raise AnimeRecommendorException(f"Error in ModelEvaluator: {str(e)}", sys)
@@ -2,6 +2,7 @@ import sys
 from anime_recommender.exception.exception import AnimeRecommendorException
 from anime_recommender.loggers.logging import logging
 from anime_recommender.utils.main_utils.utils import load_csv_data 
+from anime_recommender.utils.instrumentation import instrument
 from anime_recommender.entity.artifact_entity import DataIngestionArtifact
 from anime_recommender.source.top_anime_filtering import PopularityBasedFiltering 
 
@@ -40,7 +41,9 @@ class PopularityBasedRecommendor:
         """
         try:
             logging.info("Loading transformed data...")
-            df = load_csv_data(self.data_ingestion_artifact.feature_store_anime_file_path)
+            with instrument("load_data") as step:
+                df = load_csv_data(self.data_ingestion_artifact.feature_store_anime_file_path)
+                step.set(rows=len(df))
 
             recommender = PopularityBasedFiltering(df)
 
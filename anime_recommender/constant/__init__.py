@@ -11,6 +11,34 @@ ANIME_FILE_PATH:str = "krishnaveni76/Animes"
 RATING_FILE_PATH:str = "krishnaveni76/UserRatings"
 ANIMEUSERRATINGS_FILE_PATH:str = "krishnaveni76/Anime_UserRatings"
 MODELS_FILEPATH = "krishnaveni76/anime-recommendation-models"
+# Written into Artifacts/<timestamp> once every stage of a run has finished
+TRAINING_PIPELINE_COMPLETED_FILE_NAME: str = "_COMPLETED.json"
+
+"""
+Run Report related constant start with RUN_REPORT VAR NAME
+"""
+RUN_REPORT_DIR_NAME: str = "run_report"
+RUN_REPORT_FILE_NAME: str = "run_report.json"
+RUN_REPORT_PROMETHEUS_FILE_NAME: str = "anime_training_pipeline.prom"
+RUN_REPORT_PROFILE_DIR: str = "profiles"
+RUN_REPORT_RSS_SAMPLE_SECONDS: float = 0.05
+# When set, the Prometheus textfile is also written to this directory (e.g. the node_exporter textfile collector's)
+RUN_REPORT_PROMETHEUS_TEXTFILE_DIR_ENV_VAR: str = "PROMETHEUS_TEXTFILE_DIR"
+
+"""
+Logging related constant start with LOGGING VAR NAME
+"""
+LOGGING_DIR_NAME: str = "logs"
+# Each can be overridden per process through the matching environment variable
+LOGGING_LEVEL_ENV_VAR: str = "ANIME_LOG_LEVEL"
+LOGGING_LEVEL: str = "INFO"
+# "json" writes one structured record per line; "text" keeps the plain format
+LOGGING_FORMAT_ENV_VAR: str = "ANIME_LOG_FORMAT"
+LOGGING_FORMAT: str = "json"
+# Hot-path records logged with extra=SAMPLED are let through at most this often per call site
+LOGGING_SAMPLE_RATE_ENV_VAR: str = "ANIME_LOG_SAMPLE_RATE"
+LOGGING_SAMPLE_RATE_PER_SECOND: float = 1.0
+LOGGING_SAMPLE_BURST: int = 5
 
 """
 Data Ingestion related constant start with DATA_INGESTION VAR NAME
@@ -24,6 +52,16 @@ Data Transformation related constant start with DATA_VALIDATION VAR NAME
 """
 DATA_TRANSFORMATION_DIR:str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR:str = "transformed" 
+DATA_TRANSFORMATION_VOCABULARY_FILE_NAME:str = "vocabulary.pkl"
+# Title autocomplete and user ID search over the vocabulary
+DATA_TRANSFORMATION_SEARCH_INDEX_FILE_NAME:str = "search_index.pkl"
+# Smallest trigram similarity of a misspelled title to the title it resolves to
+DATA_TRANSFORMATION_SEARCH_MIN_SIMILARITY:float = 0.5
+# Iterative k-core pruning of the ratings; setting both minimums to 1 disables it
+DATA_TRANSFORMATION_K_CORE_MIN_USER_RATINGS:int = 5
+DATA_TRANSFORMATION_K_CORE_MIN_ANIME_RATINGS:int = 5
+DATA_TRANSFORMATION_K_CORE_MAX_ITERATIONS:int = 50
+DATA_TRANSFORMATION_K_CORE_REPORT_FILE_NAME:str = "k_core_report.json"
 
 """
 Model Trainer related constant start with MODEL TRAINER VAR NAME
@@ -34,6 +72,184 @@ MODEL_TRAINER_COL_TRAINED_MODEL_DIR: str = "collaborative_recommenders"
 MODEL_TRAINER_SVD_TRAINED_MODEL_NAME: str = "svd.pkl"
 MODEL_TRAINER_ITEM_KNN_TRAINED_MODEL_NAME: str = "itembasedknn.pkl"
 MODEL_TRAINER_USER_KNN_TRAINED_MODEL_NAME: str = "userbasedknn.pkl"
+MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_NAME: str = "itemneighbortable.pkl"
+MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_K: int = 50
+# Row layout of the KNN models and the item neighbor table, saved with them and checked on load: rows are IdVocabulary
+# indices. Models without it, such as those fitted on the older name-sorted pivot tables, are refused or retrained
+MODEL_TRAINER_INDEX_LAYOUT: str = "id_vocabulary/1"
+# Dimension of the randomized truncated SVD embeddings the item and user KNN models search in, e.g. 64; None searches the raw rating vectors
+MODEL_TRAINER_KNN_EMBEDDING_DIM = None
+# Share of the exact cosine neighbors an embedding KNN model must also find, on a sample of the training ratings, before
+# it is used; below it the exact model is trained instead. Benchmarked embeddings reach only 0.12-0.47, so they stay off
+MODEL_TRAINER_KNN_EMBEDDING_MIN_OVERLAP: float = 0.9
+MODEL_TRAINER_KNN_EMBEDDING_GATE_QUERIES: int = 200
+
+# Top-k user neighbor graph, refreshed from the latest completed run's graph when there is one
+MODEL_TRAINER_USER_NEIGHBOR_GRAPH_NAME: str = "userneighborgraph.pkl"
+MODEL_TRAINER_USER_NEIGHBOR_GRAPH_REPORT_NAME: str = "user_neighbor_graph_report.json"
+MODEL_TRAINER_USER_NEIGHBOR_GRAPH_K: int = 50
+MODEL_TRAINER_USER_NEIGHBOR_GRAPH_BLOCK_SIZE: int = 512
+MODEL_TRAINER_USER_NEIGHBOR_GRAPH_N_WORKERS = None  # None uses every available core
+MODEL_TRAINER_USER_NEIGHBOR_GRAPH_INCREMENTAL: bool = True
+
+# Optional reduced-precision storage for saved models: None, "float16" or "int8"
+MODEL_TRAINER_QUANTIZATION_DTYPE = None
+MODEL_TRAINER_QUANTIZATION_REPORT_SUFFIX: str = "_quantization_report.json"
+MODEL_TRAINER_QUANTIZATION_REPORT_QUERIES: int = 100
+
+# Successive-halving search for the SVD hyperparameters, run before the SVD model is trained
+MODEL_TRAINER_SVD_TUNING_ENABLED: bool = True
+MODEL_TRAINER_SVD_TUNING_REPORT_NAME: str = "svd_tuning_report.json"
+MODEL_TRAINER_SVD_TUNING_SEARCH_SPACE: dict = {
+    'n_factors': (32, 64, 100, 150),
+    'n_epochs': (10, 20, 30),
+    'lr_all': (0.002, 0.005, 0.01),
+    'reg_all': (0.02, 0.05, 0.1),
+}
+MODEL_TRAINER_SVD_TUNING_N_CONFIGS: int = 27
+MODEL_TRAINER_SVD_TUNING_N_FOLDS: int = 5
+MODEL_TRAINER_SVD_TUNING_ETA: int = 3
+MODEL_TRAINER_SVD_TUNING_N_WORKERS = None  # None uses every available core
+MODEL_TRAINER_SVD_TUNING_SEED: int = 42
+
+# Sampling of the ratings the collaborative models are trained on; both None trains on every rating
+MODEL_TRAINER_SAMPLE_MAX_USER_RATINGS = None  # per-user cap, e.g. 500
+MODEL_TRAINER_SAMPLE_FRACTION = None  # share of the capped ratings kept, e.g. 0.5
+# "uniform" thins all ratings alike, "stratified" keeps the same share of every user's ratings
+MODEL_TRAINER_SAMPLE_STRATEGY: str = "uniform"
+MODEL_TRAINER_SAMPLE_MIN_USER_RATINGS: int = 5
+MODEL_TRAINER_SAMPLE_SEED: int = 42
+MODEL_TRAINER_SAMPLING_REPORT_NAME: str = "sampling_report.json"
 
 MODEL_TRAINER_CON_TRAINED_MODEL_DIR:str = "content_based_recommenders"
-MODEL_TRAINER_COSINESIMILARITY_MODEL_NAME:str = "cosine_similarity.pkl"
\ No newline at end of file
+MODEL_TRAINER_COSINESIMILARITY_MODEL_NAME:str = "cosine_similarity.pkl"
+
+"""
+Model Evaluation related constant start with MODEL_EVALUATION VAR NAME
+"""
+MODEL_EVALUATION_DIR_NAME: str = "model_evaluation"
+MODEL_EVALUATION_REPORT_FILE_NAME: str = "evaluation_report.json"
+MODEL_EVALUATION_METHODS: tuple = ('svd', 'item_knn', 'user_knn', 'content', 'popularity')
+# "random" holds out a random share of each user's ratings, "temporal" the latest ones
+MODEL_EVALUATION_HOLDOUT: str = "random"
+# Ratings are ordered by this column for the temporal holdout, or by file order when the column is absent
+MODEL_EVALUATION_TIMESTAMP_COLUMN: str = "timestamp"
+MODEL_EVALUATION_TEST_FRACTION: float = 0.2
+MODEL_EVALUATION_MIN_USER_RATINGS: int = 5
+MODEL_EVALUATION_K: tuple = (10, 20)
+# Held-out ratings at or above this value count as relevant; None counts every held-out rating
+MODEL_EVALUATION_RELEVANCE_THRESHOLD = None
+MODEL_EVALUATION_BATCH_SIZE: int = 512
+MODEL_EVALUATION_N_WORKERS = None  # None uses every available core
+MODEL_EVALUATION_MAX_USERS = None  # None evaluates every user with held-out ratings
+MODEL_EVALUATION_SEED: int = 42
+
+"""
+Batch Recommendation related constant start with BATCH_RECOMMENDATIONS VAR NAME
+"""
+BATCH_RECOMMENDATIONS_DIR_NAME: str = "batch_recommendations"
+RECOMMENDATION_STORE_FILE_NAME: str = "recommendations.sqlite"
+BATCH_RECOMMENDATIONS_TOP_N: int = 50
+# Neighbors of the stored user-KNN lists: n + 1 for n recommendations, as the live path queries, so the stored lists
+# answer requests for the default 10 recommendations and requests for other n are scored live
+BATCH_RECOMMENDATIONS_USER_KNN_NEIGHBORS: int = 11
+BATCH_RECOMMENDATIONS_CHUNK_SIZE: int = 512
+BATCH_RECOMMENDATIONS_N_WORKERS = None  # None uses every available core
+
+"""
+Artifact Bundle related constant start with ARTIFACT_BUNDLE VAR NAME
+"""
+ARTIFACT_BUNDLE_DIR: str = "bundle"
+ARTIFACT_BUNDLE_DIR_ENV_VAR: str = "ANIME_ARTIFACT_BUNDLE_DIR"
+ARTIFACT_BUNDLE_MANIFEST_FILE_NAME: str = "manifest.json"
+ARTIFACT_BUNDLE_DATASETS_DIR: str = "datasets"
+ARTIFACT_BUNDLE_MODELS_DIR: str = "models"
+
+"""
+Result Cache related constant start with RESULT_CACHE VAR NAME
+"""
+RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+RESULT_CACHE_TTL_SECONDS: float = 3600.0
+
+"""
+Serving related constant start with SERVING VAR NAME
+"""
+SERVING_DIR_NAME: str = "serving"
+SERVING_HOST: str = "127.0.0.1"
+SERVING_PORT: int = 8000
+SERVING_MAX_RECOMMENDATIONS: int = 100
+# Requests for the same batched method arriving within this window are scored together
+SERVING_BATCH_WAIT_MS: float = 2.0
+SERVING_MAX_BATCH_SIZE: int = 64
+SERVING_N_THREADS: int = 4
+# How often the service checks Artifacts/ for a newly completed training run
+SERVING_MODEL_VERSION_POLL_SECONDS: float = 30.0
+SERVING_LOAD_TEST_CONCURRENCY: int = 16
+SERVING_LOAD_TEST_REQUESTS: int = 1000
+SERVING_LATENCY_REPORT_FILE_NAME: str = "latency_report.json"
+# User-KNN queries are scanned by this many worker processes, each over its own shard of the users; 1 keeps the single in-process model.
+# Off by default: scaling.user_knn_shards has only been measured on one core, where every added shard is slower
+# (0.86x at 2 shards, 0.19x at 8 at the 10k scale). Enable it only once that benchmark shows a speedup on the serving host;
+# shard counts beyond the usable cores are capped to them
+SERVING_USER_KNN_SHARDS: int = 1
+# Matches per page of the /search routes and the app's selection lists
+SERVING_SEARCH_PAGE_SIZE: int = 20
+
+"""
+Rating Events related constant start with RATING_EVENTS VAR NAME
+"""
+# Append-only log of streamed ratings, shared by every training run and tailed by the service
+RATING_EVENTS_DIR: str = "rating_events"
+RATING_EVENTS_FILE_NAME: str = "rating_events.jsonl"
+RATING_EVENTS_ENABLED: bool = True
+# Streamed ratings become visible to user-KNN requests within about this delay
+RATING_EVENTS_POLL_SECONDS: float = 0.5
+# The delta buffer is folded into the rating matrix once it holds this many ratings, or has waited this long
+RATING_EVENTS_COMPACT_THRESHOLD: int = 50000
+RATING_EVENTS_COMPACT_SECONDS: float = 60.0
+
+"""
+Popularity Stats related constant start with POPULARITY_STATS VAR NAME
+"""
+# Snapshot of the streamed rating aggregates, kept per training run under its serving directory
+POPULARITY_STATS_FILE_NAME: str = "popularity_stats.npz"
+POPULARITY_STATS_SNAPSHOT_SECONDS: float = 60.0
+# Ratings an anime needs before it can enter the top rated by users leaderboard
+POPULARITY_STATS_MIN_RATINGS: int = 10
+# Leaderboards are re-selected at most this often while rating events arrive
+POPULARITY_STATS_REFRESH_SECONDS: float = 1.0
+
+"""
+Serving Metrics related constant start with SERVING_METRICS VAR NAME
+"""
+SERVING_METRICS_ENABLED: bool = True
+# Local Prometheus endpoint started by the Streamlit app; the HTTP service exposes /metrics on its own port
+SERVING_METRICS_HOST: str = "127.0.0.1"
+SERVING_METRICS_PORT: int = 9108
+# Upper bounds of the latency histogram buckets, in seconds
+SERVING_METRICS_LATENCY_BUCKETS: tuple = (0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Instrumentation cost allowed per request, as a fraction of the mean request time
+SERVING_METRICS_OVERHEAD_BUDGET: float = 0.01
+# Request phases are timed on one request in this many; phase means and shares stay unbiased
+SERVING_METRICS_PHASE_SAMPLE_EVERY: int = 16
+# Request latencies are buffered per series and binned into the histograms in bulk once this many are pending
+SERVING_METRICS_FLUSH_SIZE: int = 1024
+
+"""
+Benchmark related constant start with BENCHMARK VAR NAME
+"""
+BENCHMARK_DIR: str = "benchmarks"
+BENCHMARK_REPORT_FILE_NAME: str = "benchmark_report.json"
+# Synthetic dataset size, one of the scales in anime_recommender.benchmarks.synthetic_data.SYNTHETIC_SCALES
+BENCHMARK_SCALE: str = "100k"
+BENCHMARK_SEED: int = 42
+BENCHMARK_REPEATS: int = 3
+BENCHMARK_LATENCY_QUERIES: int = 200
+BENCHMARK_BATCH_SIZE: int = 64
+BENCHMARK_N_RECOMMENDATIONS: int = 10
+# A metric more than this fraction worse than the baseline is reported as a regression
+BENCHMARK_REGRESSION_THRESHOLD: float = 0.10
+# Shard counts of the sharded user-KNN scaling benchmark
+BENCHMARK_USER_KNN_SHARD_COUNTS: tuple = (1, 2, 4, 8)
+# Embedding dimensions compared with brute-force cosine KNN on the raw rating vectors
+BENCHMARK_KNN_EMBEDDING_DIMS: tuple = (32, 64, 128, 256)
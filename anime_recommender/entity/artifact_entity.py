@@ -9,13 +9,32 @@ class DataIngestionArtifact:
 @dataclass
 class DataTransformationArtifact:
     merged_file_path:str
+    vocabulary_file_path:Optional[str] = None
+    search_index_file_path:Optional[str] = None
 
 @dataclass
 class CollaborativeModelArtifact:
     svd_file_path: Optional[str] = None
     item_based_knn_file_path: Optional[str] = None
     user_based_knn_file_path: Optional[str] = None
+    item_neighbor_table_file_path: Optional[str] = None
+    svd_params: Optional[dict] = None
+    svd_cv_metrics: Optional[dict] = None
+    svd_tuning_report_file_path: Optional[str] = None
+    training_ratings: Optional[int] = None
+    sampling_report_file_path: Optional[str] = None
+    user_neighbor_graph_file_path: Optional[str] = None
+    user_neighbor_graph_report: Optional[dict] = None
  
 @dataclass
 class ContentBasedModelArtifact:
-    cosine_similarity_model_file_path:str
\ No newline at end of file
+    cosine_similarity_model_file_path:str
+
+@dataclass
+class ModelEvaluationArtifact:
+    report_file_path: str
+    metrics: dict
+
+@dataclass
+class RecommendationStoreArtifact:
+    store_file_path:str
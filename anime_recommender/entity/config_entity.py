@@ -16,6 +16,26 @@ class TrainingPipelineConfig:
         self.timestamp: str = timestamp
     
 
+class RunReportConfig:
+    """
+    Configuration for the run report, including paths for the JSON report, Prometheus textfile and profiles.
+    """
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig, profile: bool = False):
+        """
+        Initialize run report paths.
+
+        Args:
+            profile (bool): Whether to dump a cProfile of every pipeline stage. Defaults to False.
+        """
+        self.run_report_dir: str = os.path.join(training_pipeline_config.artifact_dir, RUN_REPORT_DIR_NAME)
+        self.report_file_path: str = os.path.join(self.run_report_dir, RUN_REPORT_FILE_NAME)
+        self.prometheus_file_paths: list = [os.path.join(self.run_report_dir, RUN_REPORT_PROMETHEUS_FILE_NAME)]
+        textfile_dir = os.environ.get(RUN_REPORT_PROMETHEUS_TEXTFILE_DIR_ENV_VAR)
+        if textfile_dir:
+            self.prometheus_file_paths.append(os.path.join(textfile_dir, RUN_REPORT_PROMETHEUS_FILE_NAME))
+        self.profile_dir: str = os.path.join(self.run_report_dir, RUN_REPORT_PROFILE_DIR) if profile else None
+        self.rss_sample_seconds: float = RUN_REPORT_RSS_SAMPLE_SECONDS
+
 class DataIngestionConfig:
     """
     Configuration for data ingestion, including paths for feature store.
@@ -40,6 +60,13 @@ class DataTransformationConfig:
         """
         self.data_transformation_dir:str = os.path.join(training_pipeline_config.artifact_dir,DATA_TRANSFORMATION_DIR)
         self.merged_file_path:str = os.path.join(self.data_transformation_dir,DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,MERGED_FILE_NAME)
+        self.vocabulary_file_path:str = os.path.join(self.data_transformation_dir,DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,DATA_TRANSFORMATION_VOCABULARY_FILE_NAME)
+        self.search_index_file_path:str = os.path.join(self.data_transformation_dir,DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,DATA_TRANSFORMATION_SEARCH_INDEX_FILE_NAME)
+        self.search_min_similarity:float = DATA_TRANSFORMATION_SEARCH_MIN_SIMILARITY
+        self.k_core_min_user_ratings:int = DATA_TRANSFORMATION_K_CORE_MIN_USER_RATINGS
+        self.k_core_min_anime_ratings:int = DATA_TRANSFORMATION_K_CORE_MIN_ANIME_RATINGS
+        self.k_core_max_iterations:int = DATA_TRANSFORMATION_K_CORE_MAX_ITERATIONS
+        self.k_core_report_file_path:str = os.path.join(self.data_transformation_dir,DATA_TRANSFORMATION_K_CORE_REPORT_FILE_NAME)
 
 class CollaborativeModelConfig:
     """
@@ -53,6 +80,32 @@ class CollaborativeModelConfig:
         self.svd_trained_model_file_path:str = os.path.join(self.model_trainer_dir,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_SVD_TRAINED_MODEL_NAME)
         self.user_knn_trained_model_file_path:str = os.path.join(self.model_trainer_dir,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_USER_KNN_TRAINED_MODEL_NAME)
         self.item_knn_trained_model_file_path:str = os.path.join(self.model_trainer_dir,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_ITEM_KNN_TRAINED_MODEL_NAME)
+        self.item_neighbor_table_file_path:str = os.path.join(self.model_trainer_dir,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_NAME)
+        self.item_neighbor_table_k:int = MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_K
+        self.knn_embedding_dim = MODEL_TRAINER_KNN_EMBEDDING_DIM
+        self.artifact_root:str = os.path.dirname(os.path.normpath(training_pipeline_config.artifact_dir))
+        self.user_neighbor_graph_file_path:str = os.path.join(self.model_trainer_dir,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_USER_NEIGHBOR_GRAPH_NAME)
+        self.user_neighbor_graph_report_file_path:str = os.path.join(self.model_trainer_dir,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_USER_NEIGHBOR_GRAPH_REPORT_NAME)
+        self.user_neighbor_graph_k:int = MODEL_TRAINER_USER_NEIGHBOR_GRAPH_K
+        self.user_neighbor_graph_block_size:int = MODEL_TRAINER_USER_NEIGHBOR_GRAPH_BLOCK_SIZE
+        self.user_neighbor_graph_n_workers = MODEL_TRAINER_USER_NEIGHBOR_GRAPH_N_WORKERS
+        self.user_neighbor_graph_incremental:bool = MODEL_TRAINER_USER_NEIGHBOR_GRAPH_INCREMENTAL
+        self.svd_tuning_enabled:bool = MODEL_TRAINER_SVD_TUNING_ENABLED
+        self.svd_tuning_report_file_path:str = os.path.join(self.model_trainer_dir,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_SVD_TUNING_REPORT_NAME)
+        self.svd_tuning_search_space:dict = MODEL_TRAINER_SVD_TUNING_SEARCH_SPACE
+        self.svd_tuning_n_configs:int = MODEL_TRAINER_SVD_TUNING_N_CONFIGS
+        self.svd_tuning_n_folds:int = MODEL_TRAINER_SVD_TUNING_N_FOLDS
+        self.svd_tuning_eta:int = MODEL_TRAINER_SVD_TUNING_ETA
+        self.svd_tuning_n_workers = MODEL_TRAINER_SVD_TUNING_N_WORKERS
+        self.svd_tuning_seed:int = MODEL_TRAINER_SVD_TUNING_SEED
+        self.sample_max_user_ratings = MODEL_TRAINER_SAMPLE_MAX_USER_RATINGS
+        self.sample_fraction = MODEL_TRAINER_SAMPLE_FRACTION
+        self.sample_strategy:str = MODEL_TRAINER_SAMPLE_STRATEGY
+        self.sample_min_user_ratings:int = MODEL_TRAINER_SAMPLE_MIN_USER_RATINGS
+        self.sample_seed:int = MODEL_TRAINER_SAMPLE_SEED
+        self.sampling_report_file_path:str = os.path.join(self.model_trainer_dir,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_SAMPLING_REPORT_NAME)
+        self.quantization_dtype = MODEL_TRAINER_QUANTIZATION_DTYPE
+        self.quantization_report_queries:int = MODEL_TRAINER_QUANTIZATION_REPORT_QUERIES
       
 class ContentBasedModelConfig:
     """
@@ -63,4 +116,121 @@ class ContentBasedModelConfig:
         Initialize model trainer paths.
         """
         self.model_trainer_dir:str = os.path.join(training_pipeline_config.artifact_dir,MODEL_TRAINER_DIR_NAME)
-        self.cosine_similarity_model_file_path:str = os.path.join(self.model_trainer_dir,MODEL_TRAINER_CON_TRAINED_MODEL_DIR,MODEL_TRAINER_COSINESIMILARITY_MODEL_NAME)
\ No newline at end of file
+        self.cosine_similarity_model_file_path:str = os.path.join(self.model_trainer_dir,MODEL_TRAINER_CON_TRAINED_MODEL_DIR,MODEL_TRAINER_COSINESIMILARITY_MODEL_NAME)
+        self.quantization_dtype = MODEL_TRAINER_QUANTIZATION_DTYPE
+        self.quantization_report_queries:int = MODEL_TRAINER_QUANTIZATION_REPORT_QUERIES
+
+class ModelEvaluationConfig:
+    """
+    Configuration for the offline ranking evaluation of every recommender on a holdout split.
+    """
+    def __init__(self,training_pipeline_config:TrainingPipelineConfig):
+        """
+        Initialize model evaluation paths and settings.
+        """
+        self.model_evaluation_dir:str = os.path.join(training_pipeline_config.artifact_dir,MODEL_EVALUATION_DIR_NAME)
+        self.report_file_path:str = os.path.join(self.model_evaluation_dir,MODEL_EVALUATION_REPORT_FILE_NAME)
+        self.methods:tuple = MODEL_EVALUATION_METHODS
+        self.holdout:str = MODEL_EVALUATION_HOLDOUT
+        self.timestamp_column:str = MODEL_EVALUATION_TIMESTAMP_COLUMN
+        self.test_fraction:float = MODEL_EVALUATION_TEST_FRACTION
+        self.min_user_ratings:int = MODEL_EVALUATION_MIN_USER_RATINGS
+        self.k_values:tuple = MODEL_EVALUATION_K
+        self.relevance_threshold = MODEL_EVALUATION_RELEVANCE_THRESHOLD
+        self.batch_size:int = MODEL_EVALUATION_BATCH_SIZE
+        self.n_workers = MODEL_EVALUATION_N_WORKERS
+        self.max_users = MODEL_EVALUATION_MAX_USERS
+        self.seed:int = MODEL_EVALUATION_SEED
+        self.user_knn_neighbors:int = BATCH_RECOMMENDATIONS_USER_KNN_NEIGHBORS
+        self.knn_embedding_dim = MODEL_TRAINER_KNN_EMBEDDING_DIM
+        self.item_neighbor_table_k:int = MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_K
+        # The training sample of the collaborative models, evaluated against the full training split
+        self.sample_max_user_ratings = MODEL_TRAINER_SAMPLE_MAX_USER_RATINGS
+        self.sample_fraction = MODEL_TRAINER_SAMPLE_FRACTION
+        self.sample_strategy:str = MODEL_TRAINER_SAMPLE_STRATEGY
+        self.sample_min_user_ratings:int = MODEL_TRAINER_SAMPLE_MIN_USER_RATINGS
+        self.sample_seed:int = MODEL_TRAINER_SAMPLE_SEED
+
+class BatchRecommendationConfig:
+    """
+    Configuration for the offline batch materialization of per-user recommendations.
+    """
+    def __init__(self,training_pipeline_config:TrainingPipelineConfig):
+        """
+        Initialize batch recommendation paths and settings.
+        """
+        self.batch_recommendations_dir:str = os.path.join(training_pipeline_config.artifact_dir,BATCH_RECOMMENDATIONS_DIR_NAME)
+        self.store_file_path:str = os.path.join(self.batch_recommendations_dir,RECOMMENDATION_STORE_FILE_NAME)
+        self.top_n:int = BATCH_RECOMMENDATIONS_TOP_N
+        self.user_knn_neighbors:int = BATCH_RECOMMENDATIONS_USER_KNN_NEIGHBORS
+        self.chunk_size:int = BATCH_RECOMMENDATIONS_CHUNK_SIZE
+        self.n_workers = BATCH_RECOMMENDATIONS_N_WORKERS
+
+class ServingConfig:
+    """
+    Configuration for the HTTP recommendation service, reading the artifacts of one completed training run.
+    """
+    def __init__(self,artifact_dir:str):
+        """
+        Initialize serving artifact paths and settings.
+
+        Args:
+            artifact_dir (str): Artifact directory of a training run, e.g. Artifacts/<timestamp>.
+        """
+        self.artifact_dir:str = artifact_dir
+        self.anime_file_path:str = os.path.join(artifact_dir,DATA_INGESTION_DIR_NAME,DATA_INGESTION_FEATURE_STORE_DIR,ANIME_FILE_NAME)
+        self.merged_file_path:str = os.path.join(artifact_dir,DATA_TRANSFORMATION_DIR,DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,MERGED_FILE_NAME)
+        self.vocabulary_file_path:str = os.path.join(artifact_dir,DATA_TRANSFORMATION_DIR,DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,DATA_TRANSFORMATION_VOCABULARY_FILE_NAME)
+        self.search_index_file_path:str = os.path.join(artifact_dir,DATA_TRANSFORMATION_DIR,DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,DATA_TRANSFORMATION_SEARCH_INDEX_FILE_NAME)
+        self.svd_model_file_path:str = os.path.join(artifact_dir,MODEL_TRAINER_DIR_NAME,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_SVD_TRAINED_MODEL_NAME)
+        self.item_knn_model_file_path:str = os.path.join(artifact_dir,MODEL_TRAINER_DIR_NAME,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_ITEM_KNN_TRAINED_MODEL_NAME)
+        self.user_knn_model_file_path:str = os.path.join(artifact_dir,MODEL_TRAINER_DIR_NAME,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_USER_KNN_TRAINED_MODEL_NAME)
+        self.user_neighbor_graph_file_path:str = os.path.join(artifact_dir,MODEL_TRAINER_DIR_NAME,MODEL_TRAINER_COL_TRAINED_MODEL_DIR,MODEL_TRAINER_USER_NEIGHBOR_GRAPH_NAME)
+        self.cosine_similarity_model_file_path:str = os.path.join(artifact_dir,MODEL_TRAINER_DIR_NAME,MODEL_TRAINER_CON_TRAINED_MODEL_DIR,MODEL_TRAINER_COSINESIMILARITY_MODEL_NAME)
+        self.store_file_path:str = os.path.join(artifact_dir,BATCH_RECOMMENDATIONS_DIR_NAME,RECOMMENDATION_STORE_FILE_NAME)
+        self.latency_report_file_path:str = os.path.join(artifact_dir,SERVING_DIR_NAME,SERVING_LATENCY_REPORT_FILE_NAME)
+        self.host:str = SERVING_HOST
+        self.port:int = SERVING_PORT
+        self.max_recommendations:int = SERVING_MAX_RECOMMENDATIONS
+        self.batch_wait_ms:float = SERVING_BATCH_WAIT_MS
+        self.max_batch_size:int = SERVING_MAX_BATCH_SIZE
+        self.n_threads:int = SERVING_N_THREADS
+        self.model_version_poll_seconds:float = SERVING_MODEL_VERSION_POLL_SECONDS
+        self.cache_max_bytes:int = RESULT_CACHE_MAX_BYTES
+        self.cache_ttl_seconds:float = RESULT_CACHE_TTL_SECONDS
+        self.load_test_concurrency:int = SERVING_LOAD_TEST_CONCURRENCY
+        self.load_test_requests:int = SERVING_LOAD_TEST_REQUESTS
+        self.user_knn_shards:int = SERVING_USER_KNN_SHARDS
+        self.search_page_size:int = SERVING_SEARCH_PAGE_SIZE
+        self.rating_events_file_path:str = os.path.join(RATING_EVENTS_DIR,RATING_EVENTS_FILE_NAME)
+        self.rating_events_enabled:bool = RATING_EVENTS_ENABLED
+        self.rating_events_poll_seconds:float = RATING_EVENTS_POLL_SECONDS
+        self.rating_events_compact_threshold:int = RATING_EVENTS_COMPACT_THRESHOLD
+        self.rating_events_compact_seconds:float = RATING_EVENTS_COMPACT_SECONDS
+        self.popularity_stats_file_path:str = os.path.join(artifact_dir,SERVING_DIR_NAME,POPULARITY_STATS_FILE_NAME)
+        self.popularity_stats_snapshot_seconds:float = POPULARITY_STATS_SNAPSHOT_SECONDS
+        self.popularity_stats_min_ratings:int = POPULARITY_STATS_MIN_RATINGS
+        self.popularity_stats_refresh_seconds:float = POPULARITY_STATS_REFRESH_SECONDS
+
+class BenchmarkConfig:
+    """
+    Configuration for a benchmark run on synthetic data, kept apart from the training runs in Artifacts/.
+    """
+    def __init__(self,timestamp=datetime.now()):
+        """
+        Initialize benchmark paths and settings.
+        """
+        timestamp = timestamp.strftime("%m_%d_%Y_%H_%M_%S")
+        self.benchmark_dir:str = os.path.join(BENCHMARK_DIR,timestamp)
+        self.report_file_path:str = os.path.join(self.benchmark_dir,BENCHMARK_REPORT_FILE_NAME)
+        self.scale:str = BENCHMARK_SCALE
+        self.seed:int = BENCHMARK_SEED
+        self.repeats:int = BENCHMARK_REPEATS
+        self.latency_queries:int = BENCHMARK_LATENCY_QUERIES
+        self.batch_size:int = BENCHMARK_BATCH_SIZE
+        self.n_recommendations:int = BENCHMARK_N_RECOMMENDATIONS
+        self.item_neighbor_table_k:int = MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_K
+        self.regression_threshold:float = BENCHMARK_REGRESSION_THRESHOLD
+        self.user_knn_shard_counts:tuple = BENCHMARK_USER_KNN_SHARD_COUNTS
+        self.knn_embedding_dims:tuple = BENCHMARK_KNN_EMBEDDING_DIMS
+        self.track_memory:bool = True
@@ -1,16 +1,211 @@
+"""
+Process-wide logging setup.
+
+Log calls only build a record, format its message and put it on a queue; a background listener
+thread formats the log lines and writes them to logs/<timestamp>.log, so file I/O and JSON
+encoding stay off the request and training threads. Records are written as one JSON object per line (or in the
+previous plain format with ANIME_LOG_FORMAT=text), including any fields passed through `extra`.
+
+Hot-path messages should be logged lazily, with %-style arguments rather than f-strings, and
+flagged with `extra=SAMPLED` so that each call site is rate limited:
+
+    logging.debug("Fetching top %d most popular animes", n, extra=SAMPLED)
+
+Usage stays `from anime_recommender.loggers.logging import logging`.
+"""
 import os
+import json
+import time
+import queue
+import atexit
 import logging
+import threading
+import multiprocessing
+import logging.handlers
 from datetime import datetime
+from anime_recommender.constant import (
+    LOGGING_DIR_NAME, LOGGING_LEVEL_ENV_VAR, LOGGING_LEVEL, LOGGING_FORMAT_ENV_VAR, LOGGING_FORMAT,
+    LOGGING_SAMPLE_RATE_ENV_VAR, LOGGING_SAMPLE_RATE_PER_SECOND, LOGGING_SAMPLE_BURST,
+)
 
 LOGS_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
- 
-logs_dir = os.path.join(os.getcwd(), "logs")
+
+logs_dir = os.path.join(os.getcwd(), LOGGING_DIR_NAME)
 os.makedirs(logs_dir, exist_ok=True)
-  
+
 LOGS_FILE_PATH = os.path.join(logs_dir,LOGS_FILE)
 
-logging.basicConfig(
-    filename= LOGS_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level= logging.INFO,
-)
\ No newline at end of file
+TEXT_FORMAT = "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s"
+# Pass as `extra` to rate limit a hot-path log call per call site
+SAMPLED = {'sampled': True}
+
+# Attributes every LogRecord has; anything else on a record came in through `extra`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName', 'sampled'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single-line JSON object, with `extra` fields as top-level keys."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate limits records logged with `extra=SAMPLED`: a token bucket per call site lets through
+    `burst` records at once and `rate_per_second` on average. The number of records dropped since
+    the last one let through is attached to it as `suppressed`. Other records always pass.
+    """
+    def __init__(self, rate_per_second: float = LOGGING_SAMPLE_RATE_PER_SECOND, burst: int = LOGGING_SAMPLE_BURST):
+        super().__init__()
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, 'sampled', False):
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                # [tokens, last refill, records suppressed since the last one let through]
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            tokens = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate_per_second)
+            bucket[1] = now
+            if tokens < 1.0:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+            bucket[0] = tokens - 1.0
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records with their message formatted, leaving the log line to the listener thread.
+
+    The stock QueueHandler runs the whole formatter on the calling thread before enqueueing.
+    Only the %-style arguments are merged here, so the logged values are those at the time of the
+    call and the listener does not read objects the caller has since changed.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _formatter(log_format: str) -> logging.Formatter:
+    return JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+
+
+def create_file_handler(file_path: str, log_format: str = LOGGING_FORMAT) -> logging.FileHandler:
+    """Builds the synchronous handler writing `log_format` lines to `file_path`."""
+    file_handler = logging.FileHandler(file_path)
+    file_handler.setFormatter(_formatter(log_format))
+    return file_handler
+
+
+def create_queue_handler(file_path: str, log_format: str = LOGGING_FORMAT):
+    """
+    Builds a queue handler and the listener that drains it into `file_path`.
+
+    Returns:
+        tuple: (QueueHandler, QueueListener). The caller starts and stops the listener.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    listener = logging.handlers.QueueListener(log_queue, create_file_handler(file_path, log_format))
+    return queue_handler, listener
+
+
+_listener = None
+_handler = None
+
+
+def configure_logging(level: str = None, log_format: str = None, sample_rate_per_second: float = None,
+                      asynchronous: bool = None, file_path: str = LOGS_FILE_PATH) -> None:
+    """
+    (Re)configures the root logger. Called on import with the settings from the environment.
+
+    Args:
+        level (str, optional): Root log level. Defaults to ANIME_LOG_LEVEL, else LOGGING_LEVEL.
+        log_format (str, optional): "json" or "text". Defaults to ANIME_LOG_FORMAT, else LOGGING_FORMAT.
+        sample_rate_per_second (float, optional): Rate limit for sampled records. Defaults to
+            ANIME_LOG_SAMPLE_RATE, else LOGGING_SAMPLE_RATE_PER_SECOND.
+        asynchronous (bool, optional): Write through the background listener. Defaults to True,
+            except in worker processes, which exit without running atexit hooks and would lose
+            queued records.
+        file_path (str): Log file. Defaults to logs/<timestamp>.log.
+    """
+    global _listener, _handler
+    level = (level or os.environ.get(LOGGING_LEVEL_ENV_VAR, LOGGING_LEVEL)).upper()
+    log_format = (log_format or os.environ.get(LOGGING_FORMAT_ENV_VAR, LOGGING_FORMAT)).lower()
+    if sample_rate_per_second is None:
+        sample_rate_per_second = float(os.environ.get(LOGGING_SAMPLE_RATE_ENV_VAR, LOGGING_SAMPLE_RATE_PER_SECOND))
+    if asynchronous is None:
+        asynchronous = multiprocessing.parent_process() is None
+
+    shutdown_logging()
+    root = logging.getLogger()
+    if asynchronous:
+        _handler, _listener = create_queue_handler(file_path, log_format)
+        _listener.start()
+    else:
+        _handler = create_file_handler(file_path, log_format)
+    _handler.addFilter(SamplingFilter(sample_rate_per_second))
+    root.addHandler(_handler)
+    root.setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """Detaches the handler installed by `configure_logging` and flushes any queued records."""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler.close()
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _after_fork_in_child() -> None:
+    # The listener thread does not survive a fork; the child logs synchronously instead
+    global _listener, _handler
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+    _listener = _handler = None
+    configure_logging(asynchronous=False)
+
+
+configure_logging()
+atexit.register(shutdown_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
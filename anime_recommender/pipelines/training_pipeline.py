@@ -1,4 +1,6 @@
+import os
 import sys
+from dataclasses import asdict
 from anime_recommender.loggers.logging import logging
 from anime_recommender.exception.exception import AnimeRecommendorException
 
@@ -7,18 +9,28 @@ from anime_recommender.components.data_transformation import DataTransformation
 from anime_recommender.components.collaborative_recommender import CollaborativeModelTrainer
 from anime_recommender.components.content_based_recommender import ContentBasedModelTrainer
 from anime_recommender.components.top_anime_recommenders import PopularityBasedRecommendor
+from anime_recommender.components.batch_recommendations import BatchRecommendationMaterializer
+from anime_recommender.components.model_evaluation import ModelEvaluator
+from anime_recommender.constant import TRAINING_PIPELINE_COMPLETED_FILE_NAME
+from anime_recommender.utils.main_utils.utils import save_json
+from anime_recommender.utils.instrumentation import PipelineInstrumentation, instrument
 from anime_recommender.entity.config_entity import (
     TrainingPipelineConfig,
+    RunReportConfig,
     DataIngestionConfig,
     DataTransformationConfig,
     CollaborativeModelConfig,
     ContentBasedModelConfig,
+    ModelEvaluationConfig,
+    BatchRecommendationConfig,
 )
 from anime_recommender.entity.artifact_entity import (
     DataIngestionArtifact,
     DataTransformationArtifact,
     CollaborativeModelArtifact,
     ContentBasedModelArtifact,
+    ModelEvaluationArtifact,
+    RecommendationStoreArtifact,
 )
 
 class TrainingPipeline:
@@ -26,11 +38,20 @@ class TrainingPipeline:
     Orchestrates the entire anime recommender training pipeline, including
     data ingestion, transformation, model training, and popularity-based recommendations.
     """
-    def __init__(self):
+    def __init__(self, profile: bool = False):
         """
         Initialize the TrainingPipeline with required configurations.
+
+        Args:
+            profile (bool): Whether to dump a cProfile of every stage into the run report directory. Defaults to False.
         """
         self.training_pipeline_config = TrainingPipelineConfig()
+        self.run_report_config = RunReportConfig(self.training_pipeline_config, profile=profile)
+        self.instrumentation = PipelineInstrumentation(
+            self.training_pipeline_config.timestamp,
+            sample_seconds=self.run_report_config.rss_sample_seconds,
+            profile_dir=self.run_report_config.profile_dir
+        )
 
     def start_data_ingestion(self) -> DataIngestionArtifact:
         """
@@ -39,12 +60,13 @@ class TrainingPipeline:
             DataIngestionArtifact: Contains information about ingested data.
         """
         try:
-            logging.info("Initiating Data Ingestion...")
-            data_ingestion_config = DataIngestionConfig(self.training_pipeline_config)
-            data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
-            data_ingestion_artifact = data_ingestion.ingest_data()
-            logging.info(f"Data Ingestion completed.")
-            return data_ingestion_artifact
+            with instrument("data_ingestion"):
+                logging.info("Initiating Data Ingestion...")
+                data_ingestion_config = DataIngestionConfig(self.training_pipeline_config)
+                data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
+                data_ingestion_artifact = data_ingestion.ingest_data()
+                logging.info(f"Data Ingestion completed.")
+                return data_ingestion_artifact
         except Exception as e:
             raise AnimeRecommendorException(e, sys)
 
@@ -55,15 +77,16 @@ class TrainingPipeline:
             DataTransformationArtifact: Contains transformed data.
         """
         try:
-            logging.info("Initiating Data Transformation...")
-            data_transformation_config = DataTransformationConfig(self.training_pipeline_config)
-            data_transformation = DataTransformation(
-                data_ingestion_artifact=data_ingestion_artifact,
-                data_transformation_config=data_transformation_config
-            )
-            data_transformation_artifact = data_transformation.initiate_data_transformation()
-            logging.info(f"Data Transformation completed.")
-            return data_transformation_artifact
+            with instrument("data_transformation"):
+                logging.info("Initiating Data Transformation...")
+                data_transformation_config = DataTransformationConfig(self.training_pipeline_config)
+                data_transformation = DataTransformation(
+                    data_ingestion_artifact=data_ingestion_artifact,
+                    data_transformation_config=data_transformation_config
+                )
+                data_transformation_artifact = data_transformation.initiate_data_transformation()
+                logging.info(f"Data Transformation completed.")
+                return data_transformation_artifact
         except Exception as e:
             raise AnimeRecommendorException(e, sys)
 
@@ -74,34 +97,82 @@ class TrainingPipeline:
             CollaborativeModelTrainerArtifact: Trained collaborative model artifact.
         """
         try:
-            logging.info("Initiating Collaborative Model Training...")
-            collaborative_model_config = CollaborativeModelConfig(self.training_pipeline_config)
-            collaborative_model_trainer = CollaborativeModelTrainer(
-                collaborative_model_trainer_config=collaborative_model_config,
-                data_transformation_artifact=data_transformation_artifact
-            )
-            collaborative_model_trainer_artifact = collaborative_model_trainer.initiate_model_trainer(model_type='user_knn')
-            logging.info(f"Collaborative Model Training completed: {collaborative_model_trainer_artifact}")
-            return collaborative_model_trainer_artifact
+            with instrument("collaborative_model_training"):
+                logging.info("Initiating Collaborative Model Training...")
+                collaborative_model_config = CollaborativeModelConfig(self.training_pipeline_config)
+                collaborative_model_trainer = CollaborativeModelTrainer(
+                    collaborative_model_trainer_config=collaborative_model_config,
+                    data_transformation_artifact=data_transformation_artifact
+                )
+                collaborative_model_trainer_artifact = collaborative_model_trainer.initiate_model_trainer(model_type='user_knn')
+                logging.info(f"Collaborative Model Training completed: {collaborative_model_trainer_artifact}")
+                return collaborative_model_trainer_artifact
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def start_batch_materialization(self, data_transformation_artifact: DataTransformationArtifact, collaborative_model_artifact: CollaborativeModelArtifact) -> RecommendationStoreArtifact:
+        """
+        Materializes top-N collaborative recommendations for every user into the recommendation store.
+        Returns:
+            RecommendationStoreArtifact: Contains the recommendation store path.
+        """
+        try:
+            with instrument("batch_materialization"):
+                logging.info("Initiating Batch Recommendation Materialization...")
+                batch_recommendation_config = BatchRecommendationConfig(self.training_pipeline_config)
+                materializer = BatchRecommendationMaterializer(
+                    batch_recommendation_config=batch_recommendation_config,
+                    data_transformation_artifact=data_transformation_artifact,
+                    collaborative_model_artifact=collaborative_model_artifact
+                )
+                recommendation_store_artifact = materializer.initiate_materialization()
+                logging.info(f"Batch Recommendation Materialization completed: {recommendation_store_artifact}")
+                return recommendation_store_artifact
         except Exception as e:
             raise AnimeRecommendorException(e, sys)
 
-    def start_content_based_model_training(self, data_ingestion_artifact: DataIngestionArtifact) -> ContentBasedModelArtifact:
+    def start_content_based_model_training(self, data_ingestion_artifact: DataIngestionArtifact, data_transformation_artifact: DataTransformationArtifact = None) -> ContentBasedModelArtifact:
         """
         Starts content-based filtering model training.
         Returns:
             ContentBasedModelTrainerArtifact: Trained content-based model artifact.
         """
         try:
-            logging.info("Initiating Content-Based Model Training...")
-            content_based_model_config = ContentBasedModelConfig(self.training_pipeline_config)
-            content_based_model_trainer = ContentBasedModelTrainer(
-                content_based_model_trainer_config=content_based_model_config,
-                data_ingestion_artifact=data_ingestion_artifact
-            )
-            content_based_model_trainer_artifact = content_based_model_trainer.initiate_model_trainer()
-            logging.info(f"Content-Based Model Training completed: {content_based_model_trainer_artifact}")
-            return content_based_model_trainer_artifact
+            with instrument("content_based_model_training"):
+                logging.info("Initiating Content-Based Model Training...")
+                content_based_model_config = ContentBasedModelConfig(self.training_pipeline_config)
+                content_based_model_trainer = ContentBasedModelTrainer(
+                    content_based_model_trainer_config=content_based_model_config,
+                    data_ingestion_artifact=data_ingestion_artifact,
+                    data_transformation_artifact=data_transformation_artifact
+                )
+                content_based_model_trainer_artifact = content_based_model_trainer.initiate_model_trainer()
+                logging.info(f"Content-Based Model Training completed: {content_based_model_trainer_artifact}")
+                return content_based_model_trainer_artifact
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def start_model_evaluation(self, data_ingestion_artifact: DataIngestionArtifact, data_transformation_artifact: DataTransformationArtifact,
+                               collaborative_model_artifact: CollaborativeModelArtifact, content_based_model_artifact: ContentBasedModelArtifact) -> ModelEvaluationArtifact:
+        """
+        Evaluates the ranking quality of every recommender on a per-user holdout split.
+        Returns:
+            ModelEvaluationArtifact: Contains the evaluation report path and metrics.
+        """
+        try:
+            with instrument("model_evaluation"):
+                logging.info("Initiating Model Evaluation...")
+                model_evaluation_config = ModelEvaluationConfig(self.training_pipeline_config)
+                model_evaluator = ModelEvaluator(
+                    model_evaluation_config=model_evaluation_config,
+                    data_ingestion_artifact=data_ingestion_artifact,
+                    data_transformation_artifact=data_transformation_artifact,
+                    collaborative_model_artifact=collaborative_model_artifact,
+                    content_based_model_artifact=content_based_model_artifact
+                )
+                model_evaluation_artifact = model_evaluator.initiate_model_evaluation()
+                logging.info(f"Model Evaluation completed: {model_evaluation_artifact.report_file_path}")
+                return model_evaluation_artifact
         except Exception as e:
             raise AnimeRecommendorException(e, sys)
 
@@ -110,34 +181,83 @@ class TrainingPipeline:
         Generates popularity-based recommendations.
         """
         try:
-            logging.info("Initiating Popularity-Based Filtering...")
-            filtering = PopularityBasedRecommendor(data_ingestion_artifact=data_ingestion_artifact)
-            recommendations = filtering.initiate_model_trainer(filter_type='popular_animes')
-            logging.info("Popularity-Based Filtering completed.")
-            return recommendations
+            with instrument("popularity_based_filtering"):
+                logging.info("Initiating Popularity-Based Filtering...")
+                filtering = PopularityBasedRecommendor(data_ingestion_artifact=data_ingestion_artifact)
+                recommendations = filtering.initiate_model_trainer(filter_type='popular_animes')
+                logging.info("Popularity-Based Filtering completed.")
+                return recommendations
         except Exception as e:
             raise AnimeRecommendorException(e, sys)
 
+    def mark_completed(self, artifacts: dict):
+        """
+        Marks the run's artifact directory as a complete model version that serving may pick up.
+
+        The marker is written to a temporary file and renamed into place, so watchers never see a partial marker.
+
+        Args:
+            artifacts (dict): The artifacts produced by each stage.
+        """
+        try:
+            marker_path = os.path.join(self.training_pipeline_config.artifact_dir, TRAINING_PIPELINE_COMPLETED_FILE_NAME)
+            save_json({'timestamp': self.training_pipeline_config.timestamp, 'artifacts': artifacts}, marker_path + ".tmp")
+            os.replace(marker_path + ".tmp", marker_path)
+            logging.info(f"Run marked complete: {marker_path}")
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def write_run_report(self):
+        """
+        Writes the run report (JSON) and Prometheus textfile of the stages run so far.
+        A failure to write them is logged rather than raised, so it never masks the pipeline's own outcome.
+        """
+        try:
+            self.instrumentation.write_reports(self.run_report_config.report_file_path, self.run_report_config.prometheus_file_paths)
+        except Exception as e:
+            logging.warning(f"Could not write the run report: {e}")
+
     def run_pipeline(self):
         """
         Executes the entire training pipeline.
         """
         try:
-            # Data Ingestion
-            data_ingestion_artifact = self.start_data_ingestion()
+            with self.instrumentation.activate():
+                # Data Ingestion
+                data_ingestion_artifact = self.start_data_ingestion()
+
+                # Data Transformation
+                data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact)
+
+                # Collaborative Model Training
+                collaborative_model_trainer_artifact = self.start_collaborative_model_training(data_transformation_artifact)
 
-            # Data Transformation
-            data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact)
+                # Batch Materialization of per-user recommendations
+                recommendation_store_artifact = self.start_batch_materialization(data_transformation_artifact, collaborative_model_trainer_artifact)
 
-            # Collaborative Model Training
-            collaborative_model_trainer_artifact = self.start_collaborative_model_training(data_transformation_artifact)
+                # Content-Based Model Training
+                content_based_model_trainer_artifact = self.start_content_based_model_training(data_ingestion_artifact, data_transformation_artifact)
 
-            # Content-Based Model Training
-            content_based_model_trainer_artifact = self.start_content_based_model_training(data_ingestion_artifact)
+                # Offline evaluation of every recommender on a holdout split
+                model_evaluation_artifact = self.start_model_evaluation(
+                    data_ingestion_artifact, data_transformation_artifact, collaborative_model_trainer_artifact, content_based_model_trainer_artifact
+                )
 
-            # Popularity-Based Filtering
-            popularity_recommendations = self.start_popularity_based_filtering(data_ingestion_artifact)
+                # Popularity-Based Filtering
+                popularity_recommendations = self.start_popularity_based_filtering(data_ingestion_artifact)
 
+            # The report is in place before the run is marked complete and picked up by serving
+            self.write_run_report()
+            self.mark_completed({
+                'data_ingestion': asdict(data_ingestion_artifact),
+                'data_transformation': asdict(data_transformation_artifact),
+                'collaborative_model': asdict(collaborative_model_trainer_artifact),
+                'recommendation_store': asdict(recommendation_store_artifact),
+                'content_based_model': asdict(content_based_model_trainer_artifact),
+                'model_evaluation': asdict(model_evaluation_artifact),
+            })
             logging.info("Training Pipeline executed successfully.")
         except Exception as e:
+            if self.instrumentation.status == 'failed':
+                self.write_run_report()
             raise AnimeRecommendorException(e, sys)
\ No newline at end of file
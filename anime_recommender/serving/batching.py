@@ -0,0 +1,80 @@
+import asyncio
+from anime_recommender.loggers.logging import logging, SAMPLED
+
+
+class MicroBatcher:
+    """
+    Coalesces requests that arrive within a short window into one call of a batch function.
+
+    The first request of a batch starts a timer of `max_wait_ms`; the batch is flushed when the
+    timer fires or when `max_batch_size` requests are pending, whichever comes first. The batch
+    function runs in an executor so the event loop keeps accepting requests while it scores.
+    """
+    def __init__(self, name: str, batch_fn, max_wait_ms: float, max_batch_size: int, executor=None):
+        """
+        Args:
+            name (str): Name used in logs and stats.
+            batch_fn (callable): batch_fn(requests) returning one result per request, in order.
+                                 A result that is an Exception instance is raised for that request only.
+            max_wait_ms (float): Longest time the first request of a batch waits for others.
+            max_batch_size (int): Flush as soon as this many requests are pending.
+            executor (concurrent.futures.Executor, optional): Executor running batch_fn. Defaults to the loop's default executor.
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.executor = executor
+        self._pending = []
+        self._timer = None
+        self.n_requests = 0
+        self.n_batches = 0
+
+    async def submit(self, request):
+        """
+        Queues one request and waits for its result.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        self.n_requests += len(batch)
+        self.n_batches += 1
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.batch_fn, [request for request, _ in batch])
+        except Exception as e:
+            logging.error("Batch '%s' of %d requests failed: %s", self.name, len(batch), e, extra=SAMPLED)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """Request and batch counts, and the mean number of requests coalesced per batch."""
+        return {
+            'requests': self.n_requests,
+            'batches': self.n_batches,
+            'mean_batch_size': self.n_requests / self.n_batches if self.n_batches else None,
+        }
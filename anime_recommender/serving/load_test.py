@@ -0,0 +1,114 @@
+import time
+import asyncio
+import numpy as np
+from urllib.parse import urlencode
+from anime_recommender.loggers.logging import logging
+
+
+def build_targets(vocabulary, methods: list, n_requests: int, n: int = 10, seed: int = 42) -> list:
+    """
+    Builds a reproducible mix of request paths spread evenly over the given methods.
+
+    Args:
+        vocabulary (IdVocabulary): Vocabulary of the served run, used to sample users and titles.
+        methods (list): Methods to exercise, e.g. the ones reported by /health.
+        n_requests (int): Number of requests.
+        n (int): Recommendations per request. Defaults to 10.
+        seed (int): Random seed. Defaults to 42.
+
+    Returns:
+        list: (method, path) pairs.
+    """
+    rng = np.random.default_rng(seed)
+    titles = vocabulary.anime_titles[:vocabulary.n_rated_anime]
+    titles = titles[np.array([isinstance(title, str) for title in titles], dtype=bool)]
+    targets = []
+    for i in range(n_requests):
+        method = methods[i % len(methods)]
+        params = {'n': n}
+        if method in ('svd', 'user_knn'):
+            params['user_id'] = int(vocabulary.user_ids[rng.integers(vocabulary.n_users)])
+        elif method in ('item_knn', 'content'):
+            params['title'] = titles[rng.integers(len(titles))]
+        targets.append((method, f"/recommend/{method}?{urlencode(params)}"))
+    return targets
+
+
+def latency_summary(latencies) -> dict:
+    """Percentiles of a list of latencies in seconds, reported in milliseconds."""
+    latencies = np.asarray(latencies, dtype=np.float64) * 1000.0
+    if not len(latencies):
+        return {'count': 0}
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        'count': int(len(latencies)),
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(p50),
+        'p90_ms': float(p90),
+        'p99_ms': float(p99),
+        'max_ms': float(latencies.max()),
+    }
+
+
+async def _read_response(reader) -> int:
+    status = int((await reader.readline()).split()[1])
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            content_length = int(value)
+    await reader.readexactly(content_length)
+    return status
+
+
+async def run_load_test(host: str, port: int, targets: list, concurrency: int) -> dict:
+    """
+    Replays the targets against a running service over `concurrency` keep-alive connections.
+
+    Args:
+        host (str): Service host.
+        port (int): Service port.
+        targets (list): (method, path) pairs from build_targets.
+        concurrency (int): Number of concurrent clients.
+
+    Returns:
+        dict: Throughput, error count and overall and per-method latency percentiles.
+    """
+    queue = iter(targets)
+    latencies = {}
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for method, path in queue:
+                start = time.perf_counter()
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+                await writer.drain()
+                status = await _read_response(reader)
+                latencies.setdefault(method, []).append(time.perf_counter() - start)
+                if status != 200:
+                    errors += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [latency for method_latencies in latencies.values() for latency in method_latencies]
+    report = {
+        'concurrency': concurrency,
+        'requests': len(all_latencies),
+        'errors': errors,
+        'elapsed_seconds': elapsed,
+        'throughput_rps': len(all_latencies) / elapsed if elapsed > 0 else None,
+        'latency': latency_summary(all_latencies),
+        'latency_by_method': {method: latency_summary(values) for method, values in latencies.items()},
+    }
+    logging.info(f"Load test report: {report}")
+    return report
@@ -0,0 +1,254 @@
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.constant import TRAINING_PIPELINE_COMPLETED_FILE_NAME
+from anime_recommender.utils.serving_metrics import serving_metrics
+
+
+def list_completed_runs(artifact_root: str) -> list:
+    """
+    Lists the training runs under artifact_root that were marked complete, oldest first.
+
+    Args:
+        artifact_root (str): Directory holding one Artifacts/<timestamp> directory per run.
+
+    Returns:
+        list: Paths of the completed run directories.
+    """
+    if not os.path.isdir(artifact_root):
+        return []
+    runs = []
+    for name in os.listdir(artifact_root):
+        marker_path = os.path.join(artifact_root, name, TRAINING_PIPELINE_COMPLETED_FILE_NAME)
+        if os.path.exists(marker_path):
+            runs.append((os.path.getmtime(marker_path), os.path.join(artifact_root, name)))
+    return [run_dir for _, run_dir in sorted(runs)]
+
+
+class ModelVersion:
+    """
+    One loaded set of artifacts, reference counted by the requests using it.
+
+    Once retired, the version is closed as soon as its last in-flight request releases it.
+    """
+    def __init__(self, version_id: str, artifact_dir: str, value):
+        self.version_id = version_id
+        self.artifact_dir = artifact_dir
+        self.value = value
+        self.released = threading.Event()
+        self._in_flight = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _acquire(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def release(self):
+        """Ends one request's use of this version."""
+        with self._lock:
+            self._in_flight -= 1
+            close = self._retired and self._in_flight == 0
+        if close:
+            self._close()
+
+    def retire(self):
+        """Stops handing this version to new requests; it closes once in-flight requests finish."""
+        with self._lock:
+            self._retired = True
+            close = self._in_flight == 0
+        if close:
+            self._close()
+
+    def _close(self):
+        close = getattr(self.value, 'close', None)
+        try:
+            if close is not None:
+                close()
+        except Exception as e:
+            logging.warning(f"Error closing model version {self.version_id}: {e}")
+        self.value = None
+        self.released.set()
+        logging.info(f"Model version {self.version_id} released")
+
+
+class ModelVersionManager:
+    """
+    Serves one model version per process and hot-swaps in newly completed training runs.
+
+    A background thread polls artifact_root for the latest run carrying the completion marker.
+    A new run is loaded and warmed (which doubles as validation) off the request path, then
+    swapped in atomically: new requests get the new version while in-flight requests finish on
+    the old one, which is released afterwards. A new candidate is not loaded while a retired
+    version is still draining, so at most two versions are in memory at once.
+    """
+    def __init__(self, artifact_root: str, loader, warmer=None, poll_seconds: float = 30.0, on_swap=None):
+        """
+        Args:
+            artifact_root (str): Directory holding one Artifacts/<timestamp> directory per run.
+            loader (callable): loader(artifact_dir) returning the loaded version, e.g. a RecommendationService.
+            warmer (callable, optional): warmer(value) loading lazy parts and running sample queries; raises if the version is unusable.
+            poll_seconds (float): Interval between checks for a new run. Defaults to 30 seconds.
+            on_swap (callable, optional): on_swap(version) called after a version is swapped in.
+        """
+        self.artifact_root = artifact_root
+        self.loader = loader
+        self.warmer = warmer
+        self.poll_seconds = poll_seconds
+        self.on_swap = on_swap
+        self.failed = {}
+        self._current = None
+        self._retiring = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def current(self) -> ModelVersion:
+        return self._current
+
+    def acquire(self) -> ModelVersion:
+        """
+        Pins the current version for one request. The caller must call release() on it.
+        """
+        with self._lock:
+            if self._current is None:
+                raise RuntimeError("No model version loaded.")
+            version = self._current
+            version._acquire()
+        return version
+
+    @contextmanager
+    def use(self):
+        """Context manager yielding the current version's loaded value for the duration of a request."""
+        version = self.acquire()
+        try:
+            yield version.value
+        finally:
+            version.release()
+
+    def load_version(self, artifact_dir: str) -> ModelVersion:
+        """
+        Loads, warms and swaps in the artifacts of one run.
+
+        Args:
+            artifact_dir (str): The run's artifact directory.
+
+        Returns:
+            ModelVersion: The new current version.
+        """
+        try:
+            version_id = os.path.basename(os.path.normpath(artifact_dir))
+            logging.info(f"Loading model version {version_id} from {artifact_dir}")
+            start = time.perf_counter()
+            value = self.loader(artifact_dir)
+            serving_metrics.observe_load("model version load", time.perf_counter() - start)
+            try:
+                if self.warmer is not None:
+                    start = time.perf_counter()
+                    self.warmer(value)
+                    serving_metrics.observe_load("model version warm-up", time.perf_counter() - start)
+            except Exception:
+                close = getattr(value, 'close', None)
+                if close is not None:
+                    close()
+                raise
+            return self.install(version_id, artifact_dir, value)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def install(self, version_id: str, artifact_dir: str, value) -> ModelVersion:
+        """
+        Atomically swaps in an already loaded value as the current version and retires the previous one.
+
+        Args:
+            version_id (str): Version identifier.
+            artifact_dir (str): Directory the value was loaded from.
+            value: The loaded version.
+
+        Returns:
+            ModelVersion: The new current version.
+        """
+        version = ModelVersion(version_id, artifact_dir, value)
+        with self._lock:
+            previous, self._current = self._current, version
+            if previous is not None:
+                self._retiring.append(previous)
+        if previous is not None:
+            previous.retire()
+        logging.info(f"Model version {version_id} is now serving")
+        if self.on_swap is not None:
+            self.on_swap(version)
+        return version
+
+    def load_latest(self) -> ModelVersion:
+        """Loads the most recent completed run, if there is one."""
+        runs = list_completed_runs(self.artifact_root)
+        if not runs:
+            raise FileNotFoundError(f"No completed training runs in {self.artifact_root}.")
+        return self.load_version(runs[-1])
+
+    def check_for_new_version(self):
+        """
+        Swaps in the latest completed run if it is newer than the current one.
+
+        Returns:
+            ModelVersion or None: The new version, or None when nothing changed.
+        """
+        with self._lock:
+            self._retiring = [version for version in self._retiring if not version.released.is_set()]
+            draining = bool(self._retiring)
+            current_dir = self._current.artifact_dir if self._current is not None else None
+        runs = list_completed_runs(self.artifact_root)
+        if not runs or runs[-1] == current_dir or runs[-1] in self.failed:
+            return None
+        if draining:
+            logging.info(f"New model version {runs[-1]} waits for the previous version to drain")
+            return None
+        try:
+            return self.load_version(runs[-1])
+        except Exception as e:
+            logging.error(f"Model version {runs[-1]} failed validation and will not be served: {e}")
+            self.failed[runs[-1]] = str(e)
+            return None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.check_for_new_version()
+
+    def start(self):
+        """Starts watching artifact_root in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="model-version-watcher", daemon=True)
+            self._thread.start()
+            logging.info(f"Watching {self.artifact_root} for new model versions every {self.poll_seconds}s")
+
+    def stop(self):
+        """Stops the watcher and releases the current version."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            current, self._current = self._current, None
+        if current is not None:
+            current.retire()
+
+    def status(self) -> dict:
+        """Current and draining versions with their in-flight request counts, and rejected runs."""
+        with self._lock:
+            current = self._current
+            retiring = [version for version in self._retiring if not version.released.is_set()]
+        return {
+            'current': {'version': current.version_id, 'in_flight': current.in_flight} if current else None,
+            'draining': [{'version': version.version_id, 'in_flight': version.in_flight} for version in retiring],
+            'failed': self.failed,
+        }
@@ -0,0 +1,139 @@
+import json
+import asyncio
+from urllib.parse import urlsplit, parse_qsl
+from anime_recommender.loggers.logging import logging, SAMPLED
+from anime_recommender.serving.service import RequestError
+from anime_recommender.serving.model_versions import ModelVersionManager
+from anime_recommender.utils.serving_metrics import serving_metrics, PROMETHEUS_CONTENT_TYPE
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+def _json_default(value):
+    # NumPy scalars left in object columns
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class RecommendationHTTPServer:
+    """
+    Minimal HTTP/1.1 JSON front end for the RecommendationService versions of a ModelVersionManager,
+    built on asyncio streams. Each request pins the version that was current when it arrived.
+
+    Routes:
+        GET  /health                      Liveness, the serving version and the available methods.
+        GET  /stats                       Model versions, load time, cache, batching and latency statistics.
+        GET  /metrics                     Latency histograms in Prometheus text format.
+        GET  /recommend/<method>?...      Recommendations; parameters in the query string.
+        POST /recommend/<method>          Recommendations; parameters as a JSON object body.
+        GET  /compare?...                 Recommendations of every method for one user ID and/or title, computed concurrently.
+        GET  /search/anime?q=...          One page of title autocomplete matches, tolerant of spelling variants.
+        GET  /search/users?prefix=...     One page of user IDs by decimal prefix and/or min and max.
+        POST /ratings                     Appends a rating, or a list of them, to the rating event log.
+
+    Connections are kept alive between requests unless the client sends 'Connection: close'.
+    """
+    def __init__(self, manager: ModelVersionManager, host: str, port: int):
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        """Starts listening; returns once the socket is bound."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logging.info(f"Recommendation service listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                http_method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+
+                status, payload = await self._dispatch(http_method, target, body)
+                if isinstance(payload, str):
+                    data, content_type = payload.encode(), PROMETHEUS_CONTENT_TYPE
+                else:
+                    data, content_type = json.dumps(payload, default=_json_default).encode(), "application/json"
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, http_method: str, target: str, body: bytes):
+        """
+        Routes one request.
+
+        Returns:
+            tuple: (HTTP status, JSON-serialisable payload, or text for /metrics).
+        """
+        url = urlsplit(target)
+        path = url.path.rstrip('/')
+        version = self.manager.acquire()
+        try:
+            service = version.value
+            if path == '/health':
+                return 200, {'status': 'ok', 'version': version.version_id, 'methods': service.methods}
+            if path == '/metrics':
+                return 200, serving_metrics.to_prometheus()
+            if path == '/stats':
+                return 200, {'model_versions': self.manager.status(), **service.stats()}
+            if path == '/ratings':
+                if http_method != 'POST':
+                    raise RequestError(405, f"Method {http_method} not allowed.")
+                return 200, service.submit_ratings(json.loads(body or b'null'))
+            if path.startswith('/search/'):
+                return 200, {'version': version.version_id, **service.search(path[len('/search/'):], dict(parse_qsl(url.query)))}
+            if path.startswith('/recommend/') or path == '/compare':
+                params = dict(parse_qsl(url.query))
+                if http_method == 'POST' and body:
+                    payload = json.loads(body)
+                    if not isinstance(payload, dict):
+                        raise RequestError(400, "Request body must be a JSON object.")
+                    params.update(payload)
+                elif http_method not in ('GET', 'POST'):
+                    raise RequestError(405, f"Method {http_method} not allowed.")
+                if path == '/compare':
+                    return 200, {'version': version.version_id, **await service.compare(params)}
+                recommendations = await service.recommend(path[len('/recommend/'):], params)
+                return 200, {'version': version.version_id, 'recommendations': recommendations}
+            raise RequestError(404, f"No route for {url.path}.")
+        except RequestError as e:
+            return e.status, {'error': e.message}
+        except json.JSONDecodeError:
+            return 400, {'error': "Request body must be a JSON object."}
+        except Exception as e:
+            logging.error("Error serving %s: %s", target, e, extra=SAMPLED)
+            return 500, {'error': str(e)}
+        finally:
+            version.release()
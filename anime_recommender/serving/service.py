@@ -0,0 +1,485 @@
+import os
+import sys
+import time
+import asyncio
+import contextvars
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.entity.config_entity import ServingConfig
+from anime_recommender.utils.main_utils.utils import load_csv_data, load_object
+from anime_recommender.source.collaborative_modelling import CollaborativeAnimeRecommender, LIVE_RATINGS_METHODS
+from anime_recommender.source.content_based_modelling import ContentBasedRecommender, content_catalog
+from anime_recommender.source.top_anime_filtering import PopularityBasedFiltering
+from anime_recommender.source.recommendation_store import RecommendationStore
+from anime_recommender.source.result_cache import RecommendationCache
+from anime_recommender.source.rating_events import RatingEventLog, LiveRatings, RatingEventTailer
+from anime_recommender.source.popularity_stats import PopularityStatistics
+from anime_recommender.source.sharded_knn import ShardedUserKNN, usable_cores
+from anime_recommender.source.search_index import SearchIndex
+from anime_recommender.serving.batching import MicroBatcher
+from anime_recommender.utils.serving_metrics import serving_metrics
+
+POPULARITY_FILTERS = (
+    'popular_animes', 'top_ranked_animes', 'overall_top_rated_animes', 'favorite_animes',
+    'top_animes_members', 'popular_anime_among_members', 'top_avg_rated',
+)
+# Leaderboards maintained from the rating stream, available while rating events are tailed
+STREAMED_POPULARITY_FILTERS = ('most_rated_animes', 'top_rated_by_users')
+
+
+class RequestError(Exception):
+    """
+    A request the service cannot answer, carrying the HTTP status to respond with.
+    """
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class RecommendationService:
+    """
+    Long-lived recommendation service wrapping the recommenders in anime_recommender.source.
+
+    Data and models are loaded once from the local artifacts of a training run and only read while
+    answering, so every request runs on the shared scoring threads: content and popularity
+    requests one by one, SVD, user-KNN and item-KNN requests coalesced by a MicroBatcher per
+    method and scored with one matrix operation per batch. Ratings appended
+    to the rating event log are tailed into the rating matrix, so user-KNN recommendations and
+    seen-item masks reflect them within a poll interval, without retraining.
+    """
+    def __init__(self, serving_config: ServingConfig):
+        """
+        Loads the datasets and every trained model available in the artifact directory.
+
+        Args:
+            serving_config (ServingConfig): Paths of the run's artifacts and serving settings.
+        """
+        try:
+            self.serving_config = serving_config
+            start = time.perf_counter()
+            self.anime_df = load_csv_data(serving_config.anime_file_path)
+            self.vocabulary = load_object(serving_config.vocabulary_file_path)
+            # Runs transformed before the search index existed get one built at load time
+            self.search_index = self._load_optional(serving_config.search_index_file_path) or SearchIndex.from_vocabulary(
+                self.vocabulary, content_anime_ids=content_catalog(self.anime_df)['anime_id'].to_numpy()
+            )
+            self.vocabulary.search_index = self.search_index
+            # Results are keyed by the run they were computed from
+            self.result_cache = RecommendationCache(
+                serving_config.cache_max_bytes, serving_config.cache_ttl_seconds,
+                model_version=os.path.basename(os.path.normpath(serving_config.artifact_dir))
+            )
+
+            store = RecommendationStore(serving_config.store_file_path) if os.path.exists(serving_config.store_file_path) else None
+            self.collaborative = CollaborativeAnimeRecommender(
+                load_csv_data(serving_config.merged_file_path), vocabulary=self.vocabulary, recommendation_store=store
+            )
+            self.svd_model = self._load_optional(serving_config.svd_model_file_path)
+            self.item_knn_model = self._load_optional(serving_config.item_knn_model_file_path)
+            self.user_knn_model = self._load_optional(serving_config.user_knn_model_file_path)
+            # Neighbor indices are vocabulary rows; a model in another layout is retrained rather than served
+            if self.item_knn_model is not None:
+                self.item_knn_model = self.collaborative.conform_model('item_knn', self.item_knn_model)
+            if self.user_knn_model is not None:
+                self.user_knn_model = self.collaborative.conform_model('user_knn', self.user_knn_model)
+            self.collaborative.user_neighbor_graph = self._load_optional(serving_config.user_neighbor_graph_file_path)
+            user_knn_shards = min(serving_config.user_knn_shards, usable_cores())
+            if user_knn_shards < serving_config.user_knn_shards:
+                # More shards than cores only adds inter-process overhead
+                logging.warning(f"{serving_config.user_knn_shards} user-KNN shards requested but only {user_knn_shards} cores usable; using {user_knn_shards}")
+            if self.user_knn_model is not None and user_knn_shards > 1:
+                # Same brute-force cosine neighbors as the trained model, scanned by one process per shard
+                self.user_knn_model = ShardedUserKNN(n_shards=user_knn_shards).fit(self.collaborative.user_item_matrix)
+
+            self.rating_events = RatingEventLog(serving_config.rating_events_file_path)
+            self.rating_tailer = None
+            self.popularity_statistics = None
+            if serving_config.rating_events_enabled:
+                live_ratings = LiveRatings(self.collaborative.user_item_matrix, self.vocabulary)
+                self.collaborative.attach_live_ratings(live_ratings)
+                self.popularity_statistics = self._load_popularity_statistics(live_ratings)
+                live_ratings.add_listener(self.popularity_statistics.update)
+                self.rating_tailer = RatingEventTailer(
+                    self.rating_events, live_ratings, poll_seconds=serving_config.rating_events_poll_seconds,
+                    compact_threshold=serving_config.rating_events_compact_threshold,
+                    compact_seconds=serving_config.rating_events_compact_seconds,
+                    on_apply=self._invalidate_rated
+                )
+                self.rating_tailer.resume_offset = self.popularity_statistics.offset
+                self.rating_tailer.start()
+
+            self.content = None
+            if os.path.exists(serving_config.cosine_similarity_model_file_path):
+                self.content = ContentBasedRecommender(
+                    self.anime_df, vocabulary=self.vocabulary, model_path=serving_config.cosine_similarity_model_file_path,
+                    result_cache=self.result_cache
+                )
+            self.popularity = PopularityBasedFiltering(
+                self.anime_df.copy(), result_cache=self.result_cache, statistics=self.popularity_statistics
+            )
+
+            self.executor = ThreadPoolExecutor(max_workers=serving_config.n_threads, thread_name_prefix="scoring")
+            self.batchers = {}
+            for method, batch_fn, model in (
+                ('svd', self._svd_batch, self.svd_model),
+                ('user_knn', self._user_knn_batch, self.user_knn_model),
+                ('item_knn', self._item_knn_batch, self.item_knn_model),
+            ):
+                if model is not None:
+                    self.batchers[method] = MicroBatcher(
+                        method, batch_fn, serving_config.batch_wait_ms, serving_config.max_batch_size, self.executor
+                    )
+            self.load_seconds = time.perf_counter() - start
+            serving_metrics.observe_load("recommendation service", self.load_seconds)
+            logging.info(f"Recommendation service loaded {self.methods} from {serving_config.artifact_dir} in {self.load_seconds:.2f}s")
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @staticmethod
+    def _load_optional(file_path: str):
+        """Loads a model when the training run produced it, otherwise returns None."""
+        return load_object(file_path) if os.path.exists(file_path) else None
+
+    def _invalidate_rated(self, user_ids: set) -> None:
+        """
+        Drops the cached results a batch of streamed ratings made stale: those of the users who rated,
+        and every result counting other users' ratings, since any of those users may be a neighbor.
+        """
+        self.result_cache.invalidate_subjects(user_ids, methods=LIVE_RATINGS_METHODS)
+
+    def _load_popularity_statistics(self, live_ratings: LiveRatings) -> PopularityStatistics:
+        """
+        Restores the streamed popularity aggregates saved for this run, or aggregates the loaded
+        ratings when there is no snapshot or it is ahead of the rating event log.
+        """
+        config = self.serving_config
+        options = dict(
+            min_ratings=config.popularity_stats_min_ratings, capacity=config.max_recommendations,
+            refresh_seconds=config.popularity_stats_refresh_seconds,
+            snapshot_path=config.popularity_stats_file_path, snapshot_seconds=config.popularity_stats_snapshot_seconds
+        )
+        if os.path.exists(config.popularity_stats_file_path):
+            statistics = PopularityStatistics.restore(config.popularity_stats_file_path, self.vocabulary, **options)
+            log_size = os.path.getsize(config.rating_events_file_path) if os.path.exists(config.rating_events_file_path) else 0
+            if statistics.offset <= log_size:
+                return statistics
+            logging.warning(f"Popularity statistics snapshot is ahead of {config.rating_events_file_path}; aggregating the ratings again")
+        return PopularityStatistics.from_ratings(live_ratings.snapshot.base, self.vocabulary, **options)
+
+    @property
+    def methods(self) -> list:
+        """Recommendation methods this service can answer."""
+        methods = list(self.batchers)
+        if self.content is not None:
+            methods.append('content')
+        return methods + ['popularity']
+
+    def _parse_n(self, params: dict) -> int:
+        try:
+            n = int(params.get('n', 10))
+        except (TypeError, ValueError):
+            raise RequestError(400, "Parameter 'n' must be an integer.")
+        if not 1 <= n <= self.serving_config.max_recommendations:
+            raise RequestError(400, f"Parameter 'n' must be between 1 and {self.serving_config.max_recommendations}.")
+        return n
+
+    @staticmethod
+    def _parse_user_id(params: dict) -> int:
+        try:
+            return int(params['user_id'])
+        except KeyError:
+            raise RequestError(400, "Parameter 'user_id' is required.")
+        except (TypeError, ValueError):
+            raise RequestError(400, "Parameter 'user_id' must be an integer.")
+
+    def _parse_page(self, params: dict) -> tuple:
+        try:
+            offset = int(params.get('offset', 0))
+            limit = int(params.get('limit', self.serving_config.search_page_size))
+        except (TypeError, ValueError):
+            raise RequestError(400, "Parameters 'offset' and 'limit' must be integers.")
+        if offset < 0 or not 1 <= limit <= self.serving_config.max_recommendations:
+            raise RequestError(400, f"Parameter 'offset' must be non-negative and 'limit' between 1 and {self.serving_config.max_recommendations}.")
+        return offset, limit
+
+    @staticmethod
+    def _parse_title(params: dict) -> str:
+        title = params.get('title')
+        if not title:
+            raise RequestError(400, "Parameter 'title' is required.")
+        return title
+
+    async def recommend(self, method: str, params: dict) -> list:
+        """
+        Answers one recommendation request.
+
+        Args:
+            method (str): One of 'svd', 'user_knn', 'item_knn', 'content' or 'popularity'.
+            params (dict): Request parameters: 'user_id' or 'title' depending on the method, optional 'n' and,
+                           for popularity, 'filter'.
+
+        Returns:
+            list: Recommendation records.
+
+        Raises:
+            RequestError: When the method is unavailable or the request is invalid.
+        """
+        # Unknown methods share one label so arbitrary paths cannot grow the metrics without bound
+        with serving_metrics.track_request(method if method in self.methods else 'unavailable') as request:
+            return await self._recommend(method, params, request)
+
+    async def _in_executor(self, fn, *args):
+        """Runs fn on the scoring threads within the current request's metrics context."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, contextvars.copy_context().run, fn, *args)
+
+    def _content(self, title: str, n: int) -> list:
+        recommendations = self.content.get_rec_cosine(title, n_recommendations=n)
+        if isinstance(recommendations, str):
+            raise RequestError(404, recommendations)
+        return recommendations.to_records()
+
+    def _popularity(self, filter_type: str, n: int) -> list:
+        return getattr(self.popularity, filter_type)(n=n).to_records()
+
+    async def _recommend(self, method: str, params: dict, request) -> list:
+        n = self._parse_n(params)
+        if method in self.batchers:
+            subject = self._parse_user_id(params) if method in ('svd', 'user_knn') else self._parse_title(params)
+
+            async def compute():
+                request.cache = 'miss'
+                return await self.batchers[method].submit((subject, n))
+            request.cache = 'hit'
+            live = self.collaborative.live_ratings
+            # The service caches JSON records under its own keys: self.collaborative has no result cache
+            # and is only called through its batch scoring helpers. Like the recommender's cached
+            # methods, rating-dependent keys carry the live-ratings generation.
+            filters = {'ratings_generation': live.generation} if method in LIVE_RATINGS_METHODS and live is not None else None
+            return await self.result_cache.get_or_compute_async(self.result_cache.make_key(method, subject, n, filters), compute)
+        if method == 'content' and self.content is not None:
+            return await self._in_executor(self._content, self._parse_title(params), n)
+        if method == 'popularity':
+            filter_type = params.get('filter', 'popular_animes')
+            filters = POPULARITY_FILTERS + (STREAMED_POPULARITY_FILTERS if self.popularity_statistics is not None else ())
+            if filter_type not in filters:
+                raise RequestError(400, f"Unknown popularity filter '{filter_type}'. Choose from {list(filters)}.")
+            return await self._in_executor(self._popularity, filter_type, n)
+        raise RequestError(404, f"Recommendation method '{method}' is not available. Available methods: {self.methods}.")
+
+    async def compare(self, params: dict) -> dict:
+        """
+        Answers one input with every available method at once, for side-by-side comparison.
+
+        The methods run concurrently on the scoring threads, whose NumPy and SciPy kernels release
+        the GIL, so the comparison takes about as long as the slowest method rather than the sum.
+        Methods needing an input that was not given are left out; a method failing on the input
+        reports its error without failing the others.
+
+        Args:
+            params (dict): Request parameters: 'user_id' for SVD and user-KNN, 'title' for item-KNN and content,
+                           optional 'n' and popularity 'filter'.
+
+        Returns:
+            dict: Per method, its 'recommendations' or 'error' and 'status', and its 'seconds'; the total 'seconds'.
+
+        Raises:
+            RequestError: When neither a user ID nor a title is given.
+        """
+        if params.get('user_id') is None and params.get('title') is None:
+            raise RequestError(400, "Parameter 'user_id' or 'title' is required.")
+        methods = [
+            method for method in self.methods
+            if method == 'popularity' or params.get('user_id' if method in ('svd', 'user_knn') else 'title') is not None
+        ]
+
+        async def timed(method):
+            start = time.perf_counter()
+            try:
+                result = {'recommendations': await self.recommend(method, params)}
+            except RequestError as e:
+                result = {'error': e.message, 'status': e.status}
+            result['seconds'] = time.perf_counter() - start
+            return method, result
+
+        start = time.perf_counter()
+        results = dict(await asyncio.gather(*(timed(method) for method in methods)))
+        return {'methods': results, 'seconds': time.perf_counter() - start}
+
+    def search(self, kind: str, params: dict) -> dict:
+        """
+        Answers one page of a title autocomplete or user ID search.
+
+        Args:
+            kind (str): 'anime' or 'users'.
+            params (dict): For anime, the query 'q' and optional 'rated_only' and 'content_only'; for users, optional 'prefix',
+                           'min' and 'max'. Both take optional 'offset' and 'limit'.
+
+        Returns:
+            dict: The page, as returned by SearchIndex.search or SearchIndex.search_users.
+
+        Raises:
+            RequestError: When the kind is unknown or the request is invalid.
+        """
+        offset, limit = self._parse_page(params)
+        if kind == 'anime':
+            rated_only, content_only = (str(params.get(flag, '')).lower() in ('1', 'true', 'yes') for flag in ('rated_only', 'content_only'))
+            return self.search_index.search(params.get('q', ''), offset=offset, limit=limit, rated_only=rated_only, content_only=content_only)
+        if kind == 'users':
+            try:
+                low, high = (None if params.get(bound) in (None, '') else int(params[bound]) for bound in ('min', 'max'))
+            except (TypeError, ValueError):
+                raise RequestError(400, "Parameters 'min' and 'max' must be integers.")
+            return self.search_index.search_users(params.get('prefix', ''), low=low, high=high, offset=offset, limit=limit)
+        raise RequestError(404, f"Unknown search '{kind}'. Choose from ['anime', 'users'].")
+
+    def submit_ratings(self, events) -> dict:
+        """
+        Appends ratings to the rating event log, from which this and every other serving process picks them up.
+
+        Args:
+            events (dict or list): One rating, or a list of them, each with 'user_id', 'anime_id' and 'rating'.
+
+        Returns:
+            dict: The number of ratings accepted.
+
+        Raises:
+            RequestError: When a rating is malformed.
+        """
+        events = [events] if isinstance(events, dict) else events
+        if not isinstance(events, list) or not events:
+            raise RequestError(400, "Expected a rating object or a non-empty list of them.")
+        for event in events:
+            try:
+                float(event['rating']), int(event['user_id']), int(event['anime_id'])
+            except (KeyError, TypeError, ValueError):
+                raise RequestError(400, "Every rating needs numeric 'user_id', 'anime_id' and 'rating'.")
+        return {'accepted': self.rating_events.append(events)}
+
+    def _user_requests(self, method: str, requests: list):
+        """
+        Resolves a batch of (user_id, n) requests, answering unknown users and materialized lists directly.
+
+        Returns:
+            tuple: (results with unresolved entries set to None, list of (position, user index, n) still to score).
+        """
+        results = [None] * len(requests)
+        live = []
+        for position, (user_id, n) in enumerate(requests):
+            user_idx = self.vocabulary.user_index(user_id)
+            if user_idx < 0:
+                if self.vocabulary.is_pruned_user(user_id):
+                    results[position] = self.collaborative._popularity_fallback(n).to_records()
+                else:
+                    results[position] = RequestError(404, f"User ID '{user_id}' not found in the dataset.")
+                continue
+            stored = self.collaborative._stored_recommendations(method, user_id, n)
+            if stored is not None:
+                results[position] = stored.to_records()
+                continue
+            live.append((position, user_idx, n))
+        return results, live
+
+    def _format_batch(self, results: list, live: list, rankings: list) -> list:
+        """Gathers the details of each scored request's ranked anime into its result."""
+        with serving_metrics.phase("metadata"):
+            for (position, _, _), ranked in zip(live, rankings):
+                results[position] = self.collaborative._format_recommendations(ranked).to_records()
+        return results
+
+    def _svd_batch(self, requests: list) -> list:
+        """Scores a batch of SVD requests with one (batch x n_rated_anime) prediction."""
+        with serving_metrics.track_batch('svd', len(requests)):
+            with serving_metrics.phase("lookup"):
+                results, live = self._user_requests('svd', requests)
+            if not live:
+                return results
+            with serving_metrics.phase("scoring"):
+                scores = self.collaborative._svd_scores(self.svd_model, np.array([user_idx for _, user_idx, _ in live]))
+                rankings = [self.collaborative._top_n(row, n) for (_, _, n), row in zip(live, scores)]
+            return self._format_batch(results, live, rankings)
+
+    def _user_knn_batch(self, requests: list) -> list:
+        """Scores a batch of user-KNN requests with one neighbor query and one sparse product."""
+        with serving_metrics.track_batch('user_knn', len(requests)):
+            with serving_metrics.phase("lookup"):
+                results, live = self._user_requests('user_knn', requests)
+            if not live:
+                return results
+            with serving_metrics.phase("scoring"):
+                user_idx = np.array([user_idx for _, user_idx, _ in live])
+                n_neighbors = np.array([n + 1 for _, _, n in live])
+                counts = self.collaborative._user_based_scores(self.user_knn_model, user_idx, n_neighbors)
+                rankings = [self.collaborative._top_n(row, n) for (_, _, n), row in zip(live, counts)]
+            return self._format_batch(results, live, rankings)
+
+    def _item_knn_batch(self, requests: list) -> list:
+        """Scores a batch of item-KNN requests with one neighbor query."""
+        with serving_metrics.track_batch('item_knn', len(requests)):
+            results = [None] * len(requests)
+            live = []
+            with serving_metrics.phase("lookup"):
+                for position, (title, n) in enumerate(requests):
+                    anime_idx = self.vocabulary.anime_index_for_title(title)
+                    if anime_idx < 0 or anime_idx >= self.vocabulary.n_rated_anime:
+                        results[position] = RequestError(404, f"Anime title '{title}' not found in the dataset.")
+                        continue
+                    live.append((position, anime_idx, n))
+            if not live:
+                return results
+            with serving_metrics.phase("scoring"):
+                anime_idx = np.array([anime_idx for _, anime_idx, _ in live])
+                n_neighbors = min(max(n for _, _, n in live) + 1, self.collaborative.item_user_matrix.shape[0])
+                _, indices = self.item_knn_model.kneighbors(self.collaborative.item_user_matrix[anime_idx], n_neighbors=n_neighbors)
+                rankings = [row[row != query_idx][:n] for (_, query_idx, n), row in zip(live, indices)]
+            return self._format_batch(results, live, rankings)
+
+    def warm(self) -> None:
+        """
+        Runs one query per available method, loading lazy state and failing loudly if a model is unusable.
+        """
+        user_id = int(self.vocabulary.user_ids[0])
+        title = next(title for title in self.vocabulary.anime_titles[:self.vocabulary.n_rated_anime] if isinstance(title, str))
+        results = []
+        if self.svd_model is not None:
+            results += self._svd_batch([(user_id, 10)])
+        if self.user_knn_model is not None:
+            results += self._user_knn_batch([(user_id, 10)])
+        if self.item_knn_model is not None:
+            results += self._item_knn_batch([(title, 10)])
+        if self.content is not None:
+            self.content.get_rec_cosine(title, n_recommendations=10)
+        self.popularity.popular_animes(n=10)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+        logging.info(f"Recommendation service for {self.serving_config.artifact_dir} warmed up")
+
+    def stats(self) -> dict:
+        """Model load time, cache and per-method batching statistics, and the serving latency metrics."""
+        return {
+            'artifact_dir': self.serving_config.artifact_dir,
+            'load_seconds': self.load_seconds,
+            'result_cache': self.result_cache.stats(),
+            'batching': {method: batcher.stats() for method, batcher in self.batchers.items()},
+            'rating_events': self.rating_tailer.stats() if self.rating_tailer is not None else None,
+            'popularity_statistics': self.popularity_statistics.stats() if self.popularity_statistics is not None else None,
+            'metrics': serving_metrics.snapshot(),
+        }
+
+    def close(self):
+        """
+        Stops tailing rating events, saving the popularity statistics, stops the scoring threads and
+        user-KNN shard workers and closes the recommendation store.
+        """
+        if self.rating_tailer is not None:
+            self.rating_tailer.stop()
+            self.popularity_statistics.save()
+        self.executor.shutdown(wait=True)
+        if isinstance(self.user_knn_model, ShardedUserKNN):
+            self.user_knn_model.close()
+        if self.collaborative.recommendation_store is not None:
+            self.collaborative.recommendation_store.close()
@@ -1,12 +1,30 @@
+import sys
+import numpy as np
 import pandas as pd
 from anime_recommender.loggers.logging import logging
 from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.source.vocabulary import IdVocabulary
+from anime_recommender.source.quantization import QuantizedSVDModel, QuantizedSparseMatrix
+from anime_recommender.source.result_cache import cached_result
+from anime_recommender.source.rating_events import RatingsSnapshot
+from anime_recommender.source.embeddings import EmbeddingKNN, neighbor_overlap
+from anime_recommender.source.pagination import RankedCursor
+from anime_recommender.source.recommendations import AnimeMetadata, Recommendations
+from anime_recommender.utils.instrumentation import instrument
+from anime_recommender.utils.serving_metrics import phase
+from anime_recommender.source.model_layout import ModelLayoutError, check_model_layout, tag_model
+from anime_recommender.constant import (
+    SERVING_MAX_RECOMMENDATIONS, MODEL_TRAINER_KNN_EMBEDDING_DIM, MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_K,
+    MODEL_TRAINER_KNN_EMBEDDING_MIN_OVERLAP, MODEL_TRAINER_KNN_EMBEDDING_GATE_QUERIES,
+)
 
 from surprise import Reader, Dataset, SVD
-from surprise.model_selection import cross_validate
-from scipy.sparse import csr_matrix
+from scipy.sparse import csr_matrix, coo_matrix
 from sklearn.neighbors import NearestNeighbors
-from collections import Counter
+from sklearn.preprocessing import normalize
+
+# Methods whose results count other users' ratings, so a streamed rating can change anyone's result
+LIVE_RATINGS_METHODS = ('user_knn', 'because_you_watched')
 
 class CollaborativeAnimeRecommender:
     """
@@ -14,75 +32,316 @@ class CollaborativeAnimeRecommender:
     - Singular Value Decomposition (SVD)
     - Item-based KNN
     - User-based KNN
+
+    Users and anime are addressed through the shared IdVocabulary, so the rating matrices are
+    (n_users x n_rated_anime) CSR matrices indexed directly by vocabulary indices.
     """
-    def __init__(self, df):
+    def __init__(self, df, vocabulary: IdVocabulary = None, recommendation_store=None, result_cache=None):
         """
         Initializes the recommender system with a given dataset.
-        
+
         Args:
             df (pd.DataFrame): DataFrame containing anime ratings with 'user_id', 'anime_id', 'rating', etc.
+            vocabulary (IdVocabulary, optional): Shared ID vocabulary. Built from df if not provided.
+            recommendation_store (RecommendationStore, optional): Materialized per-user top-N lists served before falling back to live scoring.
+            result_cache (RecommendationCache, optional): Cache of recommendation results shared across calls and sessions.
         """
         try:
             logging.info("Initializing CollaborativeAnimeRecommender")
             self.df = df
+            self.vocabulary = vocabulary
+            self.recommendation_store = recommendation_store
+            self.result_cache = result_cache
             self.svd = None
             self.knn_item_based = None
             self.knn_user_based = None
+            self.item_neighbor_table = None
+            self.user_neighbor_graph = None
+            self._svd_factors_cache = {}
+            self._popular_items = None
+            self.live_ratings = None
+            self._static_snapshot = None
             self.prepare_data()
         except Exception as e:
-            raise AnimeRecommendorException(e)
-  
+            raise AnimeRecommendorException(e, sys)
+
+    @classmethod
+    def for_scoring(cls, user_item_matrix: csr_matrix, vocabulary: IdVocabulary) -> "CollaborativeAnimeRecommender":
+        """
+        Builds a recommender that only scores against an existing rating matrix, e.g. in evaluation
+        worker processes, without the ratings DataFrame, the Surprise dataset or the anime metadata.
+        Models are passed to the scoring methods explicitly.
+
+        Args:
+            user_item_matrix (csr_matrix): (n_users x n_rated_anime) rating matrix indexed by vocabulary indices.
+            vocabulary (IdVocabulary): The vocabulary the matrix is indexed by.
+        """
+        recommender = cls.__new__(cls)
+        recommender.df = None
+        recommender.vocabulary = vocabulary
+        recommender.recommendation_store = None
+        recommender.result_cache = None
+        recommender.svd = recommender.knn_item_based = recommender.knn_user_based = recommender.item_neighbor_table = None
+        recommender.user_neighbor_graph = None
+        recommender._svd_factors_cache = {}
+        recommender._popular_items = None
+        recommender.live_ratings = None
+        recommender._static_snapshot = None
+        recommender.user_item_matrix = user_item_matrix
+        recommender.item_user_matrix = None
+        return recommender
+
     def prepare_data(self):
         """
         Prepares data for training.
         """
         try:
-            self.df = self.df.drop_duplicates()
-            reader = Reader(rating_scale=(1, 10))
-            self.data = Dataset.load_from_df(self.df[['user_id', 'anime_id', 'rating']], reader)
-            self.anime_pivot = self.df.pivot_table(index='name', columns='user_id', values='rating').fillna(0)
-            self.user_pivot = self.df.pivot_table(index='user_id', columns='name', values='rating').fillna(0)
-            logging.info("Data preparation completed...")
+            with instrument("prepare_data") as step:
+                self.df = self.df.drop_duplicates()
+                if self.vocabulary is None:
+                    self.vocabulary = IdVocabulary.from_frames(self.df, self.df)
+                reader = Reader(rating_scale=(1, 10))
+                self.data = Dataset.load_from_df(self.df[['user_id', 'anime_id', 'rating']], reader)
+
+                user_idx = self.vocabulary.user_index(self.df['user_id'].to_numpy())
+                anime_idx = self.vocabulary.anime_index(self.df['anime_id'].to_numpy())
+                ratings = pd.to_numeric(self.df['rating'], errors='coerce').to_numpy(dtype=np.float64)
+                keep = (user_idx >= 0) & (anime_idx >= 0) & (anime_idx < self.vocabulary.n_rated_anime) & np.isfinite(ratings)
+                with instrument("ratings_matrix") as matrix_step:
+                    self.user_item_matrix = self._ratings_matrix(user_idx[keep], anime_idx[keep], ratings[keep])
+                    self.item_user_matrix = self.user_item_matrix.T.tocsr()
+                    matrix_step.set(users=self.user_item_matrix.shape[0], items=self.user_item_matrix.shape[1], nnz=self.user_item_matrix.nnz)
+                self._build_metadata()
+                step.set(rows=len(self.df), nnz=self.user_item_matrix.nnz)
+                logging.info(f"Data preparation completed, rating matrix {self.user_item_matrix.shape} with {self.user_item_matrix.nnz} ratings")
         except Exception as e:
-            raise AnimeRecommendorException(e) 
+            raise AnimeRecommendorException(e, sys)
+
+    def _ratings_matrix(self, user_idx, anime_idx, ratings) -> csr_matrix:
+        """
+        Builds the (n_users x n_rated_anime) rating matrix, averaging duplicate (user, anime) ratings.
+        """
+        n_users, n_items = self.vocabulary.n_users, self.vocabulary.n_rated_anime
+        keys = user_idx.astype(np.int64) * n_items + anime_idx
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        means = np.bincount(inverse, weights=ratings) / np.bincount(inverse)
+        return csr_matrix(
+            (means.astype(np.float32), (unique_keys // n_items, unique_keys % n_items)),
+            shape=(n_users, n_items)
+        )
 
-    def train_svd(self):
+    def _build_metadata(self):
         """
-        Trains the Singular Value Decomposition (SVD) model using Surprise.
+        Gathers the anime details shown with recommendations into arrays indexed by anime index.
+        """
+        details = self.df.drop_duplicates(subset='anime_id')
+        details = details.set_index(pd.to_numeric(details['anime_id'], errors='coerce')).reindex(self.vocabulary.anime_ids)
+        self.metadata = AnimeMetadata.from_frame(details, name_column='Anime Name')
+
+    def _format_recommendations(self, anime_idx, scores=None) -> Recommendations:
+        """
+        Wraps ranked anime indices as recommendations, their details read from the metadata index.
+
+        Args:
+            anime_idx (np.ndarray): Ranked anime indices.
+            scores (np.ndarray, optional): Scores aligned with anime_idx, shown as a 'Score' column.
+
+        Returns:
+            Recommendations: The recommended anime names, image URLs, genres and ratings.
+        """
+        return Recommendations(self.metadata, anime_idx, scores)
+
+    def _popularity_fallback(self, n) -> Recommendations:
+        """
+        Recommends the n most rated anime, for users pruned from the rating matrix by k-core filtering.
+        """
+        return self._format_recommendations(self._popular_ranking()[:n])
+
+    def _popular_ranking(self) -> np.ndarray:
+        """The SERVING_MAX_RECOMMENDATIONS most rated anime indices, best first."""
+        if self._popular_items is None:
+            counts = np.bincount(self.user_item_matrix.indices, minlength=self.user_item_matrix.shape[1]).astype(np.float64)
+            self._popular_items = self._top_n(counts, min(len(counts), SERVING_MAX_RECOMMENDATIONS))
+        return self._popular_items
+
+    def attach_live_ratings(self, live_ratings) -> None:
+        """
+        Serves user-KNN and "because you watched" recommendations from a LiveRatings matrix, so that
+        streamed ratings change a user's neighbors' counts and seen-item masks without retraining.
+
+        Args:
+            live_ratings (LiveRatings): Streamed ratings layered over this recommender's user_item_matrix.
+        """
+        self.live_ratings = live_ratings
+
+    def _ratings_snapshot(self) -> RatingsSnapshot:
+        """
+        The ratings to score a request against: the current live snapshot when streamed ratings are
+        attached, otherwise a snapshot of user_item_matrix that keeps its binary copy between calls.
+        """
+        if self.live_ratings is not None:
+            return self.live_ratings.snapshot
+        snapshot = self._static_snapshot
+        if snapshot is None or snapshot.base is not self.user_item_matrix:
+            snapshot = self._static_snapshot = RatingsSnapshot(self.user_item_matrix)
+        return snapshot
+
+    @staticmethod
+    def _top_n(scores, n) -> np.ndarray:
+        """
+        Returns the indices of the n highest finite scores, best first and ties by lower index, so
+        the top n of a score vector is always the start of its longer top lists.
+        """
+        if n <= 0:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if len(candidates) > n:
+            candidate_scores = scores[candidates]
+            kth = candidate_scores[np.argpartition(-candidate_scores, n - 1)[n - 1]]
+            above = candidates[candidate_scores > kth]
+            # Of the candidates tied at the boundary, the lowest indices are kept
+            candidates = np.concatenate([above, candidates[candidate_scores == kth][:n - len(above)]])
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+    def train_svd(self, params: dict = None):
+        """
+        Trains the Singular Value Decomposition (SVD) model using Surprise on the full trainset.
+
+        Args:
+            params (dict, optional): SVD hyperparameters, e.g. the best ones found by SVDHyperparameterSearch. Defaults to Surprise's defaults.
         """
         try:
-            logging.info("Training SVD model")
-            self.svd = SVD()
-            cross_validate(self.svd, self.data, cv=5)
-            trainset = self.data.build_full_trainset()
-            self.svd.fit(trainset)
-            logging.info("SVD model training completed")
+            with instrument("train_svd") as step:
+                logging.info(f"Training SVD model with {params or 'default parameters'}")
+                self.svd = SVD(**(params or {}))
+                with instrument("fit") as fit_step:
+                    trainset = self.data.build_full_trainset()
+                    self.svd.fit(trainset)
+                    fit_step.set(ratings=trainset.n_ratings, users=trainset.n_users, items=trainset.n_items)
+                step.set(ratings=trainset.n_ratings)
+                logging.info("SVD model training completed")
         except Exception as e:
-            raise AnimeRecommendorException(e)
- 
-    def train_knn_item_based(self):
+            raise AnimeRecommendorException(e, sys)
+
+    @staticmethod
+    def _fit_knn(matrix, embedding_dim: int = None):
+        """
+        Fits brute-force cosine KNN over the rows of a rating matrix, or over embedding_dim-dimensional
+        SVD embeddings of them. An embedding model is only kept when it finds at least
+        MODEL_TRAINER_KNN_EMBEDDING_MIN_OVERLAP of the exact neighbors on a sample of the rows;
+        otherwise the exact model is returned.
+        """
+        exact = NearestNeighbors(metric='cosine', algorithm='brute').fit(matrix)
+        if not embedding_dim:
+            return exact
+        embedded = EmbeddingKNN(n_components=embedding_dim).fit(matrix)
+        embedded.neighbor_overlap = neighbor_overlap(embedded, exact, matrix, n_queries=MODEL_TRAINER_KNN_EMBEDDING_GATE_QUERIES)
+        if embedded.neighbor_overlap < MODEL_TRAINER_KNN_EMBEDDING_MIN_OVERLAP:
+            logging.warning(
+                f"{embedding_dim}-dimensional embeddings find {embedded.neighbor_overlap:.2f} of the exact neighbors, "
+                f"below the required {MODEL_TRAINER_KNN_EMBEDDING_MIN_OVERLAP}; using exact KNN"
+            )
+            return exact
+        return embedded
+
+    def train_knn_item_based(self, embedding_dim: int = None):
         """
         Trains an item-based KNN model using cosine similarity.
+
+        Args:
+            embedding_dim (int, optional): Dimension of the anime embeddings the neighbors are searched in. Defaults to None, the raw rating vectors.
+        """
+        try:
+            with instrument("train_knn_item_based") as step:
+                logging.info("Training KNN model....")
+                self.knn_item_based = self._fit_knn(self.item_user_matrix, embedding_dim)
+                step.set(rows=self.item_user_matrix.shape[0], nnz=self.item_user_matrix.nnz, dim=getattr(self.knn_item_based, 'n_components', self.item_user_matrix.shape[1]))
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def train_knn_user_based(self, embedding_dim: int = None):
+        """
+        Train the KNN model for user-based recommendations.
+
+        Args:
+            embedding_dim (int, optional): Dimension of the user embeddings the neighbors are searched in. Defaults to None, the raw rating vectors.
         """
         try:
-            logging.info("Training KNN model....")
-            item_user_matrix = csr_matrix(self.anime_pivot.values)
-            self.knn_item_based = NearestNeighbors(metric='cosine', algorithm='brute')
-            self.knn_item_based.fit(item_user_matrix)
+            with instrument("train_knn_user_based") as step:
+                logging.info("Training KNN model")
+                self.knn_user_based = self._fit_knn(self.user_item_matrix, embedding_dim)
+                step.set(rows=self.user_item_matrix.shape[0], nnz=self.user_item_matrix.nnz, dim=getattr(self.knn_user_based, 'n_components', self.user_item_matrix.shape[1]))
+                logging.info("KNN model training completed")
         except Exception as e:
-            raise AnimeRecommendorException(e) 
-        
-    def train_knn_user_based(self):
-        """Train the KNN model for user-based recommendations."""
+            raise AnimeRecommendorException(e, sys)
+
+    def build_item_neighbor_table(self, k=50, knn_item_model=None, batch_size=1024) -> csr_matrix:
+        """
+        Precomputes the top-k item-item similarity table from the item-based KNN model.
+
+        Args:
+            k (int): Number of neighbors kept per anime. Defaults to 50.
+            knn_item_model (NearestNeighbors): Pre-trained item-based KNN model. Defaults to None, in which case self.knn_item_based is used.
+            batch_size (int): Number of anime queried per kneighbors call. Defaults to 1024.
+
+        Returns:
+            csr_matrix: Sparse (n_rated_anime x n_rated_anime) matrix whose row i holds the cosine similarities of anime i to its k nearest neighbors.
+        """
         try:
-            logging.info("Training KNN model")
-            user_item_matrix = csr_matrix(self.user_pivot.values)
-            self.knn_user_based = NearestNeighbors(metric='cosine', algorithm='brute')
-            self.knn_user_based.fit(user_item_matrix)
-            logging.info("KNN model training completed")
+            with instrument("build_item_neighbor_table") as step:
+                knn_item_based = knn_item_model or self.knn_item_based
+                if knn_item_based is None:
+                    raise ValueError("Item-based KNN model is not provided or trained.")
+
+                logging.info(f"Building item neighbor table with k={k}")
+                n_items = self.item_user_matrix.shape[0]
+                n_neighbors = min(k + 1, n_items)  # +1 because each anime is its own nearest neighbor
+                rows, cols, sims = [], [], []
+                for start in range(0, n_items, batch_size):
+                    stop = min(start + batch_size, n_items)
+                    distances, indices = knn_item_based.kneighbors(self.item_user_matrix[start:stop], n_neighbors=n_neighbors)
+                    rows.append(np.repeat(np.arange(start, stop), n_neighbors))
+                    cols.append(indices.ravel())
+                    sims.append(1.0 - distances.ravel())
+                rows, cols, sims = np.concatenate(rows), np.concatenate(cols), np.concatenate(sims)
+
+                # Drop self-matches and neighbors without any co-rating users
+                keep = (rows != cols) & (sims > 0)
+                self.item_neighbor_table = csr_matrix((sims[keep], (rows[keep], cols[keep])), shape=(n_items, n_items))
+                logging.info(f"Item neighbor table built with {self.item_neighbor_table.nnz} entries")
+                step.set(rows=n_items, nnz=self.item_neighbor_table.nnz)
+                return self.item_neighbor_table
         except Exception as e:
-            raise AnimeRecommendorException(e) 
- 
+            raise AnimeRecommendorException(e, sys)
+
+    def conform_model(self, method: str, model):
+        """
+        Checks a loaded KNN model or item neighbor table against the vocabulary, replacing it with
+        one trained on this recommender's rating matrix when its rows are in another layout, e.g.
+        a model fitted on the older name-sorted pivot tables, whose neighbor indices would name
+        the wrong anime.
+
+        Args:
+            method (str): 'item_knn', 'user_knn' or 'item_neighbor_table'.
+            model: The loaded model.
+
+        Returns:
+            The model, or its retrained replacement.
+        """
+        try:
+            return check_model_layout(model, self.vocabulary, method)
+        except ModelLayoutError as e:
+            logging.warning(f"{e}; retraining it on the loaded ratings")
+        if method == 'item_knn':
+            self.train_knn_item_based(embedding_dim=MODEL_TRAINER_KNN_EMBEDDING_DIM)
+            return tag_model(self.knn_item_based)
+        if method == 'user_knn':
+            self.train_knn_user_based(embedding_dim=MODEL_TRAINER_KNN_EMBEDDING_DIM)
+            return tag_model(self.knn_user_based)
+        if self.knn_item_based is None:
+            self.train_knn_item_based(embedding_dim=MODEL_TRAINER_KNN_EMBEDDING_DIM)
+        return tag_model(self.build_item_neighbor_table(k=MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_K))
+
     def print_unique_user_ids(self):
         """
         Logs and returns unique user IDs in the dataset.
@@ -91,23 +350,164 @@ class CollaborativeAnimeRecommender:
             np.ndarray: Array of unique user IDs.
         """
         try:
-            unique_user_ids = self.df['user_id'].unique()
-            logging.info(f"Unique User IDs: {unique_user_ids}")
+            unique_user_ids = self.vocabulary.user_ids
+            logging.info("%d unique user IDs", len(unique_user_ids))
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug("Unique User IDs: %s", unique_user_ids.tolist())
             return unique_user_ids
         except Exception as e:
-            raise AnimeRecommendorException(e) 
-    
-    def get_svd_recommendations(self, user_id, n=10, svd_model=None)-> pd.DataFrame: 
+            raise AnimeRecommendorException(e, sys)
+
+    def _svd_factors(self, svd_model):
+        """
+        Re-indexes the Surprise SVD parameters by vocabulary index, once per model.
+
+        Surprise keys its factors by inner IDs through per-model raw-to-inner dicts. Those dicts (or the
+        raw ID arrays of a QuantizedSVDModel) are walked once here, after which scoring is pure array indexing.
+
+        Returns:
+            tuple: (global_mean, user_inner, item_inner, rating_scale) where user_inner and item_inner map
+            vocabulary indices to Surprise inner IDs (-1 when unknown to the model).
+        """
+        cached = self._svd_factors_cache.get(id(svd_model))
+        if cached is not None and cached[0] is svd_model:
+            return cached[1]
+        if isinstance(svd_model, QuantizedSVDModel):
+            global_mean, rating_scale = svd_model.global_mean, svd_model.rating_scale
+            raw_users, inner_users = svd_model.raw_user_ids, np.arange(len(svd_model.raw_user_ids))
+            raw_items, inner_items = svd_model.raw_item_ids, np.arange(len(svd_model.raw_item_ids))
+        else:
+            trainset = svd_model.trainset
+            global_mean, rating_scale = trainset.global_mean, trainset.rating_scale
+            raw_users = np.fromiter(trainset._raw2inner_id_users.keys(), dtype=np.float64, count=trainset.n_users)
+            inner_users = np.fromiter(trainset._raw2inner_id_users.values(), dtype=np.int64, count=trainset.n_users)
+            raw_items = np.fromiter(trainset._raw2inner_id_items.keys(), dtype=np.float64, count=trainset.n_items)
+            inner_items = np.fromiter(trainset._raw2inner_id_items.values(), dtype=np.int64, count=trainset.n_items)
+
+        user_inner = np.full(self.vocabulary.n_users, -1, dtype=np.int64)
+        codes = self.vocabulary.user_index(raw_users)
+        user_inner[codes[codes >= 0]] = inner_users[codes >= 0]
+
+        item_inner = np.full(self.vocabulary.n_rated_anime, -1, dtype=np.int64)
+        codes = self.vocabulary.anime_index(raw_items)
+        known = (codes >= 0) & (codes < self.vocabulary.n_rated_anime)
+        item_inner[codes[known]] = inner_items[known]
+
+        factors = (global_mean, user_inner, item_inner, rating_scale)
+        self._svd_factors_cache[id(svd_model)] = (svd_model, factors)
+        return factors
+
+    def _svd_scores(self, svd_model, user_idx) -> np.ndarray:
+        """
+        Predicts ratings of every rated anime, matching Surprise's SVD.predict.
+
+        Args:
+            svd_model (SVD or QuantizedSVDModel): The trained SVD model.
+            user_idx (int or np.ndarray): One user index, or an array of user indices.
+
+        Returns:
+            np.ndarray: Predicted ratings of shape (n_rated_anime,) for one user, or (n_users, n_rated_anime) for many.
+        """
+        global_mean, user_inner, item_inner, (lower, upper) = self._svd_factors(svd_model)
+        known_items = item_inner >= 0
+        item_bias = np.full(len(item_inner), global_mean, dtype=np.float64)
+        item_bias[known_items] += svd_model.bi[item_inner[known_items]]
+        inner_users = user_inner[np.atleast_1d(user_idx)]
+        known_users = inner_users >= 0
+        scores = np.tile(item_bias, (len(inner_users), 1))
+        if known_users.any():
+            rows = np.flatnonzero(known_users)
+            scores[rows] += np.asarray(svd_model.bu[inner_users[known_users]], dtype=np.float64)[:, None]
+            scores[np.ix_(rows, np.flatnonzero(known_items))] += svd_model.pu[inner_users[known_users]] @ svd_model.qi[item_inner[known_items]].T
+        scores = np.clip(scores, lower, upper)
+        return scores[0] if np.isscalar(user_idx) else scores
+
+    def _user_based_scores(self, knn_user_based, user_idx, n_neighbors) -> np.ndarray:
+        """
+        Counts how many of each user's nearest neighbors rated every anime, excluding anime the user already rated.
+
+        Neighbors are read from the attached user neighbor graph where it holds enough of them and
+        the user's ratings have not changed since, and queried from the KNN model otherwise.
+
+        Args:
+            knn_user_based (NearestNeighbors): The trained user-based KNN model.
+            user_idx (np.ndarray): User indices.
+            n_neighbors (int or np.ndarray): Number of neighbors to query, including the user itself, for all users or per user.
+
+        Returns:
+            np.ndarray: (len(user_idx) x n_rated_anime) neighbor counts, -inf where the anime is already rated or unrated by every neighbor.
+        """
+        user_idx = np.atleast_1d(user_idx)
+        # Read once, so the whole batch sees the same ratings while streamed events keep arriving
+        snapshot = self._ratings_snapshot()
+        user_rows = snapshot.rows(user_idx)
+        n_neighbors = np.minimum(np.broadcast_to(n_neighbors, user_idx.shape), snapshot.base.shape[0])
+        k = int(n_neighbors.max())
+        indices = np.empty((len(user_idx), k), dtype=np.int64)
+        # Precomputed neighbors answer users whose ratings are unchanged since the graph was built
+        stored = np.zeros(len(user_idx), dtype=bool)
+        graph = self.user_neighbor_graph
+        if graph is not None and k <= graph.k + 1 and graph.n_users == snapshot.base.shape[0]:
+            live = self.live_ratings
+            stored = np.array([live is None or not live.has_updates(int(user)) for user in user_idx], dtype=bool)
+            if stored.any():
+                indices[stored] = graph.neighbor_indices(user_idx[stored], k)
+        if not stored.all():
+            # One neighbor query for the rest of the batch at the largest requested size
+            _, indices[~stored] = knn_user_based.kneighbors(user_rows[~stored], n_neighbors=k)
+        # Indicator matrix of each user's neighbors, skipping the user itself and neighbors beyond its own count
+        rows = np.repeat(np.arange(len(user_idx)), indices.shape[1])
+        cols = indices.ravel()
+        ranks = np.tile(np.arange(indices.shape[1]), len(user_idx))
+        keep = (cols != user_idx[rows]) & (ranks < n_neighbors[rows])
+        neighbor_matrix = csr_matrix((np.ones(keep.sum()), (rows[keep], cols[keep])), shape=(len(user_idx), snapshot.base.shape[0]))
+        counts = (neighbor_matrix @ snapshot.rated()).toarray()
+        seen_rows, seen_cols = user_rows.nonzero()
+        counts[seen_rows, seen_cols] = 0
+        counts[counts == 0] = -np.inf
+        return counts
+
+    def _stored_recommendations(self, method: str, user_id, n: int, with_scores: bool = False):
+        """
+        Reads a materialized top-N list from the attached recommendation store.
+
+        Args:
+            method (str): Materialized method name.
+            user_id (int): Raw user ID.
+            n (int): Number of recommendations to return.
+            with_scores (bool): Include the stored scores, as the live path of the method does. Defaults to False.
+
+        Returns:
+            Recommendations or None: The recommendations, or None when the store cannot answer the request.
+        """
+        if self.recommendation_store is None or n > self.recommendation_store.top_n:
+            return None
+        # The live user-KNN path queries n + 1 neighbors, so stored lists only answer the n they were scored for
+        if method == 'user_knn' and n + 1 != self.recommendation_store.user_knn_neighbors:
+            return None
+        # Materialized lists predate the user's streamed ratings
+        if self.live_ratings is not None and self.live_ratings.has_updates(self.vocabulary.user_index(user_id)):
+            return None
+        stored = self.recommendation_store.get(method, user_id)
+        if stored is None:
+            return None
+        anime_ids, scores = stored
+        anime_idx = self.vocabulary.anime_index(anime_ids[:n])
+        known = anime_idx >= 0
+        return self._format_recommendations(anime_idx[known], scores[:n][known] if with_scores else None)
+
+    @cached_result('svd', subject='user_id')
+    def get_svd_recommendations(self, user_id, n=10, svd_model=None)-> Recommendations:
         """
         Generates anime recommendations using the trained SVD model.
-        
+
         Args:
             user_id (int): The user ID for which recommendations are generated.
             n (int): Number of recommendations to return. Default is 10.
             svd_model (SVD, optional): Pretrained SVD model. Uses self.svd if not provided.
 
         Returns:
-            pd.DataFrame: A DataFrame containing recommended anime details.
+            Recommendations: The recommended anime details.
         """
         try:
             # Use the provided SVD model or the trained self.svd model
@@ -115,35 +515,29 @@ class CollaborativeAnimeRecommender:
             if svd_model is None:
                 raise ValueError("SVD model is not provided or trained.")
 
-            # Ensure user exists in the dataset
-            if user_id not in self.df['user_id'].unique():
-                return f"User ID '{user_id}' not found in the dataset."
-
-            # Get unique anime IDs
-            anime_ids = self.df['anime_id'].unique()
+            with phase("lookup"):
+                # Ensure user exists in the dataset
+                user_idx = self.vocabulary.user_index(user_id)
+                if user_idx < 0:
+                    if self.vocabulary.is_pruned_user(user_id):
+                        return self._popularity_fallback(n)
+                    return f"User ID '{user_id}' not found in the dataset."
 
-            # Predict ratings for all anime for the given user
-            predictions = [(anime_id, svd_model.predict(user_id, anime_id).est) for anime_id in anime_ids]
-            predictions.sort(key=lambda x: x[1], reverse=True)
+                # Serve the materialized list when available
+                stored = self._stored_recommendations('svd', user_id, n)
+                if stored is not None:
+                    return stored
 
-            # Extract top N anime IDs
-            recommended_anime_ids = [pred[0] for pred in predictions[:n]]
-
-            # Get details of recommended anime
-            recommended_anime = self.df[self.df['anime_id'].isin(recommended_anime_ids)].drop_duplicates(subset='anime_id')
-            logging.info(f"Shape of recommended_anime: {recommended_anime.shape}")
-            # Limit to N recommendations
-            recommended_anime = recommended_anime.head(n)
-
-            return pd.DataFrame({
-                'Anime Name': recommended_anime['name'].values,
-                'Genres': recommended_anime['genres'].values,
-                'Image URL': recommended_anime['image url'].values,
-                'Rating': recommended_anime['average_rating'].values
-            })
+            with phase("scoring"):
+                # Predict ratings for all anime for the given user and keep the top N
+                scores = self._svd_scores(svd_model, user_idx)
+                recommended = self._top_n(scores, n)
+            with phase("metadata"):
+                return self._format_recommendations(recommended)
         except Exception as e:
-            raise AnimeRecommendorException(e)
-           
+            raise AnimeRecommendorException(e, sys)
+
+    @cached_result('item_knn', subject='anime_name', n='n_recommendations')
     def get_item_based_recommendations(self, anime_name, n_recommendations=10, knn_item_model=None):
         """
         Get item-based recommendations for a given anime using a KNN model.
@@ -154,51 +548,33 @@ class CollaborativeAnimeRecommender:
             knn_item_model (NearestNeighbors): A trained KNN model. Defaults to None, in which case self.knn_item_based is used.
 
         Returns:
-            pd.DataFrame: A DataFrame containing recommended anime names, genres, image URLs, and ratings. 
-        """     
+            Recommendations: The recommended anime names, genres, image URLs, and ratings.
+        """
         try:
             # Use the provided model or fall back to self.knn_item_based
             knn_item_based = knn_item_model or self.knn_item_based
             if knn_item_based is None:
                 raise ValueError("Item-based KNN model is not provided or trained.")
 
-            # Ensure the anime name exists in the pivot table
-            if anime_name not in self.anime_pivot.index:
-                return f"Anime title '{anime_name}' not found in the dataset."
+            with phase("lookup"):
+                # Ensure the anime has ratings
+                anime_idx = self.vocabulary.anime_index_for_title(anime_name)
+                if anime_idx < 0 or anime_idx >= self.vocabulary.n_rated_anime:
+                    return f"Anime title '{anime_name}' not found in the dataset."
 
-            # Get the index of the anime in the pivot table
-            query_index = self.anime_pivot.index.get_loc(anime_name)
-
-            # Use the KNN model to find similar animes (n_neighbors + 1 to exclude the query itself)
-            distances, indices = knn_item_based.kneighbors(
-                self.anime_pivot.iloc[query_index, :].values.reshape(1, -1),
-                n_neighbors=n_recommendations + 1  # +1 because the query anime itself is included
-            ) 
-            recommendations = []
-            for i in range(1, len(distances.flatten())):  # Start from 1 to exclude the query anime
-                anime_title = self.anime_pivot.index[indices.flatten()[i]]
-                distance = distances.flatten()[i]
-                recommendations.append((anime_title, distance))
-
-            # Fetch the recommended anime names (top n_recommendations)
-            recommended_anime_titles = [rec[0] for rec in recommendations]
-            logging.info(f"Top {n_recommendations} recommendations: {recommended_anime_titles}")
-            filtered_df = self.df[self.df['name'].isin(recommended_anime_titles)].drop_duplicates(subset='name')
-            logging.info(f"Shape of filtered df: {filtered_df.shape}")
-            
-            # Limit the results to `n_recommendations`
-            filtered_df = filtered_df.head(n_recommendations)
-
-            return pd.DataFrame({
-                'Anime Name': filtered_df['name'].values,
-                'Image URL': filtered_df['image url'].values,
-                'Genres': filtered_df['genres'].values,
-                'Rating': filtered_df['average_rating'].values
-            })
+            with phase("scoring"):
+                # Use the KNN model to find similar animes (n_neighbors + 1 to exclude the query itself)
+                n_neighbors = min(n_recommendations + 1, self.item_user_matrix.shape[0])
+                _, indices = knn_item_based.kneighbors(self.item_user_matrix[anime_idx], n_neighbors=n_neighbors)
+                recommended = indices.ravel()
+                recommended = recommended[recommended != anime_idx][:n_recommendations]
+            with phase("metadata"):
+                return self._format_recommendations(recommended)
         except Exception as e:
-            raise AnimeRecommendorException(e)
+            raise AnimeRecommendorException(e, sys)
 
-    def get_user_based_recommendations(self, user_id, n_recommendations=10, knn_user_model=None)-> pd.DataFrame:
+    @cached_result('user_knn', subject='user_id', n='n_recommendations', live_ratings=True)
+    def get_user_based_recommendations(self, user_id, n_recommendations=10, knn_user_model=None)-> Recommendations:
         """
         Recommend anime for a given user based on similar users' preferences using the provided or trained KNN model.
 
@@ -208,7 +584,7 @@ class CollaborativeAnimeRecommender:
             knn_user_model (NearestNeighbors): Pre-trained KNN model. Defaults to None.
 
         Returns:
-            pd.DataFrame: A DataFrame containing recommended anime titles and related information.
+            Recommendations: The recommended anime titles and related information.
         """
         try:
             # Use the provided model or fall back to self.knn_user_based
@@ -216,48 +592,271 @@ class CollaborativeAnimeRecommender:
             if knn_user_based is None:
                 raise ValueError("User-based KNN model is not provided or trained.")
 
-            # Ensure the user exists in the pivot table
-            user_id = float(user_id) 
-            if user_id not in self.user_pivot.index:
-                return f"User ID '{user_id}' not found in the dataset."
+            with phase("lookup"):
+                # Ensure the user exists in the rating matrix
+                user_idx = self.vocabulary.user_index(user_id)
+                if user_idx < 0:
+                    if self.vocabulary.is_pruned_user(user_id):
+                        return self._popularity_fallback(n_recommendations)
+                    return f"User ID '{user_id}' not found in the dataset."
 
-            # Find the user's index in the pivot table
-            user_idx = self.user_pivot.index.get_loc(user_id)
+                # Serve the materialized list when available
+                stored = self._stored_recommendations('user_knn', user_id, n_recommendations)
+                if stored is not None:
+                    return stored
 
-            # Use the KNN model to find the nearest neighbors
-            distances, indices = knn_user_based.kneighbors(
-                self.user_pivot.iloc[user_idx, :].values.reshape(1, -1),
-                n_neighbors=n_recommendations + 1  # Include the user itself
-            )
+            with phase("scoring"):
+                # Count how frequently each anime not yet rated by the user is rated by its nearest neighbors
+                counts = self._user_based_scores(knn_user_based, [user_idx], n_recommendations + 1)[0]
+                recommended = self._top_n(counts, n_recommendations)
+            with phase("metadata"):
+                return self._format_recommendations(recommended)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def _seed_matrix(self, user_idx=None, seeds=None) -> csr_matrix:
+        """
+        Builds the rating-weighted seed matrix used by the "because you watched" recommendations.
+
+        Args:
+            user_idx (np.ndarray): User indices whose full rating histories are used as seeds, one row per user.
+            seeds (list): Anime titles, or (title, weight) pairs, used as a single seed row.
+
+        Returns:
+            csr_matrix: Sparse (n_rows x n_rated_anime) matrix of seed weights aligned with the item neighbor table.
+        """
+        n_items = self.vocabulary.n_rated_anime
+        if seeds is not None:
+            cols, data = [], []
+            for seed in seeds:
+                title, weight = seed if isinstance(seed, (tuple, list)) else (seed, 1.0)
+                anime_idx = self.vocabulary.anime_index_for_title(title)
+                if 0 <= anime_idx < n_items:
+                    cols.append(anime_idx)
+                    data.append(float(weight))
+            # Built as COO so the weights of a seed listed more than once add up
+            seed_matrix = coo_matrix(
+                (np.asarray(data, dtype=np.float64), (np.zeros(len(cols), dtype=np.int64), np.asarray(cols, dtype=np.int64))), shape=(1, n_items)
+            ).tocsr()
+            seed_matrix.sum_duplicates()
+            return seed_matrix
+        return self._ratings_snapshot().rows(user_idx)
+
+    def _because_you_watched_scores(self, seed_matrix, item_neighbor_table=None) -> np.ndarray:
+        """
+        Aggregates item-item similarities over a seed matrix with one sparse matrix product.
+
+        Args:
+            seed_matrix (csr_matrix): Rating-weighted seed matrix (n_rows x n_rated_anime).
+            item_neighbor_table (csr_matrix): Precomputed item neighbor table. Defaults to None, in which case self.item_neighbor_table is used.
+
+        Returns:
+            np.ndarray: Dense (n_rows x n_rated_anime) score matrix where seen and unscored anime are set to -inf.
+        """
+        table = item_neighbor_table if item_neighbor_table is not None else self.item_neighbor_table
+        if table is None:
+            table = self.build_item_neighbor_table()
+        if isinstance(table, QuantizedSparseMatrix):
+            table = table.to_csr()
+        scores = (seed_matrix @ table).toarray()
+        scores[scores <= 0] = -np.inf
+        seen_rows, seen_cols = seed_matrix.nonzero()
+        scores[seen_rows, seen_cols] = -np.inf
+        return scores
+
+    @cached_result('because_you_watched', subject=('user_id', 'seeds'), n='n_recommendations', live_ratings=True)
+    def get_because_you_watched_recommendations(self, user_id=None, seeds=None, n_recommendations=10, item_neighbor_table=None):
+        """
+        Recommend anime by combining item similarities across everything a user has watched, or across a given list of seed titles.
+
+        Args:
+            user_id (int): The ID of the user whose rated anime are used as rating-weighted seeds. Defaults to None.
+            seeds (list): Anime titles, or (title, weight) pairs, used instead of a user's history. Defaults to None.
+            n_recommendations (int): Number of recommendations to return. Defaults to 10.
+            item_neighbor_table (csr_matrix): Precomputed item neighbor table. Defaults to None, in which case self.item_neighbor_table is used.
+
+        Returns:
+            Recommendations: The recommended anime names, image URLs, genres, ratings and aggregated scores.
+        """
+        try:
+            if (user_id is None) == (seeds is None):
+                raise ValueError("Provide exactly one of user_id or seeds.")
+
+            with phase("lookup"):
+                if user_id is not None:
+                    user_idx = self.vocabulary.user_index(user_id)
+                    if user_idx < 0:
+                        if self.vocabulary.is_pruned_user(user_id):
+                            return self._popularity_fallback(n_recommendations)
+                        return f"User ID '{user_id}' not found in the dataset."
+                    stored = self._stored_recommendations('because_you_watched', user_id, n_recommendations, with_scores=True)
+                    if stored is not None:
+                        return stored
+                    seed_matrix = self._seed_matrix(user_idx=[user_idx])
+                else:
+                    seed_matrix = self._seed_matrix(seeds=seeds)
+                    if seed_matrix.nnz == 0:
+                        return "None of the seed anime titles were found in the dataset."
+
+            with phase("scoring"):
+                scores = self._because_you_watched_scores(seed_matrix, item_neighbor_table)[0]
+                recommended = self._top_n(scores, n_recommendations)
+            with phase("metadata"):
+                return self._format_recommendations(recommended, scores[recommended])
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def get_batch_because_you_watched_recommendations(self, user_ids, n_recommendations=10, item_neighbor_table=None, batch_size=1024) -> dict:
+        """
+        Batched "because you watched" recommendations for many users.
+
+        Args:
+            user_ids (list): The IDs of the users.
+            n_recommendations (int): Number of recommendations per user. Defaults to 10.
+            item_neighbor_table (csr_matrix): Precomputed item neighbor table. Defaults to None, in which case self.item_neighbor_table is used.
+            batch_size (int): Number of users scored per sparse matrix product. Defaults to 1024.
+
+        Returns:
+            dict: Mapping of user ID to its Recommendations. Users not found in the dataset are skipped.
+        """
+        try:
+            user_ids = np.asarray(user_ids)
+            user_idx = self.vocabulary.user_index(user_ids)
+            user_ids, user_idx = user_ids[user_idx >= 0], user_idx[user_idx >= 0]
+            results = {}
+            for start in range(0, len(user_idx), batch_size):
+                batch = user_idx[start:start + batch_size]
+                scores = self._because_you_watched_scores(self._seed_matrix(user_idx=batch), item_neighbor_table)
+                for user_id, score_row in zip(user_ids[start:start + batch_size], scores):
+                    recommended = self._top_n(score_row, n_recommendations)
+                    results[user_id.item()] = self._format_recommendations(recommended, score_row[recommended])
+            logging.info(f"Because-you-watched recommendations generated for {len(results)} users")
+            return results
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def _user_cursor(self, user_id, score_fn):
+        """
+        Resolves a user for a cursor: a RankedCursor over score_fn(user index), the popularity
+        fallback for pruned users, or a message for unknown users.
+        """
+        user_idx = self.vocabulary.user_index(user_id)
+        if user_idx < 0:
+            if self.vocabulary.is_pruned_user(user_id):
+                return RankedCursor.from_ranked(self._popular_ranking(), self._format_recommendations)
+            return f"User ID '{user_id}' not found in the dataset."
+        return RankedCursor(score_fn(user_idx), self._format_recommendations)
+
+    def _item_similarities(self, knn_item_based, anime_idx: int) -> np.ndarray:
+        """
+        Cosine similarity of one anime to every anime the item-based KNN model indexes, the
+        scores its kneighbors ranks by.
+        """
+        query = self.item_user_matrix[anime_idx]
+        if isinstance(knn_item_based, EmbeddingKNN):
+            embeddings = knn_item_based.embeddings
+            embeddings = embeddings if isinstance(embeddings, np.ndarray) else embeddings.to_array()
+            return (knn_item_based.transform(query) @ embeddings.T).ravel().astype(np.float64)
+        if hasattr(knn_item_based, 'fit_matrix'):
+            # QuantizedNearestNeighbors keeps its rows L2-normalized
+            indexed = knn_item_based.fit_matrix.to_csr()
+        else:
+            # The rows a brute-force NearestNeighbors model scans
+            indexed = normalize(csr_matrix(knn_item_based._fit_X), norm='l2', axis=1)
+        return (indexed @ normalize(csr_matrix(query, dtype=np.float32), norm='l2', axis=1).T).toarray().ravel().astype(np.float64)
 
-            # Get the list of anime the user has already rated
-            user_rated_anime = set(self.user_pivot.columns[self.user_pivot.iloc[user_idx, :] > 0])
-
-            # Collect all anime rated by the nearest neighbors
-            all_neighbor_ratings = []
-            for i in range(1, len(distances.flatten())):  # Start from 1 to exclude the user itself
-                neighbor_idx = indices.flatten()[i]
-                neighbor_rated_anime = self.user_pivot.iloc[neighbor_idx, :]
-                neighbor_ratings = neighbor_rated_anime[neighbor_rated_anime > 0]
-                all_neighbor_ratings.extend(neighbor_ratings.index)
-
-            # Count how frequently each anime is rated by neighbors
-            anime_counter = Counter(all_neighbor_ratings)
-
-            # Recommend anime not already rated by the user
-            recommendations = [(anime, count) for anime, count in anime_counter.items() if anime not in user_rated_anime]
-            recommendations.sort(key=lambda x: x[1], reverse=True)   
-            # Extract recommended anime names and their details
-            recommended_anime_titles = [rec[0] for rec in recommendations[:n_recommendations]]
-            filtered_df = self.df[self.df['name'].isin(recommended_anime_titles)].drop_duplicates(subset='name')
-            logging.info(f"Shape of filtered df: {filtered_df.shape}") 
-            filtered_df = filtered_df.head(n_recommendations)
-
-            return pd.DataFrame({
-                'Anime Name': filtered_df['name'].values,
-                'Image URL': filtered_df['image url'].values,
-                'Genres': filtered_df['genres'].values,
-                'Rating': filtered_df['average_rating'].values
-            })
+    def svd_cursor(self, user_id, svd_model=None):
+        """
+        Pages through a user's SVD recommendations, scoring every anime once and ranking only as
+        far as the pages read.
+
+        Args:
+            user_id (int): The user ID for which recommendations are generated.
+            svd_model (SVD, optional): Pretrained SVD model. Uses self.svd if not provided.
+
+        Returns:
+            RankedCursor or str: Cursor yielding Recommendations pages, or a message when the user is unknown.
+        """
+        try:
+            svd_model = svd_model or self.svd
+            if svd_model is None:
+                raise ValueError("SVD model is not provided or trained.")
+            return self._user_cursor(user_id, lambda user_idx: self._svd_scores(svd_model, user_idx))
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def user_based_cursor(self, user_id, n_neighbors=11, knn_user_model=None):
+        """
+        Pages through a user's user-based KNN recommendations: anime ranked by how many of the
+        user's nearest neighbors rated them.
+
+        Args:
+            user_id (int): The ID of the user.
+            n_neighbors (int): Neighbors queried, including the user itself. Defaults to 11, as get_user_based_recommendations for 10 recommendations.
+            knn_user_model (NearestNeighbors): Pre-trained KNN model. Defaults to None.
+
+        Returns:
+            RankedCursor or str: Cursor yielding Recommendations pages, or a message when the user is unknown.
+        """
+        try:
+            knn_user_based = knn_user_model or self.knn_user_based
+            if knn_user_based is None:
+                raise ValueError("User-based KNN model is not provided or trained.")
+            return self._user_cursor(user_id, lambda user_idx: self._user_based_scores(knn_user_based, [user_idx], n_neighbors)[0])
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def item_based_cursor(self, anime_name, knn_item_model=None):
+        """
+        Pages through the anime most similar to a given anime under the item-based KNN model,
+        computing the similarities once instead of a neighbor query per page size.
+
+        Args:
+            anime_name (str): The title of the anime for which recommendations are needed.
+            knn_item_model (NearestNeighbors): A trained KNN model. Defaults to None, in which case self.knn_item_based is used.
+
+        Returns:
+            RankedCursor or str: Cursor yielding Recommendations pages, or a message when the anime is unknown.
+        """
+        try:
+            knn_item_based = knn_item_model or self.knn_item_based
+            if knn_item_based is None:
+                raise ValueError("Item-based KNN model is not provided or trained.")
+            anime_idx = self.vocabulary.anime_index_for_title(anime_name)
+            if anime_idx < 0 or anime_idx >= self.vocabulary.n_rated_anime:
+                return f"Anime title '{anime_name}' not found in the dataset."
+            scores = self._item_similarities(knn_item_based, anime_idx)
+            scores[anime_idx] = -np.inf
+            return RankedCursor(scores, self._format_recommendations)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def because_you_watched_cursor(self, user_id=None, seeds=None, item_neighbor_table=None):
+        """
+        Pages through the "because you watched" recommendations of a user's history or of seed titles.
+
+        Args:
+            user_id (int): The ID of the user whose rated anime are used as rating-weighted seeds. Defaults to None.
+            seeds (list): Anime titles, or (title, weight) pairs, used instead of a user's history. Defaults to None.
+            item_neighbor_table (csr_matrix): Precomputed item neighbor table. Defaults to None, in which case self.item_neighbor_table is used.
+
+        Returns:
+            RankedCursor or str: Cursor yielding Recommendations pages with scores, or a message when nothing matches.
+        """
+        try:
+            if (user_id is None) == (seeds is None):
+                raise ValueError("Provide exactly one of user_id or seeds.")
+            if user_id is None:
+                seed_matrix = self._seed_matrix(seeds=seeds)
+                if seed_matrix.nnz == 0:
+                    return "None of the seed anime titles were found in the dataset."
+                scores = self._because_you_watched_scores(seed_matrix, item_neighbor_table)[0]
+                return RankedCursor(scores, lambda anime_idx: self._format_recommendations(anime_idx, scores[anime_idx]))
+            cursor = self._user_cursor(
+                user_id, lambda user_idx: self._because_you_watched_scores(self._seed_matrix(user_idx=[user_idx]), item_neighbor_table)[0]
+            )
+            if isinstance(cursor, RankedCursor) and len(cursor.scores):
+                cursor.format_fn = lambda anime_idx: self._format_recommendations(anime_idx, cursor.scores[anime_idx])
+            return cursor
         except Exception as e:
-            raise AnimeRecommendorException(e)
\ No newline at end of file
+            raise AnimeRecommendorException(e, sys)
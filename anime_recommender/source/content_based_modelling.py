@@ -1,20 +1,66 @@
 import os
-import pandas as pd 
-from sklearn.feature_extraction.text import TfidfVectorizer 
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import  cosine_similarity
 import joblib
-from anime_recommender.loggers.logging import logging
+from anime_recommender.loggers.logging import logging, SAMPLED
 from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.source.vocabulary import IdVocabulary
+from anime_recommender.source.quantization import QuantizedMatrix
+from anime_recommender.source.result_cache import cached_result
+from anime_recommender.source.pagination import RankedCursor
+from anime_recommender.source.recommendations import AnimeMetadata, Recommendations
+from anime_recommender.utils.instrumentation import instrument
+from anime_recommender.utils.serving_metrics import phase
+
+def _read_only(cosine_sim):
+    """Marks a similarity matrix, dense or quantized, read-only, so shared instances cannot be mutated by a request."""
+    for array in (cosine_sim, getattr(cosine_sim, 'values', None), getattr(cosine_sim, 'scales', None)):
+        if isinstance(array, np.ndarray):
+            array.setflags(write=False)
+    return cosine_sim
+
+
+def content_catalog(df: pd.DataFrame) -> pd.DataFrame:
+    """The catalog rows the content recommender ranks: those with every detail present, renumbered from 0."""
+    return df.dropna().reset_index(drop=True)
+
 
 class ContentBasedRecommender:
     """
     A content-based recommender system using TF-IDF Vectorizer and Cosine Similarity.
+
+    Recommendations only read the catalog and the read-only similarity matrix, so one instance
+    can answer concurrent requests from several threads.
     """
-    def __init__(self, df): 
-        try: 
-            self.df = df.dropna() 
-            # Create a Series mapping anime names to their indices
-            self.indices = pd.Series(self.df.index, index=self.df['name']).drop_duplicates() 
+    def __init__(self, df, vocabulary: IdVocabulary = None, model_path=None, result_cache=None):
+        """
+        Args:
+            df (pd.DataFrame): Anime catalog with 'anime_id', 'name', 'genres', 'image url' and 'average_rating'.
+            vocabulary (IdVocabulary, optional): Shared ID vocabulary. Built from df if not provided.
+            model_path (str, optional): Saved (TF-IDF, cosine similarity) model to load instead of fitting on df.
+            result_cache (RecommendationCache, optional): Cache of recommendation results shared across calls and sessions.
+        """
+        try:
+            self.result_cache = result_cache
+            self._loaded_models = {}
+            self._load_lock = threading.Lock()
+            self.df = content_catalog(df)
+            self.metadata = AnimeMetadata.from_frame(self.df)
+            self.vocabulary = vocabulary or IdVocabulary.from_frames(self.df)
+            # Map vocabulary anime indices to rows of the similarity matrix (-1 when not in this catalog)
+            row_anime_idx = self.vocabulary.anime_index(self.df['anime_id'].to_numpy())
+            self.row_of_anime = np.full(self.vocabulary.n_anime, -1, dtype=np.int32)
+            self.row_of_anime[row_anime_idx[row_anime_idx >= 0]] = np.flatnonzero(row_anime_idx >= 0)
+            # First row of each title in this catalog, for titles whose vocabulary anime is not in it
+            names = self.df['name'].to_numpy()
+            self.row_of_title = dict(zip(names[::-1], range(len(names) - 1, -1, -1)))
+            if model_path is not None:
+                self.load_model(model_path)
+                return
             # Initialize and fit the TF-IDF Vectorizer on the 'genres' column
             self.tfv = TfidfVectorizer(
                 min_df=3,
@@ -24,50 +70,139 @@ class ContentBasedRecommender:
                 ngram_range=(1, 3),
                 stop_words='english'
             )
-            self.tfv_matrix = self.tfv.fit_transform(self.df['genres']) 
-            self.cosine_sim = cosine_similarity(self.tfv_matrix, self.tfv_matrix)  
+            with instrument("tfidf") as step:
+                self.tfv_matrix = self.tfv.fit_transform(self.df['genres'])
+                step.set(rows=self.tfv_matrix.shape[0], features=self.tfv_matrix.shape[1], nnz=self.tfv_matrix.nnz)
+            with instrument("cosine_similarity") as step:
+                self.cosine_sim = _read_only(cosine_similarity(self.tfv_matrix, self.tfv_matrix))
+                step.set(rows=self.cosine_sim.shape[0], bytes=self.cosine_sim.nbytes)
         except Exception as e:
-            raise AnimeRecommendorException(e)
-        
-    def save_model(self, model_path):
-        """Save the trained model (TF-IDF and Cosine Similarity Matrix) to a file."""
+            raise AnimeRecommendorException(e, sys)
+
+    def save_model(self, model_path, quantization=None):
+        """
+        Save the trained model (TF-IDF and Cosine Similarity Matrix) to a file.
+
+        Args:
+            model_path (str): The file path where the model should be stored.
+            quantization (str, optional): 'float16' or 'int8' to store the similarity matrix in reduced precision with per-row scales.
+        """
         try:
             logging.info(f"Saving model to {model_path}")
             os.makedirs(os.path.dirname(model_path), exist_ok=True)
+            cosine_sim = QuantizedMatrix.from_array(self.cosine_sim, quantization) if quantization else self.cosine_sim
             with open(model_path, 'wb') as f:
-                joblib.dump((self.tfv, self.cosine_sim), f)
+                joblib.dump((self.tfv, cosine_sim), f)
             logging.info("Content recommender Model saved successfully")
         except Exception as e:
-            raise AnimeRecommendorException(e)
-        
-    def get_rec_cosine(self, title, model_path, n_recommendations=5):
-        """Get recommendations based on cosine similarity for a given anime title."""
+            raise AnimeRecommendorException(e, sys)
+
+    def load_model(self, model_path):
+        """
+        Load a saved model (TF-IDF and Cosine Similarity Matrix) from a file.
+
+        Args:
+            model_path (str): The file path of the saved model.
+        """
         try:
             logging.info(f"Loading model from {model_path}")
-            # Load the model (TF-IDF and cosine similarity matrix)
-            with open(model_path, 'rb') as f:
-                self.tfv, self.cosine_sim = joblib.load(f)
+            self.tfv, self.cosine_sim = self._read_model(model_path)
             logging.info("Model loaded successfully")
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @staticmethod
+    def _read_model(model_path) -> tuple:
+        with open(model_path, 'rb') as f:
+            tfv, cosine_sim = joblib.load(f)
+        return tfv, _read_only(cosine_sim)
+
+    def _similarity(self, model_path=None):
+        """
+        The similarity matrix of the model saved at model_path, read once per path and kept
+        alongside the instance's own model instead of replacing it, or the instance's own matrix.
+        """
+        if model_path is None:
+            return self.cosine_sim
+        model = self._loaded_models.get(model_path)
+        if model is None:
+            with self._load_lock:
+                model = self._loaded_models.get(model_path)
+                if model is None:
+                    logging.info(f"Loading model from {model_path}")
+                    model = self._loaded_models[model_path] = self._read_model(model_path)
+        return model[1]
+
+    def _row_for_title(self, title) -> int:
+        """
+        Row of the similarity matrix for a title, or -1 when this catalog has no anime of that title.
+
+        The vocabulary resolves a title shared by several anime to the rated one first, which may
+        be missing from this catalog while another anime of the same title remains in it.
+        """
+        anime_idx = self.vocabulary.anime_index_for_title(title)
+        if anime_idx < 0:
+            return -1
+        row = self.row_of_anime[anime_idx]
+        if row < 0:
+            row = self.row_of_title.get(self.vocabulary.anime_titles[anime_idx], -1)
+        search_index = self.vocabulary.search_index
+        if row < 0 and search_index is not None and isinstance(title, str):
+            # Titles differing only in case or punctuation share a search key
+            anime_idx = self.vocabulary.anime_index(search_index.resolve(title, content_only=True))
+            row = self.row_of_anime[anime_idx] if anime_idx >= 0 else -1
+        return int(row)
+
+    @cached_result('content', subject='title', n='n_recommendations')
+    def get_rec_cosine(self, title, model_path=None, n_recommendations=5):
+        """Get recommendations based on cosine similarity for a given anime title, using the model saved at model_path when given."""
+        try:
+            cosine_sim = self._similarity(model_path)
             # Check if the DataFrame is loaded
             if self.df is None:
                 logging.error("The DataFrame is not loaded, cannot make recommendations.")
                 raise ValueError("The DataFrame is not loaded, cannot make recommendations.")
-            
-            if title not in self.indices.index:
-                logging.warning(f"Anime title '{title}' not found in dataset")
+
+            with phase("lookup"):
+                idx = self._row_for_title(title)
+                if idx < 0:
+                    logging.warning("Anime title '%s' not found in dataset", title, extra=SAMPLED)
+                    return f"Anime title '{title}' not found in the dataset."
+
+            with phase("scoring"):
+                scores = np.array(cosine_sim[idx], dtype=np.float64)
+                scores[idx] = -np.inf
+                n_recommendations = min(n_recommendations, len(scores) - 1)
+                anime_indices = np.argpartition(-scores, n_recommendations - 1)[:n_recommendations] if n_recommendations > 0 else np.empty(0, dtype=np.int64)
+                anime_indices = anime_indices[np.argsort(-scores[anime_indices], kind='stable')]
+            with phase("metadata"):
+                return self._format_rows(anime_indices)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def _format_rows(self, rows) -> Recommendations:
+        """Wraps ranked catalog rows as recommendations, their details read from the metadata index."""
+        return Recommendations(self.metadata, rows)
+
+    def cosine_cursor(self, title, model_path=None):
+        """
+        Pages through the anime most similar to a given title, ranking only as far as the pages read.
+
+        Args:
+            title (str): The anime title.
+            model_path (str, optional): Saved model to use instead of the instance's own.
+
+        Returns:
+            RankedCursor or str: Cursor yielding Recommendations pages, or a message when the title is unknown.
+        """
+        try:
+            cosine_sim = self._similarity(model_path)
+            idx = self._row_for_title(title)
+            if idx < 0:
                 return f"Anime title '{title}' not found in the dataset."
-            
-            idx = self.indices[title]
-            cosinesim_scores = list(enumerate(self.cosine_sim[idx]))
-            cosinesim_scores = sorted(cosinesim_scores, key=lambda x: x[1], reverse=True)[1:n_recommendations + 1]
-            anime_indices = [i[0] for i in cosinesim_scores]
-            logging.info("Recommendations generated successfully")
-            return pd.DataFrame({
-                'Anime name': self.df['name'].iloc[anime_indices].values,
-                'Image URL': self.df['image url'].iloc[anime_indices].values,
-                'Genres': self.df['genres'].iloc[anime_indices].values,
-                'Rating': self.df['average_rating'].iloc[anime_indices].values
-            })
+            scores = np.array(cosine_sim[idx], dtype=np.float64)
+            scores[idx] = -np.inf
+            return RankedCursor(scores, self._format_rows)
         except Exception as e:
-            raise AnimeRecommendorException(e)
-        
\ No newline at end of file
+            raise AnimeRecommendorException(e, sys)
+
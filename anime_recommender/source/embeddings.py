@@ -0,0 +1,119 @@
+import sys
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
+from sklearn.preprocessing import normalize
+from sklearn.utils.extmath import randomized_svd
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+
+
+class EmbeddingKNN:
+    """
+    Cosine nearest neighbors in a low-dimensional embedding of the fitted rows.
+
+    `fit` factorizes the sparse (n_rows x n_cols) rating matrix with randomized truncated SVD,
+    X ~ U S Vt, and keeps the row embeddings U S as L2-normalized float32 vectors. Queries are
+    projected onto Vt, so a fitted row maps to its own embedding, and scored against every
+    embedding with one dense product over `n_components` values instead of n_cols. Fitted on
+    the user-item matrix it embeds users, on the item-user matrix anime; either way it is a
+    drop-in for a fitted NearestNeighbors(metric='cosine', algorithm='brute'), and `embeddings`
+    can be handed to any other index working in the same space.
+    """
+    def __init__(self, n_components: int = 64, n_neighbors: int = 5, n_iter: int = 4, random_state: int = 42):
+        """
+        Args:
+            n_components (int): Embedding dimension, typically 32 to 256. Defaults to 64.
+            n_neighbors (int): Neighbors returned when kneighbors is not given a count. Defaults to 5.
+            n_iter (int): Power iterations of the randomized SVD. Defaults to 4.
+            random_state (int): Seed of the randomized SVD. Defaults to 42.
+        """
+        self.n_components = n_components
+        self.n_neighbors = n_neighbors
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.components_ = None
+        self.singular_values_ = None
+        self.embeddings = None
+        # Share of the exact neighbors found, when measured by neighbor_overlap at training time
+        self.neighbor_overlap = None
+
+    @property
+    def n_samples_fit_(self) -> int:
+        return self.embeddings.shape[0]
+
+    def fit(self, X) -> "EmbeddingKNN":
+        """
+        Embeds the rows of X.
+
+        Args:
+            X (csr_matrix): (n_rows x n_cols) ratings.
+
+        Returns:
+            EmbeddingKNN: self.
+        """
+        try:
+            X = csr_matrix(X, dtype=np.float32)
+            n_components = max(1, min(self.n_components, min(X.shape) - 1))
+            U, S, Vt = randomized_svd(X, n_components, n_iter=self.n_iter, random_state=self.random_state)
+            self.components_ = Vt.astype(np.float32)
+            self.singular_values_ = S.astype(np.float32)
+            self.embeddings = normalize((U * S).astype(np.float32), norm='l2', axis=1)
+            logging.info(f"Embedded {X.shape[0]} rows of {X.shape[1]} columns into {n_components} dimensions")
+            return self
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def transform(self, X) -> np.ndarray:
+        """L2-normalized float32 embeddings of query rows."""
+        projected = X @ self.components_.T if issparse(X) else np.asarray(X, dtype=np.float32) @ self.components_.T
+        return normalize(np.asarray(projected, dtype=np.float32), norm='l2', axis=1)
+
+    def kneighbors(self, X, n_neighbors: int = None, return_distance: bool = True):
+        """
+        Finds the nearest fitted rows of each query row by cosine distance in the embedding.
+
+        Args:
+            X (array-like or sparse matrix): (n_queries x n_cols) query rows.
+            n_neighbors (int, optional): Number of neighbors. Defaults to the model's value.
+            return_distance (bool): Whether to return distances. Defaults to True.
+
+        Returns:
+            tuple: (distances, indices), nearest first, or only indices when return_distance is False.
+        """
+        embeddings = self.embeddings if isinstance(self.embeddings, np.ndarray) else self.embeddings.to_array()
+        n_neighbors = min(n_neighbors or self.n_neighbors, embeddings.shape[0])
+        similarities = self.transform(X) @ embeddings.T
+        indices = np.argpartition(-similarities, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        order = np.argsort(-np.take_along_axis(similarities, indices, axis=1), axis=1, kind='stable')
+        indices = np.take_along_axis(indices, order, axis=1)
+        if not return_distance:
+            return indices
+        return np.clip(1.0 - np.take_along_axis(similarities, indices, axis=1), 0.0, 2.0), indices
+
+
+def neighbor_overlap(model, exact_model, X, n_neighbors: int = 10, n_queries: int = 200, random_state: int = 42) -> float:
+    """
+    Share of the exact model's nearest neighbors that a model finds too, averaged over a random
+    sample of the fitted rows, each query row itself excluded.
+
+    Args:
+        model: Fitted model under test, e.g. EmbeddingKNN.
+        exact_model: The same rows fitted with NearestNeighbors(metric='cosine', algorithm='brute').
+        X (csr_matrix): The rows both models were fitted on.
+        n_neighbors (int): Neighbors compared per query. Defaults to 10.
+        n_queries (int): Rows sampled as queries. Defaults to 200.
+        random_state (int): Seed of the sample. Defaults to 42.
+
+    Returns:
+        float: Mean overlap between 0 and 1.
+    """
+    queries = np.sort(np.random.default_rng(random_state).choice(X.shape[0], size=min(n_queries, X.shape[0]), replace=False))
+    n_neighbors = min(n_neighbors + 1, X.shape[0])
+    expected = exact_model.kneighbors(X[queries], n_neighbors=n_neighbors, return_distance=False)
+    found = model.kneighbors(X[queries], n_neighbors=n_neighbors, return_distance=False)
+    shares = []
+    for query, exact_row, found_row in zip(queries, expected, found):
+        exact_neighbors = set(exact_row.tolist()) - {query}
+        if exact_neighbors:
+            shares.append(len(exact_neighbors & (set(found_row.tolist()) - {query})) / len(exact_neighbors))
+    return float(np.mean(shares)) if shares else 1.0
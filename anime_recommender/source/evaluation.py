@@ -0,0 +1,295 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.stats import rankdata
+from concurrent.futures import ProcessPoolExecutor
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.utils.main_utils.utils import save_model, load_object
+from anime_recommender.source.vocabulary import IdVocabulary
+from anime_recommender.source.collaborative_modelling import CollaborativeAnimeRecommender
+
+EVALUATION_METHODS = ('svd', 'item_knn', 'user_knn', 'content', 'popularity')
+
+# Per-worker state, loaded once by the pool initializer
+_worker_recommender = None
+_worker_test = None
+_worker_models = {}
+_worker_popularity = None
+
+
+def holdout_split(user_idx, test_fraction: float = 0.2, min_ratings: int = 5, strategy: str = 'random', order=None, seed: int = 42) -> np.ndarray:
+    """
+    Selects the held-out ratings of a per-user holdout split.
+
+    Users with at least `min_ratings` ratings hold out floor(test_fraction * n) of them, and at least
+    one: a random subset ('random') or the last ones by `order` ('temporal'). Other users keep every
+    rating in the training split.
+
+    Args:
+        user_idx (np.ndarray): User index of each rating.
+        test_fraction (float): Share of each user's ratings held out. Defaults to 0.2.
+        min_ratings (int): Minimum number of ratings for a user to be held out from. Defaults to 5.
+        strategy (str): 'random' or 'temporal'. Defaults to 'random'.
+        order (np.ndarray, optional): Sort key of each rating, e.g. its timestamp, for the temporal split. Defaults to the row order.
+        seed (int): Seed of the random split. Defaults to 42.
+
+    Returns:
+        np.ndarray: Boolean mask of the held-out ratings.
+    """
+    user_idx = np.asarray(user_idx, dtype=np.int64)
+    n = len(user_idx)
+    if strategy == 'random':
+        key = np.random.default_rng(seed).random(n)
+    elif strategy == 'temporal':
+        key = np.arange(n) if order is None else np.asarray(order)
+    else:
+        raise ValueError(f"Unknown holdout strategy '{strategy}'. Choose 'random' or 'temporal'.")
+
+    by_user = np.lexsort((key, user_idx))
+    counts = np.bincount(user_idx)
+    starts = np.cumsum(counts) - counts
+    n_test = np.where(counts >= min_ratings, np.maximum(1, np.floor(counts * test_fraction)), 0).astype(np.int64)
+    sorted_users = user_idx[by_user]
+    position = np.arange(n) - starts[sorted_users]
+    test = np.empty(n, dtype=bool)
+    test[by_user] = position >= counts[sorted_users] - n_test[sorted_users]
+    return test
+
+
+def _save_csr(data_dir: str, name: str, matrix: csr_matrix) -> None:
+    for part in ('data', 'indices', 'indptr'):
+        np.save(os.path.join(data_dir, f"{name}_{part}.npy"), getattr(matrix, part))
+    np.save(os.path.join(data_dir, f"{name}_shape.npy"), np.array(matrix.shape))
+
+
+def _load_csr(data_dir: str, name: str) -> csr_matrix:
+    parts = [np.load(os.path.join(data_dir, f"{name}_{part}.npy"), mmap_mode='r') for part in ('data', 'indices', 'indptr')]
+    shape = tuple(np.load(os.path.join(data_dir, f"{name}_shape.npy")))
+    return csr_matrix(tuple(parts), shape=shape, copy=False)
+
+
+def _init_worker(data_dir: str, model_file_paths: dict) -> None:
+    """
+    Maps the train and test matrices and the content similarities, and loads the vocabulary and
+    models, once in each worker process.
+    """
+    global _worker_recommender, _worker_test, _worker_models, _worker_popularity
+    train = _load_csr(data_dir, 'train')
+    _worker_test = _load_csr(data_dir, 'test')
+    _worker_recommender = CollaborativeAnimeRecommender.for_scoring(train, load_object(os.path.join(data_dir, 'vocabulary.pkl')))
+    _worker_models = {method: load_object(path) for method, path in model_file_paths.items()}
+    if 'content' in model_file_paths:
+        _worker_models['content'] = (_worker_models['content'], np.load(os.path.join(data_dir, 'content_similarity.npy'), mmap_mode='r'))
+    _worker_popularity = np.bincount(train.indices, minlength=train.shape[1]).astype(np.float64)
+
+
+def _scores(method: str, user_idx: np.ndarray) -> np.ndarray:
+    """
+    Scores every rated anime for a batch of users with one method, trained items set to -inf.
+    """
+    recommender = _worker_recommender
+    train_rows = recommender.user_item_matrix[user_idx]
+    if method == 'svd':
+        scores = recommender._svd_scores(_worker_models['svd'], user_idx)
+    elif method == 'item_knn':
+        scores = recommender._because_you_watched_scores(train_rows, _worker_models['item_knn'])
+    elif method == 'user_knn':
+        knn_model, n_neighbors = _worker_models['user_knn']
+        scores = recommender._user_based_scores(knn_model, user_idx, n_neighbors)
+    elif method == 'content':
+        content_cols, similarity = _worker_models['content']
+        scores = np.full(train_rows.shape, -np.inf)
+        watched = train_rows[:, content_cols]
+        watched.data = np.ones_like(watched.data)
+        content_scores = np.asarray(watched @ similarity)
+        scores[:, content_cols] = np.where(content_scores > 0, content_scores, -np.inf)
+    elif method == 'popularity':
+        scores = np.tile(_worker_popularity, (len(user_idx), 1))
+    else:
+        raise ValueError(f"Unsupported evaluation method '{method}'.")
+    seen_rows, seen_cols = train_rows.nonzero()
+    scores[seen_rows, seen_cols] = -np.inf
+    return scores
+
+
+def _evaluate_shard(method: str, user_idx: np.ndarray, k_values: tuple, relevance_threshold) -> tuple:
+    """
+    Ranks a shard of users and sums their ranking metrics.
+
+    Returns:
+        tuple: (method, per-k metric sums, per-k recommendation counts per item, seconds spent).
+    """
+    start = time.perf_counter()
+    scores = _scores(method, user_idx)
+    k_max = min(max(k_values), scores.shape[1])
+    top = np.argpartition(-scores, k_max - 1, axis=1)[:, :k_max]
+    top = np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable'), axis=1)
+    valid = np.isfinite(np.take_along_axis(scores, top, axis=1))
+
+    test_rows = _worker_test[user_idx]
+    relevant = (test_rows.toarray() >= relevance_threshold) if relevance_threshold is not None else (test_rows.toarray() != 0)
+    n_relevant = relevant.sum(axis=1)
+    hits = np.take_along_axis(relevant, top, axis=1) & valid
+
+    sums, item_counts = {}, {}
+    for k in k_values:
+        k_hits = hits[:, :k]
+        n_hits = k_hits.sum(axis=1)
+        discounts = 1.0 / np.log2(np.arange(2, k_hits.shape[1] + 2))
+        ideal = np.cumsum(discounts)[np.minimum(n_relevant, k_hits.shape[1]) - 1]
+        precision_at_rank = np.cumsum(k_hits, axis=1) / np.arange(1, k_hits.shape[1] + 1)
+        recommended = top[:, :k][valid[:, :k]]
+        sums[k] = {
+            'precision': float((n_hits / k).sum()),
+            'recall': float((n_hits / n_relevant).sum()),
+            'ndcg': float(((k_hits @ discounts) / ideal).sum()),
+            'map': float(((precision_at_rank * k_hits).sum(axis=1) / np.minimum(n_relevant, k)).sum()),
+            'hit_rate': float((n_hits > 0).sum()),
+            'popularity': float(_worker_popularity[recommended].sum()),
+            'recommended': int(len(recommended)),
+        }
+        item_counts[k] = np.bincount(recommended, minlength=scores.shape[1])
+    return method, sums, item_counts, time.perf_counter() - start
+
+
+class OfflineEvaluator:
+    """
+    Batched offline ranking evaluation of recommenders trained on the training side of a holdout split.
+
+    Every method ranks all rated anime for a batch of users at once (trained items excluded) through
+    the same scoring code serving uses, and the top-k lists are compared with the held-out ratings as
+    array operations. Batches are sharded across a process pool whose workers memory-map the train
+    and test matrices. Reported per method and k:
+
+    - precision@k, recall@k, NDCG@k, MAP@k and hit rate@k, averaged over users with relevant held-out ratings
+    - coverage@k: share of the rated anime recommended to at least one user
+    - popularity_bias@k: mean popularity percentile of the recommended anime in the training split,
+      0.5 being the catalog average and 1.0 only the most rated anime
+    """
+    def __init__(self, vocabulary: IdVocabulary, train_matrix: csr_matrix, test_matrix: csr_matrix, k_values: tuple = (10,),
+                 relevance_threshold: float = None, batch_size: int = 512, n_workers: int = None, max_users: int = None, seed: int = 42):
+        """
+        Args:
+            vocabulary (IdVocabulary): The vocabulary both matrices are indexed by.
+            train_matrix (csr_matrix): (n_users x n_rated_anime) training ratings.
+            test_matrix (csr_matrix): (n_users x n_rated_anime) held-out ratings.
+            k_values (tuple): Cut-offs to report. Defaults to (10,).
+            relevance_threshold (float, optional): Held-out ratings at or above this are relevant. Defaults to every held-out rating.
+            batch_size (int): Users ranked per batch. Defaults to 512.
+            n_workers (int, optional): Worker processes. Defaults to every available core.
+            max_users (int, optional): Evaluate a random sample of this many users. Defaults to all users with relevant held-out ratings.
+            seed (int): Seed of the user sample. Defaults to 42.
+        """
+        self.vocabulary = vocabulary
+        self.train_matrix = train_matrix.tocsr()
+        self.test_matrix = test_matrix.tocsr()
+        self.k_values = tuple(sorted(k_values))
+        self.relevance_threshold = relevance_threshold
+        self.batch_size = batch_size
+        self.n_workers = n_workers
+        self.max_users = max_users
+        self.seed = seed
+
+    def users(self) -> np.ndarray:
+        """Indices of the users evaluated: those with relevant held-out ratings, optionally sampled."""
+        test = self.test_matrix
+        relevant = test.copy()
+        relevant.data = (relevant.data >= self.relevance_threshold) if self.relevance_threshold is not None else (relevant.data != 0)
+        users = np.flatnonzero(np.asarray(relevant.sum(axis=1)).ravel() > 0)
+        if self.max_users is not None and len(users) > self.max_users:
+            users = np.sort(np.random.default_rng(self.seed).choice(users, size=self.max_users, replace=False))
+        return users
+
+    def evaluate(self, models: dict) -> dict:
+        """
+        Evaluates the given methods.
+
+        Args:
+            models (dict): Method name to model: 'svd' a trained SVD model, 'item_knn' an item neighbor table,
+                'user_knn' a (NearestNeighbors, n_neighbors) pair, 'content' a ContentBasedRecommender and
+                'popularity' None (training-split rating counts are used).
+
+        Returns:
+            dict: Per-method metrics, plus the number of users and ratings evaluated.
+        """
+        try:
+            users = self.users()
+            chunks = [chunk for chunk in np.array_split(users, max(1, -(-len(users) // self.batch_size))) if len(chunk)]
+            logging.info(f"Evaluating {list(models)} on {len(users)} users in {len(chunks)} batches at k={self.k_values}")
+            if not len(users):
+                logging.warning("The holdout has no user with a relevant test rating; every metric is reported as 0")
+
+            with tempfile.TemporaryDirectory(prefix="evaluation_") as data_dir:
+                model_file_paths = self._write_state(data_dir, models)
+                totals = {method: {'sums': {}, 'items': {}, 'seconds': 0.0} for method in models}
+                start = time.perf_counter()
+                with ProcessPoolExecutor(
+                    max_workers=self.n_workers, initializer=_init_worker, initargs=(data_dir, model_file_paths)
+                ) as executor:
+                    futures = [
+                        executor.submit(_evaluate_shard, method, chunk, self.k_values, self.relevance_threshold)
+                        for method in models for chunk in chunks
+                    ]
+                    for future in futures:
+                        method, sums, item_counts, seconds = future.result()
+                        total = totals[method]
+                        total['seconds'] += seconds
+                        for k in self.k_values:
+                            total['sums'][k] = {name: total['sums'].get(k, {}).get(name, 0) + value for name, value in sums[k].items()}
+                            total['items'][k] = total['items'][k] + item_counts[k] if k in total['items'] else item_counts[k]
+                wall_seconds = time.perf_counter() - start
+
+            report = {
+                'users': int(len(users)),
+                'train_ratings': int(self.train_matrix.nnz),
+                'test_ratings': int(self.test_matrix.nnz),
+                'k': list(self.k_values),
+                'wall_seconds': wall_seconds,
+                'methods': {method: self._metrics(total, len(users)) for method, total in totals.items()},
+            }
+            for method, metrics in report['methods'].items():
+                logging.info(f"Evaluation of {method}: {metrics}")
+            return report
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def _write_state(self, data_dir: str, models: dict) -> dict:
+        """Writes the matrices, vocabulary and models the workers load, returning the model file paths."""
+        _save_csr(data_dir, 'train', self.train_matrix)
+        _save_csr(data_dir, 'test', self.test_matrix)
+        save_model(self.vocabulary, os.path.join(data_dir, 'vocabulary.pkl'))
+        model_file_paths = {}
+        for method, model in models.items():
+            if method not in EVALUATION_METHODS:
+                raise ValueError(f"Unsupported evaluation method '{method}'. Choose from {EVALUATION_METHODS}.")
+            if method == 'popularity':
+                continue
+            if method == 'content':
+                # Similarities between the rated anime that are in the content catalog, memory-mapped by the workers
+                rows = model.row_of_anime[:self.vocabulary.n_rated_anime]
+                content_cols = np.flatnonzero(rows >= 0)
+                similarity = np.asarray(model.cosine_sim[rows[content_cols]])
+                np.save(os.path.join(data_dir, 'content_similarity.npy'), np.ascontiguousarray(similarity[:, rows[content_cols]], dtype=np.float32))
+                model = content_cols
+            model_file_paths[method] = os.path.join(data_dir, f"{method}.pkl")
+            save_model(model, model_file_paths[method])
+        return model_file_paths
+
+    def _metrics(self, total: dict, n_users: int) -> dict:
+        popularity = np.bincount(self.train_matrix.indices, minlength=self.train_matrix.shape[1])
+        percentile = (rankdata(popularity) - 1) / max(1, len(popularity) - 1)
+        metrics = {'users': n_users, 'cpu_seconds': total['seconds']}
+        for k in self.k_values:
+            # A holdout without evaluable users scores no shard, so its metrics are all zero
+            sums = total['sums'].get(k, {})
+            items = total['items'].get(k, np.zeros(len(popularity), dtype=np.int64))
+            for name in ('precision', 'recall', 'ndcg', 'map', 'hit_rate'):
+                metrics[f"{name}@{k}"] = sums.get(name, 0) / max(1, n_users)
+            metrics[f"coverage@{k}"] = float(np.count_nonzero(items) / max(1, len(items)))
+            metrics[f"popularity_bias@{k}"] = float(items @ percentile / max(1, items.sum()))
+            metrics[f"mean_popularity@{k}"] = sums.get('popularity', 0) / max(1, sums.get('recommended', 0))
+        return metrics
@@ -0,0 +1,67 @@
+from anime_recommender.constant import (
+    MODEL_TRAINER_INDEX_LAYOUT, MODEL_TRAINER_ITEM_KNN_TRAINED_MODEL_NAME, MODEL_TRAINER_USER_KNN_TRAINED_MODEL_NAME,
+    MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_NAME,
+)
+
+# Model files whose rows are vocabulary indices -> the vocabulary axis they index
+LAYOUT_MODELS = {
+    MODEL_TRAINER_ITEM_KNN_TRAINED_MODEL_NAME: 'item_knn',
+    MODEL_TRAINER_USER_KNN_TRAINED_MODEL_NAME: 'user_knn',
+    MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_NAME: 'item_neighbor_table',
+}
+
+
+class ModelLayoutError(ValueError):
+    """A model whose rows are not the rows of the vocabulary it is served with."""
+
+
+def model_rows(model) -> int:
+    """Rows a KNN model was fitted on, or rows of a neighbor table."""
+    rows = getattr(model, 'n_samples_fit_', None)
+    return int(rows if rows is not None else model.shape[0])
+
+
+def expected_rows(vocabulary, method: str) -> int:
+    """Rows a model of method ('item_knn', 'user_knn' or 'item_neighbor_table') has under a vocabulary."""
+    return vocabulary.n_users if method == 'user_knn' else vocabulary.n_rated_anime
+
+
+def tag_model(model):
+    """
+    Records the index layout and row count on a model about to be saved.
+
+    Returns:
+        The model.
+    """
+    model.index_layout = MODEL_TRAINER_INDEX_LAYOUT
+    model.index_rows = model_rows(model)
+    return model
+
+
+def check_model_layout(model, vocabulary, method: str, name: str = None):
+    """
+    Checks that a loaded model indexes its rows by the vocabulary's indices.
+
+    Args:
+        model: A KNN model or item neighbor table.
+        vocabulary (IdVocabulary): The vocabulary the model is served with.
+        method (str): 'item_knn', 'user_knn' or 'item_neighbor_table'.
+        name (str, optional): Model name used in the error message. Defaults to method.
+
+    Returns:
+        The model.
+
+    Raises:
+        ModelLayoutError: When the model has no or another layout tag, or its rows do not match the vocabulary.
+    """
+    name = name or method
+    layout = getattr(model, 'index_layout', None)
+    if layout != MODEL_TRAINER_INDEX_LAYOUT:
+        raise ModelLayoutError(
+            f"{name} has index layout {layout!r}, not {MODEL_TRAINER_INDEX_LAYOUT!r}; "
+            f"it was fitted on another row order and must be retrained against the vocabulary"
+        )
+    rows, expected = model_rows(model), expected_rows(vocabulary, method)
+    if rows != expected or getattr(model, 'index_rows', rows) != rows:
+        raise ModelLayoutError(f"{name} has {rows} rows but the vocabulary has {expected}; it must be retrained against the vocabulary")
+    return model
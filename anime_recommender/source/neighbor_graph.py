@@ -0,0 +1,243 @@
+import sys
+import time
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.source.evaluation import _save_csr, _load_csr
+
+# Dense similarity cells scored per block, bounding a block's scores at 64 MB
+_MAX_BLOCK_CELLS = 1 << 24
+
+# L2-normalized rating matrix, memory-mapped once per worker process
+_worker_matrix = None
+
+
+def _init_worker(data_dir: str) -> None:
+    global _worker_matrix
+    _worker_matrix = _load_csr(data_dir, 'normalized')
+
+
+def _top_k_entries(rows: np.ndarray, cols: np.ndarray, sims: np.ndarray, k: int) -> tuple:
+    """
+    Keeps the k most similar entries of every row of (row, col, similarity) triplets.
+
+    Returns:
+        tuple: (rows, cols, sims), grouped by row, most similar first and ties by lower index.
+    """
+    order = np.lexsort((cols, -sims, rows))
+    rows, cols, sims = rows[order], cols[order], sims[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else np.empty(0, dtype=np.int64)
+    rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    keep = rank < k
+    return rows[keep], cols[keep], sims[keep]
+
+
+def _block_neighbors(matrix: csr_matrix, user_idx: np.ndarray, k: int) -> tuple:
+    """
+    Top-k neighbors of a block of users by cosine similarity over L2-normalized rows, the user
+    itself and users without any anime in common excluded.
+    """
+    sims = (matrix[user_idx] @ matrix.T).toarray()
+    sims[np.arange(len(user_idx)), user_idx] = 0
+    k = min(k, sims.shape[1])
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    rows, cols, sims = np.repeat(user_idx.astype(np.int64), k), top.ravel().astype(np.int64), np.take_along_axis(sims, top, axis=1).ravel()
+    keep = sims > 0
+    return rows[keep], cols[keep], sims[keep]
+
+
+def _worker_block_neighbors(user_idx: np.ndarray, k: int) -> tuple:
+    return _block_neighbors(_worker_matrix, user_idx, k)
+
+
+class UserNeighborGraph:
+    """
+    Persisted user -> top-k neighbor graph under cosine similarity, the neighbors the user-based
+    KNN model finds, precomputed for every user at training time.
+
+    A full build scores the users in blocks of `block_size`, spread over a process pool. A refresh
+    against a newer rating matrix re-scores only what the changes can affect: users whose ratings
+    changed get their rows recomputed in full, and the users sharing an anime with them, found
+    through the anime -> users inverted index, either get their row recomputed (when it held a
+    changed user, whose similarity may have dropped) or have the new similarities to the changed
+    users merged into their stored row. Every other row is carried over unchanged. A refreshed
+    graph equals a rebuilt one up to the choice among exactly tied k-th neighbors.
+    """
+    def __init__(self, k: int = 50, block_size: int = 512, n_workers: int = None):
+        """
+        Args:
+            k (int): Neighbors kept per user. Defaults to 50.
+            block_size (int): Users scored per task, fewer when their dense scores would exceed 64 MB. Defaults to 512.
+            n_workers (int, optional): Worker processes. Defaults to every available core; 0 scores in the calling process.
+        """
+        self.k = k
+        self.block_size = block_size
+        self.n_workers = n_workers
+        self.user_ids = None
+        self.anime_ids = None
+        self.ratings = None
+        self.neighbors = None
+
+    @property
+    def n_users(self) -> int:
+        return 0 if self.neighbors is None else self.neighbors.shape[0]
+
+    def _compute(self, normalized: csr_matrix, user_idx: np.ndarray) -> tuple:
+        """Neighbor triplets of the given users, scored in blocks."""
+        block_size = max(1, min(self.block_size, _MAX_BLOCK_CELLS // max(1, normalized.shape[0])))
+        blocks = [user_idx[start:start + block_size] for start in range(0, len(user_idx), block_size)]
+        if self.n_workers == 0 or len(blocks) <= 1:
+            results = [_block_neighbors(normalized, block, self.k) for block in blocks]
+        else:
+            with tempfile.TemporaryDirectory(prefix="neighbor_graph_") as data_dir:
+                _save_csr(data_dir, 'normalized', normalized)
+                with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker, initargs=(data_dir,)) as executor:
+                    results = list(executor.map(_worker_block_neighbors, blocks, [self.k] * len(blocks)))
+        if not results:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return tuple(np.concatenate([result[part] for result in results]) for part in range(3))
+
+    def _set(self, ratings: csr_matrix, vocabulary, rows, cols, sims) -> None:
+        n_users, n_items = ratings.shape
+        self.ratings = ratings
+        self.user_ids = np.asarray(vocabulary.user_ids[:n_users]).copy()
+        self.anime_ids = np.asarray(vocabulary.anime_ids[:n_items]).copy()
+        self.neighbors = csr_matrix((sims.astype(np.float32), (rows, cols)), shape=(n_users, n_users))
+
+    def build(self, user_item_matrix: csr_matrix, vocabulary) -> dict:
+        """
+        Computes the neighbors of every user.
+
+        Args:
+            user_item_matrix (csr_matrix): (n_users x n_rated_anime) ratings indexed by vocabulary indices.
+            vocabulary (IdVocabulary): The vocabulary the matrix is indexed by.
+
+        Returns:
+            dict: Build report, with every row counted as recomputed.
+        """
+        try:
+            start = time.perf_counter()
+            ratings = csr_matrix(user_item_matrix, dtype=np.float32)
+            n_users = ratings.shape[0]
+            rows, cols, sims = self._compute(normalize(ratings, norm='l2', axis=1), np.arange(n_users))
+            self._set(ratings, vocabulary, rows, cols, sims)
+            report = {
+                'mode': 'full', 'k': self.k, 'users': n_users, 'rows_recomputed': n_users, 'rows_merged': 0, 'rows_reused': 0,
+                'full_rebuild_rows': n_users, 'recomputed_fraction': 1.0, 'seconds': time.perf_counter() - start,
+            }
+            logging.info(f"User neighbor graph built for {n_users} users with k={self.k} in {report['seconds']:.2f}s")
+            return report
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def refresh(self, user_item_matrix: csr_matrix, vocabulary) -> dict:
+        """
+        Updates the graph to a newer rating matrix, which may index users and anime differently;
+        the two are aligned by raw user and anime IDs.
+
+        Args:
+            user_item_matrix (csr_matrix): (n_users x n_rated_anime) ratings indexed by vocabulary indices.
+            vocabulary (IdVocabulary): The vocabulary the matrix is indexed by.
+
+        Returns:
+            dict: Refresh report: rows recomputed, merged and carried over, against the rows of a full rebuild.
+        """
+        try:
+            start = time.perf_counter()
+            new = csr_matrix(user_item_matrix, dtype=np.float32)
+            n_users, n_items = new.shape
+
+            # Previous users and anime in the new index space, -1 where they are gone
+            user_map = np.asarray(vocabulary.user_index(self.user_ids), dtype=np.int64)
+            user_map[user_map >= n_users] = -1
+            anime_map = np.asarray(vocabulary.anime_index(self.anime_ids), dtype=np.int64)
+            anime_map[anime_map >= n_items] = -1
+            old = self.ratings.tocoo()
+            old_users = user_map[old.row]
+            dropped_anime = anime_map[old.col] < 0
+            keep = (old_users >= 0) & ~dropped_anime
+            old_aligned = csr_matrix((old.data[keep], (old_users[keep], anime_map[old.col[keep]])), shape=new.shape)
+
+            # Users whose rating vectors changed, including new users and raters of anime that are gone
+            difference = abs(new - old_aligned)
+            difference.eliminate_zeros()
+            changed = np.diff(difference.indptr) > 0
+            changed[old_users[dropped_anime & (old_users >= 0)]] = True
+            known = np.zeros(n_users, dtype=bool)
+            known[user_map[user_map >= 0]] = True
+            changed |= ~known
+            changed_idx = np.flatnonzero(changed)
+
+            # Stored neighbor lists in the new index space; lists that lost a removed user are recomputed
+            stored = self.neighbors.tocoo()
+            stored_rows, stored_cols = user_map[stored.row], user_map[stored.col]
+            recompute = changed.copy()
+            recompute[stored_rows[(stored_rows >= 0) & (stored_cols < 0)]] = True
+            keep = (stored_rows >= 0) & (stored_cols >= 0)
+            stored_rows, stored_cols, stored_sims = stored_rows[keep], stored_cols[keep], stored.data[keep]
+
+            # Users sharing an anime with a changed user, before or after the change, via the inverted index
+            affected_anime = np.union1d(new[changed_idx].indices, old_aligned[changed_idx].indices)
+            candidates = np.zeros(n_users, dtype=bool)
+            for matrix in (new, old_aligned):
+                candidates[matrix.tocsc()[:, affected_anime].indices] = True
+            candidates &= ~changed
+            # A changed user in a stored list may have become less similar, so the list is rebuilt
+            recompute[stored_rows[changed[stored_cols]]] = True
+            merge = candidates & ~recompute
+
+            normalized = normalize(new, norm='l2', axis=1)
+            recompute_idx, merge_idx = np.flatnonzero(recompute), np.flatnonzero(merge)
+            parts = [self._compute(normalized, recompute_idx)]
+            if len(merge_idx) and len(changed_idx):
+                product = (normalized[merge_idx] @ normalized[changed_idx].T).tocoo()
+                positive = product.data > 0
+                from_stored = merge[stored_rows]
+                parts.append(_top_k_entries(
+                    np.r_[merge_idx[product.row[positive]], stored_rows[from_stored]],
+                    np.r_[changed_idx[product.col[positive]], stored_cols[from_stored]],
+                    np.r_[product.data[positive], stored_sims[from_stored]], self.k
+                ))
+            reused = ~recompute[stored_rows] & ~merge[stored_rows]
+            parts.append((stored_rows[reused], stored_cols[reused], stored_sims[reused]))
+            rows, cols, sims = (np.concatenate([part[i] for part in parts]) for i in range(3))
+            self._set(new, vocabulary, rows, cols, sims)
+
+            report = {
+                'mode': 'incremental', 'k': self.k, 'users': n_users,
+                'new_users': int((~known).sum()), 'removed_users': int((user_map < 0).sum()),
+                'changed_users': int(changed.sum()), 'candidate_users': int(candidates.sum()),
+                'rows_recomputed': int(len(recompute_idx)), 'rows_merged': int(len(merge_idx)),
+                'rows_reused': int(n_users - len(recompute_idx) - len(merge_idx)), 'full_rebuild_rows': n_users,
+                'recomputed_fraction': len(recompute_idx) / n_users if n_users else 0.0, 'seconds': time.perf_counter() - start,
+            }
+            logging.info(f"User neighbor graph refreshed: {report['rows_recomputed']} of {n_users} rows recomputed, "
+                         f"{report['rows_merged']} merged, in {report['seconds']:.2f}s")
+            return report
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def neighbor_indices(self, user_idx, n_neighbors: int) -> np.ndarray:
+        """
+        Stored neighbors of users, laid out as NearestNeighbors.kneighbors returns them for the
+        users' own rows: the user first, then its n_neighbors - 1 most similar users. Rows with
+        fewer stored neighbors are padded with the user itself.
+
+        Args:
+            user_idx (np.ndarray): User indices.
+            n_neighbors (int): Columns of the result, at most k + 1.
+
+        Returns:
+            np.ndarray: (len(user_idx) x n_neighbors) user indices.
+        """
+        user_idx = np.atleast_1d(user_idx).astype(np.int64)
+        rows = self.neighbors[user_idx].tocoo()
+        rows, cols, _ = _top_k_entries(rows.row.astype(np.int64), rows.col.astype(np.int64), rows.data, n_neighbors - 1)
+        indices = np.repeat(user_idx[:, None], n_neighbors, axis=1)
+        starts = np.searchsorted(rows, np.arange(len(user_idx)))
+        indices[rows, 1 + np.arange(len(rows)) - starts[rows]] = cols
+        return indices
@@ -0,0 +1,106 @@
+import numpy as np
+
+# Results ranked by the first selection of a cursor, however small its first page; a selection
+# pass costs about the same for any chunk size, so a few pages are ranked at once
+MIN_CHUNK_SIZE: int = 256
+# Growth of the chunk ranked by each further selection pass
+CHUNK_GROWTH: int = 4
+
+
+class RankedCursor:
+    """
+    Pages through a ranking, best first, ranking only as far as the pages read so far need.
+
+    Over a score vector the ranking is built by incremental partial selection: the first read
+    argpartitions the finite scores for the first chunk of results, and every later refill selects
+    the next, CHUNK_GROWTH times larger chunk from the candidates still unranked, so the scores are
+    computed once and reading r results costs O(log(r)) linear passes plus sorting the r results.
+    Results are ordered by descending score, ties by lower index. Over a precomputed ranked list
+    the cursor only slices it. Pages are handed to `format_fn`, e.g. to wrap their indices as
+    Recommendations.
+    """
+    def __init__(self, scores: np.ndarray, format_fn=None):
+        """
+        Args:
+            scores (np.ndarray): Score of every candidate; -inf and NaN mark excluded candidates.
+            format_fn (callable, optional): Maps an array of ranked indices to a page. Defaults to returning the indices.
+        """
+        self.scores = np.asarray(scores)
+        self.format_fn = format_fn
+        self.offset = 0
+        self._ranked = np.empty(0, dtype=np.int64)
+        self._unranked = np.flatnonzero(np.isfinite(self.scores))
+        self._unranked_scores = self.scores[self._unranked]
+        self._chunk_size = 0
+
+    @classmethod
+    def from_ranked(cls, ranked, format_fn=None) -> "RankedCursor":
+        """
+        A cursor over an already ranked list, such as a precomputed ordering or a stored top-N list.
+
+        Args:
+            ranked (np.ndarray): Indices, best first.
+            format_fn (callable, optional): Maps an array of ranked indices to a page. Defaults to returning the indices.
+        """
+        cursor = cls(np.empty(0), format_fn)
+        cursor._ranked = np.asarray(ranked, dtype=np.int64)
+        return cursor
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether every result has been read."""
+        return self.offset >= len(self._ranked) and not len(self._unranked)
+
+    def _select_next_chunk(self, needed: int) -> None:
+        """Ranks the best `needed` or more of the unranked candidates and appends them to the ranking."""
+        unranked, scores = self._unranked, self._unranked_scores
+        size = min(len(unranked), max(needed, CHUNK_GROWTH * self._chunk_size, MIN_CHUNK_SIZE))
+        self._chunk_size = size
+        if size < len(unranked):
+            kth = scores[np.argpartition(-scores, size - 1)[size - 1]]
+            take = scores > kth
+            # Of the candidates tied at the boundary, the lowest indices are taken
+            tied = np.flatnonzero(scores == kth)
+            take[tied[np.argsort(unranked[tied], kind='stable')][:size - take.sum()]] = True
+        else:
+            take = np.ones(len(unranked), dtype=bool)
+        chunk = unranked[take]
+        self._unranked, self._unranked_scores = unranked[~take], scores[~take]
+        self._ranked = np.concatenate([self._ranked, chunk[np.lexsort((chunk, -scores[take]))]])
+
+    def next_indices(self, size: int) -> np.ndarray:
+        """
+        Advances the cursor by up to `size` results.
+
+        Returns:
+            np.ndarray: The next ranked indices; empty once the cursor is exhausted.
+        """
+        needed = self.offset + size - len(self._ranked)
+        if needed > 0 and len(self._unranked):
+            self._select_next_chunk(needed)
+        indices = self._ranked[self.offset:self.offset + size]
+        self.offset += len(indices)
+        return indices
+
+    def next_page(self, size: int):
+        """
+        Advances the cursor by up to `size` results.
+
+        Returns:
+            The formatted page; empty once the cursor is exhausted.
+        """
+        indices = self.next_indices(size)
+        return indices if self.format_fn is None else self.format_fn(indices)
+
+    def pages(self, page_size: int, limit: int = None):
+        """
+        Yields formatted pages of `page_size` results until the ranking, or `limit` results, run out.
+
+        Args:
+            page_size (int): Results per page.
+            limit (int, optional): Total results to read from the current offset. Defaults to every result.
+        """
+        end = None if limit is None else self.offset + limit
+        while not self.exhausted and (end is None or self.offset < end):
+            size = page_size if end is None else min(page_size, end - self.offset)
+            yield self.next_page(size)
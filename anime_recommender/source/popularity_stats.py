@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+from scipy.sparse import csr_matrix
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+
+
+def _top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n highest finite scores, best first, with a partial sort."""
+    candidates = np.flatnonzero(np.isfinite(scores))
+    if len(candidates) > n:
+        candidates = candidates[np.argpartition(-scores[candidates], n - 1)[:n]]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class Leaderboard:
+    """
+    Top `capacity` anime by a score that changes with every rating event.
+
+    Updates only mark the leaderboard stale; the next read re-selects the top entries with a
+    partial sort, at most once per `refresh_seconds`, so a burst of events costs one O(n_anime)
+    selection rather than one per event. Reads may therefore lag updates by up to `refresh_seconds`.
+    """
+    def __init__(self, score_fn, capacity: int, refresh_seconds: float):
+        """
+        Args:
+            score_fn (callable): Returns the current score of every anime; -inf excludes an anime.
+            capacity (int): Largest n that can be requested.
+            refresh_seconds (float): Minimum time between two re-selections.
+        """
+        self.score_fn = score_fn
+        self.capacity = capacity
+        self.refresh_seconds = refresh_seconds
+        self.rebuilds = 0
+        self._top = None
+        self._stale = True
+        self._built_at = 0.0
+
+    def mark_stale(self) -> None:
+        self._stale = True
+
+    def top(self, n: int) -> tuple:
+        """
+        Returns:
+            tuple: (anime indices, scores) of the n best anime, best first.
+        """
+        top = self._top
+        now = time.monotonic()
+        if top is None or (self._stale and now - self._built_at >= self.refresh_seconds):
+            # Cleared before scoring, so an update landing meanwhile marks it stale again
+            self._stale = False
+            scores = self.score_fn()
+            anime_idx = _top_n(scores, self.capacity)
+            top = self._top = (anime_idx, scores[anime_idx])
+            self._built_at = now
+            self.rebuilds += 1
+        return top[0][:n], top[1][:n]
+
+
+class PopularityStatistics:
+    """
+    Per-anime rating counts, sums and running averages kept up to date from the rating stream.
+
+    Each event changes its anime's count and sum in O(1): a new rating adds one rating and its
+    value, a changed rating only adds the difference. Two leaderboards are maintained over them:
+    the most rated anime, and the best average rating among anime with at least `min_ratings`
+    ratings. The aggregates can be saved to disk together with the event log offset they include,
+    so a restarted service resumes from there instead of replaying the whole log into them.
+    """
+    def __init__(self, anime_ids, counts=None, sums=None, offset: int = 0, min_ratings: int = 10,
+                 capacity: int = 100, refresh_seconds: float = 1.0, snapshot_path: str = None, snapshot_seconds: float = 60.0):
+        """
+        Args:
+            anime_ids (np.ndarray): Raw anime ID of every index, i.e. the vocabulary's rated anime.
+            counts (np.ndarray, optional): Ratings per anime. Defaults to zeros.
+            sums (np.ndarray, optional): Sum of the ratings per anime. Defaults to zeros.
+            offset (int): Rating event log offset the aggregates include events up to. Defaults to 0.
+            min_ratings (int): Ratings an anime needs to enter the top rated leaderboard. Defaults to 10.
+            capacity (int): Largest leaderboard size served. Defaults to 100.
+            refresh_seconds (float): Minimum time between two leaderboard re-selections. Defaults to 1.
+            snapshot_path (str, optional): File the aggregates are saved to as events are folded in.
+            snapshot_seconds (float): Minimum time between two saves to snapshot_path. Defaults to 60.
+        """
+        self.anime_ids = np.asarray(anime_ids, dtype=np.int64)
+        self.counts = np.zeros(len(self.anime_ids), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self.sums = np.zeros(len(self.anime_ids), dtype=np.float64) if sums is None else np.asarray(sums, dtype=np.float64)
+        self.offset = offset
+        self.min_ratings = min_ratings
+        self.snapshot_path = snapshot_path
+        self.snapshot_seconds = snapshot_seconds
+        self.events = 0
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.most_rated = Leaderboard(lambda: self.counts.astype(np.float64), capacity, refresh_seconds)
+        self.top_rated = Leaderboard(self._rated_averages, capacity, refresh_seconds)
+
+    @classmethod
+    def from_ratings(cls, user_item_matrix: csr_matrix, vocabulary, **kwargs) -> "PopularityStatistics":
+        """
+        Aggregates an (n_users x n_rated_anime) rating matrix.
+
+        Args:
+            user_item_matrix (csr_matrix): Ratings indexed by vocabulary indices.
+            vocabulary (IdVocabulary): The vocabulary the matrix is indexed by.
+            **kwargs: Further PopularityStatistics arguments.
+        """
+        n_items = user_item_matrix.shape[1]
+        counts = np.bincount(user_item_matrix.indices, minlength=n_items)
+        sums = np.bincount(user_item_matrix.indices, weights=user_item_matrix.data.astype(np.float64), minlength=n_items)
+        return cls(vocabulary.anime_ids[:n_items], counts, sums, **kwargs)
+
+    def averages(self) -> np.ndarray:
+        """Running average rating per anime, NaN for anime without ratings."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sums / self.counts
+
+    def _rated_averages(self) -> np.ndarray:
+        averages = self.averages()
+        averages[~(self.counts >= self.min_ratings)] = -np.inf
+        return averages
+
+    def update(self, anime_idx, ratings, previous, offset: int = None) -> None:
+        """
+        Folds a batch of rating events in; usable as a LiveRatings listener.
+
+        Args:
+            anime_idx (np.ndarray): Anime index of each event.
+            ratings (np.ndarray): New rating of each event.
+            previous (np.ndarray): Rating each event replaces, 0 for a new (user, anime) pair.
+            offset (int, optional): Log offset the batch ends at. Batches ending at or before the
+                                    offset already included are ignored.
+        """
+        if offset is not None and offset <= self.offset:
+            return
+        anime_idx = np.asarray(anime_idx)
+        previous = np.asarray(previous, dtype=np.float64)
+        with self._lock:
+            np.add.at(self.counts, anime_idx, (previous == 0).astype(np.int64))
+            np.add.at(self.sums, anime_idx, np.asarray(ratings, dtype=np.float64) - previous)
+            self.events += len(anime_idx)
+            if offset is not None:
+                self.offset = offset
+        self.most_rated.mark_stale()
+        self.top_rated.mark_stale()
+        if self.snapshot_path is not None and time.monotonic() - self._saved_at >= self.snapshot_seconds:
+            self.save()
+
+    def save(self, file_path: str = None) -> None:
+        """
+        Writes the aggregates and their log offset, replacing any previous snapshot atomically.
+
+        Args:
+            file_path (str, optional): Snapshot file. Defaults to snapshot_path.
+        """
+        try:
+            file_path = file_path or self.snapshot_path
+            with self._lock:
+                arrays = {'anime_ids': self.anime_ids, 'counts': self.counts.copy(), 'sums': self.sums.copy(), 'offset': np.int64(self.offset)}
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            temp_path = f"{file_path}.tmp"
+            with open(temp_path, 'wb') as snapshot_file:
+                np.savez(snapshot_file, **arrays)
+            os.replace(temp_path, file_path)
+            self._saved_at = time.monotonic()
+            logging.info(f"Popularity statistics saved to {file_path} at offset {arrays['offset']}")
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @classmethod
+    def restore(cls, file_path: str, vocabulary, **kwargs) -> "PopularityStatistics":
+        """
+        Loads a snapshot written by `save`, aligned to the vocabulary's rated anime. Anime missing
+        from the snapshot start without ratings.
+
+        Args:
+            file_path (str): Snapshot file.
+            vocabulary (IdVocabulary): The vocabulary the statistics are indexed by.
+            **kwargs: Further PopularityStatistics arguments.
+        """
+        try:
+            with np.load(file_path) as snapshot:
+                anime_ids, counts, sums, offset = snapshot['anime_ids'], snapshot['counts'], snapshot['sums'], int(snapshot['offset'])
+            current_ids = vocabulary.anime_ids[:vocabulary.n_rated_anime]
+            aligned_counts = np.zeros(len(current_ids), dtype=np.int64)
+            aligned_sums = np.zeros(len(current_ids), dtype=np.float64)
+            anime_idx = vocabulary.anime_index(anime_ids)
+            known = (anime_idx >= 0) & (anime_idx < vocabulary.n_rated_anime)
+            aligned_counts[anime_idx[known]] = counts[known]
+            aligned_sums[anime_idx[known]] = sums[known]
+            logging.info(f"Popularity statistics restored from {file_path} at offset {offset}")
+            return cls(current_ids, aligned_counts, aligned_sums, offset=offset, **kwargs)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def stats(self) -> dict:
+        return {
+            'offset': self.offset,
+            'events': self.events,
+            'ratings': int(self.counts.sum()),
+            'leaderboard_rebuilds': {'most_rated': self.most_rated.rebuilds, 'top_rated': self.top_rated.rebuilds},
+        }
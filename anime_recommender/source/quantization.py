@@ -0,0 +1,288 @@
+import io
+import sys
+import copy
+import time
+import joblib
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.source.embeddings import EmbeddingKNN
+
+SUPPORTED_DTYPES = ('float16', 'int8')
+
+
+def _check_dtype(dtype: str):
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported quantization dtype '{dtype}'. Choose from {SUPPORTED_DTYPES}.")
+
+
+class QuantizedMatrix:
+    """
+    Dense matrix stored as float16, or as int8 with one float32 scale per row.
+
+    Indexing returns dequantized float32 rows, so callers written against NumPy arrays
+    (`matrix[rows]`, `matrix[rows] @ vector`) work unchanged.
+    """
+    def __init__(self, values: np.ndarray, scales: np.ndarray = None):
+        self.values = values
+        self.scales = scales
+
+    @classmethod
+    def from_array(cls, array, dtype: str) -> "QuantizedMatrix":
+        """
+        Quantizes a dense 2D array.
+
+        Args:
+            array (np.ndarray): The full-precision matrix.
+            dtype (str): 'float16' or 'int8'.
+
+        Returns:
+            QuantizedMatrix: The quantized matrix.
+        """
+        _check_dtype(dtype)
+        array = np.asarray(array, dtype=np.float32)
+        if dtype == 'float16':
+            return cls(array.astype(np.float16))
+        scales = np.abs(array).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        values = np.rint(array / scales[:, None]).astype(np.int8)
+        return cls(values, scales.astype(np.float32))
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        values = self.values[rows].astype(np.float32)
+        if self.scales is None:
+            return values
+        scales = self.scales[rows]
+        return values * (scales[..., None] if np.ndim(scales) else scales)
+
+    def to_array(self) -> np.ndarray:
+        """Dequantizes the whole matrix to float32."""
+        return self[:]
+
+
+class QuantizedSparseMatrix:
+    """
+    CSR matrix whose stored values are float16, or int8 with one float32 scale per row.
+    """
+    def __init__(self, data, indices, indptr, shape, scales=None):
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = shape
+        self.scales = scales
+
+    @classmethod
+    def from_csr(cls, matrix, dtype: str) -> "QuantizedSparseMatrix":
+        """
+        Quantizes the stored values of a sparse matrix.
+
+        Args:
+            matrix (scipy.sparse matrix): The full-precision sparse matrix.
+            dtype (str): 'float16' or 'int8'.
+
+        Returns:
+            QuantizedSparseMatrix: The quantized matrix.
+        """
+        _check_dtype(dtype)
+        matrix = csr_matrix(matrix, dtype=np.float32)
+        matrix.sort_indices()
+        indices = matrix.indices.astype(np.int32)
+        indptr = matrix.indptr.astype(np.int64)
+        if dtype == 'float16':
+            return cls(matrix.data.astype(np.float16), indices, indptr, matrix.shape)
+        row_lengths = np.diff(indptr)
+        scales = np.ones(matrix.shape[0], dtype=np.float32)
+        non_empty = row_lengths > 0
+        if matrix.nnz:
+            scales[non_empty] = np.maximum.reduceat(np.abs(matrix.data), indptr[:-1][non_empty]) / 127.0
+        scales[scales == 0] = 1.0
+        data = np.rint(matrix.data / np.repeat(scales, row_lengths)).astype(np.int8)
+        return cls(data, indices, indptr, matrix.shape, scales)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    @property
+    def nbytes(self) -> int:
+        scales = self.scales.nbytes if self.scales is not None else 0
+        return self.data.nbytes + self.indices.nbytes + self.indptr.nbytes + scales
+
+    def to_csr(self) -> csr_matrix:
+        """Dequantizes to a float32 CSR matrix."""
+        data = self.data.astype(np.float32)
+        if self.scales is not None:
+            data *= np.repeat(self.scales, np.diff(self.indptr))
+        return csr_matrix((data, self.indices, self.indptr), shape=self.shape)
+
+
+class QuantizedSVDModel:
+    """
+    Compact replacement for a trained Surprise SVD model holding only what ranking needs:
+    biases, quantized factor matrices and the raw IDs of the inner user/item indices.
+    """
+    def __init__(self, svd_model, dtype: str):
+        """
+        Args:
+            svd_model (surprise.SVD): The trained full-precision model.
+            dtype (str): 'float16' or 'int8'.
+        """
+        try:
+            trainset = svd_model.trainset
+            self.dtype = dtype
+            self.global_mean = float(trainset.global_mean)
+            self.rating_scale = trainset.rating_scale
+            self.bu = np.asarray(svd_model.bu, dtype=np.float32)
+            self.bi = np.asarray(svd_model.bi, dtype=np.float32)
+            self.pu = QuantizedMatrix.from_array(svd_model.pu, dtype)
+            self.qi = QuantizedMatrix.from_array(svd_model.qi, dtype)
+            self.raw_user_ids = self._raw_ids(trainset._raw2inner_id_users)
+            self.raw_item_ids = self._raw_ids(trainset._raw2inner_id_items)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @staticmethod
+    def _raw_ids(raw2inner: dict) -> np.ndarray:
+        raw_ids = np.empty(len(raw2inner), dtype=np.float64)
+        raw_ids[np.fromiter(raw2inner.values(), dtype=np.int64, count=len(raw2inner))] = np.fromiter(
+            raw2inner.keys(), dtype=np.float64, count=len(raw2inner)
+        )
+        return raw_ids
+
+
+class QuantizedNearestNeighbors:
+    """
+    Brute-force cosine nearest neighbors over a quantized, L2-normalized training matrix.
+
+    Drop-in replacement for a fitted `NearestNeighbors(metric='cosine', algorithm='brute')`;
+    the training matrix is dequantized on the fly for each kneighbors call.
+    """
+    def __init__(self, knn_model, dtype: str):
+        """
+        Args:
+            knn_model (NearestNeighbors): The fitted full-precision model.
+            dtype (str): 'float16' or 'int8'.
+        """
+        try:
+            self.dtype = dtype
+            self.n_neighbors = knn_model.n_neighbors
+            self.fit_matrix = QuantizedSparseMatrix.from_csr(normalize(csr_matrix(knn_model._fit_X)), dtype)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @property
+    def n_samples_fit_(self) -> int:
+        return self.fit_matrix.shape[0]
+
+    def kneighbors(self, X, n_neighbors=None, return_distance=True):
+        """
+        Finds the nearest training rows of each query row by cosine distance.
+
+        Args:
+            X (array-like or sparse matrix): Query rows.
+            n_neighbors (int, optional): Number of neighbors. Defaults to the fitted model's value.
+            return_distance (bool): Whether to return distances. Defaults to True.
+
+        Returns:
+            tuple: (distances, indices), or only indices when return_distance is False.
+        """
+        n_neighbors = min(n_neighbors or self.n_neighbors, self.n_samples_fit_)
+        queries = normalize(csr_matrix(X, dtype=np.float32))
+        similarities = (queries @ self.fit_matrix.to_csr().T).toarray()
+        indices = np.argpartition(-similarities, n_neighbors - 1, axis=1)[:, :n_neighbors]
+        order = np.argsort(-np.take_along_axis(similarities, indices, axis=1), axis=1, kind='stable')
+        indices = np.take_along_axis(indices, order, axis=1)
+        if not return_distance:
+            return indices
+        return 1.0 - np.take_along_axis(similarities, indices, axis=1), indices
+
+
+def quantize_model(model, dtype: str):
+    """
+    Quantizes any of the saved recommender artifacts.
+
+    Args:
+        model: A Surprise SVD model, a fitted NearestNeighbors or EmbeddingKNN model, a sparse
+               neighbor table, a content-based (tfv, cosine_sim) tuple, or a dense matrix.
+        dtype (str): 'float16' or 'int8'.
+
+    Returns:
+        The quantized counterpart of the artifact.
+    """
+    try:
+        _check_dtype(dtype)
+        if hasattr(model, 'trainset') and hasattr(model, 'qi'):
+            return QuantizedSVDModel(model, dtype)
+        if isinstance(model, EmbeddingKNN):
+            quantized = copy.copy(model)
+            quantized.embeddings = QuantizedMatrix.from_array(model.embeddings, dtype)
+            return quantized
+        if hasattr(model, 'kneighbors'):
+            return QuantizedNearestNeighbors(model, dtype)
+        if isinstance(model, tuple):
+            tfv, cosine_sim = model
+            return tfv, QuantizedMatrix.from_array(cosine_sim, dtype)
+        if hasattr(model, 'tocsr'):
+            return QuantizedSparseMatrix.from_csr(model, dtype)
+        return QuantizedMatrix.from_array(model, dtype)
+    except Exception as e:
+        raise AnimeRecommendorException(e, sys)
+
+
+def quantization_report(full_model, quantized_model, rank_fn, queries, n: int = 10) -> dict:
+    """
+    Compares a full-precision artifact with its quantized counterpart.
+
+    Args:
+        full_model: The full-precision artifact.
+        quantized_model: The quantized artifact.
+        rank_fn (callable): rank_fn(model, query) returning ranked item indices for one query.
+        queries (list): Queries (user or item indices) to score.
+        n (int): Top-N cutoff for the overlap measurement. Defaults to 10.
+
+    Returns:
+        dict: Artifact size, load time, scoring throughput and mean top-N overlap.
+    """
+    try:
+        report = {'n': n, 'n_queries': len(queries)}
+        rankings = {}
+        for label, model in (('full', full_model), ('quantized', quantized_model)):
+            buffer = io.BytesIO()
+            joblib.dump(model, buffer)
+            payload = buffer.getvalue()
+            start = time.perf_counter()
+            joblib.load(io.BytesIO(payload))
+            load_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rankings[label] = [np.asarray(rank_fn(model, query))[:n] for query in queries]
+            score_seconds = time.perf_counter() - start
+            report[label] = {
+                'size_bytes': len(payload),
+                'load_seconds': load_seconds,
+                'queries_per_second': len(queries) / score_seconds if score_seconds > 0 else None,
+            }
+
+        overlaps = [
+            len(np.intersect1d(full, quantized)) / max(len(full), 1)
+            for full, quantized in zip(rankings['full'], rankings['quantized'])
+        ]
+        report['top_n_overlap'] = float(np.mean(overlaps)) if overlaps else None
+        report['size_ratio'] = report['quantized']['size_bytes'] / max(report['full']['size_bytes'], 1)
+        logging.info(f"Quantization report: {report}")
+        return report
+    except Exception as e:
+        raise AnimeRecommendorException(e, sys)
@@ -0,0 +1,375 @@
+import os
+import sys
+import json
+import time
+import threading
+import numpy as np
+from scipy.sparse import csr_matrix
+from anime_recommender.loggers.logging import logging, SAMPLED
+from anime_recommender.exception.exception import AnimeRecommendorException
+
+
+def _binary(matrix: csr_matrix) -> csr_matrix:
+    """Copy of a rating matrix with every stored rating replaced by 1."""
+    rated = matrix.copy()
+    rated.data = np.ones_like(rated.data)
+    return rated
+
+
+class RatingEventLog:
+    """
+    Append-only log of rating events, one JSON object per line, standing in for a message queue.
+
+    Producers append events; a serving process tails the file from a byte offset. Each append is
+    a single write on a file opened in append mode, so lines from concurrent writers do not
+    interleave, and readers only consume complete lines.
+    """
+    def __init__(self, file_path: str):
+        """
+        Args:
+            file_path (str): The log file, created on the first append.
+        """
+        self.file_path = file_path
+        self._lock = threading.Lock()
+
+    def append(self, events) -> int:
+        """
+        Appends rating events.
+
+        Args:
+            events (iterable): Dicts with 'user_id', 'anime_id' and 'rating', and optionally 'timestamp'
+                               (seconds since the epoch, the time of the append by default).
+
+        Returns:
+            int: Number of events written.
+        """
+        try:
+            now = time.time()
+            lines = [
+                json.dumps({
+                    'user_id': int(event['user_id']), 'anime_id': int(event['anime_id']),
+                    'rating': float(event['rating']), 'timestamp': float(event.get('timestamp', now)),
+                }) + "\n"
+                for event in events
+            ]
+            if not lines:
+                return 0
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            with self._lock, open(self.file_path, 'a', encoding='utf-8') as log_file:
+                log_file.write("".join(lines))
+            return len(lines)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def read(self, offset: int = 0, max_bytes: int = 16 * 1024 * 1024) -> tuple:
+        """
+        Reads the complete events written after a byte offset.
+
+        Args:
+            offset (int): Byte offset returned by the previous read, 0 for the start of the log.
+            max_bytes (int): Upper bound on the bytes read per call. Defaults to 16 MiB.
+
+        Returns:
+            tuple: (list of event dicts, offset to continue from). A log shorter than the offset,
+                   e.g. truncated by rotation, is read again from the start.
+        """
+        if not os.path.exists(self.file_path):
+            return [], 0
+        if os.path.getsize(self.file_path) < offset:
+            logging.warning(f"Rating event log {self.file_path} shrank below offset {offset}; reading it from the start")
+            offset = 0
+        with open(self.file_path, 'rb') as log_file:
+            log_file.seek(offset)
+            data = log_file.read(max_bytes)
+        # A trailing partial line is still being written; leave it for the next read
+        end = data.rfind(b"\n") + 1
+        events = []
+        for line in data[:end].splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logging.warning("Skipping malformed rating event %r", line[:200], extra=SAMPLED)
+        return events, offset + end
+
+
+class RatingsSnapshot:
+    """
+    Immutable view of the ratings: the compacted CSR matrix plus the ratings streamed in since.
+
+    Readers take the current snapshot once per request and never lock; writers publish a new
+    snapshot instead of modifying this one. Streamed ratings override the compacted rating of
+    the same (user, anime) pair.
+    """
+    __slots__ = ('base', 'base_rated', 'delta', 'added', '_rated')
+
+    def __init__(self, base: csr_matrix, base_rated: csr_matrix = None, delta: csr_matrix = None, added: csr_matrix = None):
+        """
+        Args:
+            base (csr_matrix): Compacted (n_users x n_rated_anime) rating matrix.
+            base_rated (csr_matrix, optional): Binary copy of base, built lazily when not given.
+            delta (csr_matrix, optional): Streamed ratings not yet compacted into base.
+            added (csr_matrix, optional): Binary matrix of the delta pairs that base has no rating for.
+        """
+        self.base = base
+        self.base_rated = base_rated
+        self.delta = delta if delta is not None and delta.nnz else None
+        self.added = added
+        self._rated = None
+
+    def rows(self, user_idx) -> csr_matrix:
+        """
+        Current rating rows of the given users.
+
+        Args:
+            user_idx (list or np.ndarray): User indices.
+
+        Returns:
+            csr_matrix: (len(user_idx) x n_rated_anime) ratings including streamed ones.
+        """
+        rows = self.base[user_idx]
+        if self.delta is None:
+            return rows
+        delta = self.delta[user_idx]
+        if delta.nnz == 0:
+            return rows
+        merged = (rows - rows.multiply(_binary(delta)) + delta).tocsr()
+        merged.eliminate_zeros()
+        return merged
+
+    def rated(self) -> csr_matrix:
+        """Binary (n_users x n_rated_anime) matrix of every rated pair, including streamed ratings."""
+        if self._rated is None:
+            if self.base_rated is None:
+                self.base_rated = _binary(self.base)
+            self._rated = self.base_rated if self.delta is None or self.added.nnz == 0 else (self.base_rated + self.added).tocsr()
+        return self._rated
+
+    def merged(self) -> csr_matrix:
+        """The full rating matrix with the streamed ratings folded in."""
+        if self.delta is None:
+            return self.base
+        merged = (self.base - self.base.multiply(_binary(self.delta)) + self.delta).tocsr()
+        merged.eliminate_zeros()
+        return merged
+
+
+class LiveRatings:
+    """
+    Rating matrix that absorbs streamed rating events while it is being read.
+
+    Events are kept in a small delta buffer layered over the immutable CSR matrix loaded with the
+    model; every applied batch publishes a new RatingsSnapshot and bumps `generation`, and `compact`
+    periodically folds the delta into a new CSR matrix. Only users and anime in the vocabulary can be updated in place;
+    events for others are counted as skipped.
+    """
+    def __init__(self, user_item_matrix: csr_matrix, vocabulary):
+        """
+        Args:
+            user_item_matrix (csr_matrix): (n_users x n_rated_anime) rating matrix indexed by vocabulary indices.
+            vocabulary (IdVocabulary): The vocabulary the matrix is indexed by.
+        """
+        self.vocabulary = vocabulary
+        self.snapshot = RatingsSnapshot(user_item_matrix, _binary(user_item_matrix))
+        # (user index, anime index) -> (rating, whether the base matrix already rates the pair)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.updated_users = set()
+        self._listeners = []
+        # Number of batches that changed the ratings, so cached results can be keyed on it
+        self.generation = 0
+        self.events_applied = 0
+        self.events_skipped = 0
+        self.compactions = 0
+        self.last_compaction_seconds = None
+        self.last_event_timestamp = None
+
+    @property
+    def pending(self) -> int:
+        """Number of streamed (user, anime) ratings not yet compacted."""
+        return len(self._pending)
+
+    def has_updates(self, user_idx: int) -> bool:
+        """Whether streamed ratings changed the given user's history since the matrix was loaded."""
+        return user_idx in self.updated_users
+
+    def _publish(self, base: csr_matrix, base_rated: csr_matrix) -> None:
+        """Builds the snapshot of base plus the pending ratings and swaps it in. Caller holds the lock."""
+        if not self._pending:
+            self.snapshot = RatingsSnapshot(base, base_rated)
+            return
+        keys = np.array(list(self._pending.keys()), dtype=np.int64)
+        values = np.array(list(self._pending.values()), dtype=np.float64)
+        delta = csr_matrix((values[:, 0].astype(np.float32), (keys[:, 0], keys[:, 1])), shape=base.shape)
+        new = values[:, 1] == 0
+        added = csr_matrix((np.ones(new.sum(), dtype=np.float32), (keys[new, 0], keys[new, 1])), shape=base.shape)
+        self.snapshot = RatingsSnapshot(base, base_rated, delta, added)
+
+    def add_listener(self, listener) -> None:
+        """
+        Registers a callable notified of every applied batch, e.g. to keep aggregates in step with the ratings.
+
+        Args:
+            listener (callable): Called as listener(anime_idx, ratings, previous, offset) with the anime
+                                 index, new rating and replaced rating (0 for a new pair) of each applied
+                                 event, and the log offset the batch ends at, while the batch is applied.
+        """
+        self._listeners.append(listener)
+
+    def apply(self, events: list, offset: int = None) -> set:
+        """
+        Applies a batch of rating events and publishes the resulting snapshot.
+
+        Args:
+            events (list): Event dicts as read from a RatingEventLog. A later rating of the same
+                           (user, anime) pair replaces the earlier one, so replaying events is harmless.
+            offset (int, optional): Log offset the batch ends at, passed on to the listeners.
+
+        Returns:
+            set: Raw IDs of the users whose ratings changed.
+        """
+        if not events:
+            return set()
+        user_ids = np.array([event['user_id'] for event in events], dtype=np.int64)
+        anime_ids = np.array([event['anime_id'] for event in events], dtype=np.int64)
+        ratings = np.array([event['rating'] for event in events], dtype=np.float64)
+        user_idx = self.vocabulary.user_index(user_ids)
+        anime_idx = self.vocabulary.anime_index(anime_ids)
+        keep = (user_idx >= 0) & (anime_idx >= 0) & (anime_idx < self.vocabulary.n_rated_anime) & np.isfinite(ratings) & (ratings != 0)
+        with self._lock:
+            self.events_skipped += int((~keep).sum())
+            if keep.any():
+                user_idx, anime_idx, ratings = user_idx[keep], anime_idx[keep], ratings[keep]
+                base = self.snapshot.base
+                base_ratings = np.asarray(base[user_idx, anime_idx], dtype=np.float64).ravel()
+                previous = np.empty(len(ratings), dtype=np.float64)
+                for i, key in enumerate(zip(user_idx.tolist(), anime_idx.tolist())):
+                    pending = self._pending.get(key)
+                    previous[i] = pending[0] if pending is not None else base_ratings[i]
+                    self._pending[key] = (ratings[i], base_ratings[i] != 0)
+                self.updated_users.update(user_idx.tolist())
+                self.events_applied += int(keep.sum())
+                self._publish(base, self.snapshot.base_rated)
+                self.generation += 1
+                for listener in self._listeners:
+                    listener(anime_idx, ratings, previous, offset)
+            self.last_event_timestamp = events[-1].get('timestamp', self.last_event_timestamp)
+        return set(user_ids[keep].tolist())
+
+    def compact(self) -> None:
+        """
+        Folds the pending ratings into a new CSR matrix. The merge runs outside the lock, so reads
+        keep using the previous snapshot and events keep being applied meanwhile.
+        """
+        with self._lock:
+            snapshot = self.snapshot
+            compacted = dict(self._pending)
+        if not compacted:
+            return
+        start = time.perf_counter()
+        base = snapshot.merged()
+        base_rated = _binary(base)
+        with self._lock:
+            # Ratings applied during the merge, or changed since, stay pending over the new matrix
+            remaining = {key: value for key, value in self._pending.items() if compacted.get(key, (None,))[0] != value[0]}
+            if remaining:
+                keys = np.array(list(remaining.keys()), dtype=np.int64)
+                in_base = np.asarray(base[keys[:, 0], keys[:, 1]]).ravel() != 0
+                remaining = {key: (value[0], bool(known)) for (key, value), known in zip(remaining.items(), in_base)}
+            self._pending = remaining
+            self._publish(base, base_rated)
+            self.compactions += 1
+            self.last_compaction_seconds = time.perf_counter() - start
+        logging.info(f"Compacted {len(compacted)} streamed ratings into the rating matrix in {self.last_compaction_seconds:.3f}s")
+
+    def stats(self) -> dict:
+        """Counters of the applied events and compactions."""
+        return {
+            'generation': self.generation,
+            'events_applied': self.events_applied,
+            'events_skipped': self.events_skipped,
+            'pending': self.pending,
+            'updated_users': len(self.updated_users),
+            'compactions': self.compactions,
+            'last_compaction_seconds': self.last_compaction_seconds,
+            'lag_seconds': time.time() - self.last_event_timestamp if self.last_event_timestamp is not None else None,
+        }
+
+
+class RatingEventTailer:
+    """
+    Background thread tailing a RatingEventLog into LiveRatings, compacting the delta whenever it
+    grows past a threshold or has been pending for too long.
+    """
+    def __init__(self, event_log: RatingEventLog, live_ratings: LiveRatings, poll_seconds: float = 0.5,
+                 compact_threshold: int = 50000, compact_seconds: float = 60.0, on_apply=None):
+        """
+        Args:
+            event_log (RatingEventLog): The log to tail, from its start.
+            live_ratings (LiveRatings): The ratings to update.
+            poll_seconds (float): Wait between reads once the log is exhausted. Defaults to 0.5.
+            compact_threshold (int): Pending ratings that trigger a compaction. Defaults to 50000.
+            compact_seconds (float): Longest time ratings stay pending before a compaction. Defaults to 60.
+            on_apply (callable, optional): Called with the set of raw user IDs updated by each batch.
+        """
+        self.event_log = event_log
+        self.live_ratings = live_ratings
+        self.poll_seconds = poll_seconds
+        self.compact_threshold = compact_threshold
+        self.compact_seconds = compact_seconds
+        self.on_apply = on_apply
+        self.offset = 0
+        # Replayed reads stop at this offset, so that listeners restored from a snapshot taken
+        # there see batches that end exactly where they left off
+        self.resume_offset = 0
+        self._last_compaction = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self) -> int:
+        """
+        Applies every complete event written since the last poll and compacts when due.
+
+        Returns:
+            int: Number of events read.
+        """
+        n_events = 0
+        while True:
+            if self.offset < self.resume_offset:
+                events, self.offset = self.event_log.read(self.offset, max_bytes=self.resume_offset - self.offset)
+            else:
+                events, self.offset = self.event_log.read(self.offset)
+            if not events:
+                break
+            n_events += len(events)
+            user_ids = self.live_ratings.apply(events, offset=self.offset)
+            if user_ids and self.on_apply is not None:
+                self.on_apply(user_ids)
+        live = self.live_ratings
+        if live.pending >= self.compact_threshold or (live.pending and time.monotonic() - self._last_compaction >= self.compact_seconds):
+            live.compact()
+            self._last_compaction = time.monotonic()
+        return n_events
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logging.error("Error applying rating events from %s: %s", self.event_log.file_path, e, extra=SAMPLED)
+            self._stop.wait(self.poll_seconds)
+
+    def start(self) -> None:
+        """Replays the log and starts tailing it in a daemon thread."""
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name="rating-events", daemon=True)
+        self._thread.start()
+        logging.info(f"Tailing rating events from {self.event_log.file_path} at offset {self.offset}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {'file_path': self.event_log.file_path, 'offset': self.offset, **self.live_ratings.stats()}
@@ -0,0 +1,145 @@
+import os
+import sys
+import sqlite3
+import threading
+import numpy as np
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+
+# Let SQLite memory-map up to this many bytes of the store file for reads
+STORE_MMAP_SIZE: int = 1 << 30
+
+
+class RecommendationStore:
+    """
+    Embedded key-value store of materialized per-user top-N recommendation lists.
+
+    Backed by a single SQLite file keyed by (method, user_id). Each value holds the ranked raw
+    anime IDs (int32) and their scores (float32) as packed arrays. Readers open the file
+    read-only with memory-mapped I/O, so a lookup is a single primary-key probe.
+    """
+    def __init__(self, file_path: str, read_only: bool = True):
+        """
+        Opens an existing store.
+
+        Args:
+            file_path (str): Path of the SQLite store file.
+            read_only (bool): Open the file read-only. Defaults to True.
+        """
+        try:
+            self.file_path = file_path
+            self.read_only = read_only
+            uri = f"file:{file_path}?mode=ro" if read_only else f"file:{file_path}"
+            self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._connection.execute(f"PRAGMA mmap_size={STORE_MMAP_SIZE}")
+            self._lock = threading.Lock()
+            self.top_n = int(self.get_metadata('top_n', 0))
+            # Neighbors the user-KNN lists were scored with; 0 for stores without user-KNN lists
+            self.user_knn_neighbors = int(self.get_metadata('user_knn_neighbors', 0))
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @classmethod
+    def create(cls, file_path: str, top_n: int) -> "RecommendationStore":
+        """
+        Creates an empty store, replacing any existing file.
+
+        Args:
+            file_path (str): Path of the SQLite store file.
+            top_n (int): Length of the materialized lists.
+
+        Returns:
+            RecommendationStore: The store opened for writing.
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            connection = sqlite3.connect(file_path)
+            connection.executescript("""
+                CREATE TABLE recommendations (
+                    method TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    anime_ids BLOB NOT NULL,
+                    scores BLOB NOT NULL,
+                    PRIMARY KEY (method, user_id)
+                ) WITHOUT ROWID;
+                CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """)
+            connection.execute("INSERT INTO metadata VALUES ('top_n', ?)", (str(top_n),))
+            connection.commit()
+            connection.close()
+            return cls(file_path, read_only=False)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def put_many(self, method: str, user_ids, anime_ids, scores) -> None:
+        """
+        Writes the ranked lists of many users for one method.
+
+        Args:
+            method (str): Recommendation method, e.g. 'svd' or 'user_knn'.
+            user_ids (np.ndarray): Raw user IDs.
+            anime_ids (np.ndarray): (n_users x top_n) ranked raw anime IDs, padded with -1.
+            scores (np.ndarray): (n_users x top_n) scores aligned with anime_ids.
+        """
+        try:
+            anime_ids = np.asarray(anime_ids, dtype=np.int32)
+            scores = np.asarray(scores, dtype=np.float32)
+            rows = []
+            for user_id, ids, row_scores in zip(np.asarray(user_ids, dtype=np.int64), anime_ids, scores):
+                length = int((ids >= 0).sum())
+                rows.append((method, int(user_id), ids[:length].tobytes(), row_scores[:length].tobytes()))
+            with self._lock:
+                self._connection.executemany("INSERT OR REPLACE INTO recommendations VALUES (?, ?, ?, ?)", rows)
+                self._connection.commit()
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def get(self, method: str, user_id):
+        """
+        Reads the materialized list of one user.
+
+        Args:
+            method (str): Recommendation method.
+            user_id (int): Raw user ID.
+
+        Returns:
+            tuple or None: (anime_ids, scores) arrays, or None when the user is not materialized.
+        """
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT anime_ids, scores FROM recommendations WHERE method = ? AND user_id = ?",
+                    (method, int(float(user_id)))
+                ).fetchone()
+            if row is None:
+                return None
+            return np.frombuffer(row[0], dtype=np.int32), np.frombuffer(row[1], dtype=np.float32)
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def set_metadata(self, key: str, value) -> None:
+        """Stores a metadata value, such as the model version the lists were computed with."""
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?)", (key, str(value)))
+            self._connection.commit()
+
+    def get_metadata(self, key: str, default=None):
+        """Reads a metadata value."""
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def count(self, method: str = None) -> int:
+        """Number of materialized lists, optionally for one method."""
+        with self._lock:
+            if method is None:
+                return self._connection.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
+            return self._connection.execute("SELECT COUNT(*) FROM recommendations WHERE method = ?", (method,)).fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the underlying connection."""
+        with self._lock:
+            self._connection.close()
+        logging.info(f"Recommendation store {self.file_path} closed")
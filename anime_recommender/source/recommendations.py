@@ -0,0 +1,159 @@
+import sys
+import json
+import numpy as np
+import pandas as pd
+
+# Columns of every recommendations table after the name column, as the recommenders have always returned them
+DETAIL_COLUMNS = ('Image URL', 'Genres', 'Rating')
+
+
+class AnimeMetadata:
+    """
+    Metadata index of the anime details shown with recommendations: parallel arrays of names,
+    image URLs, genres and ratings, indexed by the positions recommenders rank (anime indices for
+    the collaborative recommender, catalog rows for the others). Built once per recommender and
+    shared, read-only, by every result it formats.
+    """
+    __slots__ = ('names', 'image_urls', 'genres', 'ratings', 'name_column')
+
+    def __init__(self, names, image_urls, genres, ratings, name_column: str = 'Anime name'):
+        """
+        Args:
+            names (np.ndarray): Anime names.
+            image_urls (np.ndarray): Image URLs.
+            genres (np.ndarray): Genres.
+            ratings (np.ndarray): Average ratings.
+            name_column (str): Label of the name column in tables. Defaults to 'Anime name'.
+        """
+        self.names = np.asarray(names)
+        self.image_urls = np.asarray(image_urls)
+        self.genres = np.asarray(genres)
+        self.ratings = np.asarray(ratings)
+        self.name_column = name_column
+        for array in (self.names, self.image_urls, self.genres, self.ratings):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, name_column: str = 'Anime name') -> "AnimeMetadata":
+        """Indexes the 'name', 'image url', 'genres' and 'average_rating' columns of a catalog frame by row position."""
+        return cls(
+            df['name'].to_numpy(copy=True), df['image url'].to_numpy(copy=True), df['genres'].to_numpy(copy=True),
+            df['average_rating'].to_numpy(copy=True), name_column=name_column
+        )
+
+
+class Recommendation:
+    """One recommended anime, as yielded by iterating over Recommendations."""
+    __slots__ = ('name', 'image_url', 'genres', 'rating', 'score')
+
+    def __init__(self, name, image_url, genres, rating, score=None):
+        self.name = name
+        self.image_url = image_url
+        self.genres = genres
+        self.rating = rating
+        self.score = score
+
+    def __repr__(self) -> str:
+        return f"Recommendation(name={self.name!r}, rating={self.rating!r}, score={self.score!r})"
+
+
+class Recommendations:
+    """
+    Ranked recommendations as parallel arrays of metadata positions and optional scores.
+
+    Formatting a result only keeps the ranked positions; names, image URLs, genres and ratings are
+    gathered from the shared AnimeMetadata when read, and a DataFrame or JSON records are built
+    only on request with to_pandas, to_records or to_json. Iterating yields Recommendation records.
+    Results may be cached and shared between callers, so they are never modified after formatting.
+    """
+    __slots__ = ('metadata', 'positions', 'scores', '_ratings')
+
+    def __init__(self, metadata: AnimeMetadata, positions, scores=None, ratings=None):
+        """
+        Args:
+            metadata (AnimeMetadata): Details of every position.
+            positions (np.ndarray): Ranked metadata positions, best first.
+            scores (np.ndarray, optional): Scores aligned with positions, shown as a 'Score' column.
+            ratings (np.ndarray, optional): Ratings aligned with positions, shown instead of the catalog ratings.
+        """
+        self.metadata = metadata
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.scores = None if scores is None else np.asarray(scores)
+        self._ratings = None if ratings is None else np.asarray(ratings)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.positions) == 0
+
+    @property
+    def names(self) -> np.ndarray:
+        return self.metadata.names[self.positions]
+
+    @property
+    def image_urls(self) -> np.ndarray:
+        return self.metadata.image_urls[self.positions]
+
+    @property
+    def genres(self) -> np.ndarray:
+        return self.metadata.genres[self.positions]
+
+    @property
+    def ratings(self) -> np.ndarray:
+        return self.metadata.ratings[self.positions] if self._ratings is None else self._ratings
+
+    @property
+    def columns(self) -> list:
+        """Column labels of the table form, as the recommendations DataFrames have always had them."""
+        columns = [self.metadata.name_column, *DETAIL_COLUMNS]
+        return columns if self.scores is None else columns + ['Score']
+
+    def _column_values(self) -> list:
+        values = [self.names, self.image_urls, self.genres, self.ratings]
+        return values if self.scores is None else values + [self.scores]
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """Values of one column of the table form."""
+        columns = self.columns
+        if column not in columns:
+            raise KeyError(column)
+        return self._column_values()[columns.index(column)]
+
+    def __iter__(self):
+        scores = self.scores if self.scores is not None else [None] * len(self.positions)
+        for row in zip(self.names, self.image_urls, self.genres, self.ratings, scores):
+            yield Recommendation(*row)
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: The recommendations table, one row per recommendation.
+        """
+        return pd.DataFrame(dict(zip(self.columns, self._column_values())))
+
+    def to_records(self) -> list:
+        """
+        Returns:
+            list: JSON-ready {column: value} records, missing values mapped to None.
+        """
+        columns = self.columns
+        rows = zip(*(values.tolist() for values in self._column_values()))
+        # value != value only holds for NaN
+        return [{column: (None if value != value else value) for column, value in zip(columns, row)} for row in rows]
+
+    def to_json(self) -> str:
+        """
+        Returns:
+            str: The records of to_records as a JSON array.
+        """
+        return json.dumps(self.to_records())
+
+    def memory_usage(self) -> int:
+        """Bytes held by this result, not counting the shared metadata."""
+        arrays = (self.positions, self.scores, self._ratings)
+        return sys.getsizeof(self) + sum(array.nbytes for array in arrays if array is not None)
+
+    def __repr__(self) -> str:
+        return repr(self.to_pandas())
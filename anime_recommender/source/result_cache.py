@@ -0,0 +1,328 @@
+import sys
+import time
+import asyncio
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+import pandas as pd
+from anime_recommender.loggers.logging import logging
+from anime_recommender.source.recommendations import Recommendations
+from anime_recommender.utils.serving_metrics import track_request
+
+
+def _estimate_size(value) -> int:
+    """
+    Approximate memory footprint of a cached result in bytes.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, Recommendations):
+        return value.memory_usage()
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_size(key) + _estimate_size(item) for key, item in value.items())
+    return sys.getsizeof(value)
+
+
+def _hashable(value):
+    """Turns list arguments such as seed titles into tuples so they can be part of a key."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def cached_result(method: str, subject=None, n: str = 'n', filters: tuple = (), live_ratings: bool = False):
+    """
+    Decorator routing a recommender method through the instance's `result_cache`, when one is attached.
+
+    Args:
+        method (str): Method name used in the cache key.
+        subject (str or tuple, optional): Name(s) of the arguments identifying the request subject.
+        n (str): Name of the argument holding the number of recommendations. Defaults to 'n'.
+        filters (tuple): Names of further arguments that change the result.
+        live_ratings (bool): The result depends on other users' ratings, so while the instance has
+                             `live_ratings` attached the key includes their generation. Defaults to False.
+
+    Model objects and file paths passed as arguments are not part of the key; the cache's model
+    version identifies the artifact set instead. Every call is timed as a `method` request in the
+    serving metrics, labelled with its cache outcome.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        subject_names = (subject,) if isinstance(subject, str) else tuple(subject or ())
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with track_request(method) as request:
+                cache = getattr(self, 'result_cache', None)
+                if cache is None:
+                    return func(self, *args, **kwargs)
+                arguments = signature.bind(self, *args, **kwargs)
+                arguments.apply_defaults()
+                arguments = arguments.arguments
+                subject_value = tuple(_hashable(arguments[name]) for name in subject_names)
+                key_filters = {name: _hashable(arguments[name]) for name in filters}
+                live = getattr(self, 'live_ratings', None) if live_ratings else None
+                if live is not None:
+                    # Results computed before another user's streamed rating are never looked up again
+                    key_filters['ratings_generation'] = live.generation
+                key = cache.make_key(
+                    method,
+                    subject_value[0] if len(subject_value) == 1 else subject_value,
+                    arguments[n],
+                    key_filters
+                )
+
+                def compute():
+                    request.cache = 'miss'
+                    return func(self, *args, **kwargs)
+                # Waiting on another caller's computation of the same key counts as a hit
+                request.cache = 'hit'
+                return cache.get_or_compute(key, compute)
+        return wrapper
+    return decorator
+
+
+class _InFlight:
+    """A computation in progress that concurrent misses on the same key wait for."""
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class RecommendationCache:
+    """
+    Thread-safe cache of recommendation results with LRU eviction, a TTL and a byte budget.
+
+    Keys are (method, subject, n, filters, model version) tuples built by `make_key`. Concurrent
+    misses on the same key are coalesced: the first caller computes the result while the others
+    wait for it, so a popular input is computed once even under a burst of requests. Cached
+    results are shared between callers and must not be modified.
+    """
+    def __init__(self, max_bytes: int, ttl_seconds: float = None, model_version: str = None):
+        """
+        Args:
+            max_bytes (int): Byte budget; least recently used entries are evicted beyond it.
+            ttl_seconds (float, optional): Lifetime of an entry. None keeps entries until evicted.
+            model_version (str, optional): Version of the artifact set the cached results come from.
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.model_version = model_version
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._async_inflight = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def make_key(self, method: str, subject, n: int, filters: dict = None) -> tuple:
+        """
+        Builds the cache key of a request under the current model version.
+
+        Args:
+            method (str): Recommendation method, e.g. 'svd' or 'content'.
+            subject: User ID, anime title or other subject of the request.
+            n (int): Number of recommendations.
+            filters (dict, optional): Any further parameters that change the result.
+
+        Returns:
+            tuple: The cache key.
+        """
+        return (method, subject, n, tuple(sorted((filters or {}).items())), self.model_version)
+
+    def set_model_version(self, model_version: str) -> None:
+        """
+        Switches to a new artifact set, dropping every result computed from the previous one.
+        """
+        with self._lock:
+            if model_version == self.model_version:
+                return
+            logging.info(f"Result cache invalidated: model version {self.model_version} -> {model_version}")
+            self.model_version = model_version
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _lookup(self, key):
+        """Returns the live entry for key, expiring it if its TTL has passed. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, size, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.current_bytes -= size
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key):
+        """
+        Returns the cached value of key, or None on a miss.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value) -> None:
+        """
+        Stores a value, evicting least recently used entries to stay within the byte budget.
+        Values larger than the whole budget are not stored.
+        """
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            # Results of a superseded model version are not worth keeping
+            if key[-1] != self.model_version:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value of key, computing and storing it on a miss.
+
+        Args:
+            key (tuple): Cache key from make_key.
+            compute (callable): Zero-argument function producing the value.
+
+        Returns:
+            The cached or freshly computed value.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            inflight = self._inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = self._inflight[key] = _InFlight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            inflight.event.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value
+
+        try:
+            inflight.value = compute()
+            self.put(key, inflight.value)
+            return inflight.value
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.event.set()
+
+    async def get_or_compute_async(self, key, compute):
+        """
+        Asyncio counterpart of get_or_compute: concurrent misses on the same key await one computation
+        instead of blocking the event loop.
+
+        Args:
+            key (tuple): Cache key from make_key.
+            compute (callable): Zero-argument coroutine function producing the value.
+
+        Returns:
+            The cached or freshly computed value.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            pending = self._async_inflight.get(key)
+            if pending is None:
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = self._async_inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await compute()
+            self.put(key, value)
+            pending.set_result(value)
+            return value
+        except Exception as e:
+            pending.set_exception(e)
+            # Mark the exception as retrieved when no other request was waiting for it
+            pending.exception()
+            raise
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def invalidate_subjects(self, subjects, methods=()) -> int:
+        """
+        Drops the results computed for any of the given subjects, e.g. users whose ratings changed.
+
+        Args:
+            subjects (iterable): Subjects whose results are dropped.
+            methods (iterable): Methods whose results are all dropped, e.g. those depending on every
+                                user's ratings. Defaults to none.
+
+        Returns:
+            int: Number of entries dropped.
+        """
+        subjects = set(subjects)
+        methods = set(methods)
+        with self._lock:
+            # Subjects made of several arguments, e.g. (user_id, seeds), are matched on the first
+            stale = [
+                key for key in self._entries
+                if key[0] in methods or (key[1][0] if isinstance(key[1], tuple) and key[1] else key[1]) in subjects
+            ]
+            for key in stale:
+                self.current_bytes -= self._entries.pop(key)[1]
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        """Hit rate and size metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'model_version': self.model_version,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
@@ -0,0 +1,123 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+
+SAMPLING_STRATEGIES = ('uniform', 'stratified')
+
+
+class RatingSampler:
+    """
+    Samples the ratings a model is trained on, in one vectorized pass.
+
+    Every rating draws a random priority from the seeded generator. A per-user cap keeps each
+    user's `max_user_ratings` lowest-priority ratings, which is the sample a per-user reservoir
+    of that size would hold. A fraction below 1 then thins the capped ratings further, either
+    uniformly across all ratings ('uniform'), or as the same share of every user's ratings with
+    at least `min_user_ratings` kept per user ('stratified').
+    """
+    def __init__(self, max_user_ratings: int = None, fraction: float = None, strategy: str = 'uniform',
+                 min_user_ratings: int = 1, seed: int = 42):
+        """
+        Args:
+            max_user_ratings (int, optional): Cap on the ratings kept per user. None keeps every rating.
+            fraction (float, optional): Share of the capped ratings to keep, in (0, 1]. None keeps them all.
+            strategy (str): 'uniform' or 'stratified' application of the fraction. Defaults to 'uniform'.
+            min_user_ratings (int): Ratings kept per user by the stratified strategy, when the user has them. Defaults to 1.
+            seed (int): Seed of the rating priorities. Defaults to 42.
+        """
+        if strategy not in SAMPLING_STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy '{strategy}'. Choose from {SAMPLING_STRATEGIES}.")
+        if fraction is not None and not 0 < fraction <= 1:
+            raise ValueError("fraction must be in (0, 1].")
+        self.max_user_ratings = max_user_ratings
+        self.fraction = fraction
+        self.strategy = strategy
+        self.min_user_ratings = min_user_ratings
+        self.seed = seed
+
+    @classmethod
+    def from_config(cls, config) -> "RatingSampler":
+        """Builds the sampler described by a config's sample_* settings."""
+        return cls(
+            max_user_ratings=config.sample_max_user_ratings, fraction=config.sample_fraction, strategy=config.sample_strategy,
+            min_user_ratings=config.sample_min_user_ratings, seed=config.sample_seed
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the sampler drops any ratings at all."""
+        return self.max_user_ratings is not None or (self.fraction is not None and self.fraction < 1)
+
+    def sample_mask(self, user_codes: np.ndarray) -> np.ndarray:
+        """
+        Selects the ratings to keep.
+
+        Args:
+            user_codes (np.ndarray): Integer user of each rating.
+
+        Returns:
+            np.ndarray: Boolean mask of the kept ratings.
+        """
+        user_codes = np.asarray(user_codes, dtype=np.int64)
+        n = len(user_codes)
+        rng = np.random.default_rng(self.seed)
+        priorities = rng.random(n)
+        # Rank of every rating among its user's ratings, in priority order
+        order = np.lexsort((priorities, user_codes))
+        starts = np.flatnonzero(np.r_[True, np.diff(user_codes[order]) != 0])
+        sizes = np.diff(np.r_[starts, n])
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n) - np.repeat(starts, sizes)
+        user_sizes = np.empty(n, dtype=np.int64)
+        user_sizes[order] = np.repeat(sizes, sizes)
+
+        quota = user_sizes if self.max_user_ratings is None else np.minimum(user_sizes, self.max_user_ratings)
+        if self.fraction is not None and self.fraction < 1 and self.strategy == 'stratified':
+            quota = np.minimum(quota, np.maximum(np.ceil(quota * self.fraction), self.min_user_ratings)).astype(np.int64)
+        keep = rank < quota
+        if self.fraction is not None and self.fraction < 1 and self.strategy == 'uniform':
+            kept = np.flatnonzero(keep)
+            keep[:] = False
+            keep[rng.choice(kept, size=int(round(len(kept) * self.fraction)), replace=False)] = True
+        return keep
+
+    def sample(self, df: pd.DataFrame, user_codes: np.ndarray = None) -> tuple:
+        """
+        Samples a ratings DataFrame.
+
+        Args:
+            df (pd.DataFrame): Ratings with a 'user_id' column.
+            user_codes (np.ndarray, optional): Integer user of each row, e.g. vocabulary indices. Factorized from 'user_id' by default.
+
+        Returns:
+            tuple: (sampled DataFrame, report with the effective sample size).
+        """
+        try:
+            start = time.perf_counter()
+            if user_codes is None:
+                user_codes = pd.factorize(df['user_id'])[0]
+            keep = self.sample_mask(user_codes) if self.enabled else np.ones(len(df), dtype=bool)
+            user_sizes = np.bincount(user_codes[user_codes >= 0]) if len(df) else np.zeros(0, dtype=np.int64)
+            report = {
+                'enabled': self.enabled,
+                'strategy': self.strategy,
+                'max_user_ratings': self.max_user_ratings,
+                'fraction': self.fraction,
+                'seed': self.seed,
+                'input_ratings': int(len(df)),
+                'sampled_ratings': int(keep.sum()),
+                'effective_fraction': float(keep.mean()) if len(df) else 1.0,
+                'input_users': int((user_sizes > 0).sum()),
+                'sampled_users': int(len(np.unique(user_codes[keep]))),
+                'capped_users': int((user_sizes > self.max_user_ratings).sum()) if self.max_user_ratings is not None else 0,
+                'seconds': time.perf_counter() - start,
+            }
+            if self.enabled:
+                logging.info(f"Sampled {report['sampled_ratings']} of {report['input_ratings']} ratings ({report['effective_fraction']:.1%}), "
+                             f"{report['capped_users']} users capped at {self.max_user_ratings}")
+            return (df[keep] if self.enabled else df), report
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
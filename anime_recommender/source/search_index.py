@@ -0,0 +1,269 @@
+import re
+import sys
+import unicodedata
+import numpy as np
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+
+# Runs of anything but letters and digits, collapsed into one space by normalization
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_title(title) -> str:
+    """
+    Folds a title to its search key: accents stripped, case folded, punctuation dropped and
+    whitespace collapsed, so 'Kimi no Na wa.' and 'kimi no na wa' share one key.
+    """
+    text = ''.join(char for char in unicodedata.normalize('NFKD', str(title)) if not unicodedata.combining(char))
+    return ' '.join(_NON_WORD.sub(' ', text.casefold()).split())
+
+
+def _trigrams(key: str) -> set:
+    """Character trigrams of a search key, padded so that word starts and ends count."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _prefix_range(sorted_keys: np.ndarray, prefix: str) -> tuple:
+    """Positions [start, end) of the sorted keys starting with prefix."""
+    start = int(np.searchsorted(sorted_keys, prefix, side='left'))
+    end = int(np.searchsorted(sorted_keys, prefix + '\U0010ffff', side='left'))
+    return start, end
+
+
+def _page(total: int, offset: int, limit: int, results: list) -> dict:
+    return {'total': int(total), 'offset': offset, 'limit': limit, 'results': results}
+
+
+class SearchIndex:
+    """
+    Title and user ID search over the vocabulary of one model version, built once at data
+    transformation time.
+
+    Titles are kept sorted by their normalized key, so an exact key is a dict lookup and a key
+    prefix is one binary search; the sorted (word, title) pairs answer prefixes of any word in a
+    title the same way, like a prefix trie flattened into arrays. Spelling variants are matched through a trigram inverted index in CSR
+    layout: a query's trigrams select posting lists whose concatenation is counted with one
+    bincount, and titles are scored by the Dice coefficient of their trigram sets. User IDs are
+    kept as a sorted array for range queries and decimal prefix queries. Titles are flagged as rated
+    and as in the content catalog, so searches can be limited to the anime a method can answer.
+    """
+    def __init__(self, min_similarity: float = 0.5):
+        """
+        Args:
+            min_similarity (float): Smallest trigram Dice similarity of a fuzzy match. Defaults to 0.5.
+        """
+        self.min_similarity = min_similarity
+        self.keys = None
+        self.titles = None
+        self.anime_ids = None
+        self.rated = None
+        self.content = None
+        self.user_ids = None
+        self._exact = None
+        self._key_lengths = None
+        self._words = None
+        self._word_titles = None
+        self._gram_ids = None
+        self._gram_indptr = None
+        self._gram_titles = None
+        self._gram_counts = None
+
+    @classmethod
+    def from_vocabulary(cls, vocabulary, min_similarity: float = 0.5, content_anime_ids=None) -> "SearchIndex":
+        """
+        Indexes the titles and user IDs of a vocabulary.
+
+        Args:
+            vocabulary (IdVocabulary): The vocabulary of the model version.
+            min_similarity (float): Smallest trigram Dice similarity of a fuzzy match. Defaults to 0.5.
+            content_anime_ids (array-like, optional): Anime IDs of the content catalog rows. Defaults to every anime.
+
+        Returns:
+            SearchIndex: The built index.
+        """
+        try:
+            index = cls(min_similarity=min_similarity)
+            titles = vocabulary.anime_titles
+            known = np.flatnonzero([isinstance(title, str) and bool(title) for title in titles])
+            keys = [normalize_title(titles[i]) for i in known]
+            # By key, duplicate keys by anime index so the rated-first anime leads, as in title_to_anime_id
+            order = sorted(range(len(known)), key=lambda i: (keys[i], known[i]))
+            anime_idx = known[order]
+            index.keys = np.array([keys[i] for i in order], dtype=object)
+            index.titles = np.asarray(titles, dtype=object)[anime_idx]
+            index.anime_ids = np.asarray(vocabulary.anime_ids, dtype=np.int64)[anime_idx]
+            index.rated = anime_idx < vocabulary.n_rated_anime
+            index.content = np.ones(len(anime_idx), dtype=bool) if content_anime_ids is None else np.isin(index.anime_ids, np.asarray(content_anime_ids, dtype=np.int64))
+            index.user_ids = np.sort(np.asarray(vocabulary.user_ids, dtype=np.int64))
+            index._key_lengths = np.array([len(key) for key in index.keys], dtype=np.int32)
+            index._exact = {}
+            for position, key in enumerate(index.keys):
+                index._exact.setdefault(key, position)
+
+            words, word_titles, gram_pairs = [], [], {}
+            for position, key in enumerate(index.keys):
+                for word in set(key.split()):
+                    words.append(word)
+                    word_titles.append(position)
+                for gram in _trigrams(key):
+                    gram_pairs.setdefault(gram, []).append(position)
+            word_order = sorted(range(len(words)), key=lambda i: (words[i], word_titles[i]))
+            index._words = np.array([words[i] for i in word_order], dtype=object)
+            index._word_titles = np.array([word_titles[i] for i in word_order], dtype=np.int32)
+
+            index._gram_ids = {gram: gram_id for gram_id, gram in enumerate(gram_pairs)}
+            postings = list(gram_pairs.values())
+            index._gram_indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+            index._gram_indptr[1:] = np.cumsum([len(titles) for titles in postings])
+            index._gram_titles = np.concatenate(postings).astype(np.int32) if postings else np.empty(0, dtype=np.int32)
+            index._gram_counts = np.bincount(index._gram_titles, minlength=len(index.keys))
+            logging.info(f"Search index built over {len(index.keys)} titles, {len(index._gram_ids)} trigrams and {len(index.user_ids)} users")
+            return index
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def _fuzzy(self, key: str) -> tuple:
+        """
+        Titles sharing enough trigrams with a key.
+
+        Returns:
+            tuple: (title positions, similarities), most similar first and ties in key order.
+        """
+        gram_ids = [self._gram_ids[gram] for gram in _trigrams(key) if gram in self._gram_ids]
+        if not gram_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        postings = np.concatenate([self._gram_titles[self._gram_indptr[g]:self._gram_indptr[g + 1]] for g in gram_ids])
+        shared = np.bincount(postings, minlength=len(self.keys))
+        candidates = np.flatnonzero(shared)
+        similarity = 2.0 * shared[candidates] / (len(_trigrams(key)) + self._gram_counts[candidates])
+        keep = similarity >= self.min_similarity
+        candidates, similarity = candidates[keep], similarity[keep]
+        order = np.lexsort((candidates, -similarity))
+        return candidates[order], similarity[order]
+
+    def _matches(self, query: str) -> np.ndarray:
+        """Title positions matching a query, best first: exact key, key prefix, word prefixes, then fuzzy."""
+        key = normalize_title(query)
+        if not key:
+            return np.arange(len(self.keys))
+        parts = []
+        if key in self._exact:
+            parts.append(np.array([self._exact[key]]))
+        parts.append(np.arange(*_prefix_range(self.keys, key)))
+        # Titles with a word starting with every word of the query, the shortest, closest ones first
+        word_matches = None
+        for word in key.split():
+            start, end = _prefix_range(self._words, word)
+            titles = np.unique(self._word_titles[start:end])
+            word_matches = titles if word_matches is None else np.intersect1d(word_matches, titles, assume_unique=True)
+        parts.append(word_matches[np.argsort(self._key_lengths[word_matches], kind='stable')])
+        parts.append(self._fuzzy(key)[0])
+        positions = np.concatenate(parts).astype(np.int64)
+        # First occurrence of each title, in match order
+        _, first = np.unique(positions, return_index=True)
+        return positions[np.sort(first)]
+
+    def _in_content(self, positions: np.ndarray) -> np.ndarray:
+        """The positions whose anime are in the content catalog; all of them for indexes built without one."""
+        content = getattr(self, 'content', None)
+        return positions if content is None else positions[content[positions]]
+
+    def search(self, query: str = '', offset: int = 0, limit: int = 20, rated_only: bool = False, content_only: bool = False) -> dict:
+        """
+        Autocompletes a title query, one page at a time. An empty query pages through every title alphabetically.
+
+        Args:
+            query (str): Title, title prefix or misspelled title.
+            offset (int): Matches skipped before the page. Defaults to 0.
+            limit (int): Matches on the page. Defaults to 20.
+            rated_only (bool): Only anime with ratings, the ones collaborative methods can answer. Defaults to False.
+            content_only (bool): Only anime in the content catalog, the ones the content method can answer. Defaults to False.
+
+        Returns:
+            dict: 'total' matches, 'offset', 'limit' and the page's 'results' as {'anime_id', 'name'} records.
+        """
+        positions = self._matches(query)
+        if rated_only:
+            positions = positions[self.rated[positions]]
+        if content_only:
+            positions = self._in_content(positions)
+        page = positions[offset:offset + limit]
+        results = [{'anime_id': int(anime_id), 'name': name} for anime_id, name in zip(self.anime_ids[page], self.titles[page])]
+        return _page(len(positions), offset, limit, results)
+
+    def resolve(self, title: str, content_only: bool = False) -> int:
+        """
+        Resolves a title, or a spelling variant of one, to an anime ID.
+
+        Args:
+            title (str): Title or misspelled title.
+            content_only (bool): Only resolve to anime in the content catalog. Defaults to False.
+
+        Returns:
+            int: The anime ID of the exactly matching normalized title, else of the most similar title
+                 above min_similarity, else -1. Of several anime sharing the key, the rated-first one.
+        """
+        key = normalize_title(title)
+        position = self._exact.get(key)
+        if content_only and position is not None:
+            # Anime sharing a key are adjacent, rated-first; take the first one in the content catalog
+            end = _prefix_range(self.keys, key)[1]
+            same_key = np.arange(position, end)
+            same_key = self._in_content(same_key[self.keys[same_key] == key])
+            return int(self.anime_ids[same_key[0]]) if len(same_key) else -1
+        if position is None and key:
+            candidates, _ = self._fuzzy(key)
+            if content_only:
+                candidates = self._in_content(candidates)
+            position = candidates[0] if len(candidates) else None
+        return -1 if position is None else int(self.anime_ids[position])
+
+    def search_users(self, prefix: str = '', low: int = None, high: int = None, offset: int = 0, limit: int = 20) -> dict:
+        """
+        Pages through the user IDs whose decimal form starts with prefix, within [low, high].
+
+        Matches are ordered by number of digits, then numerically, which is the order of
+        consecutive ID ranges prefix * 10**k .. (prefix + 1) * 10**k - 1 for growing k.
+
+        Args:
+            prefix (str): Leading digits of the user ID. Defaults to every user.
+            low (int, optional): Smallest user ID. Defaults to no bound.
+            high (int, optional): Largest user ID. Defaults to no bound.
+            offset (int): Matches skipped before the page. Defaults to 0.
+            limit (int): Matches on the page. Defaults to 20.
+
+        Returns:
+            dict: 'total' matches, 'offset', 'limit' and the page's 'results' as user IDs.
+        """
+        ids = self.user_ids
+        low = int(ids[0]) if low is None and len(ids) else low
+        high = int(ids[-1]) if high is None and len(ids) else high
+        prefix = str(prefix).strip()
+        if not len(ids) or (prefix and not prefix.isdigit()):
+            return _page(0, offset, limit, [])
+        if not prefix:
+            ranges = [(low, high)]
+        else:
+            start, ranges = int(prefix), []
+            # A leading zero matches no ID; '0' alone matches user 0
+            for digits in range(0 if prefix != '0' and prefix.startswith('0') else len(str(int(ids[-1]))) - len(prefix) + 1):
+                scale = 10 ** digits
+                ranges.append((max(low, start * scale), min(high, (start + 1) * scale - 1)))
+                if start == 0:
+                    break
+        segments = [
+            (int(np.searchsorted(ids, first, side='left')), int(np.searchsorted(ids, last, side='right')))
+            for first, last in ranges if first <= last
+        ]
+        total = sum(end - start for start, end in segments)
+        results, skip = [], offset
+        for start, end in segments:
+            if skip >= end - start:
+                skip -= end - start
+                continue
+            start, skip = start + skip, 0
+            results.extend(ids[start:min(end, start + limit - len(results))].tolist())
+            if len(results) >= limit:
+                break
+        return _page(total, offset, limit, results)
@@ -0,0 +1,179 @@
+import os
+import sys
+import shutil
+import tempfile
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+
+_SHARD_ARRAYS = ('data', 'indices', 'indptr')
+
+# Per-worker memory-mapped shards, opened once by the pool initializer
+_worker_shards = None
+
+
+def usable_cores() -> int:
+    """Cores this process may run on, which can be fewer than os.cpu_count() in a container."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def _open_shard(shard_dir: str, shard: int, n_items: int) -> csr_matrix:
+    """
+    Wraps the .npy arrays of one shard, memory-mapped read-only, in a CSR matrix without copying them,
+    so every process reading the shard shares the same pages.
+    """
+    data, indices, indptr = (np.load(os.path.join(shard_dir, f"shard_{shard}_{name}.npy"), mmap_mode='r') for name in _SHARD_ARRAYS)
+    return csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, n_items), copy=False)
+
+
+def _init_worker(shard_dir: str, offsets: list, n_items: int) -> None:
+    """Maps every shard into the worker; pages are only read for the shards the worker is asked to scan."""
+    global _worker_shards
+    _worker_shards = [(offset, _open_shard(shard_dir, shard, n_items)) for shard, offset in enumerate(offsets)]
+
+
+def _shard_top_k(matrix: csr_matrix, offset: int, queries: csr_matrix, n_neighbors: int) -> tuple:
+    """
+    Nearest users of each query within one shard of L2-normalized rows.
+
+    Returns:
+        tuple: ((n_queries x k) cosine distances, (n_queries x k) global user indices), unordered within a row.
+    """
+    similarities = (queries @ matrix.T).toarray()
+    k = min(n_neighbors, matrix.shape[0])
+    if k == 0:
+        return np.empty((queries.shape[0], 0)), np.empty((queries.shape[0], 0), dtype=np.int64)
+    top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    distances = np.clip(1.0 - np.take_along_axis(similarities, top, axis=1), 0.0, 2.0)
+    return distances, top.astype(np.int64) + offset
+
+
+def _query_shard(shard: int, query_arrays: tuple, n_items: int, n_neighbors: int) -> tuple:
+    """Pool task: scans one shard for a batch of queries sent as CSR arrays."""
+    offset, matrix = _worker_shards[shard]
+    data, indices, indptr = query_arrays
+    queries = csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, n_items))
+    return _shard_top_k(matrix, offset, queries, n_neighbors)
+
+
+class ShardedUserKNN:
+    """
+    Brute-force cosine user-KNN with the users partitioned across worker processes.
+
+    The rating matrix is L2-normalized once and split into `n_shards` contiguous user ranges of
+    about equal numbers of ratings, written as .npy files that the workers memory-map. A query
+    batch is broadcast to every shard as one pool task per shard; each returns its local top-k,
+    and the k best are merged in the calling process. `kneighbors` matches
+    NearestNeighbors(metric='cosine', algorithm='brute').kneighbors, so the index can stand in for
+    a fitted user-KNN model, up to the order of exactly tied neighbors.
+    """
+    def __init__(self, n_shards: int = None, n_workers: int = None):
+        """
+        Args:
+            n_shards (int, optional): Number of user partitions. Defaults to every usable core.
+            n_workers (int, optional): Worker processes. Defaults to n_shards; 0 scans the shards in the calling process.
+        """
+        self.n_shards = n_shards or usable_cores()
+        self.n_workers = self.n_shards if n_workers is None else n_workers
+        self.shard_dir = None
+        self.offsets = None
+        self.n_items = None
+        self._owns_shard_dir = False
+        self._shards = None
+        self._executor = None
+
+    def fit(self, user_item_matrix: csr_matrix, shard_dir: str = None) -> "ShardedUserKNN":
+        """
+        Normalizes and partitions the rating matrix and starts the shard workers.
+
+        Args:
+            user_item_matrix (csr_matrix): (n_users x n_items) rating matrix.
+            shard_dir (str, optional): Directory for the shard files. A temporary directory, removed by close(), by default.
+
+        Returns:
+            ShardedUserKNN: self.
+        """
+        try:
+            self.close()
+            matrix = normalize(csr_matrix(user_item_matrix, dtype=np.float32), norm='l2', axis=1)
+            self.n_items = matrix.shape[1]
+            self._owns_shard_dir = shard_dir is None
+            self.shard_dir = shard_dir or tempfile.mkdtemp(prefix="user_knn_shards_")
+            os.makedirs(self.shard_dir, exist_ok=True)
+
+            # Shard boundaries at equal shares of the ratings, since scan cost grows with a shard's ratings
+            n_users = matrix.shape[0]
+            boundaries = np.searchsorted(matrix.indptr, np.linspace(0, matrix.nnz, self.n_shards + 1), side='left')
+            boundaries[0], boundaries[-1] = 0, n_users
+            boundaries = np.maximum.accumulate(np.minimum(boundaries, n_users))
+            self.offsets = boundaries[:-1].tolist()
+            for shard, (start, end) in enumerate(zip(boundaries[:-1], boundaries[1:])):
+                rows = matrix[start:end]
+                for name in _SHARD_ARRAYS:
+                    np.save(os.path.join(self.shard_dir, f"shard_{shard}_{name}.npy"), getattr(rows, name))
+
+            if self.n_workers:
+                # Spawned rather than forked, since the serving process runs other threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.n_workers, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker, initargs=(self.shard_dir, self.offsets, self.n_items)
+                )
+            else:
+                self._shards = [(offset, _open_shard(self.shard_dir, shard, self.n_items)) for shard, offset in enumerate(self.offsets)]
+            logging.info(f"User-KNN index of {n_users} users split into {self.n_shards} shards across {self.n_workers} workers")
+            return self
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    def kneighbors(self, X, n_neighbors: int = 5, return_distance: bool = True):
+        """
+        Finds the nearest users of each query row.
+
+        Args:
+            X (csr_matrix): (n_queries x n_items) query ratings.
+            n_neighbors (int): Neighbors per query. Defaults to 5.
+            return_distance (bool): Also return the cosine distances. Defaults to True.
+
+        Returns:
+            tuple or np.ndarray: (distances, indices), nearest first, or the indices alone.
+        """
+        queries = normalize(csr_matrix(X, dtype=np.float32), norm='l2', axis=1)
+        if self._executor is not None:
+            query_arrays = (queries.data, queries.indices, queries.indptr)
+            futures = [
+                self._executor.submit(_query_shard, shard, query_arrays, self.n_items, n_neighbors)
+                for shard in range(self.n_shards)
+            ]
+            results = [future.result() for future in futures]
+        else:
+            results = [_shard_top_k(matrix, offset, queries, n_neighbors) for offset, matrix in self._shards]
+
+        distances = np.concatenate([result[0] for result in results], axis=1)
+        indices = np.concatenate([result[1] for result in results], axis=1)
+        order = np.argsort(distances, axis=1, kind='stable')[:, :n_neighbors]
+        indices = np.take_along_axis(indices, order, axis=1)
+        if not return_distance:
+            return indices
+        return np.take_along_axis(distances, order, axis=1), indices
+
+    def close(self) -> None:
+        """Stops the workers and removes a temporary shard directory."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._shards = None
+        if self._owns_shard_dir and self.shard_dir and os.path.isdir(self.shard_dir):
+            shutil.rmtree(self.shard_dir, ignore_errors=True)
+        self.shard_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import tempfile
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from surprise import Reader, Dataset, SVD
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+
+# Surprise's own SVD defaults, always one of the candidates so tuning never loses to them on CV
+DEFAULT_SVD_PARAMS = {'n_factors': 100, 'n_epochs': 20, 'lr_all': 0.005, 'reg_all': 0.02}
+_RATING_ARRAYS = ('user_idx', 'item_idx', 'rating', 'fold')
+
+# Per-worker memory-mapped ratings, opened once by the pool initializer
+_worker_ratings = None
+
+
+def _init_worker(data_dir: str) -> None:
+    """
+    Opens the ratings written by the parent as read-only memory maps, so every worker shares
+    the same pages instead of receiving a pickled copy.
+    """
+    global _worker_ratings
+    _worker_ratings = tuple(np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode='r') for name in _RATING_ARRAYS)
+
+
+def _predict(model: SVD, trainset, user_idx: np.ndarray, item_idx: np.ndarray, rating_scale: tuple) -> np.ndarray:
+    """
+    Vectorized equivalent of SVD.predict for held-out ratings: the global mean plus the biases
+    and factor product of whichever of the user and item the model knows, clipped to the rating scale.
+    """
+    def inner_ids(raw_to_inner: dict, raw: np.ndarray) -> np.ndarray:
+        lookup = np.full(int(max(raw.max(initial=0), max(raw_to_inner, default=0))) + 1, -1, dtype=np.int64)
+        lookup[np.fromiter(raw_to_inner.keys(), dtype=np.int64)] = np.fromiter(raw_to_inner.values(), dtype=np.int64)
+        return lookup[raw]
+
+    users = inner_ids(trainset._raw2inner_id_users, user_idx)
+    items = inner_ids(trainset._raw2inner_id_items, item_idx)
+    known_user, known_item = users >= 0, items >= 0
+    both = known_user & known_item
+
+    estimates = np.full(len(users), trainset.global_mean, dtype=np.float64)
+    if model.biased:
+        estimates[known_user] += model.bu[users[known_user]]
+        estimates[known_item] += model.bi[items[known_item]]
+    estimates[both] += np.einsum('ij,ij->i', model.pu[users[both]], model.qi[items[both]])
+    return np.clip(estimates, *rating_scale)
+
+
+def _evaluate_fold(config_id: int, params: dict, fold: int, rating_scale: tuple, seed: int) -> tuple:
+    """
+    Fits one configuration on every fold but `fold` and scores it on `fold`.
+
+    Returns:
+        tuple: (config_id, fold, rmse, mae, fit seconds).
+    """
+    user_idx, item_idx, ratings, folds = _worker_ratings
+    test = np.asarray(folds) == fold
+    train = pd.DataFrame({'user': user_idx[~test], 'item': item_idx[~test], 'rating': ratings[~test]})
+    trainset = Dataset.load_from_df(train, Reader(rating_scale=rating_scale)).build_full_trainset()
+
+    start = time.perf_counter()
+    model = SVD(random_state=seed, **params)
+    model.fit(trainset)
+    fit_seconds = time.perf_counter() - start
+
+    errors = _predict(model, trainset, np.asarray(user_idx[test]), np.asarray(item_idx[test]), rating_scale) - ratings[test]
+    return config_id, fold, float(np.sqrt(np.mean(errors ** 2))), float(np.mean(np.abs(errors))), fit_seconds
+
+
+class SVDHyperparameterSearch:
+    """
+    Successive-halving search over Surprise SVD hyperparameters, cross-validated across a process pool.
+
+    Every sampled configuration is first scored on one fold; only the best 1/eta of them move on
+    to the next rung, which scores them on eta times as many folds (re-using the folds already
+    scored), until the survivors have been scored on every fold. Each (configuration, fold) fit is
+    a separate pool task. The ratings are written once as .npy files that the workers memory-map.
+    """
+    def __init__(self, search_space: dict, n_configs: int = 27, n_folds: int = 5, eta: int = 3,
+                 n_workers: int = None, seed: int = 42, rating_scale: tuple = (1, 10)):
+        """
+        Args:
+            search_space (dict): Candidate values per SVD parameter, e.g. {'n_factors': (50, 100), ...}.
+            n_configs (int): Number of configurations sampled from the search space. Defaults to 27.
+            n_folds (int): Cross-validation folds. Defaults to 5.
+            eta (int): Halving rate: 1/eta of the configurations survive each rung. Defaults to 3.
+            n_workers (int, optional): Worker processes. Defaults to every available core.
+            seed (int): Seed of the configuration sample, the fold split and the SVD fits. Defaults to 42.
+            rating_scale (tuple): (lowest, highest) rating. Defaults to (1, 10).
+        """
+        if eta < 2:
+            raise ValueError("eta must be at least 2.")
+        self.search_space = search_space
+        self.n_configs = n_configs
+        self.n_folds = n_folds
+        self.eta = eta
+        self.n_workers = n_workers
+        self.seed = seed
+        self.rating_scale = tuple(rating_scale)
+
+    def sample_configs(self) -> list:
+        """
+        Samples distinct configurations from the search space, starting with Surprise's defaults.
+        Parameters missing from the search space keep their default value.
+        """
+        names = list(self.search_space)
+        grid = [dict(zip(names, values)) for values in itertools.product(*(self.search_space[name] for name in names))]
+        rng = np.random.default_rng(self.seed)
+        configs = [DEFAULT_SVD_PARAMS.copy()]
+        for index in rng.permutation(len(grid)):
+            config = {**DEFAULT_SVD_PARAMS, **grid[index]}
+            if config not in configs:
+                configs.append(config)
+            if len(configs) >= self.n_configs:
+                break
+        return configs
+
+    def rung_folds(self) -> list:
+        """Number of folds each configuration is scored on at each rung, e.g. [1, 3, 5] for 5 folds and eta 3."""
+        budgets, n = [], 1
+        while n < self.n_folds:
+            budgets.append(n)
+            n *= self.eta
+        return budgets + [self.n_folds]
+
+    def _write_ratings(self, data_dir: str, user_idx, item_idx, ratings) -> None:
+        folds = np.random.default_rng(self.seed).permutation(len(ratings)) % self.n_folds
+        arrays = {
+            'user_idx': np.asarray(user_idx, dtype=np.int32),
+            'item_idx': np.asarray(item_idx, dtype=np.int32),
+            'rating': np.asarray(ratings, dtype=np.float32),
+            'fold': folds.astype(np.int8),
+        }
+        for name in _RATING_ARRAYS:
+            np.save(os.path.join(data_dir, f"{name}.npy"), arrays[name])
+
+    def run(self, user_idx, item_idx, ratings) -> dict:
+        """
+        Runs the search over a set of ratings.
+
+        Args:
+            user_idx (np.ndarray): User index of each rating.
+            item_idx (np.ndarray): Item index of each rating.
+            ratings (np.ndarray): Rating values.
+
+        Returns:
+            dict: The search report, with 'best_params' and their cross-validation metrics under 'best_cv_metrics'.
+        """
+        try:
+            configs = self.sample_configs()
+            rung_folds = self.rung_folds()
+            scores = {config_id: {} for config_id in range(len(configs))}
+            survivors = list(range(len(configs)))
+            rungs = []
+            start = time.perf_counter()
+            logging.info(f"SVD search over {len(configs)} configurations, {self.n_folds} folds, rungs of {rung_folds} folds")
+
+            with tempfile.TemporaryDirectory(prefix="svd_tuning_") as data_dir:
+                self._write_ratings(data_dir, user_idx, item_idx, ratings)
+                with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker, initargs=(data_dir,)) as executor:
+                    for rung, n_folds in enumerate(rung_folds):
+                        futures = [
+                            executor.submit(_evaluate_fold, config_id, configs[config_id], fold, self.rating_scale, self.seed)
+                            for config_id in survivors for fold in range(n_folds) if fold not in scores[config_id]
+                        ]
+                        for future in futures:
+                            config_id, fold, rmse, mae, fit_seconds = future.result()
+                            scores[config_id][fold] = (rmse, mae, fit_seconds)
+                        mean_rmse = {config_id: np.mean([scores[config_id][fold][0] for fold in range(n_folds)]) for config_id in survivors}
+                        survivors.sort(key=mean_rmse.get)
+                        rungs.append({'rung': rung, 'folds': n_folds, 'configs': len(survivors), 'fits': len(futures),
+                                      'best_rmse': float(mean_rmse[survivors[0]]), 'best_params': configs[survivors[0]]})
+                        logging.info(f"Rung {rung}: {len(survivors)} configurations on {n_folds} folds, best RMSE {mean_rmse[survivors[0]]:.4f}")
+                        if rung < len(rung_folds) - 1:
+                            survivors = survivors[:max(1, len(survivors) // self.eta)]
+
+            best = survivors[0]
+            n_fits = sum(len(folds) for folds in scores.values())
+            report = {
+                'best_params': configs[best],
+                'best_cv_metrics': self._cv_metrics(scores[best]),
+                'default_params': DEFAULT_SVD_PARAMS,
+                'n_ratings': int(len(ratings)),
+                'n_folds': self.n_folds,
+                'eta': self.eta,
+                'n_fits': n_fits,
+                'full_grid_fits': len(configs) * self.n_folds,
+                'wall_seconds': time.perf_counter() - start,
+                'rungs': rungs,
+                'configs': [
+                    {'params': config, 'folds': len(scores[config_id]),
+                     'rmse': float(np.mean([score[0] for score in scores[config_id].values()]))}
+                    for config_id, config in enumerate(configs)
+                ],
+            }
+            logging.info(f"SVD search finished after {n_fits} of {report['full_grid_fits']} fits: {configs[best]} with {report['best_cv_metrics']}")
+            return report
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @staticmethod
+    def _cv_metrics(fold_scores: dict) -> dict:
+        rmse, mae, fit_seconds = (np.array([fold_scores[fold][i] for fold in sorted(fold_scores)]) for i in range(3))
+        return {
+            'rmse_mean': float(rmse.mean()), 'rmse_std': float(rmse.std()),
+            'mae_mean': float(mae.mean()), 'mae_std': float(mae.std()),
+            'fold_rmse': rmse.tolist(), 'fit_seconds_mean': float(fit_seconds.mean()),
+        }
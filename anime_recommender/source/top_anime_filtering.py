@@ -1,104 +1,188 @@
 import sys
 import numpy as np
 import pandas as pd 
-from anime_recommender.loggers.logging import logging
+from anime_recommender.loggers.logging import logging, SAMPLED
 from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.source.result_cache import cached_result
+from anime_recommender.source.pagination import RankedCursor
+from anime_recommender.source.recommendations import AnimeMetadata, Recommendations
+from anime_recommender.utils.serving_metrics import phase
 
 class PopularityBasedFiltering:
     """
     A recommender system that filters popular animes based on different criteria such as popularity, rank,
     average rating, number of members, and favorites.
+
+    The catalog columns only change with a pipeline run, so every ranking is computed once, as an
+    order of catalog rows, and requests only slice it: one instance can answer concurrent requests
+    from several threads. With PopularityStatistics attached, the most rated and top rated by users
+    leaderboards follow the rating stream instead.
     """
-    def __init__(self, df):
+    def __init__(self, df, result_cache=None, statistics=None):
         """
-        Initialize the PopularityBasedFiltering class with a DataFrame.
+        Initialize the PopularityBasedFiltering class with a DataFrame, an optional RecommendationCache shared across calls and sessions
+        and optional PopularityStatistics maintained from rating events.
         """
         try:
             logging.info("Initializing PopularityBasedFiltering class")
-            self.df = df
-            self.df['average_rating'] = pd.to_numeric(self.df['average_rating'], errors='coerce')
-            self.df['average_rating'].fillna(self.df['average_rating'].median())
+            # Normalized on a copy, leaving the caller's frame, possibly shared, untouched
+            self.df = df.assign(
+                average_rating=pd.to_numeric(df['average_rating'], errors='coerce'),
+                rank=pd.to_numeric(df['rank'].replace('UNKNOWN', np.nan), errors='coerce'),
+            ).reset_index(drop=True)
+            self.metadata = AnimeMetadata.from_frame(self.df)
+            self.result_cache = result_cache
+            self.statistics = statistics
+            self._catalog_rows = None
+            self._orders = self._rank_catalog(self.df)
         except Exception as e:
             logging.error("Error initializing PopularityBasedFiltering: %s", str(e))
             raise AnimeRecommendorException(e, sys)
          
+    @staticmethod
+    def _rank_catalog(df) -> dict:
+        """
+        Orders the catalog rows once for every ranking.
+
+        Returns:
+            dict: Ranking name to a read-only array of catalog row positions, best first.
+        """
+        orders = {
+            'popular_animes': df.sort_values(by=['popularity'], ascending=True).index,
+            'top_ranked_animes': df[df['rank'] > 1].sort_values(by=['rank'], ascending=True).index,
+            'overall_top_rated_animes': df.sort_values(by=['average_rating'], ascending=False).index,
+            'favorite_animes': df.sort_values(by=['favorites'], ascending=False).index,
+            'top_animes_members': df.sort_values(by=['members'], ascending=False).index,
+            'popular_anime_among_members': df.sort_values(by=['members', 'average_rating'], ascending=[False, False]).drop_duplicates(subset='name').index,
+            # The same order as nlargest, which keeps the first of tied rows and drops missing ratings
+            'top_avg_rated': df.drop_duplicates(subset='name').dropna(subset=['average_rating']).sort_values(by=['average_rating'], ascending=False, kind='stable').index,
+        }
+        orders = {name: np.asarray(order, dtype=np.int64) for name, order in orders.items()}
+        for order in orders.values():
+            order.setflags(write=False)
+        return orders
+
+    def _top(self, ranking: str, n: int) -> np.ndarray:
+        with phase("scoring"):
+            return self._orders[ranking][:n]
+
+    @cached_result('popular_animes')
     def popular_animes(self, n=10):
         """
         Get the top N most popular animes.
         """
-        logging.info("Fetching top %d most popular animes", n)
-        sorted_df = self.df.sort_values(by=['popularity'], ascending=True)
-        top_n_anime = sorted_df.head(n)
-        return self._format_output(top_n_anime)
+        logging.debug("Fetching top %d most popular animes", n, extra=SAMPLED)
+        return self._format_output(self._top('popular_animes', n))
     
+    @cached_result('top_ranked_animes')
     def top_ranked_animes(self, n=10):
         """
         Get the top N ranked animes.
         """
-        logging.info("Fetching top %d ranked animes", n)
-        self.df['rank'] = self.df['rank'].replace('UNKNOWN', np.nan).astype(float)
-        df_filtered = self.df[self.df['rank'] > 1]
-        sorted_df = df_filtered.sort_values(by=['rank'], ascending=True)
-        top_n_anime = sorted_df.head(n)
-        return self._format_output(top_n_anime)
+        logging.debug("Fetching top %d ranked animes", n, extra=SAMPLED)
+        return self._format_output(self._top('top_ranked_animes', n))
     
+    @cached_result('overall_top_rated_animes')
     def overall_top_rated_animes(self, n=10):
         """
         Get the top N highest-rated animes.
         """
-        logging.info("Fetching top %d highest-rated animes", n)
-        sorted_df = self.df.sort_values(by=['average_rating'], ascending=False)
-        top_n_anime = sorted_df.head(n)
-        return self._format_output(top_n_anime)
+        logging.debug("Fetching top %d highest-rated animes", n, extra=SAMPLED)
+        return self._format_output(self._top('overall_top_rated_animes', n))
     
+    @cached_result('favorite_animes')
     def favorite_animes(self, n=10):
         """
         Get the top N most favorited animes.
         """
-        logging.info("Fetching top %d most favorited animes", n)
-        sorted_df = self.df.sort_values(by=['favorites'], ascending=False)
-        top_n_anime = sorted_df.head(n)
-        return self._format_output(top_n_anime)
+        logging.debug("Fetching top %d most favorited animes", n, extra=SAMPLED)
+        return self._format_output(self._top('favorite_animes', n))
     
+    @cached_result('top_animes_members')
     def top_animes_members(self, n=10):
         """
         Get the top N animes based on the number of members.
         """
-        logging.info("Fetching top %d animes based on number of members", n)
-        sorted_df = self.df.sort_values(by=['members'], ascending=False)
-        top_n_anime = sorted_df.head(n)
-        return self._format_output(top_n_anime)
+        logging.debug("Fetching top %d animes based on number of members", n, extra=SAMPLED)
+        return self._format_output(self._top('top_animes_members', n))
     
+    @cached_result('popular_anime_among_members')
     def popular_anime_among_members(self, n=10):
         """
         Get the top N animes popular among members based on the highest number of members and ratings.
         """
-        logging.info("Fetching top %d popular animes among members", n)
-        sorted_df = self.df.sort_values(by=['members', 'average_rating'], ascending=[False, False]).drop_duplicates(subset='name') 
-        popular_animes = sorted_df.head(n)
-        return self._format_output(popular_animes)
+        logging.debug("Fetching top %d popular animes among members", n, extra=SAMPLED)
+        return self._format_output(self._top('popular_anime_among_members', n))
     
+    @cached_result('top_avg_rated')
     def top_avg_rated(self, n=10): 
         """
-        Get the top N highest-rated animes after handling missing values.
-        """
-        logging.info("Fetching top %d highest average-rated animes", n)
-        self.df['average_rating'] = pd.to_numeric(self.df['average_rating'], errors='coerce')
-        median_rating = self.df['average_rating'].median()
-        self.df['average_rating'].fillna(median_rating)
-        top_animes = (
-            self.df.drop_duplicates(subset='name')
-                    .nlargest(n, 'average_rating')[['name', 'average_rating', 'image url', 'genres']]
-        )
-        return self._format_output(top_animes)
+        Get the top N highest-rated animes.
+        """
+        logging.debug("Fetching top %d highest average-rated animes", n, extra=SAMPLED)
+        return self._format_output(self._top('top_avg_rated', n))
     
-    def _format_output(self, anime_df):
+    def _leaderboard_output(self, anime_idx, ratings):
+        """
+        Formats a PopularityStatistics leaderboard, reporting the running average rating from the stream.
+        """
+        with phase("metadata"):
+            if self._catalog_rows is None:
+                self._catalog_rows = pd.Series(np.arange(len(self.df)), index=self.df['anime_id'].to_numpy()).groupby(level=0).first()
+            rows = self._catalog_rows.reindex(self.statistics.anime_ids[anime_idx]).to_numpy()
+            known = ~np.isnan(rows)
+            return Recommendations(self.metadata, rows[known].astype(np.int64), ratings=np.round(ratings[known], 2))
+
+    def most_rated_animes(self, n=10):
+        """
+        Get the top N animes with the most user ratings, including streamed ratings.
+        """
+        if self.statistics is None:
+            raise ValueError("Rating statistics are not attached.")
+        logging.debug("Fetching top %d most rated animes", n, extra=SAMPLED)
+        with phase("scoring"):
+            anime_idx, _ = self.statistics.most_rated.top(n)
+            averages = self.statistics.averages()[anime_idx]
+        return self._leaderboard_output(anime_idx, averages)
+
+    def top_rated_by_users(self, n=10):
+        """
+        Get the top N animes by running average user rating, among animes with enough ratings.
+        """
+        if self.statistics is None:
+            raise ValueError("Rating statistics are not attached.")
+        logging.debug("Fetching top %d animes by average user rating", n, extra=SAMPLED)
+        with phase("scoring"):
+            anime_idx, averages = self.statistics.top_rated.top(n)
+        return self._leaderboard_output(anime_idx, averages)
+
+    def cursor(self, filter_type: str = 'popular_animes'):
+        """
+        Pages through one of the rankings, slicing its precomputed order page by page.
+
+        Args:
+            filter_type (str): Name of a ranking method, e.g. 'popular_animes' or 'most_rated_animes'.
+
+        Returns:
+            RankedCursor: Cursor yielding Recommendations pages.
+        """
+        if filter_type in self._orders:
+            return RankedCursor.from_ranked(self._orders[filter_type], self._format_output)
+        if filter_type in ('most_rated_animes', 'top_rated_by_users'):
+            if self.statistics is None:
+                raise ValueError("Rating statistics are not attached.")
+            # The leaderboard as of now, read once for every page
+            leaderboard = self.statistics.most_rated if filter_type == 'most_rated_animes' else self.statistics.top_rated
+            anime_idx, values = leaderboard.top(leaderboard.capacity)
+            averages = self.statistics.averages()[anime_idx] if filter_type == 'most_rated_animes' else values
+            return RankedCursor.from_ranked(
+                np.arange(len(anime_idx)), lambda positions: self._leaderboard_output(anime_idx[positions], averages[positions])
+            )
+        raise ValueError(f"Unknown ranking '{filter_type}'.")
+
+    def _format_output(self, rows) -> Recommendations:
         """
-        Format the output as a DataFrame with selected anime attributes.
+        Format ranked catalog rows as recommendations, their anime attributes read from the metadata index.
         """
-        return pd.DataFrame({
-            'Anime name': anime_df['name'].values,
-            'Image URL': anime_df['image url'].values,
-            'Genres': anime_df['genres'].values,
-            'Rating': anime_df['average_rating'].values
-        })
\ No newline at end of file
+        with phase("metadata"):
+            return Recommendations(self.metadata, rows)
\ No newline at end of file
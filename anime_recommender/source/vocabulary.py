@@ -0,0 +1,191 @@
+import sys
+import numpy as np
+import pandas as pd
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+
+# Above this many slots per known ID a dense lookup table wastes too much memory, so binary search is used instead
+MAX_DENSE_LOOKUP_RATIO: int = 64
+
+
+class _IdIndex:
+    """
+    Forward and reverse mapping between raw integer IDs and contiguous int32 indices.
+    """
+    def __init__(self, ids):
+        """
+        Args:
+            ids (np.ndarray): Raw IDs in index order. Must be unique.
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self._lookup = None
+        if len(self.ids) and self.ids.min() >= 0:
+            max_id = int(self.ids.max())
+            if max_id + 1 <= MAX_DENSE_LOOKUP_RATIO * len(self.ids):
+                self._lookup = np.full(max_id + 1, -1, dtype=np.int32)
+                self._lookup[self.ids] = np.arange(len(self.ids), dtype=np.int32)
+        if self._lookup is None:
+            self._order = np.argsort(self.ids, kind='stable').astype(np.int32)
+            self._sorted_ids = self.ids[self._order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index(self, ids) -> np.ndarray:
+        """
+        Maps raw IDs to indices, returning -1 for unknown IDs.
+        """
+        ids = np.asarray(ids)
+        if ids.dtype.kind == 'f':
+            valid = np.isfinite(ids)
+            ids = np.where(valid, ids, -1).astype(np.int64)
+        else:
+            ids = ids.astype(np.int64)
+        if self._lookup is not None:
+            in_range = (ids >= 0) & (ids < len(self._lookup))
+            return np.where(in_range, self._lookup[np.where(in_range, ids, 0)], -1).astype(np.int32)
+        if not len(self._sorted_ids):
+            return np.full(ids.shape, -1, dtype=np.int32)
+        pos = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[pos] == ids, self._order[pos], -1).astype(np.int32)
+
+
+class IdVocabulary:
+    """
+    Dense integer vocabulary shared by every model and serving path.
+
+    Maps `user_id` and `anime_id` to contiguous int32 indices with O(1) array-based forward and
+    reverse lookups, and keeps a separate title -> anime_id map. Anime that have at least one rating
+    are assigned the first `n_rated_anime` indices, so collaborative matrices only need that many
+    columns while content-based models can still address the whole catalog. Users dropped by k-core
+    pruning have no index but are remembered in `pruned_user_ids`, so serving can fall back to
+    popularity for them.
+    """
+    # Sorted raw IDs of users pruned from the ratings; class default for vocabularies pickled without it
+    pruned_user_ids = np.empty(0, dtype=np.int64)
+    # SearchIndex resolving titles without an exact match, attached when serving
+    search_index = None
+
+    def __init__(self, user_ids, anime_ids, anime_titles, n_rated_anime):
+        """
+        Args:
+            user_ids (np.ndarray): Unique user IDs in index order.
+            anime_ids (np.ndarray): Unique anime IDs in index order, rated anime first.
+            anime_titles (np.ndarray): Anime titles aligned with anime_ids.
+            n_rated_anime (int): Number of leading anime indices that have ratings.
+        """
+        try:
+            self._users = _IdIndex(user_ids)
+            self._anime = _IdIndex(anime_ids)
+            self.anime_titles = np.asarray(anime_titles, dtype=object)
+            self.n_rated_anime = int(n_rated_anime)
+            # Titles are not unique; iterate in reverse so the lowest (rated-first) index wins
+            self.title_to_anime_id = dict(zip(self.anime_titles[::-1], self._anime.ids[::-1]))
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @classmethod
+    def from_frames(cls, anime_df: pd.DataFrame, rating_df: pd.DataFrame = None, pruned_user_ids=None) -> "IdVocabulary":
+        """
+        Builds the vocabulary from the anime catalog and the (transformed) ratings.
+
+        Args:
+            anime_df (pd.DataFrame): DataFrame with 'anime_id' and 'name' columns.
+            rating_df (pd.DataFrame, optional): DataFrame with 'user_id' and 'anime_id' columns. Defaults to None.
+            pruned_user_ids (array-like, optional): IDs of users whose ratings were pruned from rating_df. Defaults to None.
+
+        Returns:
+            IdVocabulary: The built vocabulary.
+        """
+        try:
+            catalog = anime_df[['anime_id', 'name']].dropna(subset=['anime_id'])
+            if rating_df is not None:
+                catalog = pd.concat([catalog, rating_df[['anime_id', 'name']] if 'name' in rating_df else rating_df[['anime_id']]])
+                rating_anime = pd.to_numeric(rating_df['anime_id'], errors='coerce').dropna().astype(np.int64).to_numpy()
+                user_ids = pd.to_numeric(rating_df['user_id'], errors='coerce').dropna().astype(np.int64).to_numpy()
+            else:
+                rating_anime = np.empty(0, dtype=np.int64)
+                user_ids = np.empty(0, dtype=np.int64)
+            catalog = catalog.dropna(subset=['anime_id']).drop_duplicates(subset='anime_id')
+            catalog_ids = catalog['anime_id'].astype(np.int64).to_numpy()
+
+            rated = np.unique(rating_anime)
+            unrated = np.setdiff1d(catalog_ids, rated)
+            anime_ids = np.concatenate([rated, unrated])
+            titles = pd.Series(catalog['name'].to_numpy(), index=catalog_ids).reindex(anime_ids).to_numpy()
+
+            vocabulary = cls(np.unique(user_ids), anime_ids, titles, n_rated_anime=len(rated))
+            if pruned_user_ids is not None:
+                vocabulary.pruned_user_ids = np.setdiff1d(np.asarray(pruned_user_ids, dtype=np.int64), vocabulary.user_ids)
+            logging.info(f"Vocabulary built with {vocabulary.n_users} users and {vocabulary.n_anime} anime ({vocabulary.n_rated_anime} rated)")
+            return vocabulary
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+    @property
+    def n_users(self) -> int:
+        return len(self._users)
+
+    @property
+    def n_anime(self) -> int:
+        return len(self._anime)
+
+    @property
+    def user_ids(self) -> np.ndarray:
+        """Raw user IDs indexed by user index."""
+        return self._users.ids
+
+    @property
+    def anime_ids(self) -> np.ndarray:
+        """Raw anime IDs indexed by anime index."""
+        return self._anime.ids
+
+    def user_index(self, user_ids):
+        """
+        Maps one or many user IDs to user indices.
+
+        Args:
+            user_ids (int or array-like): Raw user ID(s).
+
+        Returns:
+            int or np.ndarray: The int32 index (or indices), -1 where the user is unknown.
+        """
+        codes = self._users.index(np.atleast_1d(user_ids))
+        return int(codes[0]) if np.isscalar(user_ids) else codes
+
+    def anime_index(self, anime_ids):
+        """
+        Maps one or many anime IDs to anime indices.
+
+        Args:
+            anime_ids (int or array-like): Raw anime ID(s).
+
+        Returns:
+            int or np.ndarray: The int32 index (or indices), -1 where the anime is unknown.
+        """
+        codes = self._anime.index(np.atleast_1d(anime_ids))
+        return int(codes[0]) if np.isscalar(anime_ids) else codes
+
+    def is_pruned_user(self, user_id) -> bool:
+        """
+        Whether a user ID was dropped from the ratings by k-core pruning.
+        """
+        pruned = self.pruned_user_ids
+        if not len(pruned):
+            return False
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return False
+        pos = np.searchsorted(pruned, user_id)
+        return bool(pos < len(pruned) and pruned[pos] == user_id)
+
+    def anime_index_for_title(self, title: str) -> int:
+        """
+        Resolves an anime title to its anime index, or -1 if the title is unknown. With a search
+        index attached, spelling variants of a title resolve to it too.
+        """
+        anime_id = self.title_to_anime_id.get(title)
+        if anime_id is None and self.search_index is not None and isinstance(title, str):
+            anime_id = self.search_index.resolve(title)
+        return -1 if anime_id is None or anime_id < 0 else self.anime_index(anime_id)
@@ -0,0 +1,264 @@
+import os
+import sys
+import glob
+import json
+import argparse
+from datetime import datetime
+import pandas as pd
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.constant import *
+
+# Bundle dataset name -> Hugging Face dataset repo
+BUNDLE_DATASETS = {
+    'anime': ANIME_FILE_PATH,
+    'anime_user_ratings': ANIMEUSERRATINGS_FILE_PATH,
+}
+BUNDLE_MODELS = (
+    MODEL_TRAINER_COSINESIMILARITY_MODEL_NAME,
+    MODEL_TRAINER_ITEM_KNN_TRAINED_MODEL_NAME,
+    MODEL_TRAINER_USER_KNN_TRAINED_MODEL_NAME,
+    MODEL_TRAINER_SVD_TRAINED_MODEL_NAME,
+)
+# Shipped by newer model repos only
+OPTIONAL_BUNDLE_MODELS = (
+    MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_NAME,
+    RECOMMENDATION_STORE_FILE_NAME,
+)
+
+
+class ArtifactBundle:
+    """
+    Resolves the app's datasets and models from a local bundle directory. Without a bundle the
+    datasets are loaded from the Hugging Face Hub, but models are not: Hub models may be in
+    another row layout than the vocabulary built here, so they are only served once
+    `build_bundle` has checked them.
+
+    A bundle is built once (e.g. while building the Docker image) by `build_bundle`; it holds the
+    datasets as Parquet files, the model files and a manifest recording where they came from.
+    The Hub libraries are only imported on the fallback path.
+    """
+    def __init__(self, bundle_dir: str = None):
+        """
+        Args:
+            bundle_dir (str, optional): Bundle directory. Defaults to $ANIME_ARTIFACT_BUNDLE_DIR, then ARTIFACT_BUNDLE_DIR.
+        """
+        self.bundle_dir = bundle_dir or os.environ.get(ARTIFACT_BUNDLE_DIR_ENV_VAR, ARTIFACT_BUNDLE_DIR)
+        manifest_path = os.path.join(self.bundle_dir, ARTIFACT_BUNDLE_MANIFEST_FILE_NAME)
+        self.manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        self._hub_revision = None
+        logging.info(f"Artifact source: {'bundle ' + self.bundle_dir if self.is_local else 'Hugging Face Hub'}")
+
+    @property
+    def is_local(self) -> bool:
+        """Whether artifacts are read from a local bundle."""
+        return self.manifest is not None
+
+    @property
+    def model_version(self) -> str:
+        """Revision of the model repo the artifacts come from."""
+        if self.is_local:
+            return self.manifest.get('models_revision') or self.manifest['created_at']
+        if self._hub_revision is None:
+            try:
+                from huggingface_hub import HfApi
+                self._hub_revision = HfApi().model_info(MODELS_FILEPATH).sha
+            except Exception as e:
+                logging.warning(f"Could not resolve the model repo revision: {e}")
+                self._hub_revision = "hub"
+        return self._hub_revision
+
+    def model_path(self, file_name: str):
+        """
+        Local path of a model file.
+
+        Args:
+            file_name (str): Model file name, e.g. MODEL_TRAINER_SVD_TRAINED_MODEL_NAME.
+
+        Returns:
+            str or None: The path, or None when there is no bundle or the bundle does not have the file.
+        """
+        if not self.is_local:
+            logging.warning(
+                f"Model file {file_name} not served: no artifact bundle in {self.bundle_dir}; "
+                f"build one with `python -m anime_recommender.utils.artifact_bundle`"
+            )
+            return None
+        path = os.path.join(self.bundle_dir, ARTIFACT_BUNDLE_MODELS_DIR, file_name)
+        return path if os.path.exists(path) else None
+
+    def load_dataframe(self, name: str) -> pd.DataFrame:
+        """
+        Loads one of the BUNDLE_DATASETS as a DataFrame.
+
+        Args:
+            name (str): 'anime' or 'anime_user_ratings'.
+
+        Returns:
+            pd.DataFrame: The dataset.
+        """
+        try:
+            if self.is_local:
+                return pd.read_parquet(os.path.join(self.bundle_dir, ARTIFACT_BUNDLE_DATASETS_DIR, f"{name}.parquet"))
+            from datasets import load_dataset
+            return pd.DataFrame(load_dataset(BUNDLE_DATASETS[name], split=None)["train"])
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+
+class RunArtifacts:
+    """
+    ArtifactBundle-compatible view of one completed training run's Artifacts/<timestamp> directory.
+    """
+    is_local = True
+
+    def __init__(self, artifact_dir: str):
+        """
+        Args:
+            artifact_dir (str): The run's artifact directory.
+        """
+        self.artifact_dir = artifact_dir
+        self.model_version = os.path.basename(os.path.normpath(artifact_dir))
+        self._dataset_paths = {
+            'anime': os.path.join(artifact_dir, DATA_INGESTION_DIR_NAME, DATA_INGESTION_FEATURE_STORE_DIR, ANIME_FILE_NAME),
+            'anime_user_ratings': os.path.join(artifact_dir, DATA_TRANSFORMATION_DIR, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, MERGED_FILE_NAME),
+        }
+
+    def model_path(self, file_name: str):
+        """Path of a file the run produced, or None when the run did not produce it."""
+        paths = glob.glob(os.path.join(glob.escape(self.artifact_dir), '**', file_name), recursive=True)
+        return paths[0] if paths else None
+
+    def load_dataframe(self, name: str) -> pd.DataFrame:
+        """Loads the run's anime catalog ('anime') or transformed ratings ('anime_user_ratings')."""
+        try:
+            return pd.read_csv(self._dataset_paths[name])
+        except Exception as e:
+            raise AnimeRecommendorException(e, sys)
+
+
+def _conform_bundle_models(models_dir: str, ratings: pd.DataFrame, vocabulary) -> list:
+    """
+    Checks every downloaded KNN model and item neighbor table against the bundled vocabulary,
+    retraining the ones in another row layout (e.g. fitted on the older name-sorted pivot tables)
+    on the bundled ratings.
+
+    Args:
+        models_dir (str): The bundle's models directory.
+        ratings (pd.DataFrame): The bundled user ratings.
+        vocabulary (IdVocabulary): The bundled vocabulary.
+
+    Returns:
+        list: File names of the retrained models.
+
+    Raises:
+        ModelLayoutError: When a model still does not match the vocabulary.
+    """
+    from anime_recommender.source.collaborative_modelling import CollaborativeAnimeRecommender
+    from anime_recommender.source.model_layout import LAYOUT_MODELS, check_model_layout
+    from anime_recommender.utils.main_utils.utils import load_object, save_model
+
+    recommender, retrained = None, []
+    for file_name, method in LAYOUT_MODELS.items():
+        path = os.path.join(models_dir, file_name)
+        if not os.path.exists(path):
+            continue
+        model = load_object(path)
+        if recommender is None:
+            recommender = CollaborativeAnimeRecommender(ratings, vocabulary=vocabulary)
+        conformed = recommender.conform_model(method, model)
+        if conformed is not model:
+            save_model(conformed, path)
+            retrained.append(file_name)
+        # Fails the build rather than ship a model whose neighbor indices name the wrong rows
+        check_model_layout(load_object(path), vocabulary, method, name=file_name)
+    return retrained
+
+
+def build_bundle(bundle_dir: str) -> dict:
+    """
+    Downloads the datasets and models into a self-contained bundle directory.
+
+    KNN models and the item neighbor table are checked against the bundled vocabulary and
+    retrained on the bundled ratings when they are in another row layout; the build fails if a
+    model still does not match.
+
+    Args:
+        bundle_dir (str): Directory to write the bundle to.
+
+    Returns:
+        dict: The bundle manifest.
+    """
+    try:
+        from datasets import load_dataset
+        from huggingface_hub import HfApi, hf_hub_download
+        from anime_recommender.source.vocabulary import IdVocabulary
+        from anime_recommender.source.search_index import SearchIndex
+        from anime_recommender.source.content_based_modelling import content_catalog
+        from anime_recommender.utils.main_utils.utils import save_model, save_json
+
+        datasets_dir = os.path.join(bundle_dir, ARTIFACT_BUNDLE_DATASETS_DIR)
+        models_dir = os.path.join(bundle_dir, ARTIFACT_BUNDLE_MODELS_DIR)
+        os.makedirs(datasets_dir, exist_ok=True)
+        os.makedirs(models_dir, exist_ok=True)
+
+        frames = {}
+        for name, repo in BUNDLE_DATASETS.items():
+            logging.info(f"Bundling dataset {repo}")
+            frames[name] = pd.DataFrame(load_dataset(repo, split=None)["train"])
+            frames[name].to_parquet(os.path.join(datasets_dir, f"{name}.parquet"), index=False)
+
+        revision = HfApi().model_info(MODELS_FILEPATH).sha
+        for file_name in BUNDLE_MODELS + OPTIONAL_BUNDLE_MODELS:
+            try:
+                hf_hub_download(MODELS_FILEPATH, file_name, revision=revision, local_dir=models_dir)
+            except Exception as e:
+                if file_name in BUNDLE_MODELS:
+                    raise
+                logging.info(f"Optional model file {file_name} not in {MODELS_FILEPATH}, skipped: {e}")
+
+        # Ship the shared vocabulary so the app does not need the ratings to map IDs
+        vocabulary = IdVocabulary.from_frames(frames['anime'], frames['anime_user_ratings'])
+        save_model(vocabulary, os.path.join(models_dir, DATA_TRANSFORMATION_VOCABULARY_FILE_NAME))
+        search_index = SearchIndex.from_vocabulary(
+            vocabulary, min_similarity=DATA_TRANSFORMATION_SEARCH_MIN_SIMILARITY,
+            content_anime_ids=content_catalog(frames['anime'])['anime_id'].to_numpy()
+        )
+        save_model(search_index, os.path.join(models_dir, DATA_TRANSFORMATION_SEARCH_INDEX_FILE_NAME))
+
+        retrained_models = _conform_bundle_models(models_dir, frames['anime_user_ratings'], vocabulary)
+        store_path = os.path.join(models_dir, RECOMMENDATION_STORE_FILE_NAME)
+        if retrained_models and os.path.exists(store_path):
+            # The stored lists were scored with the replaced models, so they are scored live instead
+            logging.info(f"Dropping {RECOMMENDATION_STORE_FILE_NAME}: scored with models retrained here ({retrained_models})")
+            os.remove(store_path)
+
+        files = {}
+        for root, _, names in os.walk(bundle_dir):
+            for file_name in names:
+                path = os.path.join(root, file_name)
+                files[os.path.relpath(path, bundle_dir)] = os.path.getsize(path)
+        manifest = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'models_repo': MODELS_FILEPATH,
+            'models_revision': revision,
+            'datasets': BUNDLE_DATASETS,
+            'rows': {name: len(frame) for name, frame in frames.items()},
+            'retrained_models': retrained_models,
+            'files': files,
+        }
+        save_json(manifest, os.path.join(bundle_dir, ARTIFACT_BUNDLE_MANIFEST_FILE_NAME))
+        logging.info(f"Artifact bundle written to {bundle_dir}: {sum(files.values())} bytes in {len(files)} files")
+        return manifest
+    except Exception as e:
+        raise AnimeRecommendorException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline artifact bundle baked into the app image.")
+    parser.add_argument("--bundle-dir", default=ARTIFACT_BUNDLE_DIR)
+    args = parser.parse_args()
+    print(json.dumps(build_bundle(args.bundle_dir), indent=2))
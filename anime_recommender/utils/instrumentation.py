@@ -0,0 +1,289 @@
+import os
+import sys
+import time
+import cProfile
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from anime_recommender.loggers.logging import logging
+from anime_recommender.utils.main_utils.utils import save_json
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _children_cpu_seconds() -> float:
+    """CPU time of finished child processes, e.g. process pool workers."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _max_rss_bytes():
+    """High-water RSS of the whole process so far."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class Step:
+    """
+    Measurements of one pipeline stage or sub-step: wall and CPU time, resident memory and
+    the row/nnz counts the step reports through `set`.
+    """
+    def __init__(self, name: str, parent=None):
+        self.name = name
+        self.path = f"{parent.path}/{name}" if parent is not None else name
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.counts = {}
+        self.children = []
+        self.status = 'running'
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.children_cpu_seconds = None
+        self.rss_start_bytes = self.rss_end_bytes = self.peak_rss_bytes = current_rss_bytes()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._start_children_cpu = _children_cpu_seconds()
+
+    def set(self, **counts) -> None:
+        """Records counts such as rows=len(df) or nnz=matrix.nnz for this step."""
+        self.counts.update({name: int(value) if float(value).is_integer() else float(value) for name, value in counts.items()})
+
+    def _finish(self, status: str) -> None:
+        self.wall_seconds = time.perf_counter() - self._start_wall
+        self.cpu_seconds = time.process_time() - self._start_cpu
+        self.children_cpu_seconds = _children_cpu_seconds() - self._start_children_cpu
+        self.rss_end_bytes = current_rss_bytes()
+        self._observe_rss(self.rss_end_bytes)
+        self.status = status
+
+    def _observe_rss(self, rss_bytes) -> None:
+        if rss_bytes is not None and (self.peak_rss_bytes is None or rss_bytes > self.peak_rss_bytes):
+            self.peak_rss_bytes = rss_bytes
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'path': self.path,
+            'status': self.status,
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'children_cpu_seconds': self.children_cpu_seconds,
+            'rss_start_bytes': self.rss_start_bytes,
+            'rss_end_bytes': self.rss_end_bytes,
+            'peak_rss_bytes': self.peak_rss_bytes,
+            'counts': self.counts,
+            'children': [child.to_dict() for child in self.children],
+        }
+
+
+class _NullStep:
+    """Stand-in returned by `instrument` when no run is being instrumented."""
+    def set(self, **counts) -> None:
+        pass
+
+
+_NULL_STEP = _NullStep()
+# The run being instrumented in this process, set by PipelineInstrumentation.activate
+_active_run = None
+
+
+@contextmanager
+def instrument(name: str):
+    """
+    Measures a block of code as a step of the active run, nested under the enclosing step.
+    Does nothing when no run is active, so library code can be instrumented unconditionally.
+
+    Usage:
+        with instrument("prepare_data") as step:
+            ...
+            step.set(rows=len(df), nnz=matrix.nnz)
+    """
+    run = _active_run
+    if run is None:
+        yield _NULL_STEP
+        return
+    with run.step(name) as step:
+        yield step
+
+
+class PipelineInstrumentation:
+    """
+    Structured timing and memory instrumentation of one training pipeline run.
+
+    Stages and their sub-steps form a tree of `Step`s. Peak RSS per step is tracked by a
+    background thread sampling /proc/self/statm while the run is active (on platforms without
+    /proc, only the process-wide high-water mark is reported). With `profile_dir` set, every
+    top-level stage is also run under cProfile and its stats dumped to <profile_dir>/<stage>.prof.
+    """
+    def __init__(self, run_id: str, sample_seconds: float = 0.05, profile_dir: str = None):
+        """
+        Args:
+            run_id (str): Identifier of the run, e.g. the pipeline timestamp.
+            sample_seconds (float): RSS sampling interval. Defaults to 50 ms.
+            profile_dir (str, optional): Directory for per-stage cProfile dumps. Profiling is off when None.
+        """
+        self.run_id = run_id
+        self.sample_seconds = sample_seconds
+        self.profile_dir = profile_dir
+        self.stages = []
+        self.status = 'running'
+        self.started_at = None
+        self._local = threading.local()
+        self._open = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def step(self, name: str):
+        """Measures a block of code as a stage (at top level) or as a sub-step of the enclosing step."""
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        step = Step(name, parent)
+        with self._lock:
+            (parent.children if parent is not None else self.stages).append(step)
+            self._open.add(step)
+        stack.append(step)
+        profiler = None
+        if self.profile_dir and step.depth == 0:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        status = 'failed'
+        try:
+            yield step
+            status = 'ok'
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+            stack.pop()
+            with self._lock:
+                self._open.discard(step)
+            step._finish(status)
+            logging.info(
+                f"Step {step.path} {status} in {step.wall_seconds:.2f}s (cpu {step.cpu_seconds:.2f}s, "
+                f"peak rss {(step.peak_rss_bytes or 0) / 2**20:.0f} MiB) {step.counts}"
+            )
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.sample_seconds):
+            rss_bytes = current_rss_bytes()
+            with self._lock:
+                for step in self._open:
+                    step._observe_rss(rss_bytes)
+
+    @contextmanager
+    def activate(self):
+        """Makes this the active run for `instrument` and samples memory until the block exits."""
+        global _active_run
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        _active_run = self
+        if current_rss_bytes() is not None:
+            self._sampler = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+            self._sampler.start()
+        try:
+            yield self
+            self.status = 'ok'
+        except BaseException:
+            self.status = 'failed'
+            raise
+        finally:
+            _active_run = None
+            self._stop.set()
+            if self._sampler is not None:
+                self._sampler.join()
+
+    def to_dict(self) -> dict:
+        """The run report: run status and totals plus the tree of stages and steps."""
+        stages = [stage.to_dict() for stage in self.stages]
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'status': self.status,
+            'wall_seconds': sum(stage['wall_seconds'] or 0.0 for stage in stages),
+            'cpu_seconds': sum(stage['cpu_seconds'] or 0.0 for stage in stages),
+            'children_cpu_seconds': sum(stage['children_cpu_seconds'] or 0.0 for stage in stages),
+            'process_max_rss_bytes': _max_rss_bytes(),
+            'profile_dir': self.profile_dir,
+            'stages': stages,
+        }
+
+    def _walk(self, steps=None):
+        for step in self.stages if steps is None else steps:
+            yield step
+            yield from self._walk(step.children)
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the run as Prometheus text exposition format, for the node_exporter textfile collector.
+        """
+        def escape(value) -> str:
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        metrics = (
+            ('anime_pipeline_step_wall_seconds', 'Wall-clock time of a training pipeline stage or step.', lambda step: step.wall_seconds),
+            ('anime_pipeline_step_cpu_seconds', 'CPU time of this process during a training pipeline stage or step.', lambda step: step.cpu_seconds),
+            ('anime_pipeline_step_children_cpu_seconds', 'CPU time of finished worker processes during a training pipeline stage or step.', lambda step: step.children_cpu_seconds),
+            ('anime_pipeline_step_peak_rss_bytes', 'Peak resident memory sampled during a training pipeline stage or step.', lambda step: step.peak_rss_bytes),
+            ('anime_pipeline_step_success', 'Whether a training pipeline stage or step finished without error.', lambda step: 1 if step.status == 'ok' else 0),
+        )
+        run_label = f'run="{escape(self.run_id)}"'
+        lines = []
+        for metric, help_text, value_of in metrics:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            for step in self._walk():
+                value = value_of(step)
+                if value is not None:
+                    lines.append(f'{metric}{{{run_label},step="{escape(step.path)}"}} {value}')
+        lines += ["# HELP anime_pipeline_step_count Row, nnz and other counts reported by a training pipeline step.",
+                  "# TYPE anime_pipeline_step_count gauge"]
+        for step in self._walk():
+            for count, value in step.counts.items():
+                lines.append(f'anime_pipeline_step_count{{{run_label},step="{escape(step.path)}",count="{escape(count)}"}} {value}')
+        lines += ["# HELP anime_pipeline_run_success Whether the training pipeline run finished without error.",
+                  "# TYPE anime_pipeline_run_success gauge",
+                  f"anime_pipeline_run_success{{{run_label}}} {1 if self.status == 'ok' else 0}",
+                  "# HELP anime_pipeline_run_completed_timestamp_seconds When the run report was written.",
+                  "# TYPE anime_pipeline_run_completed_timestamp_seconds gauge",
+                  f"anime_pipeline_run_completed_timestamp_seconds{{{run_label}}} {time.time():.0f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, report_file_path: str, prometheus_file_paths: list) -> None:
+        """
+        Writes the JSON run report and the Prometheus textfile(s).
+
+        Textfiles are written to a temporary name and renamed into place, as the textfile
+        collector requires, so a scrape never reads a partial file.
+        """
+        save_json(self.to_dict(), report_file_path)
+        text = self.to_prometheus()
+        for file_path in prometheus_file_paths:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            with open(file_path + ".tmp", "w") as f:
+                f.write(text)
+            os.replace(file_path + ".tmp", file_path)
+        logging.info(f"Run report written to {report_file_path} and {', '.join(prometheus_file_paths)}")
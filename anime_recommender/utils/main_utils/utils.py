@@ -1,5 +1,6 @@
 import os
 import sys 
+import json
 import pandas as pd
 import joblib
 from anime_recommender.loggers.logging import logging
@@ -85,4 +86,41 @@ def load_object(file_path: str) -> object:
             return joblib.load(file_obj)
     except Exception as e:
         logging.error(f"Error loading object from {file_path}: {e}")
-        raise AnimeRecommendorException(e, sys) from e 
\ No newline at end of file
+        raise AnimeRecommendorException(e, sys) from e
+
+def save_json(data: dict, file_path: str) -> None:
+    """
+    Saves a dictionary (e.g. a report) to a JSON file.
+    
+    Args:
+        data (dict): The JSON-serialisable data to be saved.
+        file_path (str): The file path where the JSON should be stored.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as file_obj:
+            json.dump(data, file_obj, indent=2, default=str)
+        logging.info(f"JSON saved successfully to {file_path}.")
+    except Exception as e:
+        logging.error(f"Error saving JSON to {file_path}: {e}")
+        raise AnimeRecommendorException(e, sys) from e
+
+def get_latest_artifact_dir(artifact_root: str = ARTIFACT_DIR) -> str:
+    """
+    Finds the artifact directory of the most recent training run.
+    
+    Args:
+        artifact_root (str): The root directory holding one sub-directory per run.
+    
+    Returns:
+        str: The path of the most recently modified run directory.
+    """
+    try:
+        run_dirs = [os.path.join(artifact_root, name) for name in os.listdir(artifact_root)]
+        run_dirs = [path for path in run_dirs if os.path.isdir(path)]
+        if not run_dirs:
+            raise FileNotFoundError(f"No training runs found in {artifact_root}.")
+        return max(run_dirs, key=os.path.getmtime)
+    except Exception as e:
+        logging.error(f"Error finding the latest artifact directory in {artifact_root}: {e}")
+        raise AnimeRecommendorException(e, sys) from e
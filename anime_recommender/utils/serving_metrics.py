@@ -0,0 +1,556 @@
+import json
+import time
+import bisect
+import itertools
+import threading
+import contextvars
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from anime_recommender.loggers.logging import logging
+from anime_recommender.constant import (
+    SERVING_METRICS_ENABLED, SERVING_METRICS_LATENCY_BUCKETS, SERVING_METRICS_OVERHEAD_BUDGET,
+    SERVING_METRICS_PHASE_SAMPLE_EVERY, SERVING_METRICS_FLUSH_SIZE,
+)
+
+REQUEST_METRIC = 'anime_serving_request_seconds'
+PHASE_METRIC = 'anime_serving_phase_seconds'
+BATCH_METRIC = 'anime_serving_batch_seconds'
+LOAD_METRIC = 'anime_serving_load_seconds'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+_LABEL_NAMES = {
+    REQUEST_METRIC: ('method', 'cache', 'outcome'),
+    BATCH_METRIC: ('method',),
+    LOAD_METRIC: ('resource',),
+}
+_HELP = {
+    REQUEST_METRIC: 'Latency of recommendation requests by method, cache outcome and result.',
+    PHASE_METRIC: 'Time spent in the lookup, scoring and metadata phases of recommendation requests.',
+    BATCH_METRIC: 'Latency of micro-batched scoring calls by method.',
+    LOAD_METRIC: 'Time taken to load datasets, models and model versions.',
+}
+
+# Request or batch being served in the current thread or asyncio task, set by track_request/track_batch
+_current_request = contextvars.ContextVar('anime_serving_request', default=None)
+
+
+class LatencyHistogram:
+    """
+    Cumulative latency histogram with fixed bucket bounds, as exported to Prometheus.
+    Not thread-safe on its own; ServingMetrics serializes observations.
+    """
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        # One count per bound plus the +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        # Buckets are upper-inclusive, as Prometheus' 'le'
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def observe_many(self, seconds: list) -> None:
+        """Records a batch of observations with one vectorized binning."""
+        values = np.asarray(seconds, dtype=np.float64)
+        binned = np.bincount(np.searchsorted(self.bounds, values, side='left'), minlength=len(self.counts))
+        self.counts = [a + int(b) for a, b in zip(self.counts, binned)]
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float):
+        """
+        Estimates a quantile by linear interpolation within its bucket, as PromQL's histogram_quantile does.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else max(self.max, lower)
+                return min(lower + (upper - lower) * (rank - cumulative) / count, self.max)
+            cumulative += count
+        return self.max
+
+    def summary(self) -> dict:
+        """Count, mean, estimated quantiles and maximum, in milliseconds."""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'total_seconds': self.sum,
+            'mean_ms': 1000 * self.sum / self.count,
+            'p50_ms': 1000 * self.quantile(0.50),
+            'p90_ms': 1000 * self.quantile(0.90),
+            'p99_ms': 1000 * self.quantile(0.99),
+            'max_ms': 1000 * self.max,
+        }
+
+
+class _Timer:
+    """
+    Times one request or batch and makes it the current one for `phase`, in the calling thread or task.
+    A timer entered while another request is current reports into that request instead. Phase times
+    are collected on the timer, when it is sampled for phases, and recorded with the request.
+    """
+    __slots__ = ('metrics', 'metric', 'method', 'cache', 'size', 'outer', 'phases', '_phase_timer', '_start', '_token')
+
+    def __init__(self, metrics: "ServingMetrics", metric: str, method: str, size: int = 1, phases: list = None):
+        self.metrics = metrics
+        self.metric = metric
+        self.method = method
+        # 'hit' or 'miss' when the request went through the result cache
+        self.cache = 'none'
+        self.size = size
+        self.outer = None
+        # None when the phases of this request are not sampled
+        self.phases = phases
+        self._phase_timer = None
+
+    def __enter__(self):
+        current = _current_request.get()
+        if current is not None and self.metric == REQUEST_METRIC:
+            # e.g. a service request calling a recommender method that is tracked too
+            self.outer = current
+            return current
+        self._token = _current_request.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.outer is not None:
+            return False
+        seconds = time.perf_counter() - self._start
+        _current_request.reset(self._token)
+        if self.metric == REQUEST_METRIC:
+            self.metrics._record_request((REQUEST_METRIC, self.method, self.cache, 'error' if exc_type else 'ok'), seconds, self.phases)
+        else:
+            self.metrics._record((self.metric, self.method), seconds, self.size, self.phases)
+        return False
+
+    def phase(self, name: str):
+        if self.phases is None:
+            return _NULL_TIMER
+        # Phases of a request run one after another, so one timer object serves them all
+        if self._phase_timer is None:
+            self._phase_timer = _PhaseTimer(self)
+        self._phase_timer.name = name
+        return self._phase_timer
+
+
+class _PhaseTimer:
+    """Times one phase of a request; phases of the same request do not nest."""
+    __slots__ = ('request', 'name', '_start')
+
+    def __init__(self, request: _Timer):
+        self.request = request
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.request.phases.append((self.name, time.perf_counter() - self._start))
+        return False
+
+
+class _NullTimer:
+    """Stand-in timer used while metrics are disabled."""
+    cache = 'none'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class ServingMetrics:
+    """
+    In-process latency metrics of the serving path.
+
+    Records per-method request latency histograms (split by result cache outcome), the time spent
+    in the lookup, scoring and metadata phases within each request, micro-batch latencies and load
+    times of datasets, models and model versions. `snapshot` summarizes the metrics for the admin
+    page and `to_prometheus` renders them for scraping.
+
+    The request path only appends its latency to a buffer of its series, without taking the lock;
+    buffered latencies are binned into the histograms in bulk when the metrics are read or a
+    buffer fills up. Phases are timed on one request in `phase_sample_every`, so their counts and
+    sums cover the sampled requests while their means and shares stay representative.
+    """
+    def __init__(self, buckets: tuple = SERVING_METRICS_LATENCY_BUCKETS, enabled: bool = SERVING_METRICS_ENABLED,
+                 phase_sample_every: int = SERVING_METRICS_PHASE_SAMPLE_EVERY, flush_size: int = SERVING_METRICS_FLUSH_SIZE):
+        """
+        Args:
+            buckets (tuple): Upper bounds of the latency buckets, in seconds.
+            enabled (bool): Record metrics. When False, every timer is a no-op.
+            phase_sample_every (int): Time the phases of one request in this many.
+            flush_size (int): Buffered latencies of a series that trigger binning them.
+        """
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self.phase_sample_every = phase_sample_every
+        self.flush_size = flush_size
+        self.started_at = time.time()
+        # (metric, labels) -> histogram, labels being (name, value) pairs
+        self._histograms = {}
+        # (metric, *label values) -> the same histograms, a cheaper key for the request path
+        self._index = {}
+        # (metric, *label values) -> request latencies not yet binned; appended to without the lock
+        self._pending = {}
+        self._requests = itertools.count()
+        self._sizes = {}
+        # (method, phase) -> [count, total seconds]; phases are kept as sums, which is all a breakdown needs
+        self._phase_totals = {}
+        self._lock = threading.Lock()
+        self._overhead_seconds = None
+
+    def observe(self, metric: str, label_values: tuple, seconds: float) -> None:
+        """
+        Records one observation.
+
+        Args:
+            metric (str): Metric name, e.g. LOAD_METRIC.
+            label_values (tuple): Values of the metric's labels, in order.
+            seconds (float): Observed duration.
+        """
+        with self._lock:
+            self._histogram((metric,) + tuple(label_values)).observe(seconds)
+
+    def _histogram(self, key: tuple) -> LatencyHistogram:
+        """The histogram of the series (metric, *label values), created on first use. Caller holds the lock."""
+        histogram = self._index.get(key)
+        if histogram is None:
+            labels = tuple(zip(_LABEL_NAMES[key[0]], key[1:]))
+            histogram = self._index[key] = self._histograms[(key[0], labels)] = LatencyHistogram(self.buckets)
+        return histogram
+
+    def _record_request(self, key: tuple, seconds: float, phases: list) -> None:
+        """Buffers the latency of a finished request, recording its phases when they were sampled."""
+        pending = self._pending.get(key)
+        if pending is None:
+            with self._lock:
+                pending = self._pending.setdefault(key, [])
+        pending.append(seconds)
+        if phases:
+            with self._lock:
+                self._add_phases(key[1], phases)
+        if len(pending) >= self.flush_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Bins every buffered request latency into its histogram."""
+        with self._lock:
+            for key, pending in self._pending.items():
+                n = len(pending)
+                if n:
+                    # Only the first n are taken; latencies appended meanwhile stay for the next flush
+                    values = pending[:n]
+                    del pending[:n]
+                    self._histogram(key).observe_many(values)
+
+    def _record(self, key: tuple, seconds: float, size: int, phases: list) -> None:
+        """Records a finished batch together with its phases."""
+        with self._lock:
+            histogram = self._index.get(key) or self._histogram(key)
+            histogram.observe(seconds)
+            if key[0] == BATCH_METRIC:
+                self._sizes[key] = self._sizes.get(key, 0) + size
+            self._add_phases(key[1], phases or ())
+
+    def _add_phases(self, method: str, phases) -> None:
+        """Adds phase times to the totals of method. Caller holds the lock."""
+        for name, phase_seconds in phases:
+            totals = self._phase_totals.get((method, name))
+            if totals is None:
+                totals = self._phase_totals[(method, name)] = [0, 0.0]
+            totals[0] += 1
+            totals[1] += phase_seconds
+
+    def track_request(self, method: str):
+        """
+        Times a recommendation request.
+
+        Usage:
+            with serving_metrics.track_request('svd') as request:
+                request.cache = 'hit'
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, REQUEST_METRIC, method, phases=[] if next(self._requests) % self.phase_sample_every == 0 else None)
+
+    def track_batch(self, method: str, size: int):
+        """Times a micro-batched scoring call of size requests."""
+        return _Timer(self, BATCH_METRIC, method, size, phases=[]) if self.enabled else _NULL_TIMER
+
+    def phase(self, name: str):
+        """
+        Times a phase ('lookup', 'scoring' or 'metadata') of the current request or batch. Phases outside
+        a tracked request, e.g. batch materialization during training, are not serving time and are ignored.
+        """
+        # No request is ever current while disabled, as the timers are then no-ops
+        current = _current_request.get()
+        return current.phase(name) if current is not None else _NULL_TIMER
+
+    def observe_load(self, resource: str, seconds: float) -> None:
+        """Records the load time of a dataset, model or model version."""
+        if self.enabled:
+            self.observe(LOAD_METRIC, (resource,), seconds)
+
+    def reset(self) -> None:
+        """Drops every recorded observation."""
+        with self._lock:
+            self._histograms.clear()
+            self._index.clear()
+            self._pending.clear()
+            self._sizes.clear()
+            self._phase_totals.clear()
+            self.started_at = time.time()
+
+    def _series(self, metric: str) -> list:
+        """(labels dict, histogram copy, size) of every series of metric."""
+        self._flush()
+        with self._lock:
+            series = []
+            for (name, labels), histogram in self._histograms.items():
+                if name == metric:
+                    snapshot = LatencyHistogram(self.buckets)
+                    snapshot.merge(histogram)
+                    size = self._sizes.get((name,) + tuple(value for _, value in labels), snapshot.count)
+                    series.append((dict(labels), snapshot, size))
+            return series
+
+    def _phase_list(self) -> list:
+        """((method, phase), (count, total seconds)) of every recorded phase."""
+        with self._lock:
+            return [(key, tuple(totals)) for key, totals in self._phase_totals.items()]
+
+    def snapshot(self) -> dict:
+        """
+        Summarizes the recorded metrics.
+
+        Returns:
+            dict: Per-method request latency, throughput and cache hits; the share of request time
+            spent in each phase; batch sizes and latency; load times; and the instrumentation overhead.
+        """
+        uptime = max(time.time() - self.started_at, 1e-9)
+        requests, by_cache, errors = {}, {}, {}
+        for labels, histogram, _ in self._series(REQUEST_METRIC):
+            method = labels['method']
+            requests.setdefault(method, LatencyHistogram(self.buckets)).merge(histogram)
+            by_cache.setdefault(method, {}).setdefault(labels['cache'], LatencyHistogram(self.buckets)).merge(histogram)
+            if labels['outcome'] == 'error':
+                errors[method] = errors.get(method, 0) + histogram.count
+        phases = {}
+        for (method, name), (count, total_seconds) in self._phase_list():
+            phases.setdefault(method, {})[name] = (count, total_seconds)
+        batches = {labels['method']: (histogram, size) for labels, histogram, size in self._series(BATCH_METRIC)}
+
+        report = {'uptime_seconds': uptime, 'requests': {}, 'phases': {}, 'batches': {}, 'loads': {}}
+        for method, histogram in sorted(requests.items()):
+            report['requests'][method] = {
+                **histogram.summary(),
+                'requests_per_second': histogram.count / uptime,
+                'errors': errors.get(method, 0),
+                'by_cache': {cache: cached.summary() for cache, cached in sorted(by_cache[method].items())},
+            }
+        for method, method_phases in sorted(phases.items()):
+            method_total = sum(total_seconds for _, total_seconds in method_phases.values())
+            report['phases'][method] = {
+                name: {
+                    'count': count,
+                    'total_seconds': total_seconds,
+                    'mean_ms': 1000 * total_seconds / count,
+                    'share': total_seconds / method_total if method_total else None,
+                }
+                for name, (count, total_seconds) in sorted(method_phases.items())
+            }
+        for method, (histogram, size) in sorted(batches.items()):
+            report['batches'][method] = {**histogram.summary(), 'requests': size, 'mean_batch_size': size / histogram.count}
+        for labels, histogram, _ in self._series(LOAD_METRIC):
+            report['loads'][labels['resource']] = {'count': histogram.count, 'total_seconds': histogram.sum, 'max_seconds': histogram.max}
+        report['overhead'] = self.overhead(requests)
+        return report
+
+    def measure_overhead(self, n_requests: int = 2000, repeats: int = 5) -> float:
+        """
+        Measures the instrumentation cost of one request with three phases on a scratch registry,
+        taking the best of several runs so a busy host does not inflate the estimate. Phase sampling
+        and the binning of the buffered latencies are included, amortized over the requests.
+
+        Returns:
+            float: Seconds added per request.
+        """
+        scratch = ServingMetrics(self.buckets, phase_sample_every=self.phase_sample_every, flush_size=self.flush_size)
+        phases = ('lookup', 'scoring', 'metadata')
+
+        def baseline():
+            for _ in phases:
+                pass
+
+        def instrumented():
+            with scratch.track_request('overhead') as request:
+                request.cache = 'miss'
+                for name in phases:
+                    with scratch.phase(name):
+                        pass
+
+        def best(fn, finish=None) -> float:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                for _ in range(n_requests):
+                    fn()
+                if finish is not None:
+                    finish()
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+        return max(best(instrumented, scratch._flush) - best(baseline), 0.0) / n_requests
+
+    def overhead(self, requests: dict = None) -> dict:
+        """
+        Instrumentation cost per request relative to the mean recorded request time, against the overhead budget.
+        """
+        if self._overhead_seconds is None:
+            self._overhead_seconds = self.measure_overhead()
+        if requests is None:
+            requests = {}
+            for labels, histogram, _ in self._series(REQUEST_METRIC):
+                requests.setdefault(labels['method'], LatencyHistogram(self.buckets)).merge(histogram)
+        count = sum(histogram.count for histogram in requests.values())
+        mean_seconds = sum(histogram.sum for histogram in requests.values()) / count if count else None
+        fraction = self._overhead_seconds / mean_seconds if mean_seconds else None
+        return {
+            'per_request_us': 1e6 * self._overhead_seconds,
+            'mean_request_ms': 1000 * mean_seconds if mean_seconds else None,
+            'fraction': fraction,
+            'budget': SERVING_METRICS_OVERHEAD_BUDGET,
+            'within_budget': fraction is None or fraction <= SERVING_METRICS_OVERHEAD_BUDGET,
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the metrics in Prometheus text exposition format: latencies as histograms, phases as summaries.
+        """
+        def escape(value) -> str:
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        lines = [
+            "# HELP anime_serving_uptime_seconds Seconds since the serving metrics started recording.",
+            "# TYPE anime_serving_uptime_seconds gauge",
+            f"anime_serving_uptime_seconds {time.time() - self.started_at:.3f}",
+        ]
+        for metric in (REQUEST_METRIC, BATCH_METRIC, LOAD_METRIC):
+            series = self._series(metric)
+            if not series:
+                continue
+            lines += [f"# HELP {metric} {_HELP[metric]}", f"# TYPE {metric} histogram"]
+            for labels, histogram, _ in series:
+                label_text = ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{metric}_bucket{{{label_text},le="{le}"}} {cumulative}')
+                lines.append(f"{metric}_sum{{{label_text}}} {histogram.sum}")
+                lines.append(f"{metric}_count{{{label_text}}} {histogram.count}")
+        phase_list = self._phase_list()
+        if phase_list:
+            lines += [f"# HELP {PHASE_METRIC} {_HELP[PHASE_METRIC]}", f"# TYPE {PHASE_METRIC} summary"]
+            for (method, name), (count, total_seconds) in phase_list:
+                label_text = f'method="{escape(method)}",phase="{escape(name)}"'
+                lines.append(f"{PHASE_METRIC}_sum{{{label_text}}} {total_seconds}")
+                lines.append(f"{PHASE_METRIC}_count{{{label_text}}} {count}")
+        batch_series = self._series(BATCH_METRIC)
+        if batch_series:
+            lines += ["# HELP anime_serving_batched_requests_total Requests scored in micro-batches by method.",
+                      "# TYPE anime_serving_batched_requests_total counter"]
+            for labels, _, size in batch_series:
+                lines.append(f'anime_serving_batched_requests_total{{method="{escape(labels["method"])}"}} {size}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry shared by the recommenders, the HTTP service and the Streamlit app
+serving_metrics = ServingMetrics()
+
+
+def track_request(method: str):
+    """Times a recommendation request in the process-wide registry; see ServingMetrics.track_request."""
+    return serving_metrics.track_request(method)
+
+
+def phase(name: str):
+    """
+    Times a phase of the current request in the process-wide registry. Does nothing outside a
+    tracked request, so recommenders can be instrumented unconditionally.
+
+    Usage:
+        with phase("scoring"):
+            scores = ...
+    """
+    current = _current_request.get()
+    return current.phase(name) if current is not None else _NULL_TIMER
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    metrics = serving_metrics
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path == '/metrics':
+            body, content_type, status = self.metrics.to_prometheus().encode(), PROMETHEUS_CONTENT_TYPE, 200
+        elif path == '/metrics.json':
+            body, content_type, status = json.dumps(self.metrics.snapshot()).encode(), 'application/json', 200
+        else:
+            body, content_type, status = b'Not Found\n', 'text/plain', 404
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are not worth a log line each
+        pass
+
+
+def start_metrics_server(host: str, port: int, metrics: ServingMetrics = serving_metrics):
+    """
+    Serves /metrics (Prometheus text) and /metrics.json (snapshot) from a background thread.
+
+    Returns:
+        ThreadingHTTPServer or None: The running server, or None when the port is taken, e.g. by
+        another app process on the same host.
+    """
+    handler = type('MetricsRequestHandler', (_MetricsRequestHandler,), {'metrics': metrics})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        logging.warning(f"Serving metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="serving-metrics", daemon=True).start()
+    logging.info(f"Serving metrics available at http://{host}:{server.server_address[1]}/metrics")
+    return server
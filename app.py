@@ -1,84 +1,282 @@
+import time
+_IMPORT_START = time.perf_counter()
+import threading
+import importlib
+import joblib
 import pandas as pd
 import streamlit as st
-from anime_recommender.source.content_based_modelling import ContentBasedRecommender
-from anime_recommender.source.collaborative_modelling import CollaborativeAnimeRecommender
-from anime_recommender.source.top_anime_filtering import PopularityBasedFiltering
-import joblib
+from anime_recommender.loggers.logging import logging
 from anime_recommender.constant import *
-from huggingface_hub import hf_hub_download
-from datasets import load_dataset
+from anime_recommender.utils.artifact_bundle import ArtifactBundle, RunArtifacts
+from anime_recommender.source.result_cache import RecommendationCache
+from anime_recommender.source.recommendations import Recommendations
+from anime_recommender.source.model_layout import LAYOUT_MODELS
+from anime_recommender.serving.model_versions import ModelVersionManager, list_completed_runs
+from anime_recommender.source.top_anime_filtering import PopularityBasedFiltering
+from anime_recommender.utils.serving_metrics import serving_metrics, start_metrics_server
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
-def run_app():
+# Top anime rendered per page, so the first cards show before the rest of a long list is formatted
+POPULARITY_PAGE_SIZE = 50
+
+class LazyResources:
     """
-    Initializes the Streamlit app, loads necessary datasets and models, 
-    and provides a UI for anime recommendations based on three methods: 
-    Content-Based, Collaborative, and Popularity-Based Filtering. 🎬🎮
+    Datasets, models and recommenders of one model version, each loaded the first time a page needs it.
+
+    Every load is recorded as a startup phase with its own (exclusive) duration, so nested loads,
+    such as a recommender loading its dataset, are reported separately. Recommendation results are
+    cached per version, so a new version starts with an empty cache.
     """
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.result_cache = RecommendationCache(max_bytes=RESULT_CACHE_MAX_BYTES, ttl_seconds=RESULT_CACHE_TTL_SECONDS)
+        self.timings = {}
+        self._values = {}
+        self._lock = threading.RLock()
+        self._nested = []
 
-    # Set page configuration
-    st.set_page_config(page_title="Anime Recommendation System", layout="wide")
+    def get(self, name: str, loader):
+        """
+        Returns the resource called name, loading it with loader() on first use.
+        """
+        if name in self._values:
+            return self._values[name]
+        with self._lock:
+            if name not in self._values:
+                start = time.perf_counter()
+                self._nested.append(0.0)
+                try:
+                    self._values[name] = loader()
+                finally:
+                    nested = self._nested.pop()
+                    elapsed = time.perf_counter() - start
+                    if self._nested:
+                        self._nested[-1] += elapsed
+                self.timings[name] = elapsed - nested
+                serving_metrics.observe_load(name, self.timings[name])
+                logging.info(f"Startup phase '{name}' took {self.timings[name]:.3f}s")
+        return self._values[name]
+
+    def record(self, name: str, seconds: float):
+        """Records a phase measured outside the registry, once."""
+        self.timings.setdefault(name, seconds)
+
+    def report(self) -> dict:
+        """Startup time per phase, in load order, with the total in seconds."""
+        return {'phases': {name: round(seconds, 3) for name, seconds in self.timings.items()},
+                'total': round(sum(self.timings.values()), 3)}
+
+    def close(self):
+        """Releases the open recommendation store once this version is no longer served."""
+        store = self._values.get("recommendation store")
+        if store is not None:
+            store.close()
+
+def warm_resources(resources: LazyResources):
+    """
+    Loads everything a new model version serves and runs one query per method; raises if any of it is unusable.
+    """
+    vocabulary = get_vocabulary(resources)
+    user_id = int(vocabulary.user_ids[0])
+    title = next(title for title in vocabulary.anime_titles[:vocabulary.n_rated_anime] if isinstance(title, str))
+    get_search_index(resources).search(title[:3], limit=SERVING_SEARCH_PAGE_SIZE)
+    get_popularity_recommender(resources).popular_animes(n=10)
+    if resources.bundle.model_path(MODEL_TRAINER_COSINESIMILARITY_MODEL_NAME):
+        get_content_recommender(resources).get_rec_cosine(title, n_recommendations=10)
+    recommender = get_collaborative_recommender(resources)
+    for file_name, recommend in (
+        (MODEL_TRAINER_SVD_TRAINED_MODEL_NAME, lambda model: recommender.get_svd_recommendations(user_id, n=10, svd_model=model)),
+        (MODEL_TRAINER_USER_KNN_TRAINED_MODEL_NAME, lambda model: recommender.get_user_based_recommendations(user_id, n_recommendations=10, knn_user_model=model)),
+        (MODEL_TRAINER_ITEM_KNN_TRAINED_MODEL_NAME, lambda model: recommender.get_item_based_recommendations(title, n_recommendations=10, knn_item_model=model)),
+    ):
+        model = get_model(resources, file_name, required=False)
+        if model is not None:
+            recommend(model)
 
-    # Load datasets if not present in session state
-    if "anime_data" not in st.session_state or "anime_user_ratings" not in st.session_state:
-        # Load datasets from Hugging Face (assuming no splits)
-        animedataset = load_dataset(ANIME_FILE_PATH, split=None)
-        mergeddataset = load_dataset(ANIMEUSERRATINGS_FILE_PATH, split=None)
+@st.cache_resource
+def get_version_manager() -> ModelVersionManager:
+    """
+    Process-wide model versions, shared by every session.
 
-        # Convert the dataset to Pandas DataFrame
-        st.session_state.anime_data = pd.DataFrame(animedataset["train"])
-        st.session_state.anime_user_ratings = pd.DataFrame(mergeddataset["train"]) 
+    Serves the latest completed training run under Artifacts/ when there is one and hot-swaps newer
+    runs in as they complete; otherwise serves the baked-in artifact bundle.
+    The first version is loaded lazily, page by page; later versions are warmed in the background first.
+    """
+    manager = ModelVersionManager(
+        ARTIFACT_DIR, loader=lambda artifact_dir: LazyResources(RunArtifacts(artifact_dir)),
+        warmer=warm_resources, poll_seconds=SERVING_MODEL_VERSION_POLL_SECONDS
+    )
+    completed_runs = list_completed_runs(ARTIFACT_DIR)
+    if completed_runs:
+        run_artifacts = RunArtifacts(completed_runs[-1])
+        manager.install(run_artifacts.model_version, completed_runs[-1], LazyResources(run_artifacts))
+        manager.start()
+    else:
+        bundle = ArtifactBundle()
+        manager.install("bundle", bundle.bundle_dir, LazyResources(bundle))
+    return manager
 
-    # Load models only once
-    if "models_loaded" not in st.session_state:
-        st.session_state.models_loaded = {} 
-        # Load models
-        st.session_state.models_loaded["cosine_similarity_model"] = hf_hub_download(MODELS_FILEPATH, MODEL_TRAINER_COSINESIMILARITY_MODEL_NAME)
-        st.session_state.models_loaded["item_based_knn_model_path"] = hf_hub_download(MODELS_FILEPATH, MODEL_TRAINER_ITEM_KNN_TRAINED_MODEL_NAME)
-        st.session_state.models_loaded["user_based_knn_model_path"] = hf_hub_download(MODELS_FILEPATH, MODEL_TRAINER_USER_KNN_TRAINED_MODEL_NAME)
-        st.session_state.models_loaded["svd_model_path"] = hf_hub_download(MODELS_FILEPATH, MODEL_TRAINER_SVD_TRAINED_MODEL_NAME)
+@st.cache_resource
+def get_metrics_server():
+    """Local Prometheus endpoint with the serving metrics of this app process, started once."""
+    return start_metrics_server(SERVING_METRICS_HOST, SERVING_METRICS_PORT)
 
-        # Load the models using joblib
-        with open(st.session_state.models_loaded["item_based_knn_model_path"], "rb") as f:
-            st.session_state.models_loaded["item_based_knn_model"] = joblib.load(f)
+def import_module(resources: LazyResources, module: str):
+    """Imports a module, and the heavy libraries behind it, on first use."""
+    return resources.get(f"import {module}", lambda: importlib.import_module(module))
 
-        with open(st.session_state.models_loaded["user_based_knn_model_path"], "rb") as f:
-            st.session_state.models_loaded["user_based_knn_model"] = joblib.load(f)
+def get_anime_data(resources: LazyResources) -> pd.DataFrame:
+    return resources.get("dataset anime", lambda: resources.bundle.load_dataframe('anime'))
 
-        with open(st.session_state.models_loaded["svd_model_path"], "rb") as f:
-            st.session_state.models_loaded["svd_model"] = joblib.load(f)
+def get_anime_user_ratings(resources: LazyResources) -> pd.DataFrame:
+    return resources.get("dataset anime_user_ratings", lambda: resources.bundle.load_dataframe('anime_user_ratings'))
 
-        print("Models loaded successfully!")
+def get_model(resources: LazyResources, file_name: str, required: bool = True):
+    """Loads a model file with joblib on first use; returns None for a missing optional model."""
+    def loader():
+        path = resources.bundle.model_path(file_name)
+        if path is None:
+            if required:
+                raise FileNotFoundError(f"Model file {file_name} is not available.")
+            return None
+        with open(path, "rb") as f:
+            model = joblib.load(f)
+        if file_name in LAYOUT_MODELS:
+            # Neighbor indices are vocabulary rows; a model in another layout is retrained rather than served
+            model = get_collaborative_recommender(resources).conform_model(LAYOUT_MODELS[file_name], model)
+        return model
+    return resources.get(f"model {file_name}", loader)
 
-    # Access the data from session state
-    anime_data = st.session_state.anime_data 
-    anime_user_ratings = st.session_state.anime_user_ratings
+def get_vocabulary(resources: LazyResources):
+    """Shared user/anime ID vocabulary: shipped in the bundle, or built from both datasets."""
+    def loader():
+        if resources.bundle.is_local and resources.bundle.model_path(DATA_TRANSFORMATION_VOCABULARY_FILE_NAME):
+            return get_model(resources, DATA_TRANSFORMATION_VOCABULARY_FILE_NAME)
+        vocabulary_module = import_module(resources, "anime_recommender.source.vocabulary")
+        return vocabulary_module.IdVocabulary.from_frames(get_anime_data(resources), get_anime_user_ratings(resources))
+    return resources.get("vocabulary", loader)
+
+def get_search_index(resources: LazyResources):
+    """Title and user ID search index: shipped with the run or bundle, or built from the vocabulary."""
+    def loader():
+        vocabulary = get_vocabulary(resources)
+        if resources.bundle.is_local and resources.bundle.model_path(DATA_TRANSFORMATION_SEARCH_INDEX_FILE_NAME):
+            search_index = get_model(resources, DATA_TRANSFORMATION_SEARCH_INDEX_FILE_NAME)
+        else:
+            search_module = import_module(resources, "anime_recommender.source.search_index")
+            content_module = import_module(resources, "anime_recommender.source.content_based_modelling")
+            search_index = search_module.SearchIndex.from_vocabulary(
+                vocabulary, min_similarity=DATA_TRANSFORMATION_SEARCH_MIN_SIMILARITY,
+                content_anime_ids=content_module.content_catalog(get_anime_data(resources))['anime_id'].to_numpy()
+            )
+        # Recommenders resolve misspelled titles through the vocabulary
+        vocabulary.search_index = search_index
+        return search_index
+    return resources.get("search index", loader)
+
+def search_select(label: str, search_page, key: str, format_func=str):
+    """
+    A search box and one page of its matches in a selectbox, instead of every option at once.
+
+    Args:
+        label (str): Label of the selectbox.
+        search_page (callable): (query, offset) -> page dict of SearchIndex.search or SearchIndex.search_users.
+        key (str): Widget key prefix, unique per page.
+        format_func (callable): Display text of a result.
+
+    Returns:
+        The selected result, or None when nothing matches.
+    """
+    query = st.text_input("Search", key=f"{key}_query", placeholder="Type to search, typos are fine")
+    page = search_page(query, 0)
+    n_pages = max(1, -(-page['total'] // SERVING_SEARCH_PAGE_SIZE))
+    page_number = st.number_input(f"Page (of {n_pages}, {page['total']} matches)", min_value=1, max_value=n_pages, value=1, key=f"{key}_page")
+    if page_number > 1:
+        page = search_page(query, (page_number - 1) * SERVING_SEARCH_PAGE_SIZE)
+    return st.selectbox(label, page['results'], format_func=format_func, key=key)
+
+def get_content_recommender(resources: LazyResources):
+    def loader():
+        content_module = import_module(resources, "anime_recommender.source.content_based_modelling")
+        return content_module.ContentBasedRecommender(
+            get_anime_data(resources), vocabulary=get_vocabulary(resources),
+            model_path=resources.bundle.model_path(MODEL_TRAINER_COSINESIMILARITY_MODEL_NAME), result_cache=resources.result_cache
+        )
+    return resources.get("content recommender", loader)
+
+def get_collaborative_recommender(resources: LazyResources):
+    def loader():
+        collaborative_module = import_module(resources, "anime_recommender.source.collaborative_modelling")
+        return collaborative_module.CollaborativeAnimeRecommender(
+            get_anime_user_ratings(resources), vocabulary=get_vocabulary(resources),
+            recommendation_store=get_recommendation_store(resources), result_cache=resources.result_cache
+        )
+    return resources.get("collaborative recommender", loader)
+
+def get_popularity_recommender(resources: LazyResources):
+    """Popularity rankings of the catalog, computed once per model version and shared by every session."""
+    return resources.get(
+        "popularity recommender", lambda: PopularityBasedFiltering(get_anime_data(resources), result_cache=resources.result_cache)
+    )
+
+def get_recommendation_store(resources: LazyResources):
+    """Materialized per-user recommendations, served before falling back to live scoring."""
+    def loader():
+        path = resources.bundle.model_path(RECOMMENDATION_STORE_FILE_NAME)
+        if path is None:
+            return None
+        store_module = import_module(resources, "anime_recommender.source.recommendation_store")
+        return store_module.RecommendationStore(path)
+    return resources.get("recommendation store", loader)
+
+def run_app():
+    """
+    Initializes the Streamlit app and provides a UI for anime recommendations based on three methods: 
+    Content-Based, Collaborative, and Popularity-Based Filtering. 🎬🎮
+    Datasets and models are loaded lazily, the first time a page needs them.
+    """
+
+    # Set page configuration
+    st.set_page_config(page_title="Anime Recommendation System", layout="wide")
+
+    get_metrics_server()
+    # Pin one model version for this script run; a newly swapped-in version is picked up by the next run
+    version = get_version_manager().acquire()
+    try:
+        render_app(version.value)
+    finally:
+        version.release()
+
+def render_app(resources: LazyResources):
+    """
+    Renders the selected page from the resources of one model version.
+    """
+    resources.record("app imports", _IMPORT_SECONDS)
+    result_cache = resources.result_cache
+    result_cache.set_model_version(resources.get("model version", lambda: resources.bundle.model_version))
 
-    # # Display dataset info
-    # st.write("Anime Data:")
-    # st.dataframe(anime_data.head())
-    
-    # st.write("Anime User Ratings Data:")
-    # st.dataframe(anime_user_ratings.head())
-    
-    # Access the models from session state
-    cosine_similarity_model_path = hf_hub_download(MODELS_FILEPATH, MODEL_TRAINER_COSINESIMILARITY_MODEL_NAME)
-    item_based_knn_model = st.session_state.models_loaded["item_based_knn_model"]
-    user_based_knn_model = st.session_state.models_loaded["user_based_knn_model"]
-    svd_model = st.session_state.models_loaded["svd_model"] 
-    print("Models loaded successfully!")
-        
     # Streamlit UI
     app_selector = st.sidebar.radio(
-        "Select App", ("Content-Based Recommender", "Collaborative Recommender", "Top Anime Recommender")
+        "Select App", ("Content-Based Recommender", "Collaborative Recommender", "Top Anime Recommender", "Admin")
     )
+    with st.sidebar.expander("Result cache"):
+        st.json(result_cache.stats())
+    startup_report = st.sidebar.expander("Startup time")
+    st.sidebar.caption(f"Model version: {result_cache.model_version}")
 
     # Content-Based Recommender App
     if app_selector == "Content-Based Recommender":
         st.title("Content-Based Recommendation System") 
         try:
+            anime_data = get_anime_data(resources)
+            search_index = get_search_index(resources)
             
-            anime_list = anime_data["name"].tolist()
-            anime_name = st.selectbox("Pick an anime..unlock similar anime recommendations..", anime_list) 
+            anime = search_select(
+                "Pick an anime..unlock similar anime recommendations..",
+                lambda query, offset: search_index.search(query, offset=offset, limit=SERVING_SEARCH_PAGE_SIZE, content_only=True),
+                key="content_anime", format_func=lambda result: result['name']
+            )
+            anime_name = anime['name'] if anime else None
 
             # Set number of recommendations
             max_recommendations = min(len(anime_data), 100)
@@ -99,10 +297,10 @@ def run_app():
                 unsafe_allow_html=True,
             ) 
             # Get Recommendations
-            if st.button("Get Recommendations"):
+            if st.button("Get Recommendations") and anime_name:
                 try:
-                    recommender = ContentBasedRecommender(anime_data)
-                    recommendations = recommender.get_rec_cosine(anime_name, n_recommendations=n_recommendations,model_path=cosine_similarity_model_path)
+                    recommender = get_content_recommender(resources)
+                    recommendations = recommender.get_rec_cosine(anime_name, n_recommendations=n_recommendations)
 
                     if isinstance(recommendations, str):
                         st.warning(recommendations)
@@ -111,15 +309,15 @@ def run_app():
                     else:
                         st.write(f"Here are the Content-based Recommendations for {anime_name}:") 
                         cols = st.columns(5)
-                        for i, row in enumerate(recommendations.iterrows()):
+                        for i, anime in enumerate(recommendations):
                             col = cols[i % 5]
                             with col:
-                                st.image(row[1]['Image URL'], use_container_width=True)
+                                st.image(anime.image_url, use_container_width=True)
                                 st.markdown(
-                                    f"<div class='anime-title'>{row[1]['Anime name']}</div>",
+                                    f"<div class='anime-title'>{anime.name}</div>",
                                     unsafe_allow_html=True,
                                 )
-                                st.caption(f"Genres: {row[1]['Genres']} | Rating: {row[1]['Rating']}") 
+                                st.caption(f"Genres: {anime.genres} | Rating: {anime.rating}") 
                 except Exception as e:
                     st.error(f"Unexpected error: {str(e)}")
     
@@ -130,50 +328,71 @@ def run_app():
         st.title("Collaborative Recommender System 🧑‍🤝‍🧑💬")
         
         try:  
+            search_index = get_search_index(resources)
             # Sidebar for choosing the collaborative filtering method
             collaborative_method = st.sidebar.selectbox(
                 "Choose a collaborative filtering method:", 
-                ["SVD Collaborative Filtering", "User-Based Collaborative Filtering", "Anime-Based KNN Collaborative Filtering"]
+                ["SVD Collaborative Filtering", "User-Based Collaborative Filtering", "Anime-Based KNN Collaborative Filtering", "Because You Watched Collaborative Filtering"]
             )
 
             # User input
-            if collaborative_method == "SVD Collaborative Filtering" or collaborative_method == "User-Based Collaborative Filtering": 
-                user_ids = anime_user_ratings['user_id'].unique()  
-                user_id = st.selectbox("Choose a user, and we'll show you animes they'd recommend", user_ids) 
+            if collaborative_method in ("SVD Collaborative Filtering", "User-Based Collaborative Filtering", "Because You Watched Collaborative Filtering"): 
+                user_id = search_select(
+                    "Choose a user, and we'll show you animes they'd recommend",
+                    lambda prefix, offset: search_index.search_users(prefix, offset=offset, limit=SERVING_SEARCH_PAGE_SIZE),
+                    key="collaborative_user"
+                )
                 n_recommendations = st.slider("Number of Recommendations:", min_value=1, max_value=50, value=10)
             elif collaborative_method == "Anime-Based KNN Collaborative Filtering": 
-                anime_list = anime_user_ratings["name"].dropna().unique().tolist() 
-                anime_name = st.selectbox("Pick an anime, and we'll suggest more titles you'll love", anime_list)
+                anime = search_select(
+                    "Pick an anime, and we'll suggest more titles you'll love",
+                    lambda query, offset: search_index.search(query, offset=offset, limit=SERVING_SEARCH_PAGE_SIZE, rated_only=True),
+                    key="collaborative_anime", format_func=lambda result: result['name']
+                )
+                anime_name = anime['name'] if anime else None
                 n_recommendations = st.slider("Number of Recommendations:", min_value=1, max_value=50, value=10)
     
             # Get recommendations
             if st.button("Get Recommendations"):
-                # Load the recommender
-                recommender = CollaborativeAnimeRecommender(anime_user_ratings) 
+                # Load the recommender and only the model of the chosen method
+                recommender = get_collaborative_recommender(resources)
                 if collaborative_method == "SVD Collaborative Filtering": 
-                    recommendations = recommender.get_svd_recommendations(user_id, n=n_recommendations, svd_model=svd_model)  
+                    recommendations = recommender.get_svd_recommendations(user_id, n=n_recommendations, svd_model=get_model(resources, MODEL_TRAINER_SVD_TRAINED_MODEL_NAME))  
                 elif collaborative_method == "User-Based Collaborative Filtering": 
-                    recommendations = recommender.get_user_based_recommendations(user_id, n_recommendations=n_recommendations, knn_user_model=user_based_knn_model)
+                    recommendations = recommender.get_user_based_recommendations(user_id, n_recommendations=n_recommendations, knn_user_model=get_model(resources, MODEL_TRAINER_USER_KNN_TRAINED_MODEL_NAME))
                 elif collaborative_method == "Anime-Based KNN Collaborative Filtering":
                     if anime_name: 
-                        recommendations = recommender.get_item_based_recommendations(anime_name, n_recommendations=n_recommendations, knn_item_model=item_based_knn_model)
+                        recommendations = recommender.get_item_based_recommendations(anime_name, n_recommendations=n_recommendations, knn_item_model=get_model(resources, MODEL_TRAINER_ITEM_KNN_TRAINED_MODEL_NAME))
                     else:
                         st.error("Invalid Anime Name. Please enter a valid anime title.")
+                elif collaborative_method == "Because You Watched Collaborative Filtering":
+                    def load_item_neighbor_table():
+                        table = get_model(resources, MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_NAME, required=False)
+                        if table is None:
+                            # Older model repos don't ship the table; build it once from the item-based KNN model
+                            table = recommender.build_item_neighbor_table(
+                                k=MODEL_TRAINER_ITEM_NEIGHBOR_TABLE_K, knn_item_model=get_model(resources, MODEL_TRAINER_ITEM_KNN_TRAINED_MODEL_NAME)
+                            )
+                        return table
+                    item_neighbor_table = resources.get("item neighbor table", load_item_neighbor_table)
+                    recommendations = recommender.get_because_you_watched_recommendations(
+                        user_id=user_id, n_recommendations=n_recommendations, item_neighbor_table=item_neighbor_table
+                    )
                 
-                if isinstance(recommendations, pd.DataFrame) and not recommendations.empty:
+                if isinstance(recommendations, Recommendations) and not recommendations.empty:
                     if len(recommendations) < n_recommendations:
                         st.warning(f"Oops...Only {len(recommendations)} recommendations available, fewer than the requested {n_recommendations}.")
                     st.write(f"Here are the {collaborative_method} Recommendations:") 
                     cols = st.columns(5)
-                    for i, row in enumerate(recommendations.iterrows()):
+                    for i, anime in enumerate(recommendations):
                         col = cols[i % 5]
                         with col:
-                            st.image(row[1]['Image URL'], use_container_width=True)
+                            st.image(anime.image_url, use_container_width=True)
                             st.markdown(
-                                f"<div class='anime-title'>{row[1]['Anime Name']}</div>",
+                                f"<div class='anime-title'>{anime.name}</div>",
                                 unsafe_allow_html=True,
                             ) 
-                            st.caption(f"Genres: {row[1]['Genres']} | Rating: {row[1]['Rating']}")
+                            st.caption(f"Genres: {anime.genres} | Rating: {anime.rating}")
                 else:
                     st.error("No recommendations found.")
         except Exception as e:
@@ -199,44 +418,88 @@ def run_app():
             n_recommendations = st.slider("Number of Recommendations:", min_value=1, max_value=500 , value=10)
             
             if st.button("Get Recommendations"): 
-                recommender = PopularityBasedFiltering(anime_data)
-                
-                # Get recommendations based on selected method
-                if popularity_method == "Popular Animes":
-                    recommendations = recommender.popular_animes(n=n_recommendations)
-                elif popularity_method == "Top Ranked Animes":
-                    recommendations = recommender.top_ranked_animes(n=n_recommendations)
-                elif popularity_method == "Overall Top Rated Animes":
-                    recommendations = recommender.overall_top_rated_animes(n=n_recommendations)
-                elif popularity_method == "Favorite Animes":
-                    recommendations = recommender.favorite_animes(n=n_recommendations)
-                elif popularity_method == "Top Animes by Members":
-                    recommendations = recommender.top_animes_members(n=n_recommendations)
-                elif popularity_method == "Popular Anime Among Members":
-                    recommendations = recommender.popular_anime_among_members(n=n_recommendations)
-                elif popularity_method == "Top Average Rated Animes":
-                    recommendations = recommender.top_avg_rated(n=n_recommendations)
-                else:
-                    st.error("Invalid selection. Please choose a valid method.")
-                    recommendations = None
+                recommender = get_popularity_recommender(resources)
+                filter_type = {
+                    "Popular Animes": 'popular_animes',
+                    "Top Ranked Animes": 'top_ranked_animes',
+                    "Overall Top Rated Animes": 'overall_top_rated_animes',
+                    "Favorite Animes": 'favorite_animes',
+                    "Top Animes by Members": 'top_animes_members',
+                    "Popular Anime Among Members": 'popular_anime_among_members',
+                    "Top Average Rated Animes": 'top_avg_rated',
+                }[popularity_method]
                 
-                # Display recommendations
-                if isinstance(recommendations, pd.DataFrame) and not recommendations.empty:
-                    st.write(f" Here are the Recommendations:")
+                # Display recommendations page by page, each rendered as soon as it is formatted
+                shown = 0
+                for recommendations in recommender.cursor(filter_type).pages(POPULARITY_PAGE_SIZE, limit=n_recommendations):
+                    if shown == 0:
+                        st.write(f" Here are the Recommendations:")
                     cols = st.columns(5)
-                    for i, row in recommendations.iterrows():
+                    for i, anime in enumerate(recommendations):
                         col = cols[i % 5]
                         with col:
-                            st.image(row['Image URL'], use_container_width=True)
+                            st.image(anime.image_url, use_container_width=True)
                             st.markdown(
-                                f"<div class='anime-title'>{row['Anime name']}</div>",
+                                f"<div class='anime-title'>{anime.name}</div>",
                                 unsafe_allow_html=True,
                             )
-                            st.caption(f"Genres: {row['Genres']} | Rating: {row['Rating']}")
-                else:
+                            st.caption(f"Genres: {anime.genres} | Rating: {anime.rating}")
+                    shown += len(recommendations)
+                if shown == 0:
                     st.error("No recommendations found.")
         except Exception as e:
             st.error(f"An error occurred: {e}")
 
+    elif app_selector == "Admin":
+        render_admin_page(resources)
+
+    # Filled in last so it includes whatever this run loaded
+    with startup_report:
+        st.json(resources.report())
+
+def render_admin_page(resources: LazyResources):
+    """
+    Shows the serving metrics of this app process: per-method latency and throughput, the cache
+    outcome split, the lookup/scoring/metadata breakdown, load times and the instrumentation overhead.
+    """
+    st.title("Serving Metrics")
+    metrics_server = get_metrics_server()
+    if metrics_server is not None:
+        host, port = metrics_server.server_address[:2]
+        st.caption(f"Prometheus endpoint: http://{host}:{port}/metrics")
+    snapshot = serving_metrics.snapshot()
+    overhead = snapshot['overhead']
+    columns = st.columns(3)
+    columns[0].metric("Requests", sum(method['count'] for method in snapshot['requests'].values()))
+    columns[1].metric("Instrumentation per request", f"{overhead['per_request_us']:.1f} µs")
+    columns[2].metric(
+        "Overhead of mean request",
+        f"{overhead['fraction']:.3%}" if overhead['fraction'] is not None else "n/a",
+        delta=None if overhead['within_budget'] else "over budget", delta_color="inverse",
+    )
+
+    st.subheader("Latency by method")
+    st.dataframe(pd.DataFrame.from_dict(
+        {method: {key: value for key, value in stats.items() if key != 'by_cache'} for method, stats in snapshot['requests'].items()},
+        orient='index'
+    ))
+    st.subheader("Latency by cache outcome")
+    st.dataframe(pd.DataFrame.from_dict(
+        {(method, cache): stats for method, method_stats in snapshot['requests'].items() for cache, stats in method_stats['by_cache'].items()},
+        orient='index'
+    ))
+    st.subheader("Request phases")
+    st.caption(f"Timed on one request in {SERVING_METRICS_PHASE_SAMPLE_EVERY}; micro-batches are always timed.")
+    st.dataframe(pd.DataFrame.from_dict(
+        {(method, name): stats for method, phases in snapshot['phases'].items() for name, stats in phases.items()},
+        orient='index'
+    ))
+    st.subheader("Load times")
+    st.dataframe(pd.DataFrame.from_dict(snapshot['loads'], orient='index'))
+    with st.expander("Result cache and model versions"):
+        st.json({'result_cache': resources.result_cache.stats(), 'model_versions': get_version_manager().status()})
+    if st.button("Reset metrics"):
+        serving_metrics.reset()
+
 if __name__ == "__main__":
     run_app()
\ No newline at end of file
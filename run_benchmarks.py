@@ -0,0 +1,80 @@
+import sys
+import json
+import argparse
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.entity.config_entity import BenchmarkConfig
+from anime_recommender.utils.main_utils.utils import save_json
+from anime_recommender.benchmarks.compare import compare_reports, format_comparison
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the recommender on synthetic data and compare runs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Generate a synthetic dataset and run the benchmarks.")
+    run.add_argument("--scale", default=None, help="Dataset scale: 10k, 100k, 1m, 10m or 50m ratings.")
+    run.add_argument("--seed", type=int, default=None)
+    run.add_argument("--repeats", type=int, default=None, help="Timed runs of each fast training benchmark.")
+    run.add_argument("--queries", type=int, default=None, help="Queries per latency benchmark.")
+    run.add_argument("--batch-size", type=int, default=None)
+    run.add_argument("--only", nargs="*", default=None, help="Benchmark name prefixes to run, e.g. train.svd latency.")
+    run.add_argument("--no-memory", action="store_true", help="Skip the traced peak-memory runs.")
+    run.add_argument("--output", default=None, help="Report path. Defaults to benchmarks/<timestamp>/benchmark_report.json.")
+    run.add_argument("--baseline", default=None, help="Report to compare the new run against.")
+
+    generate = subparsers.add_parser("generate", help="Only write the synthetic Animes and UserRatings CSV files.")
+    generate.add_argument("--scale", default=None)
+    generate.add_argument("--seed", type=int, default=None)
+    generate.add_argument("--output-dir", required=True)
+
+    compare = subparsers.add_parser("compare", help="Compare two benchmark reports and flag regressions.")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=None, help="Relative change flagged as a regression. Defaults to 0.10.")
+    return parser.parse_args()
+
+
+def load_report(file_path: str) -> dict:
+    with open(file_path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """Prints the comparison; returns the process exit code, 1 when there are regressions."""
+    comparison = compare_reports(baseline, current, threshold)
+    print(format_comparison(comparison))
+    return 1 if comparison['regressions'] else 0
+
+
+if __name__ == "__main__":
+    try:
+        args = parse_args()
+        benchmark_config = BenchmarkConfig()
+        if args.command == "compare":
+            threshold = args.threshold if args.threshold is not None else benchmark_config.regression_threshold
+            sys.exit(compare(load_report(args.baseline), load_report(args.current), threshold))
+        benchmark_config.scale = args.scale or benchmark_config.scale
+        benchmark_config.seed = args.seed if args.seed is not None else benchmark_config.seed
+        if args.command == "generate":
+            from anime_recommender.benchmarks.synthetic_data import SyntheticAnimeData
+            print(SyntheticAnimeData.from_scale(benchmark_config.scale, seed=benchmark_config.seed).write(args.output_dir))
+            sys.exit(0)
+
+        # Imported here so compare does not pull in the model libraries
+        from anime_recommender.benchmarks.suite import BenchmarkSuite
+        benchmark_config.repeats = args.repeats or benchmark_config.repeats
+        benchmark_config.latency_queries = args.queries or benchmark_config.latency_queries
+        benchmark_config.batch_size = args.batch_size or benchmark_config.batch_size
+        benchmark_config.track_memory = not args.no_memory
+        logging.info(f"Running benchmarks at scale {benchmark_config.scale} in {benchmark_config.benchmark_dir}")
+        report = BenchmarkSuite(benchmark_config, only=args.only).run()
+        output = args.output or benchmark_config.report_file_path
+        save_json(report, output)
+        print(json.dumps(report, indent=2))
+        print(f"Benchmark report written to {output}")
+        if args.baseline:
+            sys.exit(compare(load_report(args.baseline), report, benchmark_config.regression_threshold))
+    except Exception as e:
+        logging.error(f"Benchmark run failed: {str(e)}")
+        raise AnimeRecommendorException(e, sys)
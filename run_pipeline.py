@@ -1,12 +1,16 @@
 import sys
+import argparse
 from anime_recommender.pipelines.training_pipeline import TrainingPipeline
 from anime_recommender.loggers.logging import logging
 from anime_recommender.exception.exception import AnimeRecommendorException
 
 if __name__ == "__main__":
     try:
+        parser = argparse.ArgumentParser(description="Run the anime recommender training pipeline.")
+        parser.add_argument("--profile", action="store_true", help="Dump a cProfile of every stage next to the run report.")
+        args = parser.parse_args()
         logging.info("Starting the Anime Recommendation System Training Pipeline...")
-        pipeline = TrainingPipeline()
+        pipeline = TrainingPipeline(profile=args.profile)
         pipeline.run_pipeline() 
     except Exception as e:
         logging.error(f"Pipeline execution failed: {str(e)}")
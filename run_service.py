@@ -0,0 +1,79 @@
+import sys
+import json
+import asyncio
+import argparse
+from anime_recommender.loggers.logging import logging
+from anime_recommender.exception.exception import AnimeRecommendorException
+from anime_recommender.constant import ARTIFACT_DIR
+from anime_recommender.entity.config_entity import ServingConfig
+from anime_recommender.serving.model_versions import list_completed_runs
+from anime_recommender.utils.main_utils.utils import get_latest_artifact_dir, load_object, save_json
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Anime recommendation HTTP service, served offline from local training artifacts.")
+    parser.add_argument("command", choices=("serve", "load-test"), help="Run the service, or load test a running one.")
+    parser.add_argument("--artifact-dir", default=None, help="Serve this training run only. By default the latest completed run is served and newer runs are swapped in as they complete.")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=None, help="Concurrent clients for load-test.")
+    parser.add_argument("--requests", type=int, default=None, help="Total requests for load-test.")
+    return parser.parse_args()
+
+
+def load_service(artifact_dir: str):
+    # Imported here so load-test does not pull in the model libraries
+    from anime_recommender.serving.service import RecommendationService
+    return RecommendationService(ServingConfig(artifact_dir))
+
+
+async def serve(serving_config: ServingConfig, watch: bool):
+    from anime_recommender.serving.model_versions import ModelVersionManager
+    from anime_recommender.serving.server import RecommendationHTTPServer
+    manager = ModelVersionManager(
+        ARTIFACT_DIR, loader=load_service, warmer=lambda service: service.warm(),
+        poll_seconds=serving_config.model_version_poll_seconds
+    )
+    manager.load_version(serving_config.artifact_dir)
+    if watch:
+        manager.start()
+    server = RecommendationHTTPServer(manager, serving_config.host, serving_config.port)
+    await server.start()
+    print(f"Serving version {manager.current.version_id} {manager.current.value.methods} on http://{serving_config.host}:{server.port}")
+    try:
+        await server.serve_forever()
+    finally:
+        manager.stop()
+
+
+async def load_test(serving_config: ServingConfig):
+    from anime_recommender.serving.load_test import build_targets, run_load_test
+    reader, writer = await asyncio.open_connection(serving_config.host, serving_config.port)
+    writer.write(f"GET /health HTTP/1.1\r\nHost: {serving_config.host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    methods = json.loads((await reader.read()).split(b"\r\n\r\n", 1)[1])["methods"]
+    writer.close()
+
+    vocabulary = load_object(serving_config.vocabulary_file_path)
+    targets = build_targets(vocabulary, methods, serving_config.load_test_requests)
+    report = await run_load_test(serving_config.host, serving_config.port, targets, serving_config.load_test_concurrency)
+    save_json(report, serving_config.latency_report_file_path)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    try:
+        args = parse_args()
+        completed_runs = list_completed_runs(ARTIFACT_DIR)
+        serving_config = ServingConfig(args.artifact_dir or (completed_runs[-1] if completed_runs else get_latest_artifact_dir()))
+        serving_config.host = args.host or serving_config.host
+        serving_config.port = args.port or serving_config.port
+        serving_config.load_test_concurrency = args.concurrency or serving_config.load_test_concurrency
+        serving_config.load_test_requests = args.requests or serving_config.load_test_requests
+        logging.info(f"Starting recommendation service command '{args.command}' for {serving_config.artifact_dir}")
+        asyncio.run(serve(serving_config, watch=args.artifact_dir is None) if args.command == "serve" else load_test(serving_config))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logging.error(f"Recommendation service failed: {str(e)}")
+        raise AnimeRecommendorException(e, sys)